@@ -55,6 +55,10 @@ class AccountBroker(DatabaseBroker):
     db_type = 'account'
     db_contains_type = 'container'
     db_reclaim_timestamp = 'delete_timestamp'
+    # name, put_timestamp, delete_timestamp, object_count, bytes_used,
+    # deleted, storage_policy_index; the account server puts the values of
+    # container update headers, so only deleted is an int
+    pending_fields = 'SSSSSIS'
 
     def _initialize(self, conn, put_timestamp, **kwargs):
         """
@@ -93,6 +93,10 @@ class AccountController(BaseStorageServer):
             config_true_value(conf.get('db_preallocation', 'f'))
         swift.common.db.QUERY_LOGGING = \
             config_true_value(conf.get('db_query_logging', 'f'))
+        swift.common.db.GROUP_COMMIT_WINDOW = \
+            float(conf.get('db_group_commit_window', 0))
+        swift.common.db.BINARY_PENDING = \
+            config_true_value(conf.get('db_binary_pending', 'f'))
         self.fallocate_reserve, self.fallocate_is_percent = \
             config_fallocate_value(conf.get('fallocate_reserve', '1%'))
 
@@ -322,22 +322,19 @@ def _check_own_shard_range(broker, args):
 
 def _find_ranges(broker, args, status_file=None):
     start = last_report = time.time()
-    limit = 5 if status_file else -1
-    shard_data, last_found = broker.find_shard_ranges(
-        args.rows_per_shard, limit=limit,
-        minimum_shard_size=args.minimum_shard_size)
-    if shard_data:
-        while not last_found:
-            if last_report + 10 < time.time():
-                print('Found %d ranges in %gs; looking for more...' % (
-                    len(shard_data), time.time() - start), file=status_file)
-                last_report = time.time()
-            # prefix doesn't matter since we aren't persisting it
-            found_ranges = make_shard_ranges(broker, shard_data, '.shards_')
-            more_shard_data, last_found = broker.find_shard_ranges(
-                args.rows_per_shard, existing_ranges=found_ranges, limit=5,
-                minimum_shard_size=args.minimum_shard_size)
-            shard_data.extend(more_shard_data)
+
+    def report_progress(shard_data):
+        nonlocal last_report
+        if last_report + 10 < time.time():
+            print('Found %d ranges in %gs; looking for more...' % (
+                len(shard_data), time.time() - start), file=status_file)
+            last_report = time.time()
+
+    # find all ranges in one call: each call takes time in proportion to the
+    # number of ranges already found, so finding a few at a time is quadratic
+    shard_data, _last_found = broker.find_shard_ranges(
+        args.rows_per_shard, minimum_shard_size=args.minimum_shard_size,
+        progress_callback=report_progress if status_file else None)
     return shard_data, time.time() - start
 
 
@@ -351,7 +351,8 @@ class Relinker(object):
                         self.diskfile_mgr.partition_lock(
                             device, self.policy, partition):
                         # Order here is somewhat important for crash-tolerance
-                        for f in ('hashes.pkl', 'hashes.invalid', '.lock',
+                        for f in ('hashes.pkl', 'hashes.log',
+                                  'hashes.invalid', '.lock',
                                   '.lock-replication'):
                             try:
                                 os.unlink(os.path.join(partition_path, f))
@@ -699,6 +700,7 @@ class Relinker(object):
 
     def _run(self):
         num_policies = 0
+        unsupported_policies = 0
         for policy in self.conf['policies']:
             self.policy = policy
             policy.object_ring = None  # Ensure it will be reloaded
@@ -711,6 +713,13 @@ class Relinker(object):
                 continue
 
             num_policies += 1
+            if not self.diskfile_router[policy].files_in_hash_dirs:
+                # leaving its objects in the old partitions would strand them
+                self.logger.error(
+                    'Policy %s stores object files outside of hash dirs, '
+                    'which cannot be relinked', policy.name)
+                unsupported_policies += 1
+                continue
             self.process_policy(policy)
 
         # Some stat collation happens during _update_recon and we want to force
@@ -721,7 +730,7 @@ class Relinker(object):
                 "No policy found to increase the partition power.")
             return EXIT_NO_APPLICABLE_POLICY
 
-        if self.total_errors > 0:
+        if self.total_errors > 0 or unsupported_policies:
             log_method = self.logger.warning
             # NB: audit_location_generator logs unmounted disks as warnings,
             # but we want to treat them as errors
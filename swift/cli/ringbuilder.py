@@ -34,7 +34,8 @@ from swift.common import exceptions
 from swift.common.ring import RingBuilder, Ring, RingData
 from swift.common.ring.builder import MAX_BALANCE
 from swift.common.ring.composite_builder import CompositeRingBuilder
-from swift.common.ring.ring import RING_CODECS, DEFAULT_RING_FORMAT_VERSION
+from swift.common.ring.ring import RING_CODECS, DEFAULT_RING_FORMAT_VERSION, \
+    get_mmap_ring_path
 from swift.common.ring.utils import validate_args, \
     validate_and_normalize_ip, build_dev_from_opts, \
     parse_builder_ring_filename_args, parse_search_value, \
@@ -1205,8 +1206,12 @@ swift-ring-builder <builder_file> rebalance [options]
             pathjoin(backup_dir, '%d.' % ts + basename(ring_file)),
             format_version=options.format_version)
         builder.save(pathjoin(backup_dir, '%d.' % ts + basename(builder_file)))
-        builder.get_ring().save(
-            ring_file, format_version=options.format_version)
+        ring_data = builder.get_ring()
+        ring_data.save(ring_file, format_version=options.format_version)
+        mmap_file = get_mmap_ring_path(ring_file)
+        if exists(mmap_file):
+            # keep an existing sidecar in step with the new ring
+            ring_data.save_mmap(mmap_file, ring_file)
         builder.save(builder_file)
         exit(status)
 
@@ -1325,17 +1330,25 @@ swift-ring-builder <builder_file> validate
     @staticmethod
     def write_ring():
         """
-swift-ring-builder <builder_file> write_ring
+swift-ring-builder <builder_file> write_ring [--mmap]
     Just rewrites the distributable ring file. This is done automatically after
     a successful rebalance, so really this is only useful after one or more
     'set_info' calls when no rebalance is needed but you want to send out the
     new device information.
+
+    With --mmap, an uncompressed <ring_name>.ring.mmap file is also written
+    next to the ring file. Distribute it alongside the ring file and servers
+    will map it rather than loading the ring into every worker process.
+    Once written, the sidecar is kept up to date by rebalance.
         """
         usage = Commands.write_ring.__doc__.strip()
         parser = optparse.OptionParser(usage)
         parser.add_option('--format-version',
                           choices=FORMAT_CHOICES, default=None,
                           help="specify ring format version")
+        parser.add_option('--mmap', action='store_true', default=False,
+                          help="also write an uncompressed sidecar that "
+                          "servers may mmap")
         options, args = parser.parse_args(argv)
         if options.format_version is None:
             print("Defaulting to --format-version=1. This ensures the ring\n"
@@ -1361,6 +1374,9 @@ swift-ring-builder <builder_file> write_ring
             pathjoin(backup_dir, '%d.' % time() + basename(ring_file)),
             format_version=options.format_version)
         ring_data.save(ring_file, format_version=options.format_version)
+        mmap_file = get_mmap_ring_path(ring_file)
+        if options.mmap or exists(mmap_file):
+            ring_data.save_mmap(mmap_file, ring_file)
         exit(EXIT_SUCCESS)
 
     @staticmethod
@@ -24,9 +24,11 @@ from uuid import uuid4
 import time
 import errno
 import pickle  # nosec: B403
+import re
+import struct
 from tempfile import mkstemp
 
-from swift.common.concurrency import sleep, Timeout
+from swift.common.concurrency import Event, sleep, Timeout
 import sqlite3
 
 from swift.common.constraints import MAX_META_COUNT, MAX_META_OVERALL_SIZE, \
@@ -50,10 +52,157 @@ PICKLE_PROTOCOL = 2
 #: Max size of .pending file in bytes. When this is exceeded, the pending
 # records will be merged.
 PENDING_CAP = 131072
+#: Seconds that records put to a DB wait for concurrent records to the same DB
+# so that they are all written to its .pending file together. Zero disables
+# grouping.
+GROUP_COMMIT_WINDOW = 0
+#: Whether records are written to .pending files in the binary format rather
+# than as base64 encoded pickles. Both formats are always read.
+BINARY_PENDING = False
 
 SQLITE_ARG_LIMIT = 999
 RECLAIM_PAGE_SIZE = 10000
 
+# pending file path -> _PendingGroup of records waiting to be written to it
+_pending_groups = {}
+
+# A binary .pending entry is the marker, a format version, the number of
+# fields in the record and the length of the rest of the entry. The rest
+# starts with an int for each field, which for a str field is the length of its
+# utf-8 encoded value (or PENDING_NULL for None) and for an int field is its
+# value, followed by the encoded str values. Neither the marker nor the version
+# can appear in base64, which lets both formats share a file.
+PENDING_BINARY_MARKER = b'\x01'
+PENDING_BINARY_VERSION = 1
+PENDING_NULL = 0xffffffff
+_PENDING_HEADER = struct.Struct('>cBBI')
+_PENDING_DELIMITERS = re.compile(b'[:' + PENDING_BINARY_MARKER + b']')
+_pending_structs = {}
+
+
+def _pending_struct(fields):
+    try:
+        return _pending_structs[fields]
+    except KeyError:
+        return _pending_structs.setdefault(fields, struct.Struct(
+            '>' + ''.join('I' if field == 'S' else 'q' for field in fields)))
+
+
+def encode_pending_record(fields, record):
+    """
+    Encode a record as a binary .pending entry.
+
+    :param fields: a string with a character for each item of ``record``,
+        ``S`` for a str or None or ``I`` for an int.
+    :param record: a tuple, as returned by a broker's
+        :meth:`~swift.common.db.DatabaseBroker.make_tuple_for_pickle`
+    :returns: the entry as a byte string.
+    :raises ValueError: if the record does not match ``fields``.
+    """
+    if len(record) != len(fields):
+        raise ValueError('expected %d fields, got %d' % (
+            len(fields), len(record)))
+    values = []
+    strings = []
+    for field, value in zip(fields, record):
+        if field != 'S':
+            values.append(value)
+        elif value is None:
+            values.append(PENDING_NULL)
+        else:
+            if isinstance(value, str):
+                value = value.encode('utf-8')
+            elif not isinstance(value, bytes):
+                raise ValueError('expected a string, got %r' % (value,))
+            values.append(len(value))
+            strings.append(value)
+    try:
+        body = _pending_struct(fields).pack(*values) + b''.join(strings)
+    except struct.error as err:
+        raise ValueError(str(err))
+    return _PENDING_HEADER.pack(PENDING_BINARY_MARKER, PENDING_BINARY_VERSION,
+                                len(fields), len(body)) + body
+
+
+def decode_pending_record(fields, entry):
+    """
+    Decode a binary .pending entry.
+
+    :param fields: a string with a character for each field that the entry's
+        broker writes, as for :func:`encode_pending_record`. The entry may
+        have been written with fewer fields.
+    :param entry: a byte string holding the whole entry.
+    :returns: the record as a tuple.
+    :raises ValueError: if the entry is invalid.
+    """
+    try:
+        marker, version, count, length = _PENDING_HEADER.unpack_from(entry)
+    except struct.error as err:
+        raise ValueError(str(err))
+    if version != PENDING_BINARY_VERSION or count > len(fields):
+        raise ValueError('unsupported entry version %d with %d fields' % (
+            version, count))
+    if length != len(entry) - _PENDING_HEADER.size:
+        raise ValueError('expected entry of length %d, got %d' % (
+            length, len(entry) - _PENDING_HEADER.size))
+    fields = fields[:count]
+    header = _pending_struct(fields)
+    try:
+        record = list(header.unpack_from(entry, _PENDING_HEADER.size))
+    except struct.error as err:
+        raise ValueError(str(err))
+    offset = _PENDING_HEADER.size + header.size
+    for i, field in enumerate(fields):
+        if field == 'S':
+            size = record[i]
+            if size == PENDING_NULL:
+                record[i] = None
+            else:
+                record[i] = entry[offset:offset + size].decode('utf-8')
+                offset += size
+    if offset != len(entry):
+        raise ValueError('expected entry of length %d, got %d' % (
+            offset, len(entry)))
+    return tuple(record)
+
+
+def split_pending_entries(data):
+    """
+    Split the content of a .pending file into its entries. Binary entries
+    start with ``PENDING_BINARY_MARKER``; other entries are base64 encoded
+    pickles, each preceded by a colon.
+
+    :param data: the content of a .pending file.
+    :returns: an iterator of entries.
+    """
+    offset = 0
+    end = len(data)
+    while offset < end:
+        if data[offset:offset + 1] == PENDING_BINARY_MARKER:
+            try:
+                length = _PENDING_HEADER.unpack_from(data, offset)[3]
+            except struct.error:
+                length = end
+            next_offset = offset + _PENDING_HEADER.size + length
+            if next_offset == end or (
+                    next_offset < end and
+                    _PENDING_DELIMITERS.match(data, next_offset)):
+                yield data[offset:next_offset]
+                offset = next_offset
+                continue
+            # a truncated entry; yield it up to the next delimiter, which
+            # is likely to be the start of the next entry
+            match = _PENDING_DELIMITERS.search(
+                data, offset + _PENDING_HEADER.size)
+        else:
+            if data[offset:offset + 1] == b':':
+                offset += 1
+            match = _PENDING_DELIMITERS.search(data, offset)
+        next_offset = match.start() if match else end
+        if next_offset > offset:
+            yield data[offset:next_offset]
+        offset = next_offset
+
 
 def native_str_keys_and_values(metadata):
     bin_keys = [k for k in metadata if isinstance(k, bytes)]
@@ -306,10 +455,26 @@ class TombstoneReclaimer(object):
         return self.remaining_tombstones
 
 
+class _PendingGroup(object):
+    """
+    Records put concurrently to the same DB by brokers in this process. The
+    first broker to put a record writes the whole group once the group commit
+    window has passed; the others wait for it to finish.
+    """
+
+    def __init__(self):
+        self.records = []
+        self.done = Event()
+
+
 class DatabaseBroker(object):
     """Encapsulates working with a database."""
 
     delete_meta_whitelist = []
+    #: The fields of the tuples returned by :meth:`make_tuple_for_pickle`, as
+    #: for :func:`encode_pending_record`. Records are only written to .pending
+    #: files in the binary format by brokers that set this.
+    pending_fields = None
 
     def __init__(self, db_file, timeout=BROKER_TIMEOUT, logger=None,
                  account=None, container=None, pending_timeout=None,
@@ -775,6 +940,13 @@ class DatabaseBroker(object):
         is deferred. If its pending file is full then the record will be
         committed immediately.
 
+        If ``GROUP_COMMIT_WINDOW`` is set then records put concurrently to the
+        same DB are collected and then written, or committed, together under a
+        single lock of the pending file. The group is only held open for that
+        many seconds if another record joins it straight away; a put with no
+        other writers waiting is written without delay. Records that would be
+        superseded by others in the group are dropped.
+
         :param record: a record to be added to the DB.
         :raises DatabaseConnectionError: if the DB file does not exist or if
             ``skip_commits`` is True.
@@ -786,7 +958,58 @@ class DatabaseBroker(object):
         if self.skip_commits:
             raise DatabaseConnectionError(self.db_file,
                                           'commits not accepted')
+        if GROUP_COMMIT_WINDOW <= 0:
+            self._put_records([record])
+            return
+        group = _pending_groups.get(self.pending_file)
+        if group is not None:
+            group.records.append(record)
+            group.done.wait()
+            return
+        group = _pending_groups[self.pending_file] = _PendingGroup()
+        group.records.append(record)
+        exc = None
+        try:
+            try:
+                # Let any writers that are already runnable join the group,
+                # and only hold it open for the window if one did, so that
+                # an uncontended put isn't delayed.
+                sleep(0)
+                if len(group.records) > 1:
+                    sleep(GROUP_COMMIT_WINDOW)
+            finally:
+                del _pending_groups[self.pending_file]
+            records = self._dedupe_records(group.records)
+            self.logger.increment('pending.batches')
+            self.logger.update_stats('pending.records', len(group.records))
+            self.logger.update_stats('pending.deduped',
+                                     len(group.records) - len(records))
+            self._put_records(records)
+        except (Exception, Timeout) as err:
+            exc = err
+            raise
+        except BaseException:
+            # e.g. GreenletExit; the followers' greenthreads weren't killed
+            # so don't kill them too, but don't let them think it worked
+            exc = DatabaseConnectionError(
+                self.db_file, 'group commit was interrupted')
+            raise
+        finally:
+            group.done.send(exc=exc)
+
+    def _put_records(self, records):
+        """
+        Append records to the .pending file, or merge them and any records
+        already in the .pending file into the DB if the .pending file is full.
+
+        :param records: a list of records to be added to the DB.
+        :raises LockTimeout: if a timeout occurs while waiting to take a lock
+            to write to the pending file.
+        """
+        lock_start = time.time()
         with lock_parent_directory(self.pending_file, self.pending_timeout):
+            if GROUP_COMMIT_WINDOW > 0:
+                self.logger.timing_since('pending.lock_wait', lock_start)
             pending_size = 0
             try:
                 pending_size = os.path.getsize(self.pending_file)
@@ -794,17 +1017,37 @@ class DatabaseBroker(object):
                 if err.errno != errno.ENOENT:
                     raise
             if pending_size > PENDING_CAP:
-                self._commit_puts([record])
+                self._commit_puts(records)
             else:
                 with open(self.pending_file, 'a+b') as fp:
-                    # Colons aren't used in base64 encoding; so they are our
-                    # delimiter
-                    fp.write(b':')
-                    fp.write(base64.b64encode(pickle.dumps(
-                        self.make_tuple_for_pickle(record),
-                        protocol=PICKLE_PROTOCOL)))
+                    fp.write(b''.join(
+                        self._encode_pending_entry(record)
+                        for record in records))
                     fp.flush()
 
+    def _encode_pending_entry(self, record):
+        record = self.make_tuple_for_pickle(record)
+        if BINARY_PENDING and self.pending_fields:
+            try:
+                return encode_pending_record(self.pending_fields, record)
+            except ValueError:
+                pass
+        # Colons aren't used in base64 encoding; so they are our delimiter
+        return b':' + base64.b64encode(pickle.dumps(
+            record, protocol=PICKLE_PROTOCOL))
+
+    def _dedupe_records(self, records):
+        """
+        Remove records that would be superseded by other records in the same
+        list when they are merged into the DB. This is implemented by a
+        particular broker to be compatible with its :func:`merge_items`; the
+        baseline implementation keeps every record.
+
+        :param records: a list of records to be added to the DB.
+        :returns: a list of records.
+        """
+        return records
+
     def _skip_commit_puts(self):
         return self.skip_commits or not os.path.exists(self.pending_file)
 
@@ -832,16 +1075,19 @@ class DatabaseBroker(object):
                 self.merge_items(item_list)
             return
         with open(self.pending_file, 'r+b') as fp:
-            for entry in fp.read().split(b':'):
-                if entry:
-                    try:
+            for entry in split_pending_entries(fp.read()):
+                try:
+                    if entry[:1] == PENDING_BINARY_MARKER:
+                        data = decode_pending_record(
+                            self.pending_fields or '', entry)
+                    else:
                         data = unpickle(base64.b64decode(entry),
                                         encoding='utf8')
-                        self._commit_puts_load(item_list, data)
-                    except Exception:
-                        self.logger.exception(
-                            'Invalid pending entry %(file)s: %(entry)s',
-                            {'file': self.pending_file, 'entry': entry})
+                    self._commit_puts_load(item_list, data)
+                except Exception:
+                    self.logger.exception(
+                        'Invalid pending entry %(file)s: %(entry)s',
+                        {'file': self.pending_file, 'entry': entry})
             if item_list:
                 self.merge_items(item_list)
             try:
@@ -13,6 +13,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import base64
 import json
 import logging
 import os
@@ -25,7 +26,8 @@ import errno
 import re
 from contextlib import contextmanager
 
-from swift.common.concurrency import GreenPool, sleep, Timeout, subprocess
+from swift.common.concurrency import GreenPile, GreenPool, Event, sleep, \
+    Timeout, subprocess
 
 import swift.common.db
 from swift.common.constraints import check_drive
@@ -34,7 +36,8 @@ from swift.common.utils import get_logger, whataremyips, storage_directory, \
     unlink_older_than, dump_recon_cache, rsync_module_interpolation, \
     parse_override_options, round_robin_iter, Everything, get_db_files, \
     parse_db_filename, quote, RateLimitedIterator, config_auto_int_value, \
-    listdir, unlink_paths_older_than
+    listdir, unlink_paths_older_than, md5, EventletRateLimiter, \
+    distribute_evenly, get_prefixed_logger, load_recon_cache
 
 from swift.common import ring
 from swift.common.ring.utils import is_local_device
@@ -44,12 +47,17 @@ from swift.common.bufferedhttp import BufferedHTTPConnection
 from swift.common.exceptions import DriveNotMounted
 from swift.common.daemon import Daemon
 from swift.common.swob import Response, HTTPNotFound, HTTPNoContent, \
-    HTTPAccepted, HTTPBadRequest
+    HTTPAccepted, HTTPBadRequest, HTTPConflict
 from swift.common.recon import DEFAULT_RECON_CACHE_PATH, \
     server_type_to_recon_file
 
 
 DEBUG_TIMINGS_THRESHOLD = 10
+#: Number of DB pages sent in each REPLICATE request when syncing pages
+PAGES_PER_REQUEST = 256
+#: Length of the page checksums compared when syncing pages; the whole DB is
+#: checked with a full md5 once the pages have been sent
+PAGE_DIGEST_SIZE = 8
 
 
 def quarantine_db(object_file, server_type):
@@ -74,6 +82,22 @@ def quarantine_db(object_file, server_type):
         renamer(object_dir, quarantine_dir, fsync=False)
 
 
+def iter_db_pages(fp, page_size):
+    """
+    Yield the pages of a DB file with their checksums.
+
+    :param fp: a file object open for reading at the start of the DB.
+    :param page_size: the page size of the DB.
+    :returns: an iterator of (page, checksum) tuples.
+    """
+    while True:
+        page = fp.read(page_size)
+        if not page:
+            break
+        yield page, md5(page, usedforsecurity=False).digest()[
+            :PAGE_DIGEST_SIZE]
+
+
 def looks_like_partition(dir_name):
     """
     True if the directory name is a valid partition number, False otherwise.
@@ -147,6 +171,101 @@ def roundrobin_datadirs(datadirs):
         yield datadir
 
 
+class DeviceConcurrency(object):
+    """
+    Track the replication of the dbs on one device during a replication pass,
+    limiting how many of them are replicated at once.
+
+    When ``adaptive`` is True the limit follows the latency of replicating the
+    device's dbs: it grows towards ``max_concurrency`` while the latency stays
+    close to the lowest seen during the pass and shrinks as the latency rises.
+    A slow or overloaded device then holds fewer of the replicator's
+    greenthreads, leaving them to the other devices.
+
+    :param max_concurrency: the most dbs to replicate at once
+    :param adaptive: if True, adapt the limit to the measured latency
+    """
+    #: weight given to each new latency sample and limit
+    smoothing = 0.2
+
+    def __init__(self, max_concurrency, adaptive=False):
+        self.max_concurrency = max_concurrency
+        self.adaptive = adaptive
+        self.limit = float(max_concurrency)
+        self.in_flight = 0
+        self.latency = self.min_latency = None
+        self.attempted = self.success = self.failure = 0
+        self.start = time.time()
+        self._released = None
+
+    def acquire(self):
+        """
+        Wait until another db may be replicated, and count it as in flight.
+        """
+        while self.in_flight >= int(self.limit):
+            self._wait()
+        self.in_flight += 1
+
+    def release(self, success, elapsed):
+        """
+        Count a db as replicated.
+
+        :param success: True if the db was replicated successfully
+        :param elapsed: the time in seconds taken to replicate the db
+        """
+        self.in_flight -= 1
+        self.attempted += 1
+        if success:
+            self.success += 1
+        else:
+            self.failure += 1
+        if self.adaptive:
+            self._update_limit(elapsed)
+        if self._released is not None and not self._released.ready():
+            self._released.send()
+
+    def wait_idle(self):
+        """
+        Wait until no dbs are in flight.
+        """
+        while self.in_flight:
+            self._wait()
+
+    def _wait(self):
+        self._released = Event()
+        self._released.wait()
+
+    def _update_limit(self, elapsed):
+        if self.latency is None:
+            self.latency = elapsed
+        else:
+            self.latency += self.smoothing * (elapsed - self.latency)
+        if self.min_latency is None or self.latency < self.min_latency:
+            self.min_latency = self.latency
+        if self.latency <= 0:
+            return
+        # the limit settles where limit * gradient + 1 == limit, i.e. at
+        # 1 / (1 - gradient), so it falls as latency rises above the minimum
+        gradient = self.min_latency / self.latency
+        new_limit = self.limit * gradient + 1
+        self.limit += self.smoothing * (new_limit - self.limit)
+        self.limit = max(1.0, min(float(self.max_concurrency), self.limit))
+
+    def to_recon(self):
+        """
+        :returns: a dict describing the device's replication progress, for
+            the recon cache
+        """
+        now = time.time()
+        return {'replication_stats': {'attempted': self.attempted,
+                                      'success': self.success,
+                                      'failure': self.failure},
+                'replication_time': now - self.start,
+                'replication_last': now,
+                'concurrency': round(self.limit, 2),
+                'latency': self.latency}
+
+
 class ReplConnection(BufferedHTTPConnection):
     """
     Helper to simplify REPLICATEing to a remote server.
@@ -247,8 +366,15 @@ class Replicator(Daemon):
         self.mount_check = config_true_value(conf.get('mount_check', 'true'))
         self.bind_ip = conf.get('bind_ip', '0.0.0.0')
         self.port = int(conf.get('bind_port', self.default_port))
-        concurrency = int(conf.get('concurrency', 8))
-        self.cpool = GreenPool(size=concurrency)
+        self.concurrency = int(conf.get('concurrency', 8))
+        self.cpool = GreenPool(size=self.concurrency)
+        self.replicator_workers = int(conf.get('replicator_workers', 0))
+        self.adaptive_concurrency = config_true_value(
+            conf.get('adaptive_concurrency', 'no'))
+        self.is_multiprocess_worker = None
+        self.all_local_devices = set()
+        self._device_concurrency = {}
+        self._per_disk_recon = False
         swift_dir = conf.get('swift_dir', '/etc/swift')
         self.ring = ring.Ring(swift_dir, ring_name=self.server_type)
         self._local_device_ids = {}
@@ -277,6 +403,7 @@ class Replicator(Daemon):
         self.conn_timeout = float(conf.get('conn_timeout', 0.5))
         self.rsync_compress = config_true_value(
             conf.get('rsync_compress', 'no'))
+        self.page_sync = config_true_value(conf.get('page_sync', 'no'))
         self.rsync_module = conf.get('rsync_module', '').rstrip('/')
         if not self.rsync_module:
             self.rsync_module = '{replication_ip}::%s' % self.server_type
@@ -303,6 +430,8 @@ class Replicator(Daemon):
                 self.handoff_delete, self.ring.replica_count)
             self.handoff_delete = 0
         self.db_logger = BrokerAnnotatedLogger(logger=self.logger)
+        self.ring_mtime = None
+        self._next_rcache_update = time.time() + self.interval
 
     def _zero_stats(self):
         """Zero out the stats."""
@@ -310,6 +439,7 @@ class Replicator(Daemon):
                       'no_change': 0, 'hashmatch': 0, 'rsync': 0, 'diff': 0,
                       'remove': 0, 'empty': 0, 'remote_merge': 0,
                       'start': time.time(), 'diff_capped': 0, 'deferred': 0,
+                      'page_sync': 0, 'pages_sent': 0,
                       'failure_nodes': {}}
 
     def _report_stats(self):
@@ -325,15 +455,19 @@ class Replicator(Daemon):
         self.logger.info('Removed %(remove)d dbs', self.stats)
         self.logger.info('%(success)s successes, %(failure)s failures',
                          self.stats)
-        dump_recon_cache(
-            {'replication_stats': self.stats,
-             'replication_time': now - self.stats['start'],
-             'replication_last': now},
-            self.rcache, self.logger)
+        if not self.is_multiprocess_worker:
+            # workers record the progress of each of their devices and the
+            # parent process aggregates them
+            dump_recon_cache(
+                {'replication_stats': self.stats,
+                 'replication_time': now - self.stats['start'],
+                 'replication_last': now},
+                self.rcache, self.logger)
         self.logger.info(' '.join(['%s:%s' % item for item in
                          sorted(self.stats.items()) if item[0] in
                          ('no_change', 'hashmatch', 'rsync', 'diff', 'ts_repl',
-                          'empty', 'diff_capped', 'remote_merge')]))
+                          'empty', 'diff_capped', 'remote_merge', 'page_sync',
+                          'pages_sent')]))
 
     def _add_failure_stats(self, failure_devs_info):
         for node, dev in failure_devs_info:
@@ -411,6 +545,101 @@ class Replicator(Daemon):
                                       os.path.basename(broker.db_file))
         return response and 200 <= response.status < 300
 
+    def _send_pages(self, broker, http, local_id, page_size, remote_digests):
+        """
+        Send the pages of a DB that differ from those of the remote copy.
+
+        :param broker: DB broker object of DB to be synced
+        :param http: ReplConnection object
+        :param local_id: unique ID of the local database replica
+        :param page_size: the page size of the DB
+        :param remote_digests: a list of the checksums of the pages of the
+            remote copy, which is updated with the checksums of sent pages
+
+        :returns: a tuple of (size, md5 of the DB), or None if sending failed
+        """
+        checksum = md5(usedforsecurity=False)
+        size = 0
+        pages = []
+        with open(broker.db_file, 'rb') as fp:
+            for page_no, (page, digest) in enumerate(
+                    iter_db_pages(fp, page_size)):
+                checksum.update(page)
+                size += len(page)
+                if page_no == len(remote_digests):
+                    remote_digests.append(None)
+                if remote_digests[page_no] == digest:
+                    continue
+                remote_digests[page_no] = digest
+                pages.append((page_no, base64.b64encode(page).decode('ascii')))
+                if len(pages) >= PAGES_PER_REQUEST:
+                    if not self._send_replicate_request(
+                            http, 'merge_pages', local_id, page_size, pages):
+                        return None
+                    self.stats['pages_sent'] += len(pages)
+                    self.logger.update_stats('pages_sent', len(pages))
+                    pages = []
+        if pages:
+            if not self._send_replicate_request(
+                    http, 'merge_pages', local_id, page_size, pages):
+                return None
+            self.stats['pages_sent'] += len(pages)
+            self.logger.update_stats('pages_sent', len(pages))
+        del remote_digests[-(-size // page_size):]
+        return size, checksum.hexdigest()
+
+    def _page_sync_db(self, broker, http, local_id,
+                      replicate_method='rsync_then_merge',
+                      replicate_timeout=None):
+        """
+        Sync a whole db by sending only the pages that differ from a copy of
+        the remote replica, which the remote then merges as it would a db
+        that had been rsynced. Unlike rsync this only sends the pages that
+        changed since the replicas last shared them, which is most of a large
+        db if one replica was recently rsynced from the other.
+
+        :param broker: DB broker object of DB to be synced
+        :param http: ReplConnection object
+        :param local_id: unique ID of the local database replica
+        :param replicate_method: remote operation to perform after syncing
+        :param replicate_timeout: timeout to wait in seconds
+
+        :returns: True if the sync was successful, False if it failed, or None
+            if the remote replica could not be synced this way
+        """
+        with broker.get() as conn:
+            page_size = conn.execute('PRAGMA page_size').fetchone()[0]
+        with Timeout(replicate_timeout or self.node_timeout):
+            response = http.replicate('page_hashes', local_id, page_size)
+        if not response or not is_success(response.status):
+            return None
+        digests = base64.b64decode(json.loads(response.data)['hashes'])
+        remote_digests = [digests[i:i + PAGE_DIGEST_SIZE] for i in range(
+            0, len(digests), PAGE_DIGEST_SIZE)]
+        self.stats['page_sync'] += 1
+        self.logger.increment('page_syncs')
+        mtime = os.path.getmtime(broker.db_file)
+        result = self._send_pages(
+            broker, http, local_id, page_size, remote_digests)
+        if result is None:
+            return False
+        # send any pages that were modified while the pages were being sent
+        if os.path.exists(broker.db_file + '-journal') or \
+                os.path.getmtime(broker.db_file) > mtime:
+            # grab a lock so nobody else can modify it
+            with broker.lock():
+                result = self._send_pages(
+                    broker, http, local_id, page_size, remote_digests)
+                if result is None:
+                    return False
+        if not self._send_replicate_request(
+                http, 'check_pages', local_id, *result):
+            return False
+        with Timeout(replicate_timeout or self.node_timeout):
+            response = http.replicate(replicate_method, local_id,
+                                      os.path.basename(broker.db_file))
+        return response and 200 <= response.status < 300
+
     def _send_replicate_request(self, http, *repl_args):
         with Timeout(self.node_timeout):
             response = http.replicate(*repl_args)
@@ -585,6 +814,12 @@ class Replicator(Daemon):
                 info['max_row'] - rinfo['max_row'] > self.per_diff):
             self.stats['remote_merge'] += 1
             self.logger.increment('remote_merges')
+            if self.page_sync:
+                synced = self._page_sync_db(
+                    broker, http, info['id'],
+                    replicate_timeout=(info['count'] / 2000))
+                if synced is not None:
+                    return synced
             return self._rsync_db(broker, node, http, info['id'],
                                   replicate_method='rsync_then_merge',
                                   replicate_timeout=(info['count'] / 2000),
@@ -857,8 +1092,168 @@ class Replicator(Daemon):
             roundrobin_datadirs(dirs),
             elements_per_second=self.databases_per_second)
 
-    def run_once(self, *args, **kwargs):
+    def _emplace_log_prefix(self, worker_index):
+        self.logger = get_prefixed_logger(
+            self.logger, "[worker %d/%d pid=%d] " % (
+                worker_index + 1,
+                # use 1-based indexing for more readable logs
+                self.replicator_workers,
+                os.getpid()))
+        self.db_logger = BrokerAnnotatedLogger(logger=self.logger)
+
+    def get_local_devices(self):
+        """
+        Returns the names of the devices in the ring that are on this node.
+        """
+        ips = whataremyips(self.bind_ip)
+        return set(dev['device'] for dev in self.ring.devs
+                   if dev and is_local_device(ips, self.port,
+                                              dev['replication_ip'],
+                                              dev['replication_port']))
+
+    def get_worker_args(self, once=False, **kwargs):
+        if self.replicator_workers < 1:
+            return []
+
+        override_opts = parse_override_options(once=once, **kwargs)
+        have_overrides = bool(override_opts.devices or
+                              override_opts.partitions)
+
+        # save this off for ring-change detection later in is_healthy()
+        self.all_local_devices = self.get_local_devices()
+
+        if override_opts.devices:
+            devices_to_replicate = [
+                d for d in override_opts.devices
+                if d in self.all_local_devices]
+        else:
+            devices_to_replicate = sorted(self.all_local_devices)
+
+        # Distribute devices among workers as evenly as possible
+        self.replicator_workers = min(self.replicator_workers,
+                                      len(devices_to_replicate))
+        return [{'override_devices': devs,
+                 'override_partitions': override_opts.partitions,
+                 'have_overrides': have_overrides,
+                 'multiprocess_worker_index': index}
+                for index, devs in enumerate(
+                    distribute_evenly(devices_to_replicate,
+                                      self.replicator_workers))]
+
+    def is_healthy(self):
+        """
+        Check whether our set of local devices remains the same.
+
+        If devices have been added or removed, then we return False here so
+        that we can kill off any worker processes and then distribute the
+        new set of local devices across a new set of workers so that all
+        devices are, once again, being worked on.
+
+        This function may also cause recon stats to be updated.
+
+        :returns: False if any local devices have been added or removed,
+          True otherwise
+        """
+        # We update recon here because this is the only function we have in
+        # a multiprocess replicator that gets called periodically in the
+        # parent process.
+        if time.time() >= self._next_rcache_update:
+            self._next_rcache_update = time.time() + self.interval
+            dump_recon_cache(self.aggregate_recon_update(), self.rcache,
+                             self.logger)
+        ring_mtime = os.path.getmtime(self.ring.serialized_path)
+        if self.ring_mtime == ring_mtime:
+            return True
+        self.ring_mtime = ring_mtime
+        return self.get_local_devices() == self.all_local_devices
+
+    def aggregate_recon_update(self):
+        """
+        Aggregate the progress recorded by workers for each local device.
+
+        :returns: a dict of recon cache updates; replication stats, time and
+            last are only included once every local device has completed a
+            replication pass.
+        """
+        per_disk = load_recon_cache(self.rcache).get(
+            'replication_per_disk', {})
+        recon_update = {}
+
+        # If every child has reported some stats, then aggregate things.
+        if self.all_local_devices and all(
+                ld in per_disk for ld in self.all_local_devices):
+            aggregated = {'attempted': 0, 'success': 0, 'failure': 0}
+            repl_time = 0
+            repl_last = float('inf')
+            for device in self.all_local_devices:
+                data = per_disk[device]
+                for key in aggregated:
+                    aggregated[key] += data['replication_stats'][key]
+                # devices are replicated in parallel
+                repl_time = max(repl_time, data['replication_time'])
+                repl_last = min(repl_last, data['replication_last'])
+            recon_update['replication_stats'] = aggregated
+            recon_update['replication_time'] = repl_time
+            recon_update['replication_last'] = repl_last
+
+        # Clear out entries for old local devices that we no longer have
+        devices_to_remove = set(per_disk) - set(self.all_local_devices)
+        if devices_to_remove:
+            recon_update['replication_per_disk'] = {
+                dtr: {} for dtr in devices_to_remove}
+
+        return recon_update
+
+    def post_multiprocess_run(self):
+        # This method is called after run_once using multiple workers.
+        dump_recon_cache(self.aggregate_recon_update(), self.rcache,
+                         self.logger)
+
+    def _replicate_device(self, datadir, rate_limiter):
+        """
+        Replicate the dbs on a device, holding no more of the replicator's
+        greenthreads than the device's concurrency limit allows.
+
+        :param datadir: a tuple of (path, node_id, partition_filter) for the
+            device's datadir
+        :param rate_limiter: a rate limiter shared by all devices
+        """
+        node_id = datadir[1]
+        device = self._device_concurrency[node_id] = DeviceConcurrency(
+            self.concurrency, adaptive=self.adaptive_concurrency)
+        for part, object_file, node_id in roundrobin_datadirs([datadir]):
+            rate_limiter.wait()
+            device.acquire()
+            self.cpool.spawn_n(
+                self._replicate_device_object, part, object_file, node_id)
+        if self._per_disk_recon:
+            device.wait_idle()
+            device_name = self._local_device_ids[node_id]['device']
+            progress = device.to_recon()
+            self.logger.info(
+                'Replicated %d dbs on %s in %.2fs (concurrency %.2f)',
+                device.attempted, device_name, progress['replication_time'],
+                device.limit)
+            dump_recon_cache(
+                {'replication_per_disk': {device_name: progress}},
+                self.rcache, self.logger)
+
+    def _replicate_device_object(self, partition, object_file, node_id):
+        device = self._device_concurrency[node_id]
+        start = time.time()
+        success = False
+        try:
+            rv = self._replicate_object(partition, object_file, node_id)
+            success = bool(rv and rv[0])
+        finally:
+            device.release(success, time.time() - start)
+
+    def run_once(self, multiprocess_worker_index=None, have_overrides=False,
+                 *args, **kwargs):
         """Run a replication pass once."""
+        if multiprocess_worker_index is not None:
+            self.is_multiprocess_worker = True
+            self._emplace_log_prefix(multiprocess_worker_index)
         override_options = parse_override_options(once=True, **kwargs)
 
         devices_to_replicate = override_options.devices or Everything()
@@ -913,10 +1308,21 @@ class Replicator(Daemon):
             self.logger.error("Can't find itself %s with port %s in ring "
                               "file, not replicating",
                               ", ".join(ips), self.port)
+        # If we've been manually run on a subset of devices or partitions,
+        # then their progress is not representative of how replication is
+        # doing, so we don't publish it.
+        self._per_disk_recon = bool(
+            self.is_multiprocess_worker and not have_overrides)
         self.logger.info('Beginning replication run')
-        for part, object_file, node_id in self.roundrobin_datadirs(dirs):
-            self.cpool.spawn_n(
-                self._replicate_object, part, object_file, node_id)
+        # each device is walked by its own greenthread, so that a slow device
+        # does not hold up the others
+        rate_limiter = EventletRateLimiter(self.databases_per_second)
+        self._device_concurrency = {}
+        feeders = GreenPile(max(len(dirs), 1))
+        for datadir in dirs:
+            feeders.spawn(self._replicate_device, datadir, rate_limiter)
+        for _junk in feeders:
+            pass
         self.cpool.waitall()
         self.logger.info('Replication run OVER')
         if self.handoffs_only or self.handoff_delete:
@@ -926,15 +1332,22 @@ class Replicator(Daemon):
                 'disable them.')
         self._report_stats()
 
-    def run_forever(self, *args, **kwargs):
+    def run_forever(self, multiprocess_worker_index=None,
+                    override_devices=None, *args, **kwargs):
         """
         Replicate dbs under the given root in an infinite loop.
         """
+        if multiprocess_worker_index is not None:
+            self.is_multiprocess_worker = True
+            self._emplace_log_prefix(multiprocess_worker_index)
         sleep(random.random() * self.interval)
         while True:
             begin = time.time()
             try:
-                self.run_once()
+                if override_devices is None:
+                    self.run_once()
+                else:
+                    self.run_once(override_devices=override_devices)
             except (Exception, Timeout):
                 self.logger.exception('ERROR trying to replicate')
             elapsed = time.time() - begin
@@ -973,6 +1386,8 @@ class ReplicatorRpc(object):
             return self.rsync_then_merge(drive, db_file, args)
         if op == 'complete_rsync':
             return self.complete_rsync(drive, db_file, args)
+        if op in ('page_hashes', 'merge_pages', 'check_pages'):
+            return getattr(self, op)(drive, db_file, args)
         else:
             # someone might be about to rsync a db to us,
             # make sure there's a tmp dir to receive it.
@@ -1095,6 +1510,65 @@ class ReplicatorRpc(object):
         renamer(old_filename, db_file)
         return HTTPNoContent()
 
+    def page_hashes(self, drive, db_file, args):
+        """
+        Copy the DB to a tmp file to which the pages of a remote replica will
+        be sent, and return the checksums of its pages.
+        """
+        tmp_filename = os.path.join(self.root, drive, 'tmp', args[0])
+        page_size = int(args[1])
+        if not self._db_file_exists(db_file):
+            return HTTPNotFound()
+        broker = self.broker_class(db_file, logger=self.logger)
+        mkdirs(os.path.dirname(tmp_filename))
+        digests = []
+        with open(broker.db_file, 'rb') as src, \
+                open(tmp_filename, 'wb') as dst:
+            for page, digest in iter_db_pages(src, page_size):
+                dst.write(page)
+                digests.append(digest)
+                if len(digests) % PAGES_PER_REQUEST == 0:
+                    sleep()
+        return Response(json.dumps({'hashes': base64.b64encode(
+            b''.join(digests)).decode('ascii')}))
+
+    def merge_pages(self, drive, db_file, args):
+        """
+        Write pages sent by a remote replica to its tmp file.
+        """
+        tmp_filename = os.path.join(self.root, drive, 'tmp', args[0])
+        page_size = int(args[1])
+        try:
+            fp = open(tmp_filename, 'r+b')
+        except FileNotFoundError:
+            return HTTPNotFound()
+        with fp:
+            for page_no, page in args[2]:
+                fp.seek(page_no * page_size)
+                fp.write(base64.b64decode(page))
+        return HTTPAccepted()
+
+    def check_pages(self, drive, db_file, args):
+        """
+        Truncate the tmp file of a remote replica to the size of its DB and
+        check that they are the same.
+        """
+        tmp_filename = os.path.join(self.root, drive, 'tmp', args[0])
+        size, expected = args[1:3]
+        checksum = md5(usedforsecurity=False)
+        try:
+            fp = open(tmp_filename, 'r+b')
+        except FileNotFoundError:
+            return HTTPNotFound()
+        with fp:
+            fp.truncate(size)
+            for chunk in iter(lambda: fp.read(65536), b''):
+                checksum.update(chunk)
+        if checksum.hexdigest() != expected:
+            os.unlink(tmp_filename)
+            return HTTPConflict()
+        return HTTPNoContent()
+
     def _abort_rsync_then_merge(self, db_file, tmp_filename):
         return not (self._db_file_exists(db_file) and
                     os.path.exists(tmp_filename))
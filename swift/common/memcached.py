@@ -47,12 +47,15 @@ http://github.com/memcached/memcached/blob/1.4.2/doc/protocol.txt
 import os
 import json
 import logging
+import random
+from collections import OrderedDict
+from itertools import count
 # the name of 'time' module is changed to 'tm', to avoid changing the
 # signatures of member functions in this file.
 import time as tm
 from bisect import bisect
 
-from swift.common.concurrency import socket, ssl, Pool, Timeout
+from swift.common.concurrency import socket, ssl, GreenPile, Pool, Timeout
 from configparser import ConfigParser, NoSectionError, NoOptionError
 from swift.common import utils
 from swift.common.exceptions import MemcacheConnectionError, \
@@ -84,6 +87,10 @@ TIMING_SAMPLE_RATE_LOW = 0.001
 # The max value of a delta expiration time.
 EXPTIME_MAXDELTA = 30 * 24 * 60 * 60
 
+DEFAULT_LOCAL_CACHE_MAX_ENTRIES = 10000
+DEFAULT_LOCAL_CACHE_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_LOCAL_CACHE_JITTER = 0.1
+
 
 def md5hash(key):
     if not isinstance(key, bytes):
@@ -323,6 +330,22 @@ class MemcacheRing(object):
                 self._error_limited[server] = now + self._error_limit_duration
                 self.logger.error('Error limiting server %s', server)
 
+    def _get_servers(self, hash_key):
+        """
+        Returns the servers to try, in order, for the given hashed key.
+
+        :param hash_key: a key hashed with :func:`md5hash`.
+        :return: a tuple of up to ``tries`` distinct servers
+        """
+        pos = bisect(self._sorted, hash_key)
+        served = []
+        while len(served) < self._tries:
+            pos = (pos + 1) % len(self._sorted)
+            server = self._ring[self._sorted[pos]]
+            if server not in served:
+                served.append(server)
+        return tuple(served)
+
     def _get_conns(self, cmd):
         """
         Retrieves a server conn from the pool, or connects a new one.
@@ -331,15 +354,8 @@ class MemcacheRing(object):
         :param cmd: an instance of MemcacheCommand.
         :return: generator to serve memcached connection
         """
-        pos = bisect(self._sorted, cmd.hash_key)
-        served = []
         any_yielded = False
-        while len(served) < self._tries:
-            pos = (pos + 1) % len(self._sorted)
-            server = self._ring[self._sorted[pos]]
-            if server in served:
-                continue
-            served.append(server)
+        for server in self._get_servers(cmd.hash_key):
             pool_start_time = tm.time()
             if self._error_limited[server] > pool_start_time:
                 continue
@@ -615,18 +631,17 @@ class MemcacheRing(object):
                 self._exception_occurred(server, e, cmd, conn_start_time,
                                          sock=sock, fp=fp)
 
-    @memcached_timing_stats(sample_rate=TIMING_SAMPLE_RATE_HIGH)
-    def get_multi(self, keys, server_key):
+    def _get_multi(self, cmd, hash_keys):
         """
-        Gets multiple values from memcache for the given keys.
-
-        :param keys: keys for values to be retrieved from memcache
-        :param server_key: key to use in determining which server in the ring
-                           is used
-        :returns: list of values
+        Gets the values of several hashed keys with a single pipelined
+        request to the first server that will answer for ``cmd``.
+
+        :param cmd: an instance of MemcacheCommand, which determines the
+                    servers to try.
+        :param hash_keys: a list of keys hashed with :func:`md5hash`.
+        :returns: a dict mapping each hashed key that was found to its
+                  value, or None if no server could be read from
         """
-        cmd = MemcacheCommand('get_multi', server_key)
-        hash_keys = [md5hash(key) for key in keys]
         for (server, fp, sock) in self._get_conns(cmd):
             conn_start_time = tm.time()
             try:
@@ -649,17 +664,226 @@ class MemcacheRing(object):
                             responses[line[1]] = value
                             fp.readline()
                         line = fp.readline().strip().split()
-                    values = []
-                    for key in hash_keys:
-                        if key in responses:
-                            values.append(responses[key])
-                        else:
-                            values.append(None)
                     self._return_conn(server, fp, sock)
-                    return values
+                    return responses
             except (Exception, Timeout) as e:
                 self._exception_occurred(server, e, cmd, conn_start_time,
                                          sock=sock, fp=fp)
+        return None
+
+    @memcached_timing_stats(sample_rate=TIMING_SAMPLE_RATE_HIGH)
+    def get_multi(self, keys, server_key=None):
+        """
+        Gets multiple values from memcache for the given keys.
+
+        If ``server_key`` is given, all of the keys are fetched from the
+        server that it maps to, as stored by :meth:`set_multi`. Otherwise each
+        key is fetched from the server that it maps to itself, as stored by
+        :meth:`set`: the keys are grouped by server and each group is fetched
+        with one pipelined request, with the requests to different servers
+        made concurrently.
+
+        :param keys: keys for values to be retrieved from memcache
+        :param server_key: key to use in determining which server in the ring
+                           is used
+        :returns: list of values; if ``server_key`` is given and no server
+                  could be read from then None, otherwise the values of keys
+                  that could not be read from any server are None
+        """
+        if server_key is not None:
+            cmd = MemcacheCommand('get_multi', server_key)
+            hash_keys = [md5hash(key) for key in keys]
+            responses = self._get_multi(cmd, hash_keys)
+            if responses is None:
+                return None
+            return [responses.get(key) for key in hash_keys]
+
+        if not keys:
+            return []
+        # group the keys by the servers that get() would try for them, so
+        # that failing over behaves the same as it would for each key alone
+        groups = {}
+        cmds = []
+        for key in keys:
+            cmd = MemcacheCommand('get_multi', key)
+            cmds.append(cmd)
+            servers = self._get_servers(cmd.hash_key)
+            if servers in groups:
+                groups[servers][1].append(cmd.hash_key)
+            else:
+                groups[servers] = (cmd, [cmd.hash_key])
+        if len(groups) == 1:
+            results = [self._get_multi(*groups.popitem()[1])]
+        else:
+            pile = GreenPile(len(groups))
+            for group_cmd, hash_keys in groups.values():
+                pile.spawn(self._get_multi, group_cmd, hash_keys)
+            results = list(pile)
+        responses = {}
+        for result in results:
+            if result:
+                responses.update(result)
+        return [responses.get(cmd.hash_key) for cmd in cmds]
+
+
+class LocalCache(object):
+    """
+    Bounded, process-local cache of values that also live in memcache.
+
+    A ``LocalCache`` sits between the per-request ``swift.infocache`` and a
+    :class:`MemcacheRing`, so that values which every request needs (such as
+    account and container info) don't cost a memcache round trip per request
+    per worker. Values are kept in their JSON-serialized form and a fresh copy
+    is decoded on every hit, so callers can no more mutate a cached value than
+    they could one fetched from memcache. As with memcache, bytes values are
+    kept as they are.
+
+    Nothing tells one process that another has changed a value in memcache,
+    so ``ttl`` is the most that a process may serve stale data for after a
+    change made elsewhere; it should be short. The expiry of each entry is
+    brought forward by a random fraction of up to ``jitter`` of ``ttl`` so
+    that entries populated together don't all expire together.
+
+    Least recently used entries are evicted once there are more than
+    ``max_entries`` of them or they hold more than ``max_bytes`` of
+    serialized data.
+
+    Values that are costly to decode on every hit may instead be fetched with
+    :meth:`get_decoded`, which keeps the decoded value until the entry is
+    replaced. Decoded values are not counted towards ``max_bytes``.
+
+    :param ttl: the maximum time in seconds for which to keep any value.
+    :param max_entries: the maximum number of values to keep.
+    :param max_bytes: the maximum total size of serialized values to keep.
+    :param jitter: the fraction of ``ttl`` by which expiry times may be
+        randomly brought forward.
+    """
+
+    def __init__(self, ttl, max_entries=DEFAULT_LOCAL_CACHE_MAX_ENTRIES,
+                 max_bytes=DEFAULT_LOCAL_CACHE_MAX_BYTES,
+                 jitter=DEFAULT_LOCAL_CACHE_JITTER):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.jitter = jitter
+        # key -> (expires, serialized value, is JSON, generation), least
+        # recently used first
+        self._entries = OrderedDict()
+        # key -> (generation, decoded value)
+        self._decoded = {}
+        self._generations = count()
+        self.current_bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return self._get_entry(key) is not None
+
+    def _get_entry(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= tm.time():
+            self.delete(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def get(self, key):
+        """
+        Get a fresh copy of the value cached for ``key``.
+
+        :param key: key
+        :returns: the value, or None if there is no unexpired value
+        """
+        entry = self._get_entry(key)
+        if entry is None:
+            return None
+        _expires, value, is_json, _generation = entry
+        return json.loads(value) if is_json else value
+
+    def get_decoded(self, key, decoder):
+        """
+        Get the value cached for ``key`` as returned by ``decoder``.
+
+        The value is only decoded on the first call after it is set; later
+        calls return the same decoded value, which callers must not modify.
+
+        :param key: key
+        :param decoder: a callable that is passed a fresh copy of the value
+            and returns the decoded value
+        :returns: the decoded value, or None if there is no unexpired value
+        """
+        entry = self._get_entry(key)
+        if entry is None:
+            return None
+        _expires, value, is_json, generation = entry
+        decoded = self._decoded.get(key)
+        if decoded is None or decoded[0] != generation:
+            decoded = self._decoded[key] = (generation, decoder(
+                json.loads(value) if is_json else value))
+        return decoded[1]
+
+    def set(self, key, value, time=None):
+        """
+        Cache ``value`` for ``key``, replacing any existing value.
+
+        Empty values are never cached, just as they would be treated as a
+        miss when fetched from memcache.
+
+        :param key: key
+        :param value: a JSON-serializable value, or bytes
+        :param time: the memcache time to live of the value; if it is shorter
+            than ``ttl``, the value is only kept for ``time`` seconds
+        """
+        self.delete(key)
+        if not value:
+            return
+        # as for memcache, a time of zero means "no particular expiry"
+        ttl = min(time, self.ttl) if time and time > 0 else self.ttl
+        is_json = not isinstance(value, bytes)
+        if is_json:
+            value = json.dumps(value).encode('ascii')
+        if len(value) > self.max_bytes:
+            return
+        expires = tm.time() + ttl * (1 - self.jitter * random.random())
+        self._entries[key] = (expires, value, is_json,
+                              next(self._generations))
+        self.current_bytes += len(value)
+        while (len(self._entries) > self.max_entries
+               or self.current_bytes > self.max_bytes):
+            self.delete(next(iter(self._entries)))
+
+    def delete(self, key):
+        """
+        Forget any value cached for ``key``.
+
+        :param key: key
+        """
+        self._decoded.pop(key, None)
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.current_bytes -= len(entry[1])
+
+
+def load_local_cache(conf):
+    """
+    Build a :class:`LocalCache` from the given config.
+
+    :param conf: a dict, the config options
+    :returns: a ``LocalCache``, or None if ``local_cache_ttl`` is not a
+        positive number of seconds
+    """
+    ttl = float(conf.get('local_cache_ttl', 0))
+    if ttl <= 0:
+        return None
+    return LocalCache(
+        ttl,
+        max_entries=int(conf.get('local_cache_max_entries',
+                                 DEFAULT_LOCAL_CACHE_MAX_ENTRIES)),
+        max_bytes=int(conf.get('local_cache_max_bytes',
+                               DEFAULT_LOCAL_CACHE_MAX_BYTES)))
 
 
 def load_memcache(conf, logger):
@@ -13,7 +13,10 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import codecs
+import itertools
 import json
+import re
 from xml.etree.cElementTree import Element, SubElement, tostring
 
 from swift.common.constraints import valid_api_version
@@ -22,7 +25,8 @@ from swift.common.http import HTTP_NO_CONTENT
 from swift.common.request_helpers import get_param
 from swift.common.swob import HTTPException, HTTPNotAcceptable, Request, \
     RESPONSE_REASONS, HTTPBadRequest, wsgi_quote, wsgi_to_bytes
-from swift.common.utils import RESERVED, get_logger, list_from_csv
+from swift.common.utils import RESERVED, ClosingIterator, get_logger, \
+    list_from_csv
 
 
 #: Mapping of query string ``format=`` values to their corresponding
@@ -35,6 +39,9 @@ FORMAT2CONTENT_TYPE = {'plain': 'text/plain', 'json': 'application/json',
 # Default max object length is 1024, default container listing limit is 1e4;
 # add a fudge factor for things like hash, last_modified, etc.
 MAX_CONTAINER_LISTING_CONTENT_LENGTH = 1024 * 10000 * 2
+#: Size of the chunks of a streamed listing response body.
+LISTING_CHUNK_SIZE = 65536
+JSON_WHITESPACE = re.compile(r'[ \t\n\r]*')
 
 
 def get_listing_content_type(req):
@@ -62,8 +69,9 @@ def get_listing_content_type(req):
     return out_content_type
 
 
-def to_xml(document_element):
-    result = tostring(document_element, encoding='UTF-8').replace(
+def to_xml(document_element, short_empty_elements=True):
+    result = tostring(document_element, encoding='UTF-8',
+                      short_empty_elements=short_empty_elements).replace(
         b"<?xml version='1.0' encoding='UTF-8'?>",
         b'<?xml version="1.0" encoding="UTF-8"?>', 1)
     if not result.startswith(b'<?xml '):
@@ -73,47 +81,257 @@ def to_xml(document_element):
     return result
 
 
+def iter_xml(document_element, elements):
+    """
+    Serialize ``document_element`` with ``elements`` as its children,
+    yielding each child as it is serialized.
+
+    :param document_element: an ``Element`` with no children.
+    :param elements: an iterable of ``Element``.
+    :returns: an iterator of bytes that join to the same document as
+        :func:`to_xml` would return if ``elements`` were appended to
+        ``document_element``.
+    """
+    elements = iter(elements)
+    first = next(elements, None)
+    if first is None:
+        yield to_xml(document_element)
+        return
+    end_tag = ('</%s>' % document_element.tag).encode('utf-8')
+    yield to_xml(document_element, short_empty_elements=False)[
+        :-len(end_tag)]
+    for element in itertools.chain([first], elements):
+        yield tostring(element, encoding='unicode').encode('utf-8')
+    yield end_tag
+
+
+def _account_record_to_xml(record):
+    if 'subdir' in record:
+        name = record.pop('subdir')
+        sub = Element('subdir', name=name)
+    else:
+        sub = Element('container')
+        for field in ('name', 'count', 'bytes', 'last_modified'):
+            SubElement(sub, field).text = str(record.pop(field))
+        for field in ('storage_policy',):
+            if field in record:
+                SubElement(sub, field).text = str(record.pop(field))
+    sub.tail = '\n'
+    return sub
+
+
 def account_to_xml(listing, account_name):
     doc = Element('account', name=account_name)
     doc.text = '\n'
     for record in listing:
-        if 'subdir' in record:
-            name = record.pop('subdir')
-            sub = SubElement(doc, 'subdir', name=name)
-        else:
-            sub = SubElement(doc, 'container')
-            for field in ('name', 'count', 'bytes', 'last_modified'):
-                SubElement(sub, field).text = str(record.pop(field))
-            for field in ('storage_policy',):
-                if field in record:
-                    SubElement(sub, field).text = str(record.pop(field))
-        sub.tail = '\n'
+        doc.append(_account_record_to_xml(record))
     return to_xml(doc)
 
 
+def iter_account_xml(listing, account_name):
+    doc = Element('account', name=account_name)
+    doc.text = '\n'
+    return iter_xml(doc, map(_account_record_to_xml, listing))
+
+
+def _container_record_to_xml(record):
+    if 'subdir' in record:
+        name = record.pop('subdir')
+        sub = Element('subdir', name=name)
+        SubElement(sub, 'name').text = name
+    else:
+        sub = Element('object')
+        for field in ('name', 'hash', 'bytes', 'content_type',
+                      'last_modified'):
+            SubElement(sub, field).text = str(record.pop(field))
+    return sub
+
+
 def container_to_xml(listing, base_name):
     doc = Element('container', name=base_name)
     for record in listing:
-        if 'subdir' in record:
-            name = record.pop('subdir')
-            sub = SubElement(doc, 'subdir', name=name)
-            SubElement(sub, 'name').text = name
-        else:
-            sub = SubElement(doc, 'object')
-            for field in ('name', 'hash', 'bytes', 'content_type',
-                          'last_modified'):
-                SubElement(sub, field).text = str(record.pop(field))
+        doc.append(_container_record_to_xml(record))
     return to_xml(doc)
 
 
+def iter_container_xml(listing, base_name):
+    return iter_xml(Element('container', name=base_name),
+                    map(_container_record_to_xml, listing))
+
+
+def iter_listing_text(listing):
+    for item in listing:
+        if 'name' in item:
+            yield item['name'].encode('utf-8') + b'\n'
+        else:
+            yield item['subdir'].encode('utf-8') + b'\n'
+
+
 def listing_to_text(listing):
-    def get_lines():
-        for item in listing:
-            if 'name' in item:
-                yield item['name'].encode('utf-8') + b'\n'
-            else:
-                yield item['subdir'].encode('utf-8') + b'\n'
-    return b''.join(get_lines())
+    return b''.join(iter_listing_text(listing))
+
+
+def iter_listing_json(listing):
+    """
+    Serialize ``listing`` as a JSON array, yielding each item as it is
+    serialized.
+
+    :param listing: an iterable of JSON serializable items.
+    :returns: an iterator of bytes that join to the same JSON as
+        ``json.dumps(list(listing)).encode('ascii')``.
+    """
+    separator = b'['
+    for item in listing:
+        yield separator + json.dumps(item).encode('ascii')
+        separator = b', '
+    yield b'[]' if separator == b'[' else b']'
+
+
+def chunk_listing(body_iter, chunk_size=LISTING_CHUNK_SIZE):
+    """
+    Coalesce the small pieces of a serialized listing into chunks of at least
+    ``chunk_size`` bytes, so that a streamed listing is not written to the
+    network one record at a time.
+
+    :param body_iter: an iterator of bytes.
+    :param chunk_size: the minimum size of each chunk but the last.
+    :returns: an iterator of bytes.
+    """
+    buf = []
+    buf_len = 0
+    for piece in body_iter:
+        buf.append(piece)
+        buf_len += len(piece)
+        if buf_len >= chunk_size:
+            yield b''.join(buf)
+            buf = []
+            buf_len = 0
+    if buf:
+        yield b''.join(buf)
+
+
+def iter_listing_records(body_iter):
+    """
+    Incrementally parse a JSON listing response body.
+
+    :param body_iter: an iterator of bytes that join to a JSON array of
+        objects.
+    :returns: an iterator of the dicts in the array, parsed as the bytes
+        needed to parse each of them are read from ``body_iter``.
+    :raises ValueError: if the body is not a JSON array of objects.
+    """
+    body_iter = iter(body_iter)
+    decoder = json.JSONDecoder()
+    utf8_decoder = codecs.getincrementaldecoder('utf-8')()
+    buf = ''
+    pos = 0
+
+    def read():
+        # returns False once the body has been read
+        nonlocal buf, pos
+        chunk = next(body_iter, None)
+        buf = buf[pos:] + utf8_decoder.decode(chunk or b'', chunk is None)
+        pos = 0
+        return chunk is not None
+
+    def next_token():
+        nonlocal pos
+        while True:
+            pos = JSON_WHITESPACE.match(buf, pos).end()
+            if pos < len(buf):
+                return buf[pos]
+            if not read():
+                raise ValueError('Truncated listing')
+
+    if next_token() != '[':
+        raise ValueError('Listing is not a JSON array')
+    pos += 1
+    if next_token() == ']':
+        pos += 1
+    else:
+        while True:
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+            except ValueError:
+                # the item may continue in the next chunk
+                if not read():
+                    raise
+                continue
+            if not isinstance(item, dict):
+                raise ValueError('Listing item is not a JSON object')
+            pos = end
+            yield item
+            token = next_token()
+            pos += 1
+            if token == ']':
+                break
+            if token != ',':
+                raise ValueError('Expected "," in listing')
+            next_token()
+    # nothing but whitespace may follow the array
+    pos = JSON_WHITESPACE.match(buf, pos).end()
+    while pos == len(buf) and read():
+        pos = JSON_WHITESPACE.match(buf, pos).end()
+    if pos < len(buf):
+        raise ValueError('Extra data after listing')
+
+
+def stream_listing(resp_iter):
+    """
+    Start incrementally parsing a JSON listing response body.
+
+    The body is read until its first item has been parsed, so that a body that
+    is not a listing at all can still be passed on as it is.
+
+    :param resp_iter: a response body iterator.
+    :returns: a tuple of (records, body); if the body starts with a JSON array
+        of objects then ``records`` is a closeable iterator of its dicts and
+        ``body`` is None, otherwise ``records`` is None and ``body`` is a
+        closeable iterator of the complete original body.
+    """
+    read_chunks = []
+    body_iter = iter(resp_iter)
+
+    def reading():
+        for chunk in body_iter:
+            if read_chunks is not None:
+                read_chunks.append(chunk)
+            yield chunk
+
+    records = iter_listing_records(reading())
+    try:
+        first = [next(records)]
+    except StopIteration:
+        first = []
+    except ValueError:
+        return None, ClosingIterator(
+            itertools.chain(read_chunks, body_iter), [resp_iter])
+    read_chunks = None
+    return ClosingIterator(itertools.chain(first, records), [resp_iter]), None
+
+
+def update_listing_stream(update_func, resp_iter):
+    """
+    Apply ``update_func`` to each record of a JSON listing response body as
+    it is read.
+
+    :param update_func: a function that is called with each record, as a
+        dict, and may modify it in place.
+    :param resp_iter: a response body iterator.
+    :returns: an iterator of the body with the updated records, or of the
+        original body if it is not a JSON listing.
+    """
+    records, body = stream_listing(resp_iter)
+    if records is None:
+        return body
+
+    def update_record(record):
+        update_func(record)
+        return record
+
+    return ClosingIterator(
+        chunk_listing(iter_listing_json(map(update_record, records))),
+        [records])
 
 
 class ListingFilter(object):
@@ -122,8 +340,10 @@ class ListingFilter(object):
         self.logger = logger or get_logger(conf, log_route='listing-filter')
 
     def filter_reserved(self, listing, account, container):
-        new_listing = []
-        for entry in list(listing):
+        return list(self.iter_filter_reserved(listing, account, container))
+
+    def iter_filter_reserved(self, listing, account, container):
+        for entry in listing:
             for key in ('name', 'subdir'):
                 value = entry.get(key, '')
                 if RESERVED in value:
@@ -140,8 +360,59 @@ class ListingFilter(object):
                             wsgi_quote(account), key, value)
                     break  # out of the *key* loop; check next entry
             else:
-                new_listing.append(entry)
-        return new_listing
+                yield entry
+
+    def transcode_listing_stream(self, req, status, headers_dict,
+                                 resp_iter, out_content_type, account,
+                                 container, start_response):
+        """
+        Transcode a JSON listing response body that has no content-length
+        as it is read, rather than reading it all into memory first.
+
+        Only a body that does not start with a JSON array of objects is
+        passed through as it is; once the response has started, a listing
+        that turns out to be invalid can only be cut short.
+        """
+        records, body = stream_listing(resp_iter)
+        if records is None:
+            # not a listing; just pass it straight through
+            start_response(status, list(headers_dict.items()))
+            return body
+
+        if not req.allow_reserved_names:
+            records = ClosingIterator(self.iter_filter_reserved(
+                records, account, container), [records])
+        first = next(records, None)
+        if first is None:
+            records.close()
+            listing = []
+        else:
+            listing = ClosingIterator(
+                itertools.chain([first], records), [records])
+
+        if out_content_type.endswith('/xml'):
+            if container:
+                body = iter_container_xml(
+                    listing, wsgi_to_bytes(container).decode('utf-8'))
+            else:
+                body = iter_account_xml(
+                    listing, wsgi_to_bytes(account).decode('utf-8'))
+        elif out_content_type == 'text/plain':
+            body = iter_listing_text(listing)
+        else:
+            body = iter_listing_json(listing)
+
+        headers_dict['content-type'] = out_content_type + '; charset=utf-8'
+        if first is None:
+            body = b''.join(body)
+            if not body:
+                status = '%s %s' % (HTTP_NO_CONTENT,
+                                    RESPONSE_REASONS[HTTP_NO_CONTENT][0])
+            headers_dict['content-length'] = len(body)
+            start_response(status, list(headers_dict.items()))
+            return [body]
+        start_response(status, list(headers_dict.items()))
+        return ClosingIterator(chunk_listing(body), [listing])
 
     def __call__(self, env, start_response):
         req = Request(env)
@@ -207,8 +478,13 @@ class ListingFilter(object):
             start_response(status, list(headers_dict.items()))
             return resp_iter
 
-        if resp_length is None or \
-                int(resp_length) > MAX_CONTAINER_LISTING_CONTENT_LENGTH:
+        if resp_length is None:
+            # the listing is being streamed
+            return self.transcode_listing_stream(
+                req, status, headers_dict, resp_iter, out_content_type,
+                acct, cont, start_response)
+
+        if int(resp_length) > MAX_CONTAINER_LISTING_CONTENT_LENGTH:
             start_response(status, list(headers_dict.items()))
             return resp_iter
 
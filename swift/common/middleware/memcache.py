@@ -13,7 +13,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from swift.common.memcached import load_memcache
+from swift.common.memcached import load_memcache, load_local_cache
 from swift.common.utils import get_logger
 
 
@@ -26,9 +26,12 @@ class MemcacheMiddleware(object):
         self.app = app
         self.logger = get_logger(conf, log_route='memcache')
         self.memcache = load_memcache(conf, self.logger)
+        self.local_cache = load_local_cache(conf)
 
     def __call__(self, env, start_response):
         env['swift.cache'] = self.memcache
+        if self.local_cache is not None:
+            env['swift.local_cache'] = self.local_cache
         return self.app(env, start_response)
 
 
@@ -148,7 +148,7 @@ from urllib.parse import parse_qs
 from swift.common import swob
 from swift.common.constraints import valid_api_version
 from swift.common.middleware.listing_formats import \
-    MAX_CONTAINER_LISTING_CONTENT_LENGTH
+    MAX_CONTAINER_LISTING_CONTENT_LENGTH, update_listing_stream
 from swift.common.request_helpers import append_log_info
 from swift.common.wsgi import PipelineWrapper, loadcontext, WSGIContext
 from swift.common.statsd_client import get_labeled_statsd_client
@@ -248,6 +248,14 @@ class ListingEtagMiddleware(object):
                 if content_type:
                     break
 
+        if content_type == 'application/json' and content_length is None \
+                and cl_index is None:
+            # the listing is being streamed
+            start_response(ctx._response_status, ctx._response_headers,
+                           ctx._response_exc_info)
+            return update_listing_stream(self._update_streamed_item,
+                                         resp_iter)
+
         if content_type != 'application/json' or content_length is None or \
                 content_length > MAX_CONTAINER_LISTING_CONTENT_LENGTH:
             start_response(ctx._response_status, ctx._response_headers,
@@ -261,13 +269,7 @@ class ListingEtagMiddleware(object):
         try:
             listing = json.loads(body)
             for item in listing:
-                if 'subdir' in item:
-                    continue
-                value, params = parse_header(item['hash'])
-                if 's3_etag' in params:
-                    item['s3_etag'] = '"%s"' % params.pop('s3_etag')
-                    item['hash'] = value + ''.join(
-                        '; %s=%s' % kv for kv in params.items())
+                self._update_item(item)
         except (TypeError, KeyError, ValueError):
             # If anything goes wrong above, drop back to original response
             start_response(ctx._response_status, ctx._response_headers,
@@ -283,6 +285,22 @@ class ListingEtagMiddleware(object):
                        ctx._response_exc_info)
         return [body]
 
+    def _update_item(self, item):
+        if 'subdir' in item:
+            return
+        value, params = parse_header(item['hash'])
+        if 's3_etag' in params:
+            item['s3_etag'] = '"%s"' % params.pop('s3_etag')
+            item['hash'] = value + ''.join(
+                '; %s=%s' % kv for kv in params.items())
+
+    def _update_streamed_item(self, item):
+        try:
+            self._update_item(item)
+        except (TypeError, KeyError, ValueError):
+            # leave an item we can't make sense of as it was
+            pass
+
 
 class S3ApiMiddleware(object):
     """S3Api: S3 compatibility middleware"""
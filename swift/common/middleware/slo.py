@@ -350,7 +350,7 @@ from swift.cli.container_deleter import make_delete_jobs
 from swift.common.header_key_dict import HeaderKeyDict
 from swift.common.exceptions import ListingIterError, SegmentError
 from swift.common.middleware.listing_formats import \
-    MAX_CONTAINER_LISTING_CONTENT_LENGTH
+    MAX_CONTAINER_LISTING_CONTENT_LENGTH, update_listing_stream
 from swift.common.swob import Request, HTTPBadRequest, HTTPServerError, \
     HTTPMethodNotAllowed, HTTPRequestEntityTooLarge, HTTPLengthRequired, \
     HTTPOk, HTTPPreconditionFailed, HTTPException, HTTPNotFound, \
@@ -1828,8 +1828,12 @@ class StaticLargeObject(object):
         resp = req.get_response(self.app)
         if not resp.is_success or resp.content_type != 'application/json':
             return resp(req.environ, start_response)
-        if resp.content_length is None or \
-                resp.content_length > MAX_CONTAINER_LISTING_CONTENT_LENGTH:
+        if resp.content_length is None:
+            # the listing is being streamed
+            resp.app_iter = update_listing_stream(
+                self._update_listing_item, resp.app_iter)
+            return resp(req.environ, start_response)
+        if resp.content_length > MAX_CONTAINER_LISTING_CONTENT_LENGTH:
             return resp(req.environ, start_response)
         try:
             listing = json.loads(resp.body)
@@ -1837,17 +1841,20 @@ class StaticLargeObject(object):
             return resp(req.environ, start_response)
 
         for item in listing:
-            if 'subdir' in item:
-                continue
-            etag, params = parse_header(item['hash'])
-            if 'slo_etag' in params:
-                item['slo_etag'] = '"%s"' % params.pop('slo_etag')
-                item['hash'] = etag + ''.join(
-                    '; %s=%s' % kv for kv in params.items())
+            self._update_listing_item(item)
 
         resp.body = json.dumps(listing).encode('ascii')
         return resp(req.environ, start_response)
 
+    def _update_listing_item(self, item):
+        if 'subdir' in item:
+            return
+        etag, params = parse_header(item['hash'])
+        if 'slo_etag' in params:
+            item['slo_etag'] = '"%s"' % params.pop('slo_etag')
+            item['hash'] = etag + ''.join(
+                '; %s=%s' % kv for kv in params.items())
+
     def __call__(self, env, start_response):
         """
         WSGI entry point
@@ -205,6 +205,7 @@ from swift.common.utils import get_logger, split_path, \
     config_true_value, drain_and_close, parse_header
 from swift.common.registry import register_swift_info
 from swift.common.constraints import check_account_format
+from swift.common.middleware.listing_formats import update_listing_stream
 from swift.common.wsgi import WSGIContext, make_subrequest, \
     make_pre_authed_request
 from swift.common.request_helpers import get_sys_meta_prefix, \
@@ -359,10 +360,16 @@ class SymlinkContainerContext(WSGIContext):
         Iterate through json body looking for symlinks and modify its content
         :return: modified json body
         """
+        swift_version, account, _junk = split_path(req.path, 2, 3, True)
+        if self._response_header_value('content-length') is None:
+            # the listing is being streamed
+            return update_listing_stream(
+                lambda obj_dict: self._extract_symlink_path_json(
+                    obj_dict, swift_version, account),
+                resp_iter)
         with closing_if_possible(resp_iter):
             resp_body = b''.join(resp_iter)
         body_json = json.loads(resp_body)
-        swift_version, account, _junk = split_path(req.path, 2, 3, True)
         new_body = json.dumps(
             [self._extract_symlink_path_json(obj_dict, swift_version, account)
              for obj_dict in body_json]).encode('ascii')
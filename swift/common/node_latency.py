@@ -0,0 +1,294 @@
+# Copyright (c) 2026 OpenStack Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import mmap
+import os
+import struct
+from time import time
+
+from swift.common.utils import md5, node_to_string
+
+# Each slot of a shared table is: key hash, ewma, tail, last update time. A
+# key hash of zero marks an empty slot.
+SLOT_STRUCT = struct.Struct('<Qddd')
+DEFAULT_SHARED_SLOTS = 4096
+# How many slots are probed for a key before the least recently updated one
+# is reused.
+MAX_PROBES = 8
+
+
+def _key_hash(key):
+    digest = md5(key.encode('utf-8'), usedforsecurity=False).digest()
+    return struct.unpack('<Q', digest[:8])[0] or 1
+
+
+class LocalLatencyTable(object):
+    """
+    Stores latency stats in a dict that is private to this process.
+    """
+    def __init__(self):
+        self.stats = {}
+
+    def get(self, key):
+        return self.stats.get(key)
+
+    def set(self, key, ewma, tail, updated):
+        self.stats[key] = (ewma, tail, updated)
+
+
+class SharedLatencyTable(object):
+    """
+    Stores latency stats in a fixed size, file backed ``mmap`` so that all the
+    processes that map the same file share them.
+
+    Writes are not locked: concurrent updates to the same slot by two
+    processes may lose a sample, which only makes the stats a little less
+    smooth. Slots are found by open addressing; when the table is full the
+    least recently updated of the probed slots is reused.
+
+    :param path: path of the file to map; it is created if it does not exist.
+    :param slots: number of slots in the table.
+    """
+    def __init__(self, path, slots=DEFAULT_SHARED_SLOTS):
+        self.path = path
+        self.slots = int(slots)
+        if self.slots < 1:
+            raise ValueError('slots must be positive, not %r' % slots)
+        size = self.slots * SLOT_STRUCT.size
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if os.fstat(fd).st_size != size:
+                os.ftruncate(fd, size)
+            self._map = mmap.mmap(fd, size, mmap.MAP_SHARED,
+                                  mmap.PROT_READ | mmap.PROT_WRITE)
+        finally:
+            os.close(fd)
+
+    def _offsets(self, key_hash):
+        start = key_hash % self.slots
+        for i in range(min(MAX_PROBES, self.slots)):
+            yield ((start + i) % self.slots) * SLOT_STRUCT.size
+
+    def get(self, key):
+        key_hash = _key_hash(key)
+        for offset in self._offsets(key_hash):
+            slot_hash, ewma, tail, updated = SLOT_STRUCT.unpack_from(
+                self._map, offset)
+            if slot_hash == key_hash:
+                return ewma, tail, updated
+            if not slot_hash:
+                break
+        return None
+
+    def set(self, key, ewma, tail, updated):
+        key_hash = _key_hash(key)
+        target = oldest = None
+        for offset in self._offsets(key_hash):
+            slot_hash, _ewma, _tail, slot_updated = SLOT_STRUCT.unpack_from(
+                self._map, offset)
+            if slot_hash == key_hash or not slot_hash:
+                target = offset
+                break
+            if oldest is None or slot_updated < oldest[1]:
+                oldest = (offset, slot_updated)
+        if target is None:
+            target = oldest[0]
+        SLOT_STRUCT.pack_into(self._map, target, key_hash, ewma, tail, updated)
+
+    def close(self):
+        self._map.close()
+
+
+class NodeLatencyTracker(object):
+    """
+    Tracks smoothed latencies for nodes.
+
+    For each node two values are kept: an exponentially weighted moving
+    average (EWMA) of the latency samples, and a tail estimate. The tail is an
+    asymmetric EWMA that moves towards samples above it with weight
+    ``tail_quantile`` and towards samples below it with weight ``1 -
+    tail_quantile``, so that it settles near the high percentiles of the
+    samples (the expectile of the same order) without keeping the samples.
+
+    Stats that have not been updated for ``expiry`` seconds are ignored.
+
+    :param alpha: the weight of each new sample in the EWMA, between 0 and 1.
+    :param expiry: the number of seconds for which stats stay valid after
+        their last update.
+    :param tail_quantile: the order of the tail estimate, between 0.5 and 1.
+    :param shared_path: optional path of a file in which to share the stats
+        with other processes (see :class:`SharedLatencyTable`); the stats are
+        private to this process if this is not given.
+    :param shared_slots: the number of slots in a shared table.
+    """
+    def __init__(self, alpha=0.2, expiry=300, tail_quantile=0.99,
+                 shared_path=None, shared_slots=DEFAULT_SHARED_SLOTS):
+        self.alpha = float(alpha)
+        if not 0 < self.alpha <= 1:
+            raise ValueError('alpha must be in (0, 1], not %r' % alpha)
+        self.tail_quantile = float(tail_quantile)
+        if not 0.5 <= self.tail_quantile < 1:
+            raise ValueError('tail_quantile must be in [0.5, 1), not %r'
+                             % tail_quantile)
+        self.expiry = float(expiry)
+        if shared_path:
+            self.table = SharedLatencyTable(shared_path, shared_slots)
+        else:
+            self.table = LocalLatencyTable()
+
+    def node_key(self, node):
+        """
+        Get the key under which a node's latency stats will be stored.
+
+        :param node: dictionary describing a node.
+        :return: string key.
+        """
+        return node_to_string(node)
+
+    def _get_valid(self, node, now):
+        stats = self.table.get(self.node_key(node))
+        if stats is None or stats[2] + self.expiry <= now:
+            return None
+        return stats
+
+    def record(self, node, latency, now=None):
+        """
+        Add a latency sample for a node.
+
+        :param node: dictionary describing a node.
+        :param latency: the sample, in seconds.
+        :param now: the time of the sample; defaults to the current time.
+        """
+        now = time() if now is None else now
+        stats = self._get_valid(node, now)
+        if stats is None:
+            ewma = tail = latency
+        else:
+            ewma, tail, _updated = stats
+            ewma += self.alpha * (latency - ewma)
+            if latency > tail:
+                tail += self.alpha * (latency - tail)
+            else:
+                tail += (self.alpha * (1 - self.tail_quantile) /
+                         self.tail_quantile) * (latency - tail)
+        self.table.set(self.node_key(node), ewma, tail, now)
+
+    def get_stats(self, node, now=None):
+        """
+        Get the latency stats of a node.
+
+        :param node: dictionary describing a node.
+        :param now: the current time; defaults to the current time.
+        :returns: a tuple of (ewma, tail), or None if there are no valid stats
+            for the node.
+        """
+        now = time() if now is None else now
+        stats = self._get_valid(node, now)
+        if stats is None:
+            return None
+        return stats[0], stats[1]
+
+    def score(self, node, now=None):
+        """
+        Get a sort key for a node: the mean of its EWMA and tail estimate,
+        rounded to the millisecond, or -1.0 if there are no valid stats for the
+        node so that nodes without stats are tried first and get some.
+
+        :param node: dictionary describing a node.
+        :param now: the current time; defaults to the current time.
+        :returns: a float.
+        """
+        stats = self.get_stats(node, now)
+        if stats is None:
+            return -1.0
+        return round((stats[0] + stats[1]) / 2, 3)
+
+
+class RequestHedger(object):
+    """
+    Decides when to send a backup (hedged) request to another node because
+    the first request is slow.
+
+    The hedging delay is an estimate of the ``quantile`` of the latencies
+    passed to :meth:`observe`. It is updated multiplicatively: up by a factor
+    of ``1 + step * quantile`` for a sample above it and down by ``1 - step *
+    (1 - quantile)`` for a sample below it, so that it settles where a
+    fraction ``1 - quantile`` of samples are above it. No delay is given
+    until ``min_samples`` samples have been observed.
+
+    Hedged requests are limited by a token budget: each request that is not a
+    hedge earns ``budget`` tokens, up to ``max_tokens``, and each hedge spends
+    one. So hedges add at most a fraction ``budget`` of extra requests, and
+    while a cluster is slow enough for most requests to want a hedge only that
+    fraction of them get one.
+
+    :param budget: the fraction of extra requests that hedges may add.
+    :param quantile: the quantile of the latencies to wait before hedging.
+    :param step: the relative step of the delay estimate.
+    :param min_samples: the number of samples needed before hedging.
+    :param max_tokens: the most tokens that may be saved up.
+    """
+    def __init__(self, budget=0.05, quantile=0.95, step=0.02,
+                 min_samples=50, max_tokens=10):
+        self.budget = float(budget)
+        self.quantile = float(quantile)
+        if not 0 < self.quantile < 1:
+            raise ValueError('quantile must be in (0, 1), not %r' % quantile)
+        self.step = float(step)
+        self.min_samples = int(min_samples)
+        self.max_tokens = float(max_tokens)
+        self.estimate = None
+        self.samples = 0
+        self.tokens = 0.0
+
+    def observe(self, latency):
+        """
+        Add a latency sample.
+
+        :param latency: the sample, in seconds.
+        """
+        self.samples += 1
+        if self.estimate is None or self.estimate <= 0:
+            self.estimate = latency
+        elif latency > self.estimate:
+            self.estimate *= 1 + self.step * self.quantile
+        else:
+            self.estimate *= 1 - self.step * (1 - self.quantile)
+
+    @property
+    def delay(self):
+        """
+        The time to wait for a response before hedging, or None if there are
+        not yet enough samples to hedge.
+        """
+        if self.samples < self.min_samples or not self.estimate:
+            return None
+        return self.estimate
+
+    def request_sent(self):
+        """
+        Account for a request that is not a hedge.
+        """
+        self.tokens = min(self.tokens + self.budget, self.max_tokens)
+
+    def acquire(self):
+        """
+        Take a token for a hedged request.
+
+        :returns: True if a hedged request may be sent, False otherwise.
+        """
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
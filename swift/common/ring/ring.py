@@ -16,21 +16,27 @@
 import array
 
 import json
+import mmap
 from collections import defaultdict
 from os.path import getmtime
 import struct
+import tempfile
 from time import time
 import os
 from itertools import chain, count
 import sys
 
 from swift.common.exceptions import RingLoadError, DevIdBytesTooSmall
+from swift.common import utils
 from swift.common.utils import hash_path, validate_configuration, md5
 from swift.common.ring.io import RingReader, RingWriter
-from swift.common.ring.utils import tiers_for_dev
+from swift.common.ring.utils import tiers_for_dev, BYTES_TO_TYPE_CODE
 
 
 DEFAULT_RELOAD_TIME = 15
+MMAP_RING_MAGIC = b'R1NGMMAP'
+MMAP_RING_SUFFIX = '.mmap'
+_PART_STRUCT = struct.Struct('>I')
 RING_CODECS = {
     1: {
         "serialize": lambda ring_data, writer: ring_data.serialize_v1(writer),
@@ -55,6 +61,28 @@ def calc_replica_count(replica2part2dev_id):
     return base + extra
 
 
+def get_mmap_ring_path(ring_path):
+    """
+    Get the path of the uncompressed, mmap-able sidecar for a ring file.
+
+    ``object.ring.gz`` becomes ``object.ring.mmap``.
+
+    :param ring_path: path to a (gzipped) serialized ring
+    :returns: path to the sidecar
+    """
+    if ring_path.endswith('.gz'):
+        ring_path = ring_path[:-len('.gz')]
+    return ring_path + MMAP_RING_SUFFIX
+
+
+def _file_checksum(filename):
+    checksum = md5(usedforsecurity=False)
+    with open(filename, 'rb') as fp:
+        for chunk in iter(lambda: fp.read(2 ** 16), b''):
+            checksum.update(chunk)
+    return checksum.hexdigest()
+
+
 def normalize_devices(devs):
     # NOTE(akscram): Replication parameters like replication_ip
     #                and replication_port are required for
@@ -78,7 +106,8 @@ class RingData(object):
         normalize_devices(devs)
         self.devs = devs
         for i, part2dev_id in enumerate(replica2part2dev_id):
-            if not isinstance(part2dev_id, array.array):
+            # memoryviews come from a mapped sidecar; don't copy them
+            if not isinstance(part2dev_id, (array.array, memoryview)):
                 replica2part2dev_id[i] = array.array('H', part2dev_id)
         self._replica2part2dev_id = replica2part2dev_id
         self._part_shift = part_shift
@@ -226,6 +255,124 @@ class RingData(object):
         ring._dev_id_bytes = ring_data.get('dev_id_bytes', 2)
         return ring
 
+    @classmethod
+    def load_mmap(cls, filename, source_checksum=None):
+        """
+        Load ring data from an uncompressed sidecar written by
+        :meth:`save_mmap`.
+
+        Rather than being read into memory, the file is mapped and the
+        ``replica2part2dev_id`` rows are returned as read-only memoryviews
+        over the mapping. Every process that maps the same file shares the
+        same pages.
+
+        :param filename: path to a file serialized by ``save_mmap()``
+        :param source_checksum: if given, the hex md5 of the ring file the
+                                sidecar is expected to have been written from
+        :returns: A RingData instance backed by the mapped file.
+        :raises ValueError: if the file is not a ring sidecar, was written
+                            from some other ring file, or was written on a
+                            host with a different byte order
+        """
+        with open(filename, 'rb') as fp:
+            mapped = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        magic = mapped[:len(MMAP_RING_MAGIC)]
+        if magic != MMAP_RING_MAGIC:
+            raise ValueError('unexpected magic: %r' % magic)
+        offset = len(MMAP_RING_MAGIC)
+        meta_len, = struct.unpack_from('!Q', mapped, offset)
+        offset += struct.calcsize('!Q')
+        meta = json.loads(mapped[offset:offset + meta_len])
+        if source_checksum is not None and \
+                meta['source_checksum'] != source_checksum:
+            raise ValueError('%r was not written from the current ring' %
+                             filename)
+        if meta['byteorder'] != sys.byteorder:
+            raise ValueError('%r has unexpected byteorder %r' %
+                             (filename, meta['byteorder']))
+
+        type_code = BYTES_TO_TYPE_CODE[meta['dev_id_bytes']]
+        view = memoryview(mapped)
+        offset = meta['table_offset']
+        replica2part2dev_id = []
+        for row_len in meta['row_lengths']:
+            row_bytes = row_len * meta['dev_id_bytes']
+            replica2part2dev_id.append(
+                view[offset:offset + row_bytes].cast(type_code))
+            offset += row_bytes
+
+        ring_data = cls(replica2part2dev_id, meta['devs'],
+                        meta['part_shift'], meta.get('next_part_power'),
+                        meta.get('version'))
+        ring_data._dev_id_bytes = meta['dev_id_bytes']
+        ring_data._replica_count = meta['replica_count']
+        ring_data.format_version = meta.get('format_version')
+        ring_data.size = meta.get('size')
+        ring_data.raw_size = meta.get('raw_size')
+        return ring_data
+
+    def save_mmap(self, filename, source_path):
+        """
+        Write this RingData instance as an uncompressed, page-aligned sidecar
+        that may later be mapped with :meth:`load_mmap`.
+
+        The sidecar records the checksum of the ring file at ``source_path``
+        so that readers can detect (and ignore) a sidecar that was left
+        behind when only the ring file was updated.
+
+        :param filename: File into which this instance should be serialized.
+        :param source_path: path to the serialized ring this sidecar
+                            accompanies; it must already have been saved.
+        """
+        ring = self.to_dict()
+        with RingReader.open(source_path) as reader:
+            format_version = reader.version
+            size, raw_size = reader.size, reader.raw_size
+        meta = {
+            'devs': ring['devs'],
+            'part_shift': ring['part_shift'],
+            'next_part_power': ring['next_part_power'],
+            'version': ring['version'],
+            'dev_id_bytes': ring['dev_id_bytes'],
+            'replica_count': self.replica_count,
+            'row_lengths': [len(row) for row in ring['replica2part2dev_id']],
+            'byteorder': sys.byteorder,
+            'format_version': format_version,
+            'size': size,
+            'raw_size': raw_size,
+            'source_checksum': _file_checksum(source_path),
+        }
+        # table_offset depends on the header length, which depends on
+        # table_offset; leave enough room for any offset we could choose
+        meta['table_offset'] = 0
+        header_len = len(MMAP_RING_MAGIC) + struct.calcsize('!Q') + len(
+            json.dumps(meta, sort_keys=True, ensure_ascii=True)) + 20
+        meta['table_offset'] = -(-header_len // mmap.PAGESIZE) * \
+            mmap.PAGESIZE
+        json_text = json.dumps(meta, sort_keys=True,
+                               ensure_ascii=True).encode('ascii')
+
+        fp = tempfile.NamedTemporaryFile(
+            dir=os.path.dirname(filename),
+            prefix=os.path.basename(filename),
+            delete=False)
+        try:
+            fp.write(MMAP_RING_MAGIC)
+            fp.write(struct.pack('!Q', len(json_text)))
+            fp.write(json_text)
+            fp.write(b'\x00' * (meta['table_offset'] - fp.tell()))
+            for part2dev_id in ring['replica2part2dev_id']:
+                fp.write(part2dev_id.tobytes())
+            fp.flush()
+            os.fsync(fp.fileno())
+            fp.close()
+            os.chmod(fp.name, 0o644)
+            os.rename(fp.name, filename)
+        except BaseException:
+            fp.close()
+            os.unlink(fp.name)
+            raise
+
     def serialize_v1(self, writer):
         if self.dev_id_bytes != 2:
             raise DevIdBytesTooSmall('Ring v1 only supports 2-byte dev IDs')
@@ -332,12 +479,43 @@ class Ring(object):
         self.reload_time = (DEFAULT_RELOAD_TIME if reload_time is None
                             else reload_time)
         self._validation_hook = validation_hook
+        self._mmap_mtime = None
         self._reload(force=True)
 
+    @property
+    def mmap_path(self):
+        """Path to the optional uncompressed sidecar for this ring."""
+        return get_mmap_ring_path(self.serialized_path)
+
+    def _get_mmap_mtime(self):
+        try:
+            return getmtime(self.mmap_path)
+        except OSError:
+            return None
+
+    def _load_ring_data(self, mmap_mtime):
+        """
+        Load the ring data, preferring the mmap-able sidecar if there is one
+        that was written from the current ring file. Mapping the sidecar
+        avoids decompressing and parsing the ring in every process, and lets
+        all processes on the host share a single copy of the assignments.
+        """
+        if mmap_mtime is not None:
+            try:
+                return RingData.load_mmap(
+                    self.mmap_path,
+                    source_checksum=_file_checksum(self.serialized_path))
+            except (OSError, ValueError, KeyError):
+                # stale, partially-distributed or otherwise unusable sidecar;
+                # the ring file is the source of truth
+                pass
+        return RingData.load(self.serialized_path)
+
     def _reload(self, force=False):
         self._rtime = time() + self.reload_time
         if force or self.has_changed():
-            ring_data = RingData.load(self.serialized_path)
+            mmap_mtime = self._get_mmap_mtime()
+            ring_data = self._load_ring_data(mmap_mtime)
 
             try:
                 self._validation_hook(ring_data)
@@ -350,6 +528,9 @@ class Ring(object):
                     return
 
             self._mtime = getmtime(self.serialized_path)
+            self._mmap_mtime = mmap_mtime
+            # Swap in the new table in one go; any previous mapping is
+            # released once nothing references its rows any more.
             self._devs = ring_data.devs
             self._dev_id_bytes = ring_data._dev_id_bytes
             self._replica2part2dev_id = ring_data._replica2part2dev_id
@@ -372,8 +553,7 @@ class Ring(object):
         # bailouts in get_more_nodes() working.
         dev_ids_with_parts = set()
         for part2dev_id in self._replica2part2dev_id:
-            for dev_id in part2dev_id:
-                dev_ids_with_parts.add(dev_id)
+            dev_ids_with_parts.update(part2dev_id)
         regions = set()
         zones = set()
         ips = set()
@@ -482,16 +662,19 @@ class Ring(object):
 
         :returns: True if the ring on disk has changed, False otherwise
         """
-        return getmtime(self.serialized_path) != self._mtime
+        return (getmtime(self.serialized_path) != self._mtime or
+                self._get_mmap_mtime() != self._mmap_mtime)
 
     def _get_part_nodes(self, part):
+        # callers have already checked for a reload
+        devs = self._devs
         part_nodes = []
         seen_ids = set()
         for r2p2d in self._replica2part2dev_id:
             if part < len(r2p2d):
                 dev_id = r2p2d[part]
                 if dev_id not in seen_ids:
-                    part_nodes.append(self.devs[dev_id])
+                    part_nodes.append(devs[dev_id])
                     seen_ids.add(dev_id)
         return [dict(node, index=i) for i, node in enumerate(part_nodes)]
 
@@ -558,6 +741,75 @@ class Ring(object):
         part = self.get_part(account, container, obj)
         return part, self._get_part_nodes(part)
 
+    def get_parts_many(self, names):
+        """
+        Get the partitions for many accounts/containers/objects at once.
+
+        This is equivalent to calling :meth:`get_part` for each name, but
+        only checks for a ring reload once and hoists the per-call overhead
+        of :func:`~swift.common.utils.hash_path` out of the loop, which adds
+        up for tools resolving a great many names.
+
+        :param names: an iterable of ``(account, container, obj)`` tuples;
+                      ``container`` and ``obj`` may be None
+        :returns: a list of partition numbers, in the same order as ``names``
+        """
+        if time() > self._rtime:
+            self._reload()
+        prefix = utils.HASH_PATH_PREFIX + b'/'
+        suffix = utils.HASH_PATH_SUFFIX
+        part_shift = self._part_shift
+        unpack_from = _PART_STRUCT.unpack_from
+        # names tend to share accounts and containers; only encode those once
+        parents = {}
+        parts = []
+        for account, container, obj in names:
+            parent = parents.get((account, container))
+            if parent is None:
+                parent = prefix + (account if isinstance(account, bytes)
+                                   else account.encode('utf8'))
+                if container:
+                    parent += b'/' + (container if isinstance(container, bytes)
+                                      else container.encode('utf8'))
+                parents[account, container] = parent
+            if obj:
+                if not container:
+                    raise ValueError(
+                        'container is required if object is provided')
+                path = parent + b'/' + (obj if isinstance(obj, bytes)
+                                        else obj.encode('utf8')) + suffix
+            else:
+                path = parent + suffix
+            key = md5(path, usedforsecurity=False).digest()
+            parts.append(unpack_from(key)[0] >> part_shift)
+        return parts
+
+    def get_nodes_many(self, names):
+        """
+        Get the partitions and nodes for many accounts/containers/objects at
+        once.
+
+        This is equivalent to calling :meth:`get_nodes` for each name, except
+        that node lists are only worked out once per distinct partition:
+        results for the same partition share the same list of node dicts,
+        which callers must copy before modifying.
+
+        :param names: an iterable of ``(account, container, obj)`` tuples;
+                      ``container`` and ``obj`` may be None
+        :returns: a list of ``(partition, list of node dicts)`` tuples, in the
+                  same order as ``names``
+
+        See :func:`get_nodes` for a description of the node dicts.
+        """
+        part_nodes = {}
+        results = []
+        for part in self.get_parts_many(names):
+            nodes = part_nodes.get(part)
+            if nodes is None:
+                nodes = part_nodes[part] = self._get_part_nodes(part)
+            results.append((part, nodes))
+        return results
+
     def get_more_nodes(self, part):
         """
         Generator to get extra nodes for a partition for hinted handoff.
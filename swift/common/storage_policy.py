@@ -33,6 +33,11 @@ DEFAULT_POLICY_TYPE = REPL_POLICY = 'replication'
 EC_POLICY = 'erasure_coding'
 
 DEFAULT_EC_OBJECT_SEGMENT_SIZE = 1048576
+# EC types whose first ec_ndata fragments hold the segment data as it is, so
+# that PyECLib can decode a segment from them without doing any maths
+SYSTEMATIC_EC_TYPES = (
+    'liberasurecode_rs_vand', 'jerasure_rs_vand', 'jerasure_rs_cauchy',
+    'isa_l_rs_vand', 'isa_l_rs_cauchy', 'flat_xor_hd_3', 'flat_xor_hd_4')
 
 
 class BindPortsCache(object):
@@ -555,6 +560,14 @@ class ECStoragePolicy(BaseStoragePolicy):
     def ec_nparity(self):
         return self._ec_nparity
 
+    @property
+    def ec_systematic(self):
+        """
+        True if the first ec_ndata fragments of each segment hold its data
+        unchanged.
+        """
+        return self._ec_type in SYSTEMATIC_EC_TYPES
+
     @property
     def ec_n_unique_fragments(self):
         return self._ec_ndata + self._ec_nparity
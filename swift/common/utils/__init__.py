@@ -34,6 +34,7 @@ import time
 import uuid
 import functools
 import email.parser
+from array import array
 from random import shuffle
 from contextlib import contextmanager, closing
 import ctypes
@@ -1591,7 +1592,8 @@ class CooperativeCachePopulator(object):
     def cache_encoder(self, data):
         """
         To encode data to be stored in Memcached, default to return the data
-        as is.
+        as is. Encoded data is serialized with JSON unless it is bytes, which
+        are stored as they are.
 
         :returns: encoded data.
         """
@@ -1619,9 +1621,11 @@ class CooperativeCachePopulator(object):
             self._infocache[self._cache_key] = data
         try:
             encoded_data = self.cache_encoder(data)
+            kwargs = {'serialize': False} \
+                if isinstance(encoded_data, bytes) else {}
             self._memcache.set(
                 self._cache_key, encoded_data,
-                time=self._cache_ttl, raise_on_error=True)
+                time=self._cache_ttl, raise_on_error=True, **kwargs)
         except swift.common.exceptions.MemcacheConnectionError:
             self.set_cache_state = 'set_error'
         else:
@@ -3967,6 +3971,71 @@ class NamespaceBoundList(object):
         return namespaces
 
 
+class CompactNamespaceBoundList(NamespaceBoundList):
+    """
+    A :class:`NamespaceBoundList` that takes less memory for long lists of
+    namespaces, such as those of containers with many shards.
+
+    Rather than a list and two strings per namespace, the lower bounds are
+    kept in one list and the names are packed into a single string, with an
+    array of the offsets at which each name starts. For a list of 100k
+    namespaces this takes about half the memory of a list of bounds, and is
+    no slower to search.
+
+    :param lowers: a list of the lower bound of each namespace, ordered.
+    :param names: a string of the names of the namespaces, concatenated.
+    :param name_offsets: an ``array`` of ``len(lowers) + 1`` offsets into
+        ``names``; the i-th name is
+        ``names[name_offsets[i]:name_offsets[i + 1]]``.
+    """
+
+    def __init__(self, lowers, names, name_offsets):
+        self.lowers = lowers
+        self.names = names
+        self.name_offsets = name_offsets
+
+    @classmethod
+    def from_bounds(cls, bounds):
+        """
+        Create a CompactNamespaceBoundList from a list of bounds.
+
+        :param bounds: a list of lists ``[lower bound, name]``. The list
+            should be ordered by ``lower bound``.
+        :return: a CompactNamespaceBoundList.
+        """
+        name_offsets = array('I', [0])
+        name_offsets.extend(itertools.accumulate(
+            len(name) for _lower, name in bounds))
+        return cls([lower for lower, _name in bounds],
+                   ''.join(name for _lower, name in bounds), name_offsets)
+
+    @property
+    def bounds(self):
+        return [[lower, self._get_name(i)]
+                for i, lower in enumerate(self.lowers)]
+
+    def __len__(self):
+        return len(self.lowers)
+
+    def _get_name(self, pos):
+        return self.names[self.name_offsets[pos]:self.name_offsets[pos + 1]]
+
+    def get_namespace(self, item):
+        # the namespace whose lower bound is the last that is less than item,
+        # as found by NamespaceBoundList.get_namespace
+        pos = bisect.bisect_left(self.lowers, item) - 1
+        upper = ('' if pos + 1 == len(self.lowers)
+                 else self.lowers[pos + 1])
+        pos %= len(self.lowers)
+        return Namespace(self._get_name(pos), self.lowers[pos], upper)
+
+    def get_namespaces(self):
+        num_ns = len(self.lowers)
+        return [Namespace(self._get_name(i), lower,
+                          '' if i + 1 == num_ns else self.lowers[i + 1])
+                for i, lower in enumerate(self.lowers)]
+
+
 def _make_shard_timestamp(value):
     """
     Cast value to a NormalTimestamp.
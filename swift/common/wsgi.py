@@ -1354,7 +1354,8 @@ def make_env(env, method=None, path=None, agent='Swift', query_string=None,
                  'QUERY_STRING', 'REMOTE_USER', 'REQUEST_METHOD',
                  'SCRIPT_NAME', 'SERVER_NAME', 'SERVER_PORT',
                  'HTTP_ORIGIN', 'HTTP_ACCESS_CONTROL_REQUEST_METHOD',
-                 'SERVER_PROTOCOL', 'swift.cache', 'swift.source',
+                 'SERVER_PROTOCOL', 'swift.cache', 'swift.local_cache',
+                 'swift.source',
                  'swift.trans_id', 'swift.authorize_override',
                  'swift.authorize', 'HTTP_X_USER_ID', 'HTTP_X_PROJECT_ID',
                  'HTTP_REFERER', 'swift.infocache',
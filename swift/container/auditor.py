@@ -17,7 +17,7 @@
 from swift.container.backend import ContainerBroker
 from swift.common.daemon import run_daemon
 from swift.common.db_auditor import DatabaseAuditor
-from swift.common.utils import parse_options
+from swift.common.utils import config_true_value, parse_options
 
 
 class ContainerAuditor(DatabaseAuditor):
@@ -26,7 +26,15 @@ class ContainerAuditor(DatabaseAuditor):
     server_type = "container"
     broker_class = ContainerBroker
 
+    def __init__(self, conf, logger=None):
+        super(ContainerAuditor, self).__init__(conf, logger=logger)
+        self.listing_index = config_true_value(
+            conf.get('listing_index', 'false'))
+
     def _audit(self, job, broker):
+        if self.listing_index and broker.create_listing_index():
+            self.logger.increment('listing_index_created')
+            self.logger.info('Added listing index to %s', broker.db_file)
         return None
 
 
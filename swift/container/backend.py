@@ -40,6 +40,11 @@ DATADIR = 'containers'
 RECORD_TYPE_OBJECT = 'object'
 RECORD_TYPE_SHARD = 'shard'
 SHARD_RANGE_TABLE = 'shard_range'
+#: Maximum number of objects read from the DB by each query of
+#: :meth:`ContainerBroker.iter_objects`.
+LISTING_BATCH_SIZE = 1000
+#: Name of the optional index that covers single policy object listings.
+LISTING_INDEX = 'ix_object_listing'
 
 NOTFOUND = 'not_found'
 UNSHARDED = 'unsharded'
@@ -380,6 +385,9 @@ class ContainerBroker(DatabaseBroker):
     delete_meta_whitelist = ['x-container-sysmeta-shard-quoted-root',
                              'x-container-sysmeta-shard-root',
                              'x-container-sysmeta-sharding']
+    # name, created_at, size, content_type, etag, deleted,
+    # storage_policy_index, ctype_timestamp, meta_timestamp
+    pending_fields = 'SSISSIISS'
 
     def __init__(self, db_file, timeout=BROKER_TIMEOUT, logger=None,
                  account=None, container=None, pending_timeout=None,
@@ -707,6 +715,34 @@ class ContainerBroker(DatabaseBroker):
                           'ctype_timestamp': content_type_timestamp,
                           'meta_timestamp': meta_timestamp})
 
+    def _dedupe_records(self, records):
+        """See :func:`swift.common.db.DatabaseBroker._dedupe_records`"""
+        # a record is superseded by another for the same object that is at
+        # least as new in each of its data, content-type and metadata
+        # timestamps; of two records with the same timestamps merge_items
+        # keeps the first
+        kept = {}
+        for record in records:
+            ts_data, ts_ctype, ts_meta = decode_timestamps(
+                record['created_at'])
+            if record.get('ctype_timestamp'):
+                ts_ctype = ts_meta = Timestamp(record['ctype_timestamp'])
+            if record.get('meta_timestamp'):
+                ts_meta = Timestamp(record['meta_timestamp'])
+            timestamps = (ts_data, ts_ctype, ts_meta)
+            others = kept.setdefault(
+                (record['name'], record.get('storage_policy_index', 0)), [])
+            if any(all(other >= ts for other, ts in zip(other_ts, timestamps))
+                   for other_ts, _ in others):
+                continue
+            others[:] = [(other_ts, other) for other_ts, other in others
+                         if not all(ts >= other for ts, other
+                                    in zip(timestamps, other_ts))]
+            others.append((timestamps, record))
+        kept_ids = set(id(record) for others in kept.values()
+                       for _, record in others)
+        return [record for record in records if id(record) in kept_ids]
+
     def _empty(self):
         self._commit_puts_stale_ok()
         with self.get() as conn:
@@ -1140,6 +1176,9 @@ class ContainerBroker(DatabaseBroker):
         if transform_func is None:
             transform_func = self._transform_record
         delim_force_gte = False
+        # once a common prefix has been rolled up, more are likely to follow
+        # and the rest of the listing skip-scans past them
+        skip_scan = False
         self._commit_puts_stale_ok()
         if reverse:
             # Reverse the markers if we are reversing the listing.
@@ -1197,6 +1236,12 @@ class ContainerBroker(DatabaseBroker):
                     ''' % ('DESC' if reverse else '')
                     return query + tail_query, args + [limit - len(results)]
 
+                if skip_scan:
+                    return self._list_delimited(
+                        conn, results, query_keys, query_conditions,
+                        query_args, storage_policy_index, limit, prefix,
+                        delimiter, path, reverse, orig_marker, transform_func)
+
                 # storage policy filter
                 if all_policies:
                     query, args = build_query(
@@ -1252,6 +1297,7 @@ class ContainerBroker(DatabaseBroker):
                                     delimiter[:-1],
                                     chr(ord(delimiter[-1:]) + 1),
                                 ])
+                            skip_scan = not all_policies
                             curs.close()
                             break
                     elif end >= 0:
@@ -1268,6 +1314,7 @@ class ContainerBroker(DatabaseBroker):
                         dir_name = name[:end + len(delimiter)]
                         if dir_name != orig_marker:
                             results.append([dir_name, '0', 0, None, ''])
+                        skip_scan = not all_policies
                         curs.close()
                         break
                     results.append(transform_func(row))
@@ -1275,6 +1322,147 @@ class ContainerBroker(DatabaseBroker):
                     break
             return results
 
+    def iter_objects(self, limit, marker, end_marker, prefix, delimiter,
+                     path=None, storage_policy_index=0, reverse=False,
+                     allow_reserved=False, batch_size=None):
+        """
+        Yield the same objects as :meth:`list_objects_iter`, reading at most
+        ``batch_size`` of them from the DB at a time.
+
+        Each batch is read with a separate query that resumes from the last
+        name yielded, so that a long listing neither holds all of its objects
+        in memory nor holds a DB read transaction open while it is consumed.
+
+        :param limit: maximum number of entries to get
+        :param marker: marker query
+        :param end_marker: end marker query
+        :param prefix: prefix query
+        :param delimiter: delimiter for query
+        :param path: if defined, will set the prefix and delimiter based on
+                     the path
+        :param storage_policy_index: storage policy index for query
+        :param reverse: reverse the result order.
+        :param allow_reserved: exclude names with reserved-byte by default
+        :param batch_size: maximum number of entries to read from the DB with
+            each query; defaults to ``LISTING_BATCH_SIZE``
+
+        :returns: an iterator of tuples of (name, created_at, size,
+                  content_type, etag)
+        """
+        batch_size = batch_size or LISTING_BATCH_SIZE
+        while limit > 0:
+            batch_limit = min(limit, batch_size)
+            batch = self.list_objects_iter(
+                batch_limit, marker, end_marker, prefix, delimiter, path,
+                storage_policy_index=storage_policy_index, reverse=reverse,
+                allow_reserved=allow_reserved)
+            for record in batch:
+                yield record
+            if len(batch) < batch_limit:
+                break
+            limit -= len(batch)
+            # a marker naming a common prefix skips the rest of that prefix
+            marker = batch[-1][0]
+
+    def _list_delimited(self, conn, results, query_keys, query_conditions,
+                        query_args, storage_policy_index, limit, prefix,
+                        delimiter, path, reverse, orig_marker,
+                        transform_func):
+        """
+        Helper for :meth:`list_objects_iter` to finish a listing with a
+        delimiter.
+
+        Rather than issuing a new query after each common prefix, a single
+        recursive query seeks from each row to the next row to list: the one
+        after the row itself or, if the row is under a common prefix, the
+        first one past that prefix. Each step is one seek of the
+        ``(deleted, name)`` index, so rows under a common prefix are never
+        visited.
+
+        :param conn: the DB connection
+        :param results: the list of rows and common prefixes found so far, to
+            which the rest of the listing is appended
+        :param query_keys: the columns to select for each row
+        :param query_conditions: the conditions that every row must meet
+        :param query_args: the args for ``query_conditions``
+        :returns: ``results``
+        """
+        def skip_bound(name):
+            # SQLite's string functions stop at a NUL, which reserved names
+            # contain, so this is worked out here rather than in SQL
+            end = name.find(delimiter, len(prefix))
+            if end < 0:
+                return name
+            if reverse:
+                return name[:end + len(delimiter)]
+            return name[:end] + delimiter[:-1] + chr(ord(delimiter[-1]) + 1)
+
+        conn.create_function('skip_bound', 1, skip_bound)
+        step_bound = 'name <' if reverse else 'name >'
+        if reverse:
+            # before the row or its common prefix
+            step_conditions = ['name < skip_bound(entry.c0)']
+        else:
+            # after the row and past its common prefix
+            step_conditions = ['+name > entry.c0',
+                               'name >= skip_bound(entry.c0)']
+
+        def build_query(keys, conditions, args):
+            # unary + stops a step seeking the index by any other bound on
+            # the name in the direction of the step, which is then scanned
+            step_conditions_ = [
+                '+' + cond if cond.startswith(step_bound) else cond
+                for cond in conditions] + step_conditions
+            columns = ', '.join('c%d' % i for i in range(len(keys)))
+            order = 'ORDER BY name %s LIMIT 1' % ('DESC' if reverse else '')
+            query = """
+                WITH RECURSIVE entry(%s) AS (
+                    SELECT * FROM (
+                        SELECT %s FROM object WHERE %s %s)
+                    UNION ALL
+                    SELECT %s FROM entry JOIN object ON object.ROWID = (
+                        SELECT ROWID FROM object WHERE %s %s)
+                )
+                SELECT * FROM entry
+            """ % (columns, ', '.join(keys), ' AND '.join(conditions), order,
+                   ', '.join(keys),
+                   ' AND '.join(step_conditions_), order)
+            return query, args + args
+
+        query, args = build_query(
+            query_keys + ['storage_policy_index'],
+            query_conditions + ['storage_policy_index = ?'],
+            query_args + [storage_policy_index])
+        try:
+            curs = conn.execute(query, tuple(args))
+        except sqlite3.OperationalError as err:
+            if 'no such column: storage_policy_index' not in str(err):
+                raise
+            query, args = build_query(
+                query_keys + ['0 as storage_policy_index'],
+                query_conditions, query_args)
+            curs = conn.execute(query, tuple(args))
+        curs.row_factory = None
+
+        for row in curs:
+            if len(results) >= limit:
+                break
+            name = row[0]
+            end = name.find(delimiter, len(prefix))
+            if path is not None:
+                if name == path:
+                    continue
+                if end >= 0 and len(name) > end + len(delimiter):
+                    continue
+            elif end >= 0:
+                dir_name = name[:end + len(delimiter)]
+                if dir_name != orig_marker:
+                    results.append([dir_name, '0', 0, None, ''])
+                continue
+            results.append(transform_func(row))
+        curs.close()
+        return results
+
     def get_objects(self, limit=None, marker='', end_marker='',
                     include_deleted=None, since_row=None):
         """
@@ -1411,6 +1599,112 @@ class ContainerBroker(DatabaseBroker):
                 self._migrate_add_storage_policy(conn)
                 return _really_merge_items(conn)
 
+    def merge_objects_from(self, src_broker, limit, marker='', end_marker='',
+                           include_deleted=None, since_row=None):
+        """
+        Merge a batch of object rows from another container DB into this one,
+        with the same results as merging the rows returned by
+        ``src_broker.get_objects()`` with :meth:`merge_items`.
+
+        The other DB is attached to this DB's connection so that rows whose
+        name and storage policy are not already in this DB are copied by
+        SQLite without being loaded into python. Only rows that are already in
+        this DB are merged by :meth:`merge_items`.
+
+        :param src_broker: the :class:`ContainerBroker` from which to merge
+            rows.
+        :param limit: the number of rows, in name order, after which to end
+            the batch. More rows than this may be merged if the last name is
+            also found in other storage policies.
+        :param marker: if set, objects with names less than or equal to this
+            value will not be merged.
+        :param end_marker: if set, objects with names greater than or equal to
+            this value will not be merged.
+        :param include_deleted: if True, merge only deleted objects; if False,
+            merge only undeleted objects; otherwise (default), merge both
+            deleted and undeleted objects.
+        :param since_row: merge only items whose ROWID is greater than the
+            given row id; by default all rows are merged.
+        :returns: a tuple of (number of rows merged, marker); the marker is the
+            name of the last row merged if the batch was ended by ``limit``,
+            or None if there are no more rows to merge.
+        """
+        conditions = []
+        args = []
+        if marker:
+            conditions.append('name > ?')
+            args.append(marker)
+        if end_marker:
+            conditions.append('name < ?')
+            args.append(end_marker)
+        if include_deleted is True:
+            conditions.append('deleted = 1')
+        elif include_deleted is False:
+            conditions.append('deleted = 0')
+        else:
+            conditions.append('deleted IN (0, 1)')
+        if since_row:
+            conditions.append('ROWID > ?')
+            args.append(since_row)
+        keys = ('name, created_at, size, content_type, etag, deleted, '
+                'storage_policy_index')
+        src_broker._commit_puts_stale_ok()
+
+        def _really_merge_objects_from(conn):
+            curs = conn.cursor()
+            curs.execute('BEGIN IMMEDIATE')
+            row = curs.execute(
+                'SELECT name FROM src.object WHERE %s '
+                'ORDER BY name LIMIT 1 OFFSET ?' % ' AND '.join(conditions),
+                args + [limit - 1]).fetchone()
+            batch_conditions = list(conditions)
+            batch_args = list(args)
+            if row:
+                batch_conditions.append('name <= ?')
+                batch_args.append(row[0])
+            exists = ('EXISTS (SELECT 1 FROM main.object AS existing '
+                      'WHERE existing.deleted IN (0, 1) '
+                      'AND existing.name = src_object.name '
+                      'AND existing.storage_policy_index = '
+                      'src_object.storage_policy_index)')
+            where = ' AND '.join(
+                'src_object.%s' % cond for cond in batch_conditions)
+            # rows that are already in this DB need merging with the existing
+            # rows; the rest can be copied as they are
+            existing = [
+                self._record_to_dict(rec) for rec in curs.execute(
+                    'SELECT %s FROM src.object AS src_object WHERE %s AND %s'
+                    % (keys, where, exists), batch_args)]
+            curs.execute(
+                'INSERT INTO main.object (%s) '
+                'SELECT %s FROM src.object AS src_object '
+                'WHERE %s AND NOT %s ORDER BY name'
+                % (keys, keys, where, exists), batch_args)
+            copied = curs.rowcount
+            conn.commit()
+            return copied, existing, row[0] if row else None
+
+        with self.get() as conn:
+            conn.execute('ATTACH DATABASE ? AS src', (src_broker.db_file,))
+            try:
+                try:
+                    copied, existing, next_marker = tpool.execute(
+                        _really_merge_objects_from, conn)
+                except sqlite3.OperationalError as err:
+                    if ('no such column: existing.storage_policy_index'
+                            not in str(err)):
+                        raise
+                    conn.rollback()
+                    self._migrate_add_storage_policy(conn)
+                    copied, existing, next_marker = tpool.execute(
+                        _really_merge_objects_from, conn)
+            finally:
+                conn.rollback()
+                conn.execute('DETACH DATABASE src')
+        if existing:
+            self.merge_items(existing)
+        return copied + len(existing), next_marker
+
     def merge_shard_ranges(self, shard_ranges):
         """
         Merge shard ranges into the shard range table.
@@ -1665,6 +1959,57 @@ class ContainerBroker(DatabaseBroker):
             COMMIT;
         ''' % SHARD_RANGE_TABLE)
 
+    def _migrate_add_listing_index(self, conn):
+        """
+        Add an index to the 'object' table that covers the columns read by
+        object listings of a single storage policy, so that they are read from
+        the index alone rather than looking up each listed row in the table.
+        """
+        conn.executescript('''
+            BEGIN;
+            CREATE INDEX IF NOT EXISTS %s ON object (
+                deleted, storage_policy_index, name, created_at, size,
+                content_type, etag);
+            COMMIT;
+        ''' % LISTING_INDEX)
+
+    def has_listing_index(self):
+        """
+        Check whether the DB has the index added by
+        :meth:`create_listing_index`.
+
+        :returns: True if the DB has the index, False otherwise.
+        """
+        with self.get() as conn:
+            row = conn.execute('''
+                SELECT name FROM sqlite_master
+                WHERE type = 'index' AND name = ?
+            ''', (LISTING_INDEX,)).fetchone()
+        return bool(row)
+
+    def create_listing_index(self):
+        """
+        Add an index that covers object listings of a single storage policy
+        to the DB, if it doesn't have one already.
+
+        The index makes listings cheaper but the DB larger and every object
+        update a little more expensive, so it is not created with the DB.
+
+        :returns: True if the index was added, False otherwise.
+        """
+        if self.has_listing_index():
+            return False
+        with self.get() as conn:
+            try:
+                self._migrate_add_listing_index(conn)
+            except sqlite3.OperationalError as err:
+                if 'no such column: storage_policy_index' not in str(err):
+                    raise
+                # the DB has yet to be migrated to support storage policies
+                conn.execute('ROLLBACK')
+                return False
+        return True
+
     def _reclaim_other_stuff(self, conn, age_timestamp, sync_timestamp):
         """
         This is only called once at the end of reclaim after tombstone reclaim
@@ -2435,7 +2780,7 @@ class ContainerBroker(DatabaseBroker):
             return row['name'] if row else None
 
     def find_shard_ranges(self, shard_size, limit=-1, existing_ranges=None,
-                          minimum_shard_size=1):
+                          minimum_shard_size=1, progress_callback=None):
         """
         Scans the container db for shard ranges. Scanning will start at the
         upper bound of the any ``existing_ranges`` that are given, otherwise
@@ -2458,6 +2803,11 @@ class ContainerBroker(DatabaseBroker):
             this is greater than one then the final shard range may be extended
             to more than shard_size in order to avoid a further shard range
             with less minimum_shard_size rows.
+        :param progress_callback: an optional function that is called with the
+            list of shard ranges found so far each time a shard range is
+            found; this allows callers to report progress while finding all
+            shard ranges in a single call, rather than calling repeatedly with
+            a small ``limit``.
         :return:  a tuple; the first value in the tuple is a list of
             dicts each having keys {'index', 'lower', 'upper', 'object_count'}
             in order of ascending 'upper'; the second value in the tuple is a
@@ -2538,6 +2888,8 @@ class ContainerBroker(DatabaseBroker):
                  'lower': str(last_shard_upper),
                  'upper': str(next_shard_upper),
                  'object_count': shard_size})
+            if progress_callback:
+                progress_callback(found_ranges)
 
             if next_shard_upper == own_shard_range.upper:
                 return found_ranges, True
@@ -13,6 +13,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import itertools
 import json
 import os
 import sys
@@ -158,6 +159,10 @@ class ContainerController(BaseStorageServer):
             config_true_value(conf.get('db_preallocation', 'f'))
         swift.common.db.QUERY_LOGGING = \
             config_true_value(conf.get('db_query_logging', 'f'))
+        swift.common.db.GROUP_COMMIT_WINDOW = \
+            float(conf.get('db_group_commit_window', 0))
+        swift.common.db.BINARY_PENDING = \
+            config_true_value(conf.get('db_binary_pending', 'f'))
         self.sync_store = ContainerSyncStore(self.root,
                                              self.logger,
                                              self.mount_check)
@@ -903,12 +908,12 @@ class ContainerController(BaseStorageServer):
         # Use the retired db while container is in process of sharding,
         # otherwise use current db
         src_broker = broker.get_brokers()[0]
-        container_list = src_broker.list_objects_iter(
+        container_list = src_broker.iter_objects(
             limit, marker, end_marker, prefix, delimiter, path,
             storage_policy_index=storage_policy_index,
             reverse=reverse, allow_reserved=req.allow_reserved_names)
-        listing = [self.update_object_record(record)
-                   for record in container_list]
+        listing = (self.update_object_record(record)
+                   for record in container_list)
         return self._create_GET_response(req, out_content_type, info,
                                          resp_headers, broker.metadata,
                                          container, listing)
@@ -920,18 +925,35 @@ class ContainerController(BaseStorageServer):
                           is_sys_or_user_meta('container', key)):
                 resp_headers[str_to_wsgi(key)] = str_to_wsgi(value)
 
+        # the first record is read before responding so that errors reading
+        # the DB and empty listings still get their own status
+        listing = iter(listing)
+        first = next(listing, None)
+        if first is None:
+            listing = []
+        else:
+            listing = itertools.chain([first], listing)
         if out_content_type.endswith('/xml'):
-            body = listing_formats.container_to_xml(listing, container)
+            body = listing_formats.iter_container_xml(listing, container)
         elif out_content_type.endswith('/json'):
-            body = json.dumps(listing).encode('ascii')
+            body = listing_formats.iter_listing_json(listing)
         else:
-            body = listing_formats.listing_to_text(listing)
-
-        ret = Response(request=req, headers=resp_headers, body=body,
-                       content_type=out_content_type, charset='utf-8')
+            body = listing_formats.iter_listing_text(listing)
+
+        if first is not None and config_true_value(
+                req.headers.get('X-Backend-Listing-Stream')):
+            # stream the listing as it is read from the DB; only proxies that
+            # can handle a listing without a Content-Length ask for this
+            ret = Response(request=req, headers=resp_headers,
+                           app_iter=listing_formats.chunk_listing(body),
+                           content_type=out_content_type, charset='utf-8')
+        else:
+            ret = Response(request=req, headers=resp_headers,
+                           body=b''.join(body),
+                           content_type=out_content_type, charset='utf-8')
+            if not ret.body:
+                ret.status_int = HTTP_NO_CONTENT
         ret.last_modified = Timestamp(resp_headers['X-PUT-Timestamp'])
-        if not ret.body:
-            ret.status_int = HTTP_NO_CONTENT
         return ret
 
     @public
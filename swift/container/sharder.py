@@ -909,6 +909,7 @@ class ContainerSharder(ContainerSharderConf, ContainerReplicator):
         self.periodic_warnings_start = time.time()
         self.periodic_warnings = set()
         self.db_logger = BrokerAnnotatedLogger(self.logger)
+        self.bulk_cleave = config_true_value(conf.get('bulk_cleave', False))
 
     def periodic_warning(self, broker, msg, *args, **kwargs):
         now = time.time()
@@ -1611,6 +1612,46 @@ class ContainerSharder(ContainerSharderConf, ContainerReplicator):
                     break
                 marker = objects[-1]['name']
 
+    def merge_objects(self, broker, src_shard_range, dest_broker,
+                      since_row=None):
+        """
+        Merges all object rows in ``src_shard_range`` into ``dest_broker`` in
+        batches of up to ``cleave_row_batch_size`` rows, copying them between
+        the DB files in SQLite. All batches of rows that are not marked
+        deleted are merged before all batches of rows that are marked deleted,
+        as they are yielded by :meth:`yield_objects`.
+
+        :param broker: A :class:`~swift.container.backend.ContainerBroker`.
+        :param src_shard_range: A :class:`~swift.common.utils.ShardRange`
+            describing the source range.
+        :param dest_broker: the
+            :class:`~swift.container.backend.ContainerBroker` into which rows
+            are merged.
+        :param since_row: include only object rows whose ROWID is greater than
+            the given row id; by default all object rows are included.
+        :return: the number of object rows merged.
+        """
+        if (src_shard_range.lower == ShardRange.MAX or
+                src_shard_range.upper == ShardRange.MIN):
+            # see yield_objects
+            return 0
+
+        num_merged = 0
+        for include_deleted in (False, True):
+            marker = src_shard_range.lower_str
+            while marker is not None:
+                start = time.time()
+                num_rows, marker = dest_broker.merge_objects_from(
+                    broker, self.cleave_row_batch_size, marker=marker,
+                    end_marker=src_shard_range.end_marker,
+                    include_deleted=include_deleted, since_row=since_row)
+                self.db_logger.debug(
+                    broker,
+                    'merged %s rows (deleted=%s) in %ss',
+                    num_rows, include_deleted, time.time() - start)
+                num_merged += num_rows
+        return num_merged
+
     def yield_objects_to_shard_range(self, broker, src_shard_range,
                                      dest_shard_ranges):
         """
@@ -2009,12 +2050,18 @@ class ContainerSharder(ContainerSharderConf, ContainerReplicator):
         if sync_point < source_max_row or source_max_row == -1:
             sync_from_row = max(cleaving_context.last_cleave_to_row or -1,
                                 sync_point)
-            objects = None
-            for objects, info in self.yield_objects(
-                    source_broker, shard_range,
-                    since_row=sync_from_row):
-                shard_broker.merge_items(objects)
-            if objects is None:
+            if self.bulk_cleave:
+                num_merged = self.merge_objects(
+                    source_broker, shard_range, shard_broker,
+                    since_row=sync_from_row)
+            else:
+                num_merged = 0
+                for objects, info in self.yield_objects(
+                        source_broker, shard_range,
+                        since_row=sync_from_row):
+                    shard_broker.merge_items(objects)
+                    num_merged += len(objects)
+            if not num_merged:
                 self.db_logger.info(
                     broker, "Cleaving %r - zero objects found",
                     shard_range)
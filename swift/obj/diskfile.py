@@ -38,6 +38,8 @@ import fcntl
 import json
 import os
 import re
+import shutil
+import stat
 import time
 import uuid
 import logging
@@ -47,10 +49,10 @@ from os.path import basename, dirname, exists, join, splitext
 import random
 from tempfile import mkstemp
 from contextlib import contextmanager
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
 from datetime import timedelta
 
-from swift.common.concurrency import Timeout, tpool, trampoline
+from swift.common.concurrency import Timeout, patcher, tpool, trampoline
 from pyeclib.ec_iface import ECDriverError, ECInvalidFragmentMetadata, \
     ECBadFragmentChecksum, ECInvalidParameter
 
@@ -65,7 +67,8 @@ from swift.common.utils import mkdirs, Timestamp, \
     MD5_OF_EMPTY_STRING, link_fd_to_path, \
     O_TMPFILE, makedirs_count, replace_partition_in_path, remove_directory, \
     md5, is_file_older, non_negative_float, config_fallocate_value, \
-    fs_has_free_space, CooperativeIterator, EUCLEAN
+    fs_has_free_space, CooperativeIterator, EUCLEAN, \
+    config_positive_int_value, non_negative_int
 from swift.common.splice import splice, tee
 from swift.common.exceptions import DiskFileQuarantined, DiskFileNotExist, \
     DiskFileCollision, DiskFileNoSpace, DiskFileDeviceUnavailable, \
@@ -83,6 +86,18 @@ DEFAULT_RECLAIM_AGE = timedelta(weeks=1).total_seconds()
 DEFAULT_COMMIT_WINDOW = 60.0
 HASH_FILE = 'hashes.pkl'
 HASH_INVALIDATIONS_FILE = 'hashes.invalid'
+HASH_LOG_FILE = 'hashes.log'
+HASH_LOG_HEADER = 'swift suffix hashes v1\n'
+# hashes.log is compacted once it is more than this many times bigger than a
+# freshly written copy would be
+HASH_LOG_COMPACTION_RATIO = 2
+SUFFIX_HASHES_FORMATS = ('pickle', 'log')
+DEFAULT_SUFFIX_HASH_THREADS_PER_DEVICE = 1
+DEFAULT_METADATA_CACHE_SIZE = 0
+# hash dirs changed more recently than this many seconds ago are not cached,
+# since a further change in the same tick of the filesystem clock would not
+# change the directory's mtime
+METADATA_CACHE_MIN_AGE = 1.0
 METADATA_KEY = b'user.swift.metadata'
 METADATA_CHECKSUM_KEY = b'user.swift.metadata_checksum'
 DROP_CACHE_WINDOW = 1024 * 1024
@@ -97,6 +112,9 @@ MIN_TIME_UPDATE_AUDITOR_STATUS = 60
 # This matches rsync tempfiles, like ".<timestamp>.data.Xy095a"
 RE_RSYNC_TEMPFILE = re.compile(r'^\..*\.([a-zA-Z0-9_]){6}$')
 
+# unpatched, see SuffixHashThreads
+_threading = patcher.original('threading')
+
 
 def get_data_dir(policy_or_index):
     '''
@@ -486,6 +504,340 @@ def invalidate_hash(suffix_dir):
                 inv_fh.write(suffix + b"\n")
 
 
+def _hashes_log_record(suffix, hash_):
+    """
+    Format one hashes.log record, which sets the hash of ``suffix``.
+
+    A None hash marks the suffix as needing to be rehashed, and a hash of
+    False removes the suffix. The per-fragment-index hashes of EC policies are
+    written as ``{<frag index>:<hash>,...}``.
+    """
+    if hash_ is None:
+        return suffix + '\n'
+    if hash_ is False:
+        return suffix + ' -\n'
+    if isinstance(hash_, dict):
+        hash_ = '{%s}' % ','.join(
+            '%s:%s' % ('' if fi is None else fi, fi_hash)
+            for fi, fi_hash in sorted(hash_.items(), key=lambda i: str(i[0])))
+    return '%s %s\n' % (suffix, hash_)
+
+
+def _parse_hashes_log_value(value):
+    if value == '-':
+        return False
+    if value.startswith('{') and value.endswith('}'):
+        hash_ = {}
+        for item in filter(None, value[1:-1].split(',')):
+            fi, fi_hash = item.split(':')
+            hash_[int(fi) if fi else None] = fi_hash
+        return hash_
+    return value
+
+
+def read_hashes_log(partition_dir):
+    """
+    Read the existing hashes.log by replaying its records.
+
+    :returns: a dict, the suffix hashes (if any), the key 'valid' will be False
+              if hashes.log is corrupt, cannot be read or does not exist
+    """
+    hashes_file = join(partition_dir, HASH_LOG_FILE)
+    try:
+        with open(hashes_file, 'r') as hashes_fp:
+            lines = hashes_fp.read().split('\n')
+            updated = os.fstat(hashes_fp.fileno()).st_mtime
+    except (IOError, OSError, UnicodeDecodeError):
+        return {'valid': False}
+
+    # the final record of a torn append has no newline
+    if lines[0] + '\n' != HASH_LOG_HEADER or lines[-1]:
+        return {'valid': False}
+    hashes = {}
+    try:
+        for line in lines[1:-1]:
+            suffix, _sep, value = line.partition(' ')
+            if not valid_suffix(suffix):
+                return {'valid': False}
+            hash_ = _parse_hashes_log_value(value) if value else None
+            if hash_ is False:
+                hashes.pop(suffix, None)
+            else:
+                hashes[suffix] = hash_
+    except ValueError:
+        return {'valid': False}
+    hashes['valid'] = True
+    hashes['updated'] = updated
+    return hashes
+
+
+def write_hashes_log(partition_dir, hashes):
+    """
+    Write hashes to a new, compacted, hashes.log
+
+    The updated key of hashes is set to the modification time of the file.
+    """
+    hashes_file = join(partition_dir, HASH_LOG_FILE)
+    if not hashes.get('valid'):
+        # an invalid hashes.log is the same as a missing one
+        remove_file(hashes_file)
+        return
+    records = [_hashes_log_record(suffix, hash_)
+               for suffix, hash_ in hashes.items()
+               if suffix not in ('valid', 'updated')]
+    fd, tmppath = mkstemp(dir=partition_dir, suffix='.tmp')
+    with os.fdopen(fd, 'w') as fp:
+        fp.write(HASH_LOG_HEADER + ''.join(records))
+        fp.flush()
+        fsync(fd)
+        renamer(tmppath, hashes_file)
+    hashes['updated'] = os.stat(hashes_file).st_mtime
+
+
+def _append_hashes_log(partition_dir, records):
+    hashes_file = join(partition_dir, HASH_LOG_FILE)
+    with open(hashes_file, 'a') as fp:
+        fp.write(''.join(records))
+        fp.flush()
+        fdatasync(fp.fileno())
+    return os.stat(hashes_file)
+
+
+def update_hashes_log(partition_dir, hashes, orig_hashes):
+    """
+    Bring hashes.log up to date with hashes by appending records for just the
+    suffixes that differ from orig_hashes, which must be what hashes.log
+    currently holds. hashes.log is rewritten instead if it has grown too big.
+    The caller must hold the partition's lock.
+
+    The updated key of hashes is set to the modification time of the file.
+    """
+    if not orig_hashes.get('valid'):
+        write_hashes_log(partition_dir, hashes)
+        return
+    records = []
+    for suffix in set(orig_hashes).union(hashes):
+        if suffix in ('valid', 'updated'):
+            continue
+        if suffix not in hashes:
+            records.append(_hashes_log_record(suffix, False))
+        elif suffix not in orig_hashes \
+                or hashes[suffix] != orig_hashes[suffix]:
+            records.append(_hashes_log_record(suffix, hashes[suffix]))
+    hashes_file = join(partition_dir, HASH_LOG_FILE)
+    try:
+        log_size = os.stat(hashes_file).st_size
+    except OSError:
+        log_size = None
+    compacted_size = len(HASH_LOG_HEADER) + sum(
+        len(_hashes_log_record(suffix, hash_))
+        for suffix, hash_ in hashes.items()
+        if suffix not in ('valid', 'updated'))
+    if log_size is None or (log_size + sum(map(len, records)) >
+                            HASH_LOG_COMPACTION_RATIO * compacted_size):
+        write_hashes_log(partition_dir, hashes)
+    elif records:
+        hashes['updated'] = _append_hashes_log(
+            partition_dir, records).st_mtime
+
+
+def consolidate_hashes_log(partition_dir):
+    """
+    Take what's in hashes.log and hashes.invalid and combine them by appending
+    the invalidations to hashes.log, then clear out hashes.invalid.
+
+    A hashes.pkl in the partition is migrated to a new hashes.log and removed.
+
+    :param partition_dir: absolute path to partition dir containing hashes.log
+                          and hashes.invalid
+
+    :returns: a dict, the suffix hashes (if any), the key 'valid' will be False
+              if hashes.log is corrupt, cannot be read or does not exist
+    """
+    invalidations_file = join(partition_dir, HASH_INVALIDATIONS_FILE)
+    pickle_file = join(partition_dir, HASH_FILE)
+
+    with lock_path(partition_dir):
+        migrate = exists(pickle_file)
+        if migrate:
+            hashes = read_hashes(partition_dir)
+        else:
+            hashes = read_hashes_log(partition_dir)
+
+        found_invalidation_entry = False
+        invalidated = []
+        try:
+            with open(invalidations_file, 'r') as inv_fh:
+                for line in inv_fh:
+                    found_invalidation_entry = True
+                    suffix = line.strip()
+                    if valid_suffix(suffix):
+                        invalidated.append(suffix)
+        except (IOError, OSError) as e:
+            if e.errno != errno.ENOENT:
+                raise
+
+        if migrate:
+            hashes.update((suffix, None) for suffix in invalidated)
+            write_hashes_log(partition_dir, hashes)
+            remove_file(pickle_file)
+        elif invalidated and hashes['valid']:
+            hashes['updated'] = _append_hashes_log(
+                partition_dir,
+                [_hashes_log_record(suffix, None)
+                 for suffix in invalidated]).st_mtime
+            hashes.update((suffix, None) for suffix in invalidated)
+        if found_invalidation_entry:
+            # Now that all the invalidations are reflected in hashes.log, it's
+            # safe to clear out the invalidations file.
+            with open(invalidations_file, 'wb') as inv_fh:
+                pass
+
+        return hashes
+
+
+class SuffixHashThreads(object):
+    """
+    Hashes suffix dirs in OS threads, allowing at most ``threads_per_device``
+    suffixes of any one device to be hashed at once.
+
+    Suffixes are hashed while a partition's hashes are being computed in
+    eventlet's thread pool, where green threads could not make blocking
+    calls in parallel, so this uses the unpatched threading module.
+
+    :param threads_per_device: the maximum number of suffixes each device may
+                               have hashed at once
+    """
+
+    def __init__(self, threads_per_device):
+        self.threads_per_device = threads_per_device
+        self._lock = _threading.Lock()
+        self._semaphores = {}
+
+    def _semaphore(self, device_path):
+        with self._lock:
+            if device_path not in self._semaphores:
+                self._semaphores[device_path] = _threading.Semaphore(
+                    self.threads_per_device)
+            return self._semaphores[device_path]
+
+    def map(self, device_path, func, items):
+        """
+        Call ``func(item)`` for every item.
+
+        :param device_path: path to the device the items are on
+        :returns: a dict mapping each item to a tuple of (result,
+                  exception); one of result and exception is None
+        """
+        items = list(items)
+        semaphore = self._semaphore(device_path)
+        results = {}
+        todo = list(reversed(items))
+
+        def worker():
+            while True:
+                with self._lock:
+                    if not todo:
+                        return
+                    item = todo.pop()
+                with semaphore:
+                    try:
+                        result = (func(item), None)
+                    except BaseException as err:
+                        result = (None, err)
+                results[item] = result
+
+        threads = [_threading.Thread(target=worker)
+                   for _ in range(min(self.threads_per_device, len(items)))]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+
+class MetadataCache(object):
+    """
+    A bounded, least recently used cache of the files in object hash dirs
+    and the metadata read from them, for objects that are opened often.
+
+    An entry is only used while the hash dir has the same inode and mtime as
+    when it was listed; every change to the files of an object, including
+    its quarantine, renames a file into or out of the hash dir. Hash dirs
+    that changed less than ``METADATA_CACHE_MIN_AGE`` seconds before being
+    listed are not cached.
+
+    :param max_entries: the maximum number of hash dirs to keep
+    :param logger: a logger for hit, miss and eviction metrics
+    """
+
+    def __init__(self, max_entries, logger):
+        self.max_entries = max_entries
+        self.logger = logger
+        # hash dir path -> ((st_ino, st_mtime_ns), files,
+        #                   {filename: metadata}), least recently used first
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def list_files(self, hsh_path, list_files):
+        """
+        List the files in a hash dir, from the cache if it is unchanged.
+
+        :param hsh_path: object hash path
+        :param list_files: function used to list the hash dir on a miss
+        :returns: a new list of filenames
+        :raises OSError: as ``list_files`` would
+        """
+        try:
+            st = os.stat(hsh_path)
+        except OSError:
+            self._entries.pop(hsh_path, None)
+            raise
+        key = (st.st_ino, st.st_mtime_ns)
+        entry = self._entries.get(hsh_path)
+        if entry is not None and entry[0] == key:
+            self._entries.move_to_end(hsh_path)
+            self.logger.increment('metadata_cache.hits')
+            return list(entry[1])
+        self.logger.increment('metadata_cache.misses')
+        self._entries.pop(hsh_path, None)
+        files = list_files(hsh_path)
+        if stat.S_ISDIR(st.st_mode) and \
+                st.st_mtime < time.time() - METADATA_CACHE_MIN_AGE:
+            self._entries[hsh_path] = (key, tuple(files), {})
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.logger.increment('metadata_cache.evictions')
+        return files
+
+    def get_metadata(self, hsh_path, filename):
+        """
+        :param hsh_path: object hash path, listed by ``list_files``
+        :param filename: name of a file in the hash dir
+        :returns: a copy of the file's cached metadata, or None
+        """
+        entry = self._entries.get(hsh_path)
+        if entry is None or filename not in entry[2]:
+            return None
+        return dict(entry[2][filename])
+
+    def set_metadata(self, hsh_path, filename, metadata):
+        """
+        Cache the metadata of a file listed by the last ``list_files`` call
+        for its hash dir; nothing is cached if the hash dir was not.
+
+        :param hsh_path: object hash path
+        :param filename: name of a file in the hash dir
+        :param metadata: the file's metadata
+        """
+        entry = self._entries.get(hsh_path)
+        if entry is not None and filename in entry[1]:
+            entry[2][filename] = dict(metadata)
+
+
 def relink_paths(target_path, new_target_path, ignore_missing=True):
     """
     Hard-links a file located in ``target_path`` using the second path
@@ -566,7 +918,7 @@ class AuditLocation(object):
 
 def object_audit_location_generator(devices, datadir, mount_check=True,
                                     logger=None, device_dirs=None,
-                                    auditor_type="ALL"):
+                                    auditor_type="ALL", list_hashes=None):
     """
     Given a devices path (e.g. "/srv/node"), yield an AuditLocation for all
     objects stored under that directory for the given datadir (policy),
@@ -583,6 +935,8 @@ def object_audit_location_generator(devices, datadir, mount_check=True,
     :param logger: a logger object
     :param device_dirs: a list of directories under devices to traverse
     :param auditor_type: either ALL or ZBF
+    :param list_hashes: function used to list the object hashes in a suffix
+                        dir, utils.listdir by default
     """
     if not device_dirs:
         device_dirs = listdir(devices)
@@ -622,10 +976,10 @@ def object_audit_location_generator(devices, datadir, mount_check=True,
             for asuffix in suffixes:
                 suff_path = os.path.join(part_path, asuffix)
                 try:
-                    hashes = listdir(suff_path)
+                    hashes = (list_hashes or listdir)(suff_path)
                 except OSError as e:
-                    if e.errno not in (errno.ENOTDIR, errno.ENODATA,
-                                       EUCLEAN):
+                    if e.errno not in (errno.ENOENT, errno.ENOTDIR,
+                                       errno.ENODATA, EUCLEAN):
                         raise
                     continue
                 for hsh in hashes:
@@ -691,13 +1045,30 @@ def clear_auditor_status(devices, datadir, auditor_type="ALL"):
 
 
 class DiskFileRouter(object):
+    """
+    Maps each storage policy to its diskfile manager.
 
-    def __init__(self, *args, **kwargs):
+    Options in ``conf['policy_config']``, a dict mapping policy index to a
+    dict of options, override those in ``conf`` for the manager of that
+    policy only.
+    """
+
+    def __init__(self, conf, *args, **kwargs):
+        policy_config = conf.get('policy_config') or {}
+        for index in policy_config:
+            try:
+                POLICIES[int(index)]
+            except (KeyError, ValueError):
+                raise ValueError(
+                    'No policy found for override config, index: %s' % index)
         self.policy_to_manager = {}
         for policy in POLICIES:
+            policy_conf = conf
+            if str(int(policy)) in policy_config:
+                policy_conf = dict(conf, **policy_config[str(int(policy))])
             # create diskfile managers now to provoke any errors
             self.policy_to_manager[int(policy)] = \
-                policy.get_diskfile_manager(*args, **kwargs)
+                policy.get_diskfile_manager(policy_conf, *args, **kwargs)
 
     def __getitem__(self, policy):
         return self.policy_to_manager[int(policy)]
@@ -728,6 +1099,9 @@ class BaseDiskFileManager(object):
 
     diskfile_cls = None  # must be set by subclasses
     policy = None  # must be set by subclasses
+    # rsync replication and the relinker only handle object files that are in
+    # hash dirs
+    files_in_hash_dirs = True
 
     invalidate_hash = staticmethod(invalidate_hash)
     consolidate_hashes = staticmethod(consolidate_hashes)
@@ -769,6 +1143,22 @@ class BaseDiskFileManager(object):
             'replication_lock_timeout', 15))
         self.fallocate_reserve, self.fallocate_is_percent = \
             config_fallocate_value(conf.get('fallocate_reserve', '1%'))
+        self.suffix_hashes_format = conf.get(
+            'suffix_hashes_format', 'pickle').strip().lower()
+        if self.suffix_hashes_format not in SUFFIX_HASHES_FORMATS:
+            raise ValueError('Invalid suffix_hashes_format %r, must be one '
+                             'of %s' % (conf.get('suffix_hashes_format'),
+                                        ', '.join(SUFFIX_HASHES_FORMATS)))
+        if self.suffix_hashes_format == 'log':
+            self.consolidate_hashes = consolidate_hashes_log
+        self.suffix_hash_threads = SuffixHashThreads(
+            config_positive_int_value(conf.get(
+                'suffix_hash_threads_per_device',
+                DEFAULT_SUFFIX_HASH_THREADS_PER_DEVICE)))
+        metadata_cache_size = non_negative_int(conf.get(
+            'metadata_cache_size', DEFAULT_METADATA_CACHE_SIZE))
+        self.metadata_cache = MetadataCache(
+            metadata_cache_size, logger) if metadata_cache_size else None
 
         self.use_splice = False
         self.pipe_size = None
@@ -1103,6 +1493,83 @@ class BaseDiskFileManager(object):
 
         return results
 
+    # The following methods are the only places where the manager, its
+    # diskfiles and writers touch the files in a hash dir, or the hash dirs in
+    # a suffix dir, by name. Backends that store object files somewhere other
+    # than a hash dir override them.
+
+    def _list_object_files(self, hsh_path):
+        """
+        List the names of the object files of an object.
+
+        :param hsh_path: object hash path
+        :raises OSError: as os.listdir() would
+        """
+        return os.listdir(hsh_path)
+
+    def _remove_object_file(self, path):
+        """
+        Remove an object file, if it exists.
+
+        :param path: full path to the object file
+        """
+        remove_file(path)
+
+    def _is_object_file_older(self, path, age):
+        """
+        Test if an object file was written more than ``age`` seconds ago.
+
+        :param path: full path to the object file
+        :param age: age in seconds
+        """
+        return is_file_older(path, age)
+
+    def _rename_object_file(self, path, new_path):
+        """
+        Durably rename an object file within its hash dir.
+
+        :param path: full path to the object file
+        :param new_path: full path the object file is renamed to
+        :raises OSError: as os.rename() would
+        """
+        os.rename(path, new_path)
+        fsync_dir(dirname(new_path))
+
+    def _read_object_file_metadata(self, path):
+        """
+        Read the metadata of an object file.
+
+        :param path: full path to the object file
+        :raises DiskFileNotExist: if the file metadata could not be read
+        """
+        return read_metadata(path)
+
+    def _list_suffix_dir(self, suffix_path):
+        """
+        List the object hashes in a suffix dir.
+
+        :param suffix_path: full path to the suffix dir
+        :raises OSError: as os.listdir() would
+        """
+        return os.listdir(suffix_path)
+
+    def remove_suffix_dir(self, suffix_path):
+        """
+        Remove a suffix dir if it holds no objects.
+
+        :param suffix_path: full path to the suffix dir
+        :raises OSError: as os.rmdir() would
+        """
+        os.rmdir(suffix_path)
+
+    def remove_hash_dir(self, hsh_path):
+        """
+        Remove every file of an object, ignoring errors.
+
+        :param hsh_path: object hash path
+        """
+        shutil.rmtree(hsh_path, ignore_errors=True)
+
     def cleanup_ondisk_files(self, hsh_path, **kwargs):
         """
         Clean up on-disk files that are obsolete and gather the set of valid
@@ -1120,7 +1587,7 @@ class BaseDiskFileManager(object):
             return (time.time() - float(timestamp)) > self.reclaim_age
 
         try:
-            files = os.listdir(hsh_path)
+            files = self._list_object_files(hsh_path)
         except OSError as err:
             if err.errno == errno.ENOENT:
                 results = self.get_ondisk_files(
@@ -1135,7 +1602,8 @@ class BaseDiskFileManager(object):
             files, hsh_path, verify=False, **kwargs)
         if 'ts_info' in results and is_reclaimable(
                 results['ts_info']['timestamp']):
-            remove_file(join(hsh_path, results['ts_info']['filename']))
+            self._remove_object_file(
+                join(hsh_path, results['ts_info']['filename']))
             files.remove(results.pop('ts_info')['filename'])
         for file_info in results.get('possible_reclaim', []):
             # stray files are not deleted until reclaim-age; non-durable data
@@ -1145,10 +1613,11 @@ class BaseDiskFileManager(object):
             if (is_reclaimable(file_info['timestamp']) and
                     (file_info.get('durable', True) or
                      self.commit_window <= 0 or
-                     is_file_older(filepath, self.commit_window))):
+                     self._is_object_file_older(filepath,
+                                                self.commit_window))):
                 results.setdefault('obsolete', []).append(file_info)
         for file_info in results.get('obsolete', []):
-            remove_file(join(hsh_path, file_info['filename']))
+            self._remove_object_file(join(hsh_path, file_info['filename']))
             files.remove(file_info['filename'])
         results['files'] = files
         if not files:  # everything got unlinked
@@ -1193,7 +1662,7 @@ class BaseDiskFileManager(object):
                 return self.md5.hexdigest()
         hashes = defaultdict(shim)
         try:
-            path_contents = sorted(os.listdir(path))
+            path_contents = sorted(self._list_suffix_dir(path))
         except OSError as err:
             if err.errno in (errno.ENOTDIR, errno.ENOENT):
                 raise PathNotDir()
@@ -1271,7 +1740,7 @@ class BaseDiskFileManager(object):
                                     + '_ctype')
 
         try:
-            os.rmdir(path)
+            self.remove_suffix_dir(path)
         except OSError as e:
             if e.errno == errno.ENOENT:
                 raise PathNotDir()
@@ -1292,6 +1761,58 @@ class BaseDiskFileManager(object):
         """
         raise NotImplementedError
 
+    def _hash_suffixes(self, dev_path, partition_path, suffixes, policy):
+        """
+        Hash suffix dirs of a partition, in parallel if
+        ``suffix_hash_threads_per_device`` is more than 1.
+
+        :param dev_path: path to the device the partition is on
+        :param partition_path: path to the partition
+        :param suffixes: a list of suffixes to hash
+        :param policy: the StoragePolicy instance
+        :returns: an iterator of (suffix, (hash, exception)) tuples, in the
+                  order of ``suffixes``; one of hash and exception is None
+        """
+        def hash_suffix(suffix):
+            return self._hash_suffix(join(partition_path, suffix),
+                                     policy=policy)
+
+        # one timing for all the suffixes; the relinker's logger has no
+        # statsd methods
+        timing = getattr(self.logger, 'timing', None)
+        if self.suffix_hash_threads.threads_per_device > 1 and \
+                len(suffixes) > 1:
+            start = time.time()
+            results = self.suffix_hash_threads.map(
+                dev_path, hash_suffix, suffixes)
+            if timing:
+                timing('suffix.hash.timing', (time.time() - start) * 1000)
+            for suffix in suffixes:
+                yield suffix, results[suffix]
+            return
+        elapsed = 0.0
+        for suffix in suffixes:
+            start = time.time()
+            try:
+                result = (hash_suffix(suffix), None)
+            except Exception as err:
+                result = (None, err)
+            elapsed += time.time() - start
+            yield suffix, result
+        if timing and suffixes:
+            timing('suffix.hash.timing', elapsed * 1000)
+
+    def _read_hashes(self, partition_path):
+        if self.suffix_hashes_format == 'log':
+            return read_hashes_log(partition_path)
+        return read_hashes(partition_path)
+
+    def _write_hashes(self, partition_path, hashes, orig_hashes):
+        if self.suffix_hashes_format == 'log':
+            update_hashes_log(partition_path, hashes, orig_hashes)
+        else:
+            write_hashes(partition_path, hashes)
+
     def _get_hashes(self, *args, **kwargs):
         """
         Base entry-point to non-tpool'd __get_hashes
@@ -1325,7 +1846,9 @@ class BaseDiskFileManager(object):
         hashed = 0
         dev_path = self.get_dev_path(device)
         partition_path = get_part_path(dev_path, policy, partition)
-        hashes_file = join(partition_path, HASH_FILE)
+        hashes_file = join(partition_path, HASH_LOG_FILE
+                           if self.suffix_hashes_format == 'log'
+                           else HASH_FILE)
         modified = False
         orig_hashes = {'valid': False}
 
@@ -1354,7 +1877,7 @@ class BaseDiskFileManager(object):
             # conditions - so try not to get overly caught up trying to
             # optimize it out unless you manage to convince yourself there's a
             # bad behavior.
-            orig_hashes = read_hashes(partition_path)
+            orig_hashes = self._read_hashes(partition_path)
         else:
             hashes = copy.deepcopy(orig_hashes)
 
@@ -1365,24 +1888,24 @@ class BaseDiskFileManager(object):
             modified = True
             self.logger.debug('Run listdir on %s', partition_path)
         hashes.update((suffix, None) for suffix in recalculate)
-        for suffix, hash_ in list(hashes.items()):
-            if suffix in ('valid', 'updated'):
-                continue
-            if not hash_:
-                suffix_dir = join(partition_path, suffix)
-                try:
-                    hashes[suffix] = self._hash_suffix(
-                        suffix_dir, policy=policy)
-                    hashed += 1
-                except PathNotDir:
-                    del hashes[suffix]
-                except OSError:
-                    logging.exception('Error hashing suffix')
-                modified = True
+        to_hash = [suffix for suffix, hash_ in hashes.items()
+                   if suffix not in ('valid', 'updated') and not hash_]
+        for suffix, (hash_, err) in self._hash_suffixes(
+                dev_path, partition_path, to_hash, policy):
+            try:
+                if err is not None:
+                    raise err
+                hashes[suffix] = hash_
+                hashed += 1
+            except PathNotDir:
+                del hashes[suffix]
+            except OSError:
+                logging.exception('Error hashing suffix')
+            modified = True
         if modified:
             with lock_path(partition_path):
-                if read_hashes(partition_path) == orig_hashes:
-                    write_hashes(partition_path, hashes)
+                if self._read_hashes(partition_path) == orig_hashes:
+                    self._write_hashes(partition_path, hashes, orig_hashes)
                     return hashed, hashes
             return self.__get_hashes(device, partition, policy,
                                      recalculate=recalculate,
@@ -1607,7 +2130,8 @@ class BaseDiskFileManager(object):
         if not filenames:
             raise DiskFileNotExist()
         try:
-            metadata = read_metadata(os.path.join(object_path, filenames[-1]))
+            metadata = self._read_object_file_metadata(
+                os.path.join(object_path, filenames[-1]))
         except EOFError:
             raise DiskFileNotExist()
         try:
@@ -1666,12 +2190,14 @@ class BaseDiskFileManager(object):
                 recalculate=suffixes)
         return hashes
 
-    def _listdir(self, path):
+    def _listdir(self, path, listdir=None):
         """
         :param path: full path to directory
+        :param listdir: function used to list the directory, os.listdir by
+                        default
         """
         try:
-            return os.listdir(path)
+            return (listdir or os.listdir)(path)
         except OSError as err:
             if err.errno != errno.ENOENT:
                 self.logger.error(
@@ -1755,7 +2281,8 @@ class BaseDiskFileManager(object):
         # the next rehash
         for suffix_path, suffix in suffixes:
             found_files = False
-            for object_hash in self._listdir(suffix_path):
+            for object_hash in self._listdir(suffix_path,
+                                             self._list_suffix_dir):
                 object_path = os.path.join(suffix_path, object_hash)
                 try:
                     diskfile_info = self.cleanup_ondisk_files(
@@ -1934,17 +2461,31 @@ class BaseDiskFileWriter(object):
             raise ValueError('Writer is not open')
         self._chunks_etag.update(chunk)
         while chunk:
-            written = os.write(self._fd, chunk)
+            written = self._write_chunk(chunk)
             self._upload_size += written
             chunk = chunk[written:]
 
         # For large files sync every 512MB (by default) written
         diff = self._upload_size - self._last_sync
         if diff >= self._bytes_per_sync:
-            tpool.execute(fdatasync, self._fd)
+            self._execute(fdatasync, self._fd)
             drop_buffer_cache(self._fd, self._last_sync, diff)
             self._last_sync = self._upload_size
 
+    def _write_chunk(self, chunk):
+        """
+        Write some or all of a chunk to the temporary file.
+
+        :returns: the number of bytes written
+        """
+        return os.write(self._fd, chunk)
+
+    def _execute(self, func, *args, **kwargs):
+        """
+        Run a blocking disk operation, such as an fsync, off the hub.
+        """
+        return tpool.execute(func, *args, **kwargs)
+
     def chunks_finished(self):
         """
         Expose internal stats about written chunks.
@@ -2033,7 +2574,7 @@ class BaseDiskFileWriter(object):
         metadata['name'] = self._name
         target_path = join(self._datadir, filename)
 
-        tpool.execute(
+        self._execute(
             self._finalize_put, metadata, target_path, cleanup,
             logger_thread_locals=getattr(self.logger, 'thread_locals', None))
 
@@ -2178,6 +2719,12 @@ class BaseDiskFileReader(object):
         if self._iter_etag:
             self._iter_etag.update(chunk)
 
+    def _read_chunk(self):
+        """
+        Read the next chunk of the data file.
+        """
+        return self._fp.read(self._disk_chunk_size)
+
     def __iter__(self):
         return CooperativeIterator(
             self._inner_iter(), period=self._cooperative_period)
@@ -2193,7 +2740,7 @@ class BaseDiskFileReader(object):
             self._init_checks()
             while True:
                 try:
-                    chunk = self._fp.read(self._disk_chunk_size)
+                    chunk = self._read_chunk()
                 except IOError as e:
                     if e.errno == errno.EIO:
                         # Note that if there's no quarantine hook set up,
@@ -2621,7 +3168,11 @@ class BaseDiskFile(object):
         """
         # First figure out if the data directory exists
         try:
-            files = os.listdir(self._datadir)
+            if self.manager.metadata_cache is None or modernize:
+                files = self.manager._list_object_files(self._datadir)
+            else:
+                files = self.manager.metadata_cache.list_files(
+                    self._datadir, self.manager._list_object_files)
         except OSError as err:
             if err.errno == errno.ENOTDIR:
                 # If there's a file here instead of a directory, quarantine
@@ -2740,7 +3291,7 @@ class BaseDiskFile(object):
             exc = DiskFileNotExist()
         else:
             try:
-                metadata = self._read_and_validate_metadata(ts_file, ts_file)
+                metadata = self._read_cached_metadata(ts_file, ts_file)
             except (DiskFileQuarantined, DiskFileStateChanged):
                 # If the tombstone's corrupted, quarantine it and pretend it
                 # wasn't there
@@ -2768,6 +3319,31 @@ class BaseDiskFile(object):
                 data_file,
                 "Hash of name in metadata does not match directory name")
 
+    def _open_data_file(self, data_file):
+        """
+        Open a data file for reading.
+
+        :param data_file: full path of the data file
+        :returns: a file-like object positioned at the start of the object data
+        :raises IOError: as open() would
+        """
+        return open(data_file, 'rb')
+
+    def _get_data_file_size(self, data_file, fp):
+        """
+        Return the size of the object data in an open data file.
+
+        :param data_file: data file name, used when quarantines occur
+        :param fp: the data file, as returned by ``_open_data_file``
+        :raises DiskFileQuarantined: if the size could not be found
+        """
+        try:
+            statbuf = os.fstat(fp.fileno())
+        except OSError as err:
+            # Quarantine, we can't successfully stat the file.
+            raise self._quarantine(data_file, "not stat-able: %s" % err)
+        return statbuf.st_size
+
     def _verify_data_file(self, data_file, fp, current_time):
         """
         Verify the metadata's name value matches what we think the object is
@@ -2823,19 +3399,12 @@ class BaseDiskFile(object):
             raise self._quarantine(
                 data_file, "bad metadata content-length value %s" % (
                     self._metadata['Content-Length']))
-        fd = fp.fileno()
-        try:
-            statbuf = os.fstat(fd)
-        except OSError as err:
-            # Quarantine, we can't successfully stat the file.
-            raise self._quarantine(data_file, "not stat-able: %s" % err)
-        else:
-            obj_size = statbuf.st_size
+        obj_size = self._get_data_file_size(data_file, fp)
         if obj_size != metadata_size:
             raise self._quarantine(
                 data_file, "metadata content-length %s does"
                 " not match actual object size %s" % (
-                    metadata_size, statbuf.st_size))
+                    metadata_size, obj_size))
         self._content_length = obj_size
         return obj_size
 
@@ -2871,6 +3440,28 @@ class BaseDiskFile(object):
                 quarantine_filename,
                 "Exception reading metadata: %s" % err)
 
+    def _read_cached_metadata(self, source, filename,
+                              add_missing_checksum=False):
+        """
+        Read metadata as ``_read_and_validate_metadata`` would, using the
+        manager's metadata cache if it has one.
+
+        :param source: file descriptor or filename to load the metadata from
+        :param filename: full path of file to load the metadata from
+        :param add_missing_checksum: if True and no metadata checksum is
+            present, generate one and write it down; the cache is not used
+        :returns: dictionary of metadata
+        """
+        cache = self.manager.metadata_cache
+        if cache is None or add_missing_checksum:
+            return self._read_and_validate_metadata(
+                source, filename, add_missing_checksum=add_missing_checksum)
+        metadata = cache.get_metadata(self._datadir, basename(filename))
+        if metadata is None:
+            metadata = self._read_and_validate_metadata(source, filename)
+            cache.set_metadata(self._datadir, basename(filename), metadata)
+        return metadata
+
     def _merge_content_type_metadata(self, ctype_file):
         """
         When a second .meta file is providing the most recent Content-Type
@@ -2878,7 +3469,7 @@ class BaseDiskFile(object):
 
         :param ctype_file: An on-disk .meta file
         """
-        ctypefile_metadata = self._read_and_validate_metadata(
+        ctypefile_metadata = self._read_cached_metadata(
             ctype_file, ctype_file)
         if ('Content-Type' in ctypefile_metadata
             and (ctypefile_metadata.get('Content-Type-Timestamp', '') >
@@ -2916,17 +3507,17 @@ class BaseDiskFile(object):
                                      metadata
         """
         try:
-            fp = open(data_file, 'rb')
+            fp = self._open_data_file(data_file)
         except IOError as e:
             if e.errno == errno.ENOENT:
                 raise DiskFileStateChanged()
             raise
-        self._datafile_metadata = self._read_and_validate_metadata(
+        self._datafile_metadata = self._read_cached_metadata(
             fp, data_file,
             add_missing_checksum=modernize)
         self._metadata = {}
         if meta_file:
-            self._metafile_metadata = self._read_and_validate_metadata(
+            self._metafile_metadata = self._read_cached_metadata(
                 meta_file, meta_file,
                 add_missing_checksum=modernize)
             if ctype_file and ctype_file != meta_file:
@@ -3299,8 +3890,8 @@ class ECDiskFileWriter(BaseDiskFileWriter):
         error_in_ppi_rename = False
         try:
             try:
-                os.rename(data_file_path, durable_data_file_path)
-                fsync_dir(self._datadir)
+                self.manager._rename_object_file(
+                    data_file_path, durable_data_file_path)
                 if self.next_part_power and \
                         data_file_path != new_data_file_path:
                     try:
@@ -3312,7 +3903,7 @@ class ECDiskFileWriter(BaseDiskFileWriter):
 
             except (OSError, IOError) as err:
                 if err.errno == errno.ENOENT:
-                    files = os.listdir(self._datadir)
+                    files = self.manager._list_object_files(self._datadir)
                     results = self.manager.get_ondisk_files(
                         files, self._datadir,
                         frag_index=self._diskfile._frag_index,
@@ -3376,7 +3967,7 @@ class ECDiskFileWriter(BaseDiskFileWriter):
         durable_data_file_path = os.path.join(
             self._datadir, self.manager.make_on_disk_filename(
                 timestamp, '.data', self._diskfile._frag_index, durable=True))
-        tpool.execute(
+        self._execute(
             self._finalize_durable, data_file_path, durable_data_file_path,
             timestamp)
 
@@ -3535,13 +4126,13 @@ class ECDiskFile(BaseDiskFile):
         purge_file = self.manager.make_on_disk_filename(
             timestamp, ext='.ts')
         purge_path = os.path.join(self._datadir, purge_file)
-        remove_file(purge_path)
+        self.manager._remove_object_file(purge_path)
 
         if meta_timestamp is not None:
             purge_file = self.manager.make_on_disk_filename(
                 meta_timestamp, ext='.meta')
             purge_path = os.path.join(self._datadir, purge_file)
-            remove_file(purge_path)
+            self.manager._remove_object_file(purge_path)
 
         if frag_index is not None:
             # data file may or may not be durable so try removing both filename
@@ -3549,13 +4140,14 @@ class ECDiskFile(BaseDiskFile):
             purge_file = self.manager.make_on_disk_filename(
                 timestamp, ext='.data', frag_index=frag_index)
             purge_path = os.path.join(self._datadir, purge_file)
-            if is_file_older(purge_path, nondurable_purge_delay):
-                remove_file(purge_path)
+            if self.manager._is_object_file_older(
+                    purge_path, nondurable_purge_delay):
+                self.manager._remove_object_file(purge_path)
 
             purge_file = self.manager.make_on_disk_filename(
                 timestamp, ext='.data', frag_index=frag_index, durable=True)
             purge_path = os.path.join(self._datadir, purge_file)
-            remove_file(purge_path)
+            self.manager._remove_object_file(purge_path)
 
             remove_directory(self._datadir)
         self.manager.invalidate_hash(dirname(self._datadir))
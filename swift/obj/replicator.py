@@ -177,7 +177,8 @@ class ObjectReplicator(Daemon):
         self._next_rcache_update = time.time() + self.stats_interval
         self.conn_timeout = float(conf.get('conn_timeout', 0.5))
         self.node_timeout = float(conf.get('node_timeout', 10))
-        self.sync_method = getattr(self, conf.get('sync_method') or 'rsync')
+        sync_method = conf.get('sync_method') or 'rsync'
+        self.sync_method = getattr(self, sync_method)
         self.network_chunk_size = int(conf.get('network_chunk_size', 65536))
         self.default_headers = {
             'Content-Length': '0',
@@ -203,6 +204,13 @@ class ObjectReplicator(Daemon):
             self.handoff_delete = 0
         self.is_multiprocess_worker = None
         self._df_router = DiskFileRouter(conf, self.logger)
+        if sync_method != 'ssync':
+            for policy in self.policies:
+                if not self._df_router[policy].files_in_hash_dirs:
+                    raise ValueError(
+                        'Policy %s stores object files outside of hash dirs '
+                        'and can only be replicated with sync_method = ssync'
+                        % policy.name)
         self._child_process_reaper_queue = queue.LightQueue()
         self.rings_mtime = None
 
@@ -629,13 +637,14 @@ class ObjectReplicator(Daemon):
     def delete_handoff_objs(self, job, delete_objs):
         success_paths = []
         error_paths = []
+        df_mgr = self._df_router[job['policy']]
         for object_hash in delete_objs:
             object_path = storage_directory(job['obj_path'], job['partition'],
                                             object_hash)
-            tpool.execute(shutil.rmtree, object_path, ignore_errors=True)
+            tpool.execute(df_mgr.remove_hash_dir, object_path)
             suffix_dir = dirname(object_path)
             try:
-                os.rmdir(suffix_dir)
+                df_mgr.remove_suffix_dir(suffix_dir)
                 success_paths.append(object_path)
             except OSError as e:
                 if e.errno not in (errno.ENOENT, errno.ENOTEMPTY):
@@ -33,7 +33,7 @@ from swift.common.utils import public, get_logger, \
     get_log_line, Timestamp, parse_mime_headers, \
     iter_multipart_mime_documents, extract_swift_bytes, safe_json_loads, \
     config_auto_int_value, split_path, get_redirect_data, md5, parse_options, \
-    CooperativeIterator
+    CooperativeIterator, parse_prefixed_conf
 from swift.common.bufferedhttp import http_connect
 from swift.common.constraints import check_object_creation, \
     valid_timestamp, check_utf8, AUTO_CREATE_ACCOUNT_PREFIX
@@ -1517,6 +1517,11 @@ def app_factory(global_conf, **local_conf):
     """paste.deploy app factory for creating WSGI object server apps"""
     conf = global_conf.copy()
     conf.update(local_conf)
+    if conf.get('__file__') and conf.get('__name__'):
+        # per-policy sections are named after the app section; an unnamed
+        # (main) app section has none
+        conf['policy_config'] = parse_prefixed_conf(
+            conf['__file__'], conf['__name__'] + ':policy:')
     return ObjectController(conf)
 
 
@@ -0,0 +1,723 @@
+# Copyright (c) 2026 OpenStack Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Disk File Interface for the Swift Object Server that packs small object files
+into append-only volumes.
+
+The fs backends store every object file in a hash dir of its own. When a
+device holds a great many small objects, those hash dirs and files use most of
+its inodes, and walking them makes replication and auditing slow. The classes
+here instead store any object file with at most ``slab_max_object_size`` bytes
+of data as a record in a volume. Each suffix dir has one volume,
+``slab.<uuid>.vol``, and one index, ``slab.idx``, which records where in the
+volume the files of each object hash in the suffix are.
+
+Larger object files, and any object file written while the partition power is
+being increased, are stored exactly as the fs backends store them. The files
+in a hash dir and in the volume are listed together, so that the object
+server, the auditor, ssync replication and the reconstructor see the same
+object files, and compute the same suffix hashes, as they would with the fs
+backends.
+
+Files are removed from a volume by appending to its index, and a volume is
+rewritten without the records of removed files once these use more space than
+the live ones. Changes to the volumes and indexes of a partition are made while
+holding a lock on the partition; reads take no lock.
+
+Volumes can only be replicated with ``sync_method = ssync``; the object
+replicator refuses to start with rsync if a replication policy uses the
+backend. The relinker does not move packed files, so it fails for such a
+policy and the partition power of its ring must not be increased. To make use
+of the backend, set the ``diskfile_module`` of a policy to
+``replication.slab`` or ``erasure_coding.slab``.
+"""
+
+import errno
+import io
+import logging
+import os
+import pickle  # nosec: B403
+import time
+import uuid
+from collections import namedtuple
+from os.path import basename, dirname, join, split
+from tempfile import mkstemp
+
+from swift.common.exceptions import DiskFileNoSpace
+from swift.common.utils import fdatasync, fs_has_free_space, fsync, \
+    fsync_dir, lock_path, md5, mkdirs, non_negative_int, remove_directory, \
+    remove_file
+from swift.common.utils.pickle import unpickle
+from swift.obj.diskfile import DiskFile, DiskFileManager, DiskFileReader, \
+    DiskFileWriter, ECDiskFile, ECDiskFileManager, ECDiskFileReader, \
+    ECDiskFileWriter, PICKLE_PROTOCOL, _decode_metadata, _encode_metadata, \
+    get_data_dir, object_audit_location_generator, quarantine_renamer, \
+    write_metadata
+
+SLAB_INDEX_FILE = 'slab.idx'
+DEFAULT_SLAB_MAX_OBJECT_SIZE = 65536
+# a volume is rewritten once its removed records use more than this many bytes
+# and more than its live records do...
+SLAB_COMPACTION_MIN_BYTES = 1024 * 1024
+# ...or once its index has this many more records than twice its live files
+SLAB_COMPACTION_MIN_RECORDS = 64
+# the number of parsed indexes each manager keeps
+SLAB_INDEX_CACHE_SIZE = 1024
+
+
+def _is_slab_file(name):
+    return name.startswith(('slab.', '.slab.'))
+
+
+def _write_all(fd, data):
+    while data:
+        data = data[os.write(fd, data):]
+
+
+def _read_slab_metadata(metastr):
+    metadata_written_by_py3 = (b'_codecs\nencode' in metastr[:32])
+    return _decode_metadata(unpickle(metastr, encoding='bytes'),
+                            metadata_written_by_py3)
+
+
+SlabEntry = namedtuple('SlabEntry', 'offset meta_size data_size mtime')
+
+
+class SlabIndex(object):
+    """
+    The files stored in the volume of a suffix dir.
+
+    The first line of a ``slab.idx`` is the name of the volume, and each
+    following line is one of::
+
+        + <hash> <filename> <offset> <meta_size> <data_size> <mtime>
+        - <hash> <filename>
+        > <hash> <filename> <new_filename>
+
+    which add a file, whose pickled metadata and then data are stored at
+    ``offset`` in the volume, remove a file or rename a file. A line that has
+    no newline yet is ignored.
+
+    :param volume: the name of the volume
+    """
+
+    def __init__(self, volume):
+        self.volume = volume
+        # object hash -> {filename: SlabEntry}
+        self.entries = {}
+        self.records = 0
+        self.live_bytes = 0
+        self.dead_bytes = 0
+        # the length of the index, up to the end of its last complete line
+        self.length = len(volume) + 1
+
+    @classmethod
+    def parse(cls, data):
+        """
+        :param data: the contents of a ``slab.idx``, as bytes
+        :returns: a SlabIndex, or None if ``data`` has no volume name
+        """
+        length = data.rfind(b'\n') + 1
+        lines = data[:length].decode('ascii', 'replace').split('\n')
+        if not lines[0]:
+            return None
+        index = cls(lines[0])
+        for line in lines[1:-1]:
+            try:
+                index.apply(line)
+            except (IndexError, ValueError):
+                # not a line written by this module; skip it
+                pass
+        index.length = length
+        return index
+
+    def _add(self, files, filename, entry):
+        replaced = files.pop(filename, None)
+        if replaced:
+            self._drop(replaced)
+        files[filename] = entry
+        self.live_bytes += entry.meta_size + entry.data_size
+
+    def _drop(self, entry):
+        self.live_bytes -= entry.meta_size + entry.data_size
+        self.dead_bytes += entry.meta_size + entry.data_size
+
+    def apply(self, line):
+        """
+        Apply one line of a ``slab.idx``.
+
+        :raises ValueError: if the line can not be parsed
+        """
+        fields = line.split(' ')
+        op, hsh, filename = fields[:3]
+        files = self.entries.get(hsh, {})
+        if op == '+':
+            self._add(files, filename, SlabEntry(
+                int(fields[3]), int(fields[4]), int(fields[5]),
+                float(fields[6])))
+        elif op == '-':
+            if filename in files:
+                self._drop(files.pop(filename))
+        elif op == '>':
+            new_filename = fields[3]
+            if filename in files:
+                entry = files.pop(filename)
+                self.live_bytes -= entry.meta_size + entry.data_size
+                self._add(files, new_filename, entry)
+        else:
+            raise ValueError('Unknown slab index operation %r' % op)
+        if files:
+            self.entries[hsh] = files
+        else:
+            self.entries.pop(hsh, None)
+        self.records += 1
+
+    def get(self, hsh, filename):
+        """
+        :returns: the SlabEntry of a file, or None
+        """
+        return self.entries.get(hsh, {}).get(filename)
+
+    def files(self, hsh):
+        """
+        :returns: the names of the files of an object hash
+        """
+        return list(self.entries.get(hsh, ()))
+
+    def needs_compaction(self):
+        live_files = sum(len(files) for files in self.entries.values())
+        return (self.dead_bytes > max(self.live_bytes,
+                                      SLAB_COMPACTION_MIN_BYTES) or
+                self.records > 2 * live_files + SLAB_COMPACTION_MIN_RECORDS)
+
+
+class SlabFile(io.BytesIO):
+    """
+    An object file read from a volume.
+
+    :param metastr: the pickled metadata of the file
+    :param data: the object data of the file
+    """
+
+    def __init__(self, metastr, data):
+        super(SlabFile, self).__init__(data)
+        self.metastr = metastr
+        self.size = len(data)
+
+    def fileno(self):
+        # there is no file descriptor whose pages could be dropped from the
+        # buffer cache
+        return None
+
+
+class SlabReaderMixin(object):
+    def can_zero_copy_send(self):
+        return (super(SlabReaderMixin, self).can_zero_copy_send() and
+                not isinstance(self._fp, SlabFile))
+
+    def _drop_cache(self, fd, offset, length):
+        if fd is not None:
+            super(SlabReaderMixin, self)._drop_cache(fd, offset, length)
+
+
+class SlabWriterMixin(object):
+    # the object data written so far, while it is small enough to be packed
+    _chunks = None
+
+    def open(self):
+        if self._fd is not None or self._chunks is not None:
+            raise ValueError('DiskFileWriter is already open')
+        if self.next_part_power or \
+                (self._size or 0) > self.manager.slab_max_object_size:
+            return super(SlabWriterMixin, self).open()
+        if self._extension != '.ts' and not fs_has_free_space(
+                self._diskfile._device_path,
+                self.manager.fallocate_reserve,
+                self.manager.fallocate_is_percent):
+            # DELETEs always bypass any free-space reserve checks
+            raise DiskFileNoSpace()
+        self._chunks = []
+        return self
+
+    def close(self):
+        self._chunks = None
+        super(SlabWriterMixin, self).close()
+
+    def write(self, chunk):
+        if self._chunks is None:
+            return super(SlabWriterMixin, self).write(chunk)
+        self._chunks.append(chunk)
+        self._chunks_etag.update(chunk)
+        self._upload_size += len(chunk)
+        if self._upload_size > self.manager.slab_max_object_size:
+            # too big to pack after all, so write a file as the fs backends do
+            chunks, self._chunks = self._chunks, None
+            self._upload_size = 0
+            self._chunks_etag = md5(usedforsecurity=False)
+            super(SlabWriterMixin, self).open()
+            for chunk in chunks:
+                super(SlabWriterMixin, self).write(chunk)
+
+    def _finalize_put(self, metadata, target_path, cleanup,
+                      logger_thread_locals):
+        if self._chunks is None:
+            return super(SlabWriterMixin, self)._finalize_put(
+                metadata, target_path, cleanup, logger_thread_locals)
+        if logger_thread_locals is not None:
+            self.logger.thread_locals = logger_thread_locals
+        self.manager.invalidate_hash(dirname(self._datadir))
+        self.manager._put_slab_file(
+            target_path, metadata, b''.join(self._chunks))
+        self._put_succeeded = True
+        if cleanup:
+            try:
+                self.manager.cleanup_ondisk_files(self._datadir)
+            except OSError:
+                logging.exception('Problem cleaning up %s', self._datadir)
+
+
+class SlabDiskFileMixin(object):
+    def _open_data_file(self, data_file):
+        record = self.manager._read_slab_file(data_file)
+        if record is None:
+            return super(SlabDiskFileMixin, self)._open_data_file(data_file)
+        return SlabFile(*record)
+
+    def _get_data_file_size(self, data_file, fp):
+        if isinstance(fp, SlabFile):
+            return fp.size
+        return super(SlabDiskFileMixin, self)._get_data_file_size(
+            data_file, fp)
+
+    def _read_and_validate_metadata(self, source, quarantine_filename=None,
+                                    add_missing_checksum=False):
+        if isinstance(source, SlabFile):
+            metastr = source.metastr
+        else:
+            record = None
+            if isinstance(source, str):
+                record = self.manager._read_slab_file(source)
+            if record is None:
+                return super(SlabDiskFileMixin, self).\
+                    _read_and_validate_metadata(
+                        source, quarantine_filename, add_missing_checksum)
+            metastr = record[0]
+        try:
+            return _read_slab_metadata(metastr)
+        except Exception as err:
+            raise self._quarantine(
+                quarantine_filename,
+                "Exception reading metadata: %s" % err)
+
+
+class SlabManagerMixin(object):
+    files_in_hash_dirs = False
+
+    def __init__(self, conf, logger):
+        super(SlabManagerMixin, self).__init__(conf, logger)
+        self.slab_max_object_size = non_negative_int(conf.get(
+            'slab_max_object_size', DEFAULT_SLAB_MAX_OBJECT_SIZE))
+        # suffix path -> (stat of slab.idx, SlabIndex)
+        self._slab_indexes = {}
+        # packed files do not change the mtime of their hash dir, which the
+        # metadata cache relies on; the slab indexes are cached instead
+        self.metadata_cache = None
+
+    def _slab_lock(self, suffix_path):
+        return lock_path(dirname(suffix_path), name='slab')
+
+    def _read_slab_index(self, suffix_path, cached=True):
+        """
+        Read the index of a suffix dir.
+
+        :param suffix_path: full path to the suffix dir
+        :param cached: if False, always parse the index, and return a
+                       SlabIndex that may be changed by the caller
+        :returns: a SlabIndex, or None if the suffix dir has no index
+        """
+        try:
+            with open(join(suffix_path, SLAB_INDEX_FILE), 'rb') as fp:
+                st = os.fstat(fp.fileno())
+                key = (st.st_ino, st.st_size, st.st_mtime_ns)
+                if cached:
+                    found = self._slab_indexes.get(suffix_path)
+                    if found and found[0] == key:
+                        return found[1]
+                data = fp.read()
+        except (IOError, OSError) as err:
+            if err.errno not in (errno.ENOENT, errno.ENOTDIR):
+                raise
+            self._slab_indexes.pop(suffix_path, None)
+            return None
+        index = SlabIndex.parse(data)
+        if cached and index:
+            if len(self._slab_indexes) >= SLAB_INDEX_CACHE_SIZE:
+                self._slab_indexes.clear()
+            self._slab_indexes[suffix_path] = (key, index)
+        return index
+
+    def _get_slab_entry(self, path):
+        """
+        :param path: full path to an object file
+        :returns: the SlabEntry of the file, or None if it is not in a volume
+        """
+        hsh_path, filename = split(path)
+        suffix_path, hsh = split(hsh_path)
+        index = self._read_slab_index(suffix_path)
+        return index.get(hsh, filename) if index else None
+
+    def _read_slab_file(self, path):
+        """
+        Read an object file from a volume.
+
+        :param path: full path to the object file
+        :returns: a tuple of the pickled metadata and the data of the file, or
+                  None if the file is not in a volume
+        """
+        hsh_path, filename = split(path)
+        suffix_path, hsh = split(hsh_path)
+        # the volume may be rewritten between reading the index and opening
+        # the volume; the index will then name the new volume
+        for _attempt in range(3):
+            index = self._read_slab_index(suffix_path)
+            entry = index.get(hsh, filename) if index else None
+            if entry is None:
+                return None
+            try:
+                fd = os.open(join(suffix_path, index.volume), os.O_RDONLY)
+            except OSError as err:
+                if err.errno != errno.ENOENT:
+                    raise
+                continue
+            try:
+                record = os.pread(fd, entry.meta_size + entry.data_size,
+                                  entry.offset)
+            finally:
+                os.close(fd)
+            return record[:entry.meta_size], record[entry.meta_size:]
+        return None
+
+    def _replace_slab_index(self, suffix_path, volume, lines):
+        """
+        Atomically write a new index for a suffix dir.
+        """
+        data = ''.join('%s\n' % line for line in [volume] + lines)
+        fd, tmppath = mkstemp(dir=suffix_path, prefix='.slab.')
+        try:
+            with os.fdopen(fd, 'wb') as fp:
+                fp.write(data.encode('ascii'))
+                fp.flush()
+                fsync(fp.fileno())
+            os.rename(tmppath, join(suffix_path, SLAB_INDEX_FILE))
+        except BaseException:
+            remove_file(tmppath)
+            raise
+        fsync_dir(suffix_path)
+        index = SlabIndex(volume)
+        for line in lines:
+            index.apply(line)
+        index.length = len(data)
+        return index
+
+    def _append_slab_index(self, suffix_path, index, lines):
+        """
+        Append lines to the index of a suffix dir, and apply them to index.
+        The caller must hold the slab lock.
+        """
+        data = ''.join('%s\n' % line for line in lines).encode('ascii')
+        fd = os.open(join(suffix_path, SLAB_INDEX_FILE), os.O_WRONLY)
+        try:
+            if os.fstat(fd).st_size != index.length:
+                # drop the partial line of an append that failed
+                os.ftruncate(fd, index.length)
+            os.lseek(fd, index.length, os.SEEK_SET)
+            _write_all(fd, data)
+            fdatasync(fd)
+        finally:
+            os.close(fd)
+        for line in lines:
+            index.apply(line)
+        index.length += len(data)
+
+    def _remove_slab(self, suffix_path):
+        """
+        Remove the index, volumes and temporary files of a suffix dir. The
+        caller must hold the slab lock.
+        """
+        self._slab_indexes.pop(suffix_path, None)
+        remove_file(join(suffix_path, SLAB_INDEX_FILE))
+        for name in os.listdir(suffix_path):
+            if _is_slab_file(name):
+                remove_file(join(suffix_path, name))
+
+    def _compact_slab(self, suffix_path, index):
+        """
+        Rewrite the volume of a suffix dir without its removed records. The
+        caller must hold the slab lock.
+        """
+        volume = 'slab.%s.vol' % uuid.uuid4().hex
+        lines = []
+        offset = 0
+        with open(join(suffix_path, index.volume), 'rb') as src:
+            fd = os.open(join(suffix_path, volume),
+                         os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+            try:
+                for hsh, files in sorted(index.entries.items()):
+                    for filename, entry in sorted(files.items()):
+                        record = os.pread(
+                            src.fileno(), entry.meta_size + entry.data_size,
+                            entry.offset)
+                        _write_all(fd, record)
+                        # a short read is copied as it is, to be quarantined
+                        # when the file is next opened
+                        meta_size = min(entry.meta_size, len(record))
+                        lines.append('+ %s %s %d %d %d %.6f' % (
+                            hsh, filename, offset, meta_size,
+                            len(record) - meta_size, entry.mtime))
+                        offset += len(record)
+                fdatasync(fd)
+            finally:
+                os.close(fd)
+        self._replace_slab_index(suffix_path, volume, lines)
+        for name in os.listdir(suffix_path):
+            if name.endswith('.vol') and _is_slab_file(name) and \
+                    name != volume:
+                remove_file(join(suffix_path, name))
+
+    def _update_slab(self, suffix_path, index, lines):
+        """
+        Append lines to the index of a suffix dir, then remove or rewrite the
+        volume if it needs it. The caller must hold the slab lock.
+        """
+        self._append_slab_index(suffix_path, index, lines)
+        if not index.entries:
+            self._remove_slab(suffix_path)
+        elif index.needs_compaction():
+            try:
+                self._compact_slab(suffix_path, index)
+            except (IOError, OSError):
+                self.logger.exception('Problem compacting slab in %s',
+                                      suffix_path)
+
+    def _put_slab_file(self, path, metadata, data):
+        """
+        Durably store an object file in the volume of its suffix dir.
+
+        :param path: full path to the object file
+        :param metadata: the metadata of the file
+        :param data: the object data of the file
+        :raises DiskFileNoSpace: if the device is full
+        """
+        hsh_path, filename = split(path)
+        suffix_path, hsh = split(hsh_path)
+        metastr = pickle.dumps(_encode_metadata(metadata), PICKLE_PROTOCOL)
+        try:
+            with self._slab_lock(suffix_path):
+                mkdirs(suffix_path)
+                index = self._read_slab_index(suffix_path, cached=False)
+                if index is None:
+                    index = self._replace_slab_index(
+                        suffix_path, 'slab.%s.vol' % uuid.uuid4().hex, [])
+                fd = os.open(join(suffix_path, index.volume),
+                             os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                try:
+                    offset = os.fstat(fd).st_size
+                    _write_all(fd, metastr + data)
+                    fdatasync(fd)
+                finally:
+                    os.close(fd)
+                self._update_slab(suffix_path, index, [
+                    '+ %s %s %d %d %d %.6f' % (
+                        hsh, filename, offset, len(metastr), len(data),
+                        time.time())])
+        except OSError as err:
+            if err.errno in (errno.ENOSPC, errno.EDQUOT):
+                raise DiskFileNoSpace()
+            raise
+
+    def _remove_slab_files(self, hsh_path, filenames=None):
+        """
+        Remove the files of an object hash from the volume of its suffix dir.
+
+        :param hsh_path: object hash path
+        :param filenames: the names of the files to remove, or None to remove
+                          every file of the object hash
+        :returns: the names of the files that were removed
+        """
+        suffix_path, hsh = split(hsh_path)
+        with self._slab_lock(suffix_path):
+            index = self._read_slab_index(suffix_path, cached=False)
+            removed = [filename for filename in
+                       (index.files(hsh) if index else [])
+                       if filenames is None or filename in filenames]
+            if removed:
+                self._update_slab(suffix_path, index, [
+                    '- %s %s' % (hsh, filename) for filename in removed])
+        return removed
+
+    def _list_object_files(self, hsh_path):
+        try:
+            files = os.listdir(hsh_path)
+        except OSError as err:
+            if err.errno != errno.ENOENT:
+                raise
+            index = self._read_slab_index(dirname(hsh_path))
+            if not index or basename(hsh_path) not in index.entries:
+                raise
+            return index.files(basename(hsh_path))
+        index = self._read_slab_index(dirname(hsh_path))
+        if index:
+            files.extend(filename
+                         for filename in index.files(basename(hsh_path))
+                         if filename not in files)
+        return files
+
+    def _remove_object_file(self, path):
+        if self._get_slab_entry(path) is None or \
+                not self._remove_slab_files(dirname(path), [basename(path)]):
+            super(SlabManagerMixin, self)._remove_object_file(path)
+            # the object's other files may all be in the volume
+            remove_directory(dirname(path))
+
+    def _is_object_file_older(self, path, age):
+        entry = self._get_slab_entry(path)
+        if entry is None:
+            return super(SlabManagerMixin, self)._is_object_file_older(
+                path, age)
+        return age <= 0 or time.time() - entry.mtime > age
+
+    def _rename_object_file(self, path, new_path):
+        if self._get_slab_entry(path) is None:
+            return super(SlabManagerMixin, self)._rename_object_file(
+                path, new_path)
+        hsh_path, filename = split(path)
+        suffix_path, hsh = split(hsh_path)
+        with self._slab_lock(suffix_path):
+            index = self._read_slab_index(suffix_path, cached=False)
+            if not index or not index.get(hsh, filename):
+                raise OSError(errno.ENOENT, os.strerror(errno.ENOENT), path)
+            self._update_slab(suffix_path, index, [
+                '> %s %s %s' % (hsh, filename, basename(new_path))])
+
+    def _read_object_file_metadata(self, path):
+        record = self._read_slab_file(path)
+        if record is None:
+            return super(SlabManagerMixin, self)._read_object_file_metadata(
+                path)
+        return _read_slab_metadata(record[0])
+
+    def _list_suffix_dir(self, suffix_path):
+        hashes = [name for name in os.listdir(suffix_path)
+                  if not _is_slab_file(name)]
+        index = self._read_slab_index(suffix_path)
+        if index:
+            hashes.extend(set(index.entries).difference(hashes))
+        return hashes
+
+    def remove_suffix_dir(self, suffix_path):
+        try:
+            return super(SlabManagerMixin, self).remove_suffix_dir(
+                suffix_path)
+        except OSError as err:
+            if err.errno != errno.ENOTEMPTY:
+                raise
+        with self._slab_lock(suffix_path):
+            index = self._read_slab_index(suffix_path, cached=False)
+            if index and index.entries:
+                raise OSError(errno.ENOTEMPTY, os.strerror(errno.ENOTEMPTY),
+                              suffix_path)
+            self._remove_slab(suffix_path)
+            super(SlabManagerMixin, self).remove_suffix_dir(suffix_path)
+
+    def remove_hash_dir(self, hsh_path):
+        super(SlabManagerMixin, self).remove_hash_dir(hsh_path)
+        index = self._read_slab_index(dirname(hsh_path))
+        if index and basename(hsh_path) in index.entries:
+            self._remove_slab_files(hsh_path)
+
+    def _unpack_slab_files(self, hsh_path):
+        """
+        Move the files of an object hash out of the volume of its suffix dir
+        and into its hash dir.
+        """
+        suffix_path, hsh = split(hsh_path)
+        with self._slab_lock(suffix_path):
+            index = self._read_slab_index(suffix_path, cached=False)
+            filenames = index.files(hsh) if index else []
+            for filename in filenames:
+                record = self._read_slab_file(join(hsh_path, filename))
+                if record is None:
+                    continue
+                mkdirs(hsh_path)
+                with open(join(hsh_path, filename), 'wb') as fp:
+                    fp.write(record[1])
+                    try:
+                        metadata = _read_slab_metadata(record[0])
+                    except Exception:
+                        # keep the data of a file with unreadable metadata
+                        continue
+                    write_metadata(fp.fileno(), metadata)
+            if filenames:
+                self._update_slab(suffix_path, index, [
+                    '- %s %s' % (hsh, filename) for filename in filenames])
+
+    def quarantine_renamer(self, device_path, corrupted_file_path):
+        hsh_path = dirname(corrupted_file_path)
+        index = self._read_slab_index(dirname(hsh_path))
+        if index and basename(hsh_path) in index.entries:
+            self._unpack_slab_files(hsh_path)
+        return quarantine_renamer(device_path, corrupted_file_path)
+
+    def object_audit_location_generator(self, policy, device_dirs=None,
+                                        auditor_type="ALL"):
+        datadir = get_data_dir(policy)
+        return object_audit_location_generator(
+            self.devices, datadir, self.mount_check, self.logger,
+            device_dirs, auditor_type, list_hashes=self._list_suffix_dir)
+
+
+class SlabDiskFileReader(SlabReaderMixin, DiskFileReader):
+    pass
+
+
+class SlabDiskFileWriter(SlabWriterMixin, DiskFileWriter):
+    pass
+
+
+class SlabDiskFile(SlabDiskFileMixin, DiskFile):
+    reader_cls = SlabDiskFileReader
+    writer_cls = SlabDiskFileWriter
+
+
+class SlabDiskFileManager(SlabManagerMixin, DiskFileManager):
+    diskfile_cls = SlabDiskFile
+
+
+class SlabECDiskFileReader(SlabReaderMixin, ECDiskFileReader):
+    pass
+
+
+class SlabECDiskFileWriter(SlabWriterMixin, ECDiskFileWriter):
+    pass
+
+
+class SlabECDiskFile(SlabDiskFileMixin, ECDiskFile):
+    reader_cls = SlabECDiskFileReader
+    writer_cls = SlabECDiskFileWriter
+
+
+class SlabECDiskFileManager(SlabManagerMixin, ECDiskFileManager):
+    diskfile_cls = SlabECDiskFile
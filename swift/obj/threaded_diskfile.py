@@ -0,0 +1,124 @@
+# Copyright (c) 2026 OpenStack Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Disk File Interface for the Swift Object Server that keeps object data I/O
+off the eventlet hub.
+
+The classes here store objects exactly as :mod:`swift.obj.diskfile` does, but
+every read and write of object data, as well as every fsync and fdatasync, is
+run in eventlet's thread pool. A slow disk then only stalls the requests that
+are waiting on it, rather than every request handled by the worker.
+
+Each device may only have ``disk_io_threads_per_device`` operations in the
+thread pool at once; further operations for that device wait, without blocking
+the hub, for one of them to finish. This stops a single slow device from
+occupying every thread in the pool. To make use of the backend, set the
+``diskfile_module`` of a policy to ``replication.threaded`` or
+``erasure_coding.threaded``.
+"""
+
+import os
+from collections import defaultdict
+
+from swift.common.concurrency import Semaphore, tpool
+from swift.common.utils import config_positive_int_value
+from swift.obj.diskfile import DiskFile, DiskFileManager, DiskFileReader, \
+    DiskFileWriter, ECDiskFile, ECDiskFileManager, ECDiskFileReader, \
+    ECDiskFileWriter
+
+DEFAULT_DISK_IO_THREADS_PER_DEVICE = 4
+
+
+class DeviceIOQueues(object):
+    """
+    Runs blocking disk operations in eventlet's thread pool, allowing at most
+    ``threads_per_device`` of them to be in progress for any one device.
+
+    :param threads_per_device: the maximum number of operations each device may
+                               have in the thread pool at once
+    """
+
+    def __init__(self, threads_per_device):
+        self.threads_per_device = threads_per_device
+        self._semaphores = defaultdict(
+            lambda: Semaphore(self.threads_per_device))
+
+    def execute(self, device_path, func, *args, **kwargs):
+        """
+        Call ``func(*args, **kwargs)`` in the thread pool once the device has
+        a free slot, and return its result or raise its exception.
+
+        :param device_path: path to the device the operation is for
+        """
+        with self._semaphores[device_path]:
+            return tpool.execute(func, *args, **kwargs)
+
+
+class ThreadedReaderMixin(object):
+    def _read_chunk(self):
+        return self.manager.device_io.execute(
+            self._device_path, self._fp.read, self._disk_chunk_size)
+
+
+class ThreadedWriterMixin(object):
+    def _write_chunk(self, chunk):
+        return self._execute(os.write, self._fd, chunk)
+
+    def _execute(self, func, *args, **kwargs):
+        return self.manager.device_io.execute(
+            self._diskfile._device_path, func, *args, **kwargs)
+
+
+class ThreadedManagerMixin(object):
+    def __init__(self, conf, logger):
+        super(ThreadedManagerMixin, self).__init__(conf, logger)
+        self.device_io = DeviceIOQueues(config_positive_int_value(
+            conf.get('disk_io_threads_per_device',
+                     DEFAULT_DISK_IO_THREADS_PER_DEVICE)))
+
+
+class ThreadedDiskFileReader(ThreadedReaderMixin, DiskFileReader):
+    pass
+
+
+class ThreadedDiskFileWriter(ThreadedWriterMixin, DiskFileWriter):
+    pass
+
+
+class ThreadedDiskFile(DiskFile):
+    reader_cls = ThreadedDiskFileReader
+    writer_cls = ThreadedDiskFileWriter
+
+
+class ThreadedDiskFileManager(ThreadedManagerMixin, DiskFileManager):
+    diskfile_cls = ThreadedDiskFile
+
+
+class ThreadedECDiskFileReader(ThreadedReaderMixin, ECDiskFileReader):
+    pass
+
+
+class ThreadedECDiskFileWriter(ThreadedWriterMixin, ECDiskFileWriter):
+    pass
+
+
+class ThreadedECDiskFile(ECDiskFile):
+    reader_cls = ThreadedECDiskFileReader
+    writer_cls = ThreadedECDiskFileWriter
+
+
+class ThreadedECDiskFileManager(ThreadedManagerMixin, ECDiskFileManager):
+    diskfile_cls = ThreadedECDiskFile
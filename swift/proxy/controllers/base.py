@@ -33,6 +33,10 @@ import inspect
 import itertools
 import operator
 import random
+import struct
+import sys
+import zlib
+from array import array
 from copy import deepcopy
 from types import SimpleNamespace
 
@@ -44,7 +48,8 @@ from swift.common.utils import Timestamp, WatchdogTimeout, config_true_value, \
     public, split_path, list_from_csv, GreenthreadSafeIterator, \
     GreenAsyncPile, quorum_size, parse_content_type, drain_and_close, \
     document_iters_to_http_response_body, cache_from_env, \
-    CooperativeIterator, NamespaceBoundList, Namespace, ClosingMapper
+    CooperativeIterator, NamespaceBoundList, Namespace, ClosingMapper, \
+    CompactNamespaceBoundList
 from swift.common.bufferedhttp import http_connect
 from swift.common import constraints
 from swift.common.exceptions import ChunkReadTimeout, ChunkWriteTimeout, \
@@ -70,6 +75,16 @@ DEFAULT_RECHECK_CONTAINER_EXISTENCE = 60  # seconds
 DEFAULT_RECHECK_UPDATING_SHARD_RANGES = 3600  # seconds
 DEFAULT_RECHECK_LISTING_SHARD_RANGES = 600  # seconds
 
+# Namespace bounds in the compact cache encoding are stored as this magic
+# followed by a zlib compressed payload: the number of namespaces, then the
+# offsets of each lower bound and name in the text, then the UTF-8 text of all
+# the lower bounds and names interleaved.
+COMPACT_NAMESPACES_MAGIC = b'\x00nsb1'
+_COMPACT_NAMESPACES_COUNT = struct.Struct('<I')
+# Lists of at least this many namespaces kept decoded in the process-local
+# cache are kept as a CompactNamespaceBoundList
+COMPACT_NAMESPACE_LIST_MIN_SIZE = 10000
+
 
 def update_headers(response, headers):
     """
@@ -85,7 +100,8 @@ def update_headers(response, headers):
             response.headers[name] = value.replace('"', '')
         elif name.lower() not in (
                 'date', 'content-length', 'content-type',
-                'connection', 'x-put-timestamp', 'x-delete-after'):
+                'connection', 'x-put-timestamp',
+                'x-delete-after'):
             response.headers[name] = value
 
 
@@ -671,6 +687,7 @@ def set_info_cache(env, account, container, resp):
     cache_key = get_cache_key(account, container)
     infocache = env.setdefault('swift.infocache', {})
     memcache = cache_from_env(env, True)
+    local_cache = env.get('swift.local_cache')
     if resp is None:
         clear_info_cache(env, account, container)
         return
@@ -697,6 +714,8 @@ def set_info_cache(env, account, container, resp):
         info = headers_to_account_info(resp.headers, resp.status_int)
     if memcache:
         memcache.set(cache_key, info, time=cache_time)
+        if local_cache is not None:
+            local_cache.set(cache_key, info, time=cache_time)
     infocache[cache_key] = info
     return info
 
@@ -731,7 +750,7 @@ def set_object_info_cache(app, env, account, container, obj, resp):
 
 def clear_info_cache(env, account, container=None, shard=None):
     """
-    Clear the cached info in both memcache and env
+    Clear the cached info in memcache, the process-local cache and env
 
     :param  env: the WSGI request environment
     :param  account: the account name
@@ -744,10 +763,57 @@ def clear_info_cache(env, account, container=None, shard=None):
     infocache = env.setdefault('swift.infocache', {})
     memcache = cache_from_env(env, True)
     infocache.pop(cache_key, None)
+    env.get('swift.memcache_prefetched', {}).pop(cache_key, None)
+    local_cache = env.get('swift.local_cache')
+    if local_cache is not None:
+        local_cache.delete(cache_key)
     if memcache:
         memcache.delete(cache_key)
 
 
+def prefetch_from_memcache(env, cache_keys):
+    """
+    Fetch the values of several cache keys from memcache in one round trip.
+
+    Keys that are already in swift.infocache or the process-local cache (if
+    used) are not fetched. If at least two keys remain, they are fetched
+    with a single :meth:`~swift.common.memcached.MemcacheRing.get_multi`
+    call and the values that are found are kept in the request environment,
+    where the account and container info and namespace lookups that follow
+    find them instead of going to memcache. Keys that were not found are
+    still looked up on their own, so that a miss can be told from an error.
+
+    :param env: the WSGI request environment
+    :param cache_keys: a list of cache keys
+    """
+    memcache = cache_from_env(env, True)
+    if not memcache:
+        return
+    infocache = env.setdefault('swift.infocache', {})
+    prefetched = env.setdefault('swift.memcache_prefetched', {})
+    local_cache = env.get('swift.local_cache')
+    cache_keys = [key for key in cache_keys
+                  if key not in infocache and key not in prefetched
+                  and (local_cache is None or key not in local_cache)]
+    if len(cache_keys) < 2:
+        # nothing to gain over looking up a single key on its own
+        return
+    for key, value in zip(cache_keys, memcache.get_multi(cache_keys)):
+        if value:
+            prefetched[key] = value
+
+
+def _get_from_memcache(env, memcache, cache_key, **kwargs):
+    """
+    Get a value from memcache, or the value prefetched for it by
+    :func:`prefetch_from_memcache` if there is one.
+    """
+    value = env.get('swift.memcache_prefetched', {}).pop(cache_key, None)
+    if value is None:
+        value = memcache.get(cache_key, **kwargs)
+    return value
+
+
 def _get_info_from_infocache(env, account, container=None):
     """
     Get cached account or container information from request-environment
@@ -775,14 +841,19 @@ def record_cache_op_metrics(
     :param  op_type: the name of the operation type, includes 'shard_listing',
               'shard_updating', and etc.
     :param  cache_state: the state of this cache operation. When it's
-              'infocache_hit' or memcache 'hit', expect it succeeded and 'resp'
-              will be None; for all other cases like memcache 'miss' or 'skip'
-              which will make to backend, expect a valid 'resp'.
+              'infocache_hit', 'local_hit' or memcache 'hit', expect it
+              succeeded and 'resp' will be None; for all other cases like
+              memcache 'miss' or 'skip' which will make to backend, expect a
+              valid 'resp'.
     :param  resp: the response from backend for all cases except cache hits.
     """
     server_type = server_type.lower()
     if cache_state == 'infocache_hit':
         logger.increment('%s.%s.infocache.hit' % (server_type, op_type))
+    elif cache_state == 'local_hit':
+        # process-local cache hits; misses go on to memcache and are
+        # counted there.
+        logger.increment('%s.%s.local_cache.hit' % (server_type, op_type))
     elif cache_state == 'hit':
         # memcache hits.
         logger.increment('%s.%s.cache.hit' % (server_type, op_type))
@@ -801,7 +872,8 @@ def record_cache_op_metrics(
 
 def _get_info_from_memcache(app, env, account, container=None):
     """
-    Get cached account or container information from memcache
+    Get cached account or container information from memcache, or from the
+    process-local cache in front of it if one is in use.
 
     :param  app: the application object
     :param  env: the environment used by the current request
@@ -834,8 +906,15 @@ def _get_info_from_memcache(app, env, account, container=None):
         info = None
         cache_state = 'skip'
     else:
-        info = memcache.get(cache_key)
-        cache_state = 'hit' if info else 'miss'
+        local_cache = env.get('swift.local_cache')
+        info = local_cache.get(cache_key) if local_cache is not None else None
+        if info:
+            cache_state = 'local_hit'
+        else:
+            info = _get_from_memcache(env, memcache, cache_key)
+            cache_state = 'hit' if info else 'miss'
+            if info and local_cache is not None:
+                local_cache.set(cache_key, info)
     if info:
         env.setdefault('swift.infocache', {})[cache_key] = info
     return info, cache_state
@@ -843,8 +922,9 @@ def _get_info_from_memcache(app, env, account, container=None):
 
 def _get_info_from_caches(app, env, account, container=None):
     """
-    Get the cached info from env or memcache (if used) in that order.
-    Used for both account and container info.
+    Get the cached info from env, the process-local cache (if used) or
+    memcache (if used) in that order. Used for both account and container
+    info.
 
     :param  app: the application object
     :param  env: the environment used by the current request
@@ -860,37 +940,109 @@ def _get_info_from_caches(app, env, account, container=None):
     return info, cache_state
 
 
-def namespace_bounds_to_list(bounds):
+def encode_compact_namespace_bounds(bounds):
+    """
+    Encode namespaces bounds in the compact cache encoding, which is much
+    smaller than JSON.
+
+    :param bounds: a list of namespaces bounds(tuple of lower and name).
+    :returns: the encoded bounds as bytes, or None if some lower bound or name
+        cannot be represented in the compact encoding.
+    """
+    strings = [item for bound in bounds for item in bound]
+    try:
+        text = ''.join(strings).encode('utf-8')
+    except UnicodeEncodeError:
+        # lone surrogates; not valid in any name that passed check_utf8
+        return None
+    offsets = array('I', [0])
+    offsets.extend(itertools.accumulate(map(len, strings)))
+    if sys.byteorder != 'little':
+        offsets.byteswap()
+    return COMPACT_NAMESPACES_MAGIC + zlib.compress(b''.join([
+        _COMPACT_NAMESPACES_COUNT.pack(len(bounds)), offsets.tobytes(),
+        text]), 1)
+
+
+def decode_compact_namespace_bounds(data):
+    """
+    Decode namespaces bounds from the compact cache encoding.
+
+    :param data: bytes returned by :func:`encode_compact_namespace_bounds`.
+    :returns: a list of namespaces bounds(list of lower and name).
+    :raises ValueError: if ``data`` is not in the compact encoding.
+    """
+    if not data.startswith(COMPACT_NAMESPACES_MAGIC):
+        raise ValueError('Not compact namespace bounds')
+    try:
+        payload = zlib.decompress(data[len(COMPACT_NAMESPACES_MAGIC):])
+        count, = _COMPACT_NAMESPACES_COUNT.unpack_from(payload)
+    except (zlib.error, struct.error) as err:
+        raise ValueError('Invalid compact namespace bounds: %s' % err)
+    offsets = array('I')
+    start = _COMPACT_NAMESPACES_COUNT.size
+    end = start + offsets.itemsize * (2 * count + 1)
+    offsets.frombytes(payload[start:end])
+    if sys.byteorder != 'little':
+        offsets.byteswap()
+    text = payload[end:].decode('utf-8')
+    if len(offsets) != 2 * count + 1 or offsets[-1] != len(text):
+        raise ValueError('Invalid compact namespace bounds: bad offsets')
+    items = map(text.__getitem__, map(slice, offsets, offsets[1:]))
+    return [list(bound) for bound in zip(items, items)]
+
+
+def namespace_bounds_to_list(bounds, compact=False):
     """
     This function converts the namespaces bounds to ``NamespaceBoundList``.
 
-    :param  bounds: a list of namespaces bounds(tuple of lower and name).
+    :param  bounds: a list of namespaces bounds(tuple of lower and name), or
+        bytes of namespaces bounds in the compact cache encoding.
+    :param  compact: if True, return a ``CompactNamespaceBoundList`` if there
+        are at least ``COMPACT_NAMESPACE_LIST_MIN_SIZE`` namespaces.
     :returns: the object instance of ``NamespaceBoundList``; None if ``bounds``
-        is None or empty.
+        is None or empty, or is bytes that could not be decoded.
     """
     ns_bound_list = None
+    if isinstance(bounds, bytes):
+        try:
+            bounds = decode_compact_namespace_bounds(bounds)
+        except ValueError:
+            bounds = None
     if bounds:
-        ns_bound_list = NamespaceBoundList(bounds)
+        if compact and len(bounds) >= COMPACT_NAMESPACE_LIST_MIN_SIZE:
+            ns_bound_list = CompactNamespaceBoundList.from_bounds(bounds)
+        else:
+            ns_bound_list = NamespaceBoundList(bounds)
     return ns_bound_list
 
 
-def namespace_list_to_bounds(ns_bound_list):
+def _decode_local_namespaces(bounds):
+    return namespace_bounds_to_list(bounds, compact=True)
+
+
+def namespace_list_to_bounds(ns_bound_list, compact=False):
     """
     This function converts ``NamespaceBoundList`` to the namespaces bounds.
 
     :param  ns_bound_list: an object instance of ``NamespaceBoundList``.
-    :returns: a list of namespaces bounds(tuple of lower and name); None if
-        ``ns_bound_list`` is None or empty.
+    :param  compact: if True, return the bounds in the compact cache encoding
+        when they can be represented in it.
+    :returns: a list of namespaces bounds(tuple of lower and name), or bytes if
+        ``compact`` is True; None if ``ns_bound_list`` is None or empty.
     """
     bounds = None
     if ns_bound_list:
         bounds = ns_bound_list.bounds
+        if compact:
+            bounds = encode_compact_namespace_bounds(bounds) or bounds
     return bounds
 
 
 def get_namespaces_from_cache(req, cache_key, skip_chance):
     """
-    Get cached namespaces from infocache or memcache.
+    Get cached namespaces from infocache, the process-local cache (if used)
+    or memcache.
 
     :param req: a :class:`swift.common.swob.Request` object.
     :param cache_key: the cache key for both infocache and memcache.
@@ -910,27 +1062,43 @@ def get_namespaces_from_cache(req, cache_key, skip_chance):
     memcache = cache_from_env(req.environ, True)
     if skip_chance and random.random() < skip_chance:
         return None, 'skip'
-    try:
-        bounds = memcache.get(cache_key, raise_on_error=True)
-        cache_state = 'hit' if bounds else 'miss'
-    except MemcacheConnectionError:
-        bounds = None
-        cache_state = 'error'
+    local_cache = req.environ.get('swift.local_cache')
+    # the process-local cache keeps the decoded namespaces, so that they are
+    # only decoded once each time they are fetched from memcache
+    ns_bound_list = local_cache.get_decoded(
+        cache_key, _decode_local_namespaces) \
+        if local_cache is not None else None
+    if ns_bound_list:
+        cache_state = 'local_hit'
+    else:
+        try:
+            bounds = _get_from_memcache(
+                req.environ, memcache, cache_key, raise_on_error=True)
+            cache_state = 'hit' if bounds else 'miss'
+        except MemcacheConnectionError:
+            bounds = None
+            cache_state = 'error'
+        if bounds and local_cache is not None:
+            local_cache.set(cache_key, bounds)
+        ns_bound_list = namespace_bounds_to_list(bounds)
 
-    ns_bound_list = namespace_bounds_to_list(bounds)
     infocache[cache_key] = ns_bound_list
     return ns_bound_list, cache_state
 
 
-def set_namespaces_in_cache(req, cache_key, ns_bound_list, time):
+def set_namespaces_in_cache(req, cache_key, ns_bound_list, time,
+                            compact=False):
     """
-    Set a list of namespace bounds in infocache and memcache.
+    Set a list of namespace bounds in infocache, memcache and the
+    process-local cache (if used).
 
     :param req: a :class:`swift.common.swob.Request` object.
     :param cache_key: the cache key for both infocache and memcache.
     :param ns_bound_list: a :class:`swift.common.utils.NamespaceBoundList`;
                           should NOT be None nor empty.
     :param time: how long the namespaces should remain in memcache.
+    :param compact: if True, store the namespace bounds in memcache using the
+                    compact encoding rather than JSON.
     :return: the cache_state.
     """
     if cache_key.startswith('shard-updating'):
@@ -940,13 +1108,19 @@ def set_namespaces_in_cache(req, cache_key, ns_bound_list, time):
     infocache[cache_key] = ns_bound_list
     memcache = cache_from_env(req.environ, True)
     if memcache:
-        bounds = namespace_list_to_bounds(ns_bound_list)
+        bounds = namespace_list_to_bounds(ns_bound_list, compact=compact)
+        # bytes are already encoded so mustn't be serialized again
+        kwargs = {'serialize': False} if isinstance(bounds, bytes) else {}
         try:
-            memcache.set(cache_key, bounds, time=time, raise_on_error=True)
+            memcache.set(cache_key, bounds, time=time, raise_on_error=True,
+                         **kwargs)
         except MemcacheConnectionError:
             cache_state = 'set_error'
         else:
             cache_state = 'set'
+            local_cache = req.environ.get('swift.local_cache')
+            if local_cache is not None:
+                local_cache.set(cache_key, bounds, time=time)
     else:
         # N.B. get_namespaces_from_cache is used for both types of namespace
         # cache objects (updating and listing), and both code paths only call
@@ -1413,6 +1587,11 @@ class GetOrHeadHandler(GetterBase):
         self.used_nodes = []
         self.used_source_etag = None
         self.concurrency = concurrency
+        # hedging only applies to requests that are otherwise sent to one
+        # node at a time
+        self.hedger = None
+        if concurrency == 1 and req.method == 'GET':
+            self.hedger = self.app.get_request_hedger(server_type, policy)
         self.latest_404_timestamp = Timestamp.zero()
         policy_options = self.app.get_policy_options(self.policy)
         self.rebalance_missing_suppression_count = min(
@@ -1568,7 +1747,15 @@ class GetOrHeadHandler(GetterBase):
                 possible_source = conn.getresponse()
                 # See NOTE: swift_conn at top of file about this.
                 possible_source.swift_conn = conn
+            first_byte_timing = time.time() - start_node_timing
+            self.app.set_node_first_byte_timing(node, first_byte_timing)
+            if self.hedger:
+                self.hedger.observe(first_byte_timing)
         except (Exception, Timeout):
+            # a node that fails to respond is counted as at least as slow as
+            # one that times out, so that it sorts behind those that respond
+            self.app.set_node_first_byte_timing(node, max(
+                time.time() - start_node_timing, self.node_timeout))
             self.app.exception_occurred(
                 node, self.server_type,
                 'Trying to %(method)s %(path)s' %
@@ -1660,16 +1847,40 @@ class GetOrHeadHandler(GetterBase):
 
         nodes = GreenthreadSafeIterator(self.node_iter)
 
-        pile = GreenAsyncPile(self.concurrency)
+        pile = GreenAsyncPile(self.concurrency + (1 if self.hedger else 0))
+        hedged_nodes = []
+        hedge_next = False
 
         for node in nodes:
+            if hedge_next:
+                hedged_nodes.append(node)
+                hedge_next = False
+                self.logger.increment(
+                    '%s.hedge.launched' % self.server_type.lower())
+            elif self.hedger:
+                self.hedger.request_sent()
             pile.spawn(self._make_node_request, node,
                        self.logger.thread_locals)
-            _timeout = self.app.get_policy_options(
-                self.policy).concurrency_timeout \
-                if pile.inflight < self.concurrency else None
-            if pile.waitfirst(_timeout):
+            if pile.inflight < self.concurrency:
+                _timeout = self.app.get_policy_options(
+                    self.policy).concurrency_timeout
+            elif self.hedger and pile.inflight == 1:
+                _timeout = self.hedger.delay
+            else:
+                _timeout = None
+            result = pile.waitfirst(_timeout)
+            if result:
                 break
+            if result is None and self.hedger and pile.inflight == 1:
+                # the request is slower than most; back it up with a request
+                # to the next node if the budget allows
+                if self.hedger.acquire():
+                    hedge_next = True
+                else:
+                    self.logger.increment(
+                        '%s.hedge.over_budget' % self.server_type.lower())
+                    if pile.waitfirst(None):
+                        break
         else:
             # ran out of nodes, see if any stragglers will finish
             any(pile)
@@ -1695,6 +1906,9 @@ class GetOrHeadHandler(GetterBase):
             if self.used_source_etag is None:
                 self.used_source_etag = normalize_etag(
                     source.resp.getheader('etag', ''))
+            if source.node in hedged_nodes:
+                self.logger.increment(
+                    '%s.hedge.won' % self.server_type.lower())
             self.source = source
             return True
         return False
@@ -1792,6 +2006,7 @@ class NodeIter(object):
         self.request = request
 
         part_nodes = ring.get_part_nodes(partition)
+        sort_handoffs = node_iter is None
         if node_iter is None:
             node_iter = itertools.chain(
                 part_nodes, ring.get_more_nodes(partition))
@@ -1804,6 +2019,14 @@ class NodeIter(object):
         self.primary_nodes = self.app.sort_nodes(
             list(itertools.islice(node_iter, self.num_primary_nodes)),
             policy=policy)
+        if sort_handoffs and self.expected_handoffs > 0:
+            # only the handoffs we expect to use are reordered; any further
+            # handoffs follow in ring order
+            node_iter = itertools.chain(
+                self.app.sort_handoff_nodes(
+                    list(itertools.islice(node_iter, self.expected_handoffs)),
+                    policy=policy),
+                node_iter)
         self.handoff_iter = node_iter
         self._node_provider = None
 
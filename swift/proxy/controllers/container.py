@@ -102,9 +102,18 @@ class ContainerController(Controller):
         node_iter = NodeIter(
             'container', self.app, self.app.container_ring, part,
             self.logger, req)
+        if req.method == 'GET':
+            # listing_formats can transcode a listing as it is read, so ask
+            # container servers to stream it; older container servers ignore
+            # this and send a Content-Length
+            req.headers['X-Backend-Listing-Stream'] = 'true'
         resp = self.GETorHEAD_base(
             req, 'Container', node_iter, part,
             req.swift_entity_path, concurrency)
+        # container servers stream listings with a chunked body; that is
+        # between them and the proxy, whose own server chunks the response
+        # to the client
+        resp.headers.pop('Transfer-Encoding', None)
         return resp
 
     def _filter_complete_listing(self, req, namespaces):
@@ -192,7 +201,8 @@ class ContainerController(Controller):
         # is unexpected but use that result for this request
         set_cache_state = set_namespaces_in_cache(
             req, cache_key, ns_bound_list,
-            self.app.recheck_listing_shard_ranges)
+            self.app.recheck_listing_shard_ranges,
+            compact=self.app.namespace_cache_compact_encoding)
         if set_cache_state == 'set':
             self.logger.info(
                 'Caching listing namespaces for %s (%d namespaces)',
@@ -35,7 +35,8 @@ import math
 import random
 
 from greenlet import GreenletExit
-from swift.common.concurrency import GreenPile, Queue, Empty, Timeout
+from swift.common.concurrency import GreenPile, Queue, Empty, Timeout, \
+    Semaphore, spawn, tpool
 
 from swift.common.utils import (
     clean_content_type, config_true_value, ContextPool, csv_append,
@@ -189,7 +190,9 @@ class CooperativeNamespaceCachePopulator(CooperativeCachePopulator):
         self.req = req
 
     def cache_encoder(self, ns_bound_list):
-        return namespace_list_to_bounds(ns_bound_list)
+        return namespace_list_to_bounds(
+            ns_bound_list,
+            compact=self.ctrl.app.namespace_cache_compact_encoding)
 
     def cache_decoder(self, bounds):
         return namespace_bounds_to_list(bounds)
@@ -1232,6 +1235,52 @@ class ReplicatedObjectController(BaseObjectController):
         return resp
 
 
+class ECCodingPool(object):
+    """
+    Runs erasure code encodes in native threads, so that the eventlet hub can
+    serve other requests while they run, allowing at most ``threads`` of them
+    to be in progress at once.
+
+    Decodes are not run here: a decode from the data fragments is cheap
+    enough that handing it off to a thread costs more than it saves.
+
+    :param threads: the maximum number of encodes that may run at once.
+    """
+
+    def __init__(self, threads):
+        self.threads = threads
+        self._semaphore = Semaphore(threads)
+
+    def execute(self, func, *args):
+        """
+        Call ``func(*args)`` in a native thread once one is free, and return
+        its result or raise its exception.
+        """
+        with self._semaphore:
+            return tpool.execute(func, *args)
+
+    def encode(self, policy, data):
+        return self.execute(policy.pyeclib_driver.encode, data)
+
+    def encode_many(self, policy, segments):
+        """
+        Encode several segments at once.
+
+        :returns: a list with the fragments of each segment, in order
+        """
+        if len(segments) == 1:
+            return [self.encode(policy, segments[0])]
+        encoders = [spawn(self.encode, policy, segment)
+                    for segment in segments]
+        try:
+            return [encoder.wait() for encoder in encoders]
+        finally:
+            # if one encode failed, or this greenthread was killed, don't
+            # leave the others to raise into the hub
+            for encoder in encoders:
+                encoder.kill()
+
+
 class ECAppIter(object):
     """
     WSGI iterable that decodes EC fragment archives (or portions thereof)
@@ -2128,41 +2177,108 @@ class MIMEPutter(Putter):
                    mime_boundary, multiphase=need_multiphase)
 
 
-def chunk_transformer(policy):
+class ChunkBuffer(object):
+    """
+    A FIFO buffer of bytes that is filled with chunks of any size and read in
+    chunks of a fixed size, such as EC segments or fragments.
+
+    Appended chunks are kept as they are and split with ``memoryview`` slices,
+    so the bytes in the buffer are never moved. Each read copies the bytes it
+    returns once, except that a read of exactly one whole appended chunk
+    returns that chunk without copying it.
+    """
+    def __init__(self):
+        self._chunks = collections.deque()
+        self._len = 0
+
+    def __len__(self):
+        return self._len
+
+    def append(self, chunk):
+        """
+        Add a chunk to the end of the buffer.
+
+        :param chunk: a bytes-like object; it must not be modified while it
+            is in the buffer.
+        """
+        if chunk:
+            self._chunks.append(chunk)
+            self._len += len(chunk)
+
+    def _take(self, size):
+        # remove up to size bytes from the front of the buffer and return
+        # them as a list of bytes-like objects
+        size = min(size, self._len)
+        pieces = []
+        while size > 0:
+            piece = self._chunks.popleft()
+            if len(piece) > size:
+                if not isinstance(piece, memoryview):
+                    piece = memoryview(piece)
+                self._chunks.appendleft(piece[size:])
+                piece = piece[:size]
+            pieces.append(piece)
+            size -= len(piece)
+            self._len -= len(piece)
+        return pieces
+
+    def read(self, size):
+        """
+        Remove and return up to ``size`` bytes from the front of the buffer.
+
+        :param size: the number of bytes to read.
+        :returns: a bytes object.
+        """
+        pieces = self._take(size)
+        if len(pieces) == 1 and isinstance(pieces[0], bytes):
+            return pieces[0]
+        return b''.join(pieces)
+
+    def skip(self, size):
+        """
+        Remove up to ``size`` bytes from the front of the buffer without
+        copying them.
+
+        :param size: the number of bytes to remove.
+        """
+        self._take(size)
+
+    def clear(self):
+        self._chunks.clear()
+        self._len = 0
+
+
+def chunk_transformer(policy, coding_pool=None):
     """
     A generator to transform a source chunk to erasure coded chunks for each
     `send` call. The number of erasure coded chunks is as
     policy.ec_n_unique_fragments.
+
+    :param policy: the EC storage policy
+    :param coding_pool: an optional :class:`ECCodingPool` in which to encode
+        segments; if not given, segments are encoded in the calling thread.
     """
     segment_size = policy.ec_segment_size
 
-    buf = collections.deque()
-    total_buf_len = 0
+    buf = ChunkBuffer()
 
     chunk = yield
     while chunk:
         buf.append(chunk)
-        total_buf_len += len(chunk)
-        if total_buf_len >= segment_size:
+        if len(buf) >= segment_size:
             chunks_to_encode = []
             # extract as many chunks as we can from the input buffer
-            while total_buf_len >= segment_size:
-                to_take = segment_size
-                pieces = []
-                while to_take > 0:
-                    piece = buf.popleft()
-                    if len(piece) > to_take:
-                        buf.appendleft(piece[to_take:])
-                        piece = piece[:to_take]
-                    pieces.append(piece)
-                    to_take -= len(piece)
-                    total_buf_len -= len(piece)
-                chunks_to_encode.append(b''.join(pieces))
-
-            frags_by_byte_order = []
-            for chunk_to_encode in chunks_to_encode:
-                frags_by_byte_order.append(
-                    policy.pyeclib_driver.encode(chunk_to_encode))
+            while len(buf) >= segment_size:
+                chunks_to_encode.append(buf.read(segment_size))
+
+            if coding_pool is None:
+                frags_by_byte_order = []
+                for chunk_to_encode in chunks_to_encode:
+                    frags_by_byte_order.append(
+                        policy.pyeclib_driver.encode(chunk_to_encode))
+            else:
+                frags_by_byte_order = coding_pool.encode_many(
+                    policy, chunks_to_encode)
             # Sequential calls to encode() have given us a list that
             # looks like this:
             #
@@ -2184,9 +2300,12 @@ def chunk_transformer(policy):
 
     # Now we've gotten an empty chunk, which indicates end-of-input.
     # Take any leftover bytes and encode them.
-    last_bytes = b''.join(buf)
+    last_bytes = buf.read(len(buf))
     if last_bytes:
-        last_frags = policy.pyeclib_driver.encode(last_bytes)
+        if coding_pool is None:
+            last_frags = policy.pyeclib_driver.encode(last_bytes)
+        else:
+            last_frags = coding_pool.encode(policy, last_bytes)
         yield last_frags
     else:
         yield [b''] * policy.ec_n_unique_fragments
@@ -2600,9 +2719,13 @@ class ECFragGetter(GetterBase):
         self.logger_thread_locals = logger_thread_locals
         self.status = self.reason = self.body = self.source_headers = None
         self._source_iter = None
+        # set by the controller if first byte timings should be fed to a
+        # RequestHedger, and if this getter was started as a hedged request
+        self.hedger = None
+        self.hedged = False
 
     def _iter_bytes_from_response_part(self, part_file, nbytes):
-        buf = b''
+        buf = ChunkBuffer()
         part_file = ByteCountEnforcer(part_file, nbytes)
         while True:
             try:
@@ -2610,9 +2733,7 @@ class ECFragGetter(GetterBase):
                                      self.node_timeout,
                                      ChunkReadTimeout):
                     chunk = part_file.read(self.app.object_chunk_size)
-                    # NB: this append must be *inside* the context
-                    # manager for test.unit.SlowBody to do its thing
-                    buf += chunk
+                    buf.append(chunk)
                     if nbytes is not None:
                         nbytes -= len(chunk)
             except (ChunkReadTimeout, ShortReadError) as e:
@@ -2623,7 +2744,7 @@ class ECFragGetter(GetterBase):
                     raise e
                 except RangeAlreadyComplete:
                     break
-                buf = b''
+                buf.clear()
                 if self._replace_source(
                         'Trying to read EC fragment during GET (retrying)'):
                     try:
@@ -2640,17 +2761,16 @@ class ECFragGetter(GetterBase):
             else:
                 if buf and self.skip_bytes:
                     if self.skip_bytes < len(buf):
-                        buf = buf[self.skip_bytes:]
+                        buf.skip(self.skip_bytes)
                         self.bytes_used_from_backend += self.skip_bytes
                         self.skip_bytes = 0
                     else:
                         self.skip_bytes -= len(buf)
                         self.bytes_used_from_backend += len(buf)
-                        buf = b''
+                        buf.clear()
 
                 while buf and (len(buf) >= self.fragment_size or not chunk):
-                    client_chunk = buf[:self.fragment_size]
-                    buf = buf[self.fragment_size:]
+                    client_chunk = buf.read(self.fragment_size)
                     with WatchdogTimeout(self.app.watchdog,
                                          self.app.client_timeout,
                                          ChunkWriteTimeout):
@@ -2758,7 +2878,15 @@ class ECFragGetter(GetterBase):
                 possible_source = conn.getresponse()
                 # See NOTE: swift_conn at top of file about this.
                 possible_source.swift_conn = conn
+            first_byte_timing = time.time() - start_node_timing
+            self.app.set_node_first_byte_timing(node, first_byte_timing)
+            if self.hedger:
+                self.hedger.observe(first_byte_timing)
         except (Exception, Timeout):
+            # as for replicated GETs, penalise the node at least as much as
+            # a timeout would
+            self.app.set_node_first_byte_timing(node, max(
+                time.time() - start_node_timing, self.node_timeout))
             self.app.exception_occurred(
                 node, 'Object',
                 'Trying to %(method)s %(path)s' %
@@ -2858,7 +2986,7 @@ class ECFragGetter(GetterBase):
 class ECObjectController(BaseObjectController):
     def _fragment_GET_request(
             self, req, node_iter, partition, policy,
-            header_provider, logger_thread_locals):
+            header_provider, logger_thread_locals, hedged=False):
         """
         Makes a GET request for a fragment.
         """
@@ -2870,6 +2998,8 @@ class ECObjectController(BaseObjectController):
                               policy, req.swift_entity_path, backend_headers,
                               header_provider, logger_thread_locals,
                               self.logger)
+        getter.hedger = self.app.get_request_hedger('Object', policy)
+        getter.hedged = hedged
         return getter, getter.response_parts_iter()
 
     def _convert_range(self, req, policy):
@@ -2945,6 +3075,25 @@ class ECObjectController(BaseObjectController):
                 # got a stop
                 break
 
+    def hedge_remaining_primaries(self, safe_iter, pile, req, partition,
+                                  policy, buckets, hedger, feeder_q,
+                                  logger_thread_locals):
+        try:
+            feeder_q.get(timeout=hedger.delay)
+        except Empty:
+            # the fragment requests are slower than most; back them up with a
+            # request to another primary if the budget allows
+            if not safe_iter.unsafe_iter.primaries_left:
+                return
+            if not hedger.acquire():
+                self.logger.increment('object.hedge.over_budget')
+                return
+            self.logger.increment('object.hedge.launched')
+            pile.spawn(self._fragment_GET_request,
+                       req, safe_iter, partition,
+                       policy, buckets.get_extra_headers,
+                       logger_thread_locals, hedged=True)
+
     def _get_or_head_response(self, req, node_iter, partition, policy):
         update_etag_is_at_header(req, "X-Object-Sysmeta-Ec-Etag")
 
@@ -2967,12 +3116,25 @@ class ECObjectController(BaseObjectController):
             orig_range = req.range
             range_specs = self._convert_range(req, policy)
 
+        policy_options = self.app.get_policy_options(policy)
+        if policy_options.ec_prefer_data_fragments and policy.ec_systematic:
+            # PyECLib decodes a segment of a systematic policy from its data
+            # fragments by just joining them, which is much cheaper than a
+            # decode that needs parity fragments; so ask the primaries that
+            # hold data fragments first. Parity fragments are only requested
+            # if some of those fail.
+            node_iter.primary_nodes.sort(
+                key=lambda node: policy.get_backend_index(
+                    node['index']) >= policy.ec_ndata)
+
         safe_iter = GreenthreadSafeIterator(node_iter)
 
-        policy_options = self.app.get_policy_options(policy)
         ec_request_count = policy.ec_ndata
         if policy_options.concurrent_gets:
             ec_request_count += policy_options.concurrent_ec_extra_requests
+        hedger = None
+        if not policy_options.concurrent_gets:
+            hedger = self.app.get_request_hedger('Object', policy)
         with ContextPool(policy.ec_n_unique_fragments) as pool:
             pile = GreenAsyncPile(pool)
             buckets = ECGetResponseCollection(policy)
@@ -2983,6 +3145,8 @@ class ECObjectController(BaseObjectController):
                            req, safe_iter, partition,
                            policy, buckets.get_extra_headers,
                            self.logger.thread_locals)
+                if hedger:
+                    hedger.request_sent()
 
             feeder_q = None
             if policy_options.concurrent_gets:
@@ -2990,6 +3154,11 @@ class ECObjectController(BaseObjectController):
                 pool.spawn(self.feed_remaining_primaries, safe_iter, pile, req,
                            partition, policy, buckets, feeder_q,
                            self.logger.thread_locals)
+            elif hedger and hedger.delay is not None:
+                feeder_q = Queue()
+                pool.spawn(self.hedge_remaining_primaries, safe_iter, pile,
+                           req, partition, policy, buckets, hedger, feeder_q,
+                           self.logger.thread_locals)
 
             extra_requests = 0
             # max_extra_requests is an arbitrary hard limit for spawning extra
@@ -3019,6 +3188,8 @@ class ECObjectController(BaseObjectController):
                     pile.spawn(self._fragment_GET_request, req, safe_iter,
                                partition, policy, buckets.get_extra_headers,
                                self.logger.thread_locals)
+                    if hedger:
+                        hedger.request_sent()
             if feeder_q:
                 feeder_q.put('stop')
 
@@ -3036,6 +3207,9 @@ class ECObjectController(BaseObjectController):
             # This is only true if we didn't get a 206 response, but
             # that's the only time this is used anyway.
             fa_length = int(resp_headers['Content-Length'])
+            if any(getattr(getter, 'hedged', False)
+                   for getter, _junk in best_bucket.get_responses()):
+                self.logger.increment('object.hedge.won')
             app_iter = ECAppIter(
                 req.swift_entity_path,
                 policy,
@@ -3241,7 +3415,7 @@ class ECObjectController(BaseObjectController):
         This method was added in the PUT method extraction change
         """
         bytes_transferred = 0
-        chunk_transform = chunk_transformer(policy)
+        chunk_transform = chunk_transformer(policy, self.app.ec_coding_pool)
         chunk_transform.send(None)
         frag_hashers = collections.defaultdict(
             lambda: md5(usedforsecurity=False))
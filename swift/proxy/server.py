@@ -32,18 +32,23 @@ from swift.common.http import is_server_error, HTTP_INSUFFICIENT_STORAGE
 from swift.common.storage_policy import POLICIES
 from swift.common.ring import Ring
 from swift.common.error_limiter import ErrorLimiter
+from swift.common.node_latency import NodeLatencyTracker, RequestHedger
 from swift.common.utils import Watchdog, get_logger, \
     get_remote_client, split_path, config_true_value, generate_trans_id, \
     affinity_key_function, affinity_locality_predicate, list_from_csv, \
     parse_prefixed_conf, config_auto_int_value, node_to_string, \
     config_request_node_count_value, config_percent_value, cap_length, \
-    parse_options, non_negative_int, config_positive_float_value
+    parse_options, non_negative_int, config_positive_float_value, \
+    config_float_value
 from swift.common.registry import register_swift_info
 from swift.common.constraints import check_utf8, valid_api_version
+from swift.common.memcached import LocalCache
 from swift.common.statsd_client import get_labeled_statsd_client
 from swift.proxy.controllers import AccountController, ContainerController, \
     ObjectControllerRouter, InfoController
+from swift.proxy.controllers.obj import ECCodingPool
 from swift.proxy.controllers.base import get_container_info, \
+    get_cache_key, prefetch_from_memcache, \
     DEFAULT_RECHECK_CONTAINER_EXISTENCE, DEFAULT_RECHECK_ACCOUNT_EXISTENCE, \
     DEFAULT_RECHECK_UPDATING_SHARD_RANGES, DEFAULT_RECHECK_LISTING_SHARD_RANGES
 from swift.common.swob import HTTPBadRequest, HTTPForbidden, \
@@ -99,7 +104,7 @@ def _label_for_policy(policy):
     return '(default)'
 
 
-VALID_SORTING_METHODS = ('shuffle', 'timing', 'affinity')
+VALID_SORTING_METHODS = ('shuffle', 'timing', 'affinity', 'latency')
 
 
 class ProxyOverrideOptions(object):
@@ -164,6 +169,11 @@ class ProxyOverrideOptions(object):
             'concurrency_timeout', app.conn_timeout))
         self.concurrent_ec_extra_requests = int(get(
             'concurrent_ec_extra_requests', 0))
+        self.hedged_gets = config_true_value(get('hedged_gets', False))
+        self.hedge_budget = config_float_value(
+            get('hedge_budget', 5), 0, 100)
+        self.ec_prefer_data_fragments = config_true_value(get(
+            'ec_prefer_data_fragments', False))
 
     def __repr__(self):
         return '%s({}, {%s}, app)' % (
@@ -178,6 +188,9 @@ class ProxyOverrideOptions(object):
                     'concurrent_gets',
                     'concurrency_timeout',
                     'concurrent_ec_extra_requests',
+                    'hedged_gets',
+                    'hedge_budget',
+                    'ec_prefer_data_fragments',
                 )))
 
     def __eq__(self, other):
@@ -193,6 +206,9 @@ class ProxyOverrideOptions(object):
             'concurrent_gets',
             'concurrency_timeout',
             'concurrent_ec_extra_requests',
+            'hedged_gets',
+            'hedge_budget',
+            'ec_prefer_data_fragments',
         ))
 
 
@@ -241,6 +257,10 @@ class Application(object):
         self.recheck_listing_shard_ranges = \
             int(conf.get('recheck_listing_shard_ranges',
                          DEFAULT_RECHECK_LISTING_SHARD_RANGES))
+        # containers that this worker last saw sharding or sharded, whose
+        # updating namespaces are worth fetching along with their info
+        self.sharded_containers = LocalCache(
+            self.recheck_updating_shard_ranges)
         self.recheck_account_existence = \
             int(conf.get('recheck_account_existence',
                          DEFAULT_RECHECK_ACCOUNT_EXISTENCE))
@@ -268,6 +288,8 @@ class Application(object):
                     DEFAULT_NAMESPACE_CACHE_TOKENS_PER_SESSION
                 )
             )
+        self.namespace_cache_compact_encoding = config_true_value(
+            conf.get('namespace_cache_compact_encoding', False))
         self.allow_account_management = \
             config_true_value(conf.get('allow_account_management', 'no'))
         self.container_ring = container_ring or Ring(swift_dir,
@@ -336,6 +358,13 @@ class Application(object):
                 '1' if config_true_value(conf['write_legacy_ec_crc']) else '0'
         # else, assume operators know what they're doing and leave env alone
 
+        # EC encodes run in the eventlet hub unless some threads are
+        # configured for them
+        ec_coding_threads = non_negative_int(
+            conf.get('ec_coding_threads', 0))
+        self.ec_coding_pool = ECCodingPool(ec_coding_threads) \
+            if ec_coding_threads else None
+
         # Initialization was successful, so now apply the client chunk size
         # parameter as the default read / write buffer size for the network
         # sockets.
@@ -362,6 +391,25 @@ class Application(object):
         self._override_options = self._load_per_policy_config(conf)
         self.sorts_by_timing = any(pc.sorting_method == 'timing'
                                    for pc in self._override_options.values())
+        self.sorts_by_latency = any(pc.sorting_method == 'latency'
+                                    for pc in self._override_options.values())
+        self.node_latency = None
+        if self.sorts_by_latency:
+            latency_alpha = conf.get('latency_ewma_alpha', 0.2)
+            latency_shared_file = conf.get('latency_shared_file') or None
+            try:
+                self.node_latency = NodeLatencyTracker(
+                    alpha=latency_alpha, expiry=self.timing_expiry,
+                    shared_path=latency_shared_file)
+            except OSError as err:
+                self.logger.error(
+                    'Unable to map latency_shared_file %s (%s); node '
+                    'latencies will not be shared with other workers',
+                    latency_shared_file, err)
+                self.node_latency = NodeLatencyTracker(
+                    alpha=latency_alpha, expiry=self.timing_expiry)
+
+        self._request_hedgers = {}
 
         register_swift_info(
             version=swift_version,
@@ -426,6 +474,25 @@ class Application(object):
         """
         return self._override_options[policy and policy.idx]
 
+    def get_request_hedger(self, server_type, policy=None):
+        """
+        Return the :class:`RequestHedger` for GETs of a server type and
+        policy, if hedged GETs are enabled for the policy.
+
+        :param server_type: server type used in logging
+        :param policy: an instance of :class:`BaseStoragePolicy` or ``None``
+        :return: an instance of :class:`RequestHedger` or ``None``
+        """
+        policy_options = self.get_policy_options(policy)
+        if not policy_options.hedged_gets:
+            return None
+        key = (server_type, policy and policy.idx)
+        hedger = self._request_hedgers.get(key)
+        if hedger is None:
+            hedger = self._request_hedgers[key] = RequestHedger(
+                budget=policy_options.hedge_budget / 100.0)
+        return hedger
+
     def check_config(self):
         """
         Check the configuration for possible errors
@@ -475,9 +542,25 @@ class Application(object):
         if account and not valid_api_version(version):
             raise APIVersionError('Invalid path')
         if obj and container and account:
+            is_update = req.method in ('PUT', 'POST', 'DELETE') and \
+                self.recheck_updating_shard_ranges
+            info_cache_key = get_cache_key(account, container)
+            if is_update and info_cache_key in self.sharded_containers:
+                # a write to a sharded container needs its info and its
+                # updating namespaces; fetch both from memcache at once
+                # rather than one after the other. Most containers aren't
+                # sharded, and for them the namespaces would always miss.
+                prefetch_from_memcache(req.environ, [
+                    info_cache_key,
+                    get_cache_key(account, container, shard='updating')])
             info = get_container_info(req.environ, self)
             if is_server_error(info.get('status')):
                 raise HTTPServiceUnavailable(request=req)
+            if is_update:
+                if info.get('sharding_state') in ('sharding', 'sharded'):
+                    self.sharded_containers.set(info_cache_key, True)
+                elif info_cache_key in self.sharded_containers:
+                    self.sharded_containers.delete(info_cache_key)
             policy_index = req.headers.get('X-Backend-Storage-Policy-Index',
                                            info['storage_policy'])
             policy = POLICIES.get_by_index(policy_index)
@@ -635,7 +718,9 @@ class Application(object):
         Sorts nodes in-place (and returns the sorted list) according to
         the configured strategy. The default "sorting" is to randomly
         shuffle the nodes. If the "timing" strategy is chosen, the nodes
-        are sorted according to the stored timing data.
+        are sorted according to the stored timing data. If the "latency"
+        strategy is chosen, the nodes are sorted according to their smoothed
+        and tail latencies.
 
         :param nodes: a list of nodes
         :param policy: an instance of :class:`BaseStoragePolicy`
@@ -654,6 +739,22 @@ class Application(object):
             nodes.sort(key=key_func)
         elif policy_options.sorting_method == 'affinity':
             nodes.sort(key=policy_options.read_affinity_sort_key)
+        elif policy_options.sorting_method == 'latency':
+            now = time()
+            nodes.sort(key=lambda node: self.node_latency.score(node, now))
+        return nodes
+
+    def sort_handoff_nodes(self, nodes, policy=None):
+        """
+        Sorts handoff nodes in-place (and returns the sorted list). Handoffs
+        are only reordered if the "latency" strategy is chosen; otherwise
+        they are left in ring order.
+
+        :param nodes: a list of nodes
+        :param policy: an instance of :class:`BaseStoragePolicy`
+        """
+        if self.get_policy_options(policy).sorting_method == 'latency':
+            self.sort_nodes(nodes, policy=policy)
         return nodes
 
     def set_node_timing(self, node, timing):
@@ -663,6 +764,18 @@ class Application(object):
         timing = round(timing, 3)  # sort timings to the millisecond
         self.node_timings[node['ip']] = (timing, now + self.timing_expiry)
 
+    def set_node_first_byte_timing(self, node, timing):
+        """
+        Record the time taken for a node to start responding to a request.
+
+        :param node: a node dict
+        :param timing: the time in seconds from starting to connect to the
+            node until its response headers were read, or a penalty if the
+            node failed to respond
+        """
+        if self.sorts_by_latency:
+            self.node_latency.record(node, timing)
+
     def error_limited(self, node):
         """
         Check if the node is currently error limited.
@@ -452,6 +452,12 @@ class FakeMemcache(object):
                 raise MemcacheConnectionError()
         return self.store.get(key)
 
+    @track
+    def get_multi(self, keys, server_key=None):
+        # like MemcacheRing, keys that cannot be read come back as None
+        return [None if self.error_on_get and self.error_on_get.pop(0)
+                else self.store.get(key) for key in keys]
+
     @property
     def keys(self):
         return self.store.keys
@@ -609,6 +615,24 @@ def readlength(fd, size, timeout=1.0):
     return buf
 
 
+def readbody(fd, headers):
+    """
+    Read the rest of a response body, undoing any chunked transfer encoding.
+
+    :param fd: file to read the body from, after its headers.
+    :param headers: the response headers, as read by readuntil2crlfs.
+    """
+    if b'\r\ntransfer-encoding: chunked\r\n' not in headers.lower():
+        return fd.read()
+    body = b''
+    while True:
+        size = int(fd.readline().split(b';')[0], 16)
+        if not size:
+            return body
+        body += fd.read(size)
+        fd.readline()
+
+
 def connect_tcp(hostport):
     rv = socket.socket()
     rv.connect(hostport)
@@ -1001,6 +1025,9 @@ def fake_http_connect(*code_iter, **kwargs):
             else:
                 rv = self.body[self.sent:self.sent + amt]
             self.sent += len(rv)
+            if isinstance(rv, SlowBody):
+                rv.slowdown()
+                rv = rv.body
             return rv
 
         def send(self, data=None):
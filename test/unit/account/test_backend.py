@@ -302,6 +302,34 @@ class TestAccountBroker(test_db.TestDbBase):
                 "SELECT count(*) FROM container "
                 "WHERE deleted = 1").fetchone()[0], 1)
 
+    def test_put_container_binary_pending(self):
+        broker = AccountBroker(self.get_db_path(), account='a')
+        broker.initialize(Timestamp('1').internal)
+        ts = [Timestamp.now() for _ in range(3)]
+        broker.put_container('c\u00e9', ts[0].internal, '0', '1', '2', '0')
+        with mock.patch('swift.common.db.BINARY_PENDING', True):
+            # as the account server puts them
+            broker.put_container('d', ts[1].internal, '0', '3', '4', '1')
+            broker.put_container('c\u00e9', ts[0].internal, ts[2].internal,
+                                 '0', '0', '0')
+            # other types are pickled
+            broker.put_container('e', ts[1].internal, '0', 5, 6, 0)
+        with open(broker.pending_file, 'rb') as fd:
+            pending = fd.read()
+        self.assertEqual(b':', pending[:1])
+        self.assertEqual(2, pending.count(b'\x01\x01\x07'))
+        self.assertEqual(2, pending.count(b':'))
+        broker._commit_puts()
+        with broker.get() as conn:
+            self.assertEqual(
+                [('c\u00e9', ts[0].internal, ts[2].internal, 0, 0, 1, 0),
+                 ('d', ts[1].internal, '0', 3, 4, 0, 1),
+                 ('e', ts[1].internal, '0', 5, 6, 0, 0)],
+                [tuple(row) for row in conn.execute(
+                    'SELECT name, put_timestamp, delete_timestamp, '
+                    'object_count, bytes_used, deleted, storage_policy_index '
+                    'FROM container ORDER BY name')])
+
     def test_put_container(self):
         # Test AccountBroker.put_container
         broker = AccountBroker(self.get_db_path(), account='a')
@@ -10,6 +10,7 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import itertools
 import json
 import os
 from argparse import Namespace
@@ -501,6 +502,45 @@ class TestManageShardRanges(BaseUnitTestCase):
         self.assert_starts_with(err_lines[0], 'Loaded db broker for ')
         self.assert_starts_with(err_lines[1], 'Found 10 ranges in ')
 
+    def test_find_shard_ranges_reports_progress(self):
+        db_file = os.path.join(self.testdir, 'hash.db')
+        broker = ContainerBroker(db_file)
+        broker.account = 'a'
+        broker.container = 'c'
+        broker.initialize()
+        ts = utils.Timestamp.now()
+        broker.merge_items([
+            {'name': 'obj%02d' % i, 'created_at': ts.internal, 'size': 0,
+             'content_type': 'application/octet-stream', 'etag': 'not-really',
+             'deleted': 0, 'storage_policy_index': 0,
+             'ctype_timestamp': ts.internal, 'meta_timestamp': ts.internal}
+            for i in range(100)])
+
+        out = StringIO()
+        err = StringIO()
+        # the clock moves on 6 seconds each time it is read
+        times = itertools.count(1000, 6)
+        orig_find = ContainerBroker.find_shard_ranges
+        with mock.patch('sys.stdout', out), mock.patch('sys.stderr', err), \
+                mock.patch('swift.cli.manage_shard_ranges.time.time',
+                           lambda: next(times)), \
+                mock.patch.object(ContainerBroker, 'find_shard_ranges',
+                                  side_effect=orig_find,
+                                  autospec=True) as mock_find:
+            ret = main([db_file, 'find', '10'])
+        self.assertEqual(0, ret)
+        # all ranges are found with one call
+        self.assertEqual(1, mock_find.call_count)
+        self.assertEqual(10, len(json.loads(out.getvalue())))
+        err_lines = err.getvalue().split('\n')
+        self.assert_starts_with(err_lines[0], 'Loaded db broker for ')
+        # progress is reported at most every 10 seconds
+        self.assertEqual(['Found %d ranges in %ds; looking for more...' % (
+            num_found, elapsed) for num_found, elapsed in (
+                (1, 24), (3, 48), (5, 72), (7, 96), (9, 120))],
+            err_lines[1:6])
+        self.assert_starts_with(err_lines[6], 'Found 10 ranges in ')
+
     def test_find_shard_ranges_with_minimum_size(self):
         db_file = os.path.join(self.testdir, 'hash.db')
         broker = ContainerBroker(db_file)
@@ -1460,6 +1460,30 @@ class TestRelinker(unittest.TestCase):
             ['[step=relink] No policy found to increase the partition power.'])
         self.assertEqual([], self.logger.get_lines_for_level('error'))
 
+    def test_relink_slab_policy(self):
+        self.policy = StoragePolicy(0, 'platinum', True,
+                                    diskfile_module='replication.slab')
+        storage_policy._POLICIES = StoragePolicyCollection([self.policy])
+        self.rb.prepare_increase_partition_power()
+        self._save_ring()
+        with self._mock_relinker():
+            self.assertEqual(1, relinker.main([
+                'relink',
+                '--swift-dir', self.testdir,
+                '--devices', self.devices,
+                '--skip-mount',
+            ]))
+        # objects packed in volumes would be left in the old partitions
+        self.assertEqual(
+            ['[step=relink] Policy platinum stores object files outside of '
+             'hash dirs, which cannot be relinked'],
+            self.logger.get_lines_for_level('error'))
+        self.assertEqual(
+            ['[step=relink] 0 hash dirs processed '
+             '(0 files, 0 linked, 0 removed, 0 errors)'],
+            self.logger.get_lines_for_level('warning'))
+        self.assertFalse(os.path.isdir(self.expected_dir))
+
     def test_relink_not_mounted(self):
         self.rb.prepare_increase_partition_power()
         self._save_ring()
@@ -30,9 +30,10 @@ import time
 from swift.cli import ringbuilder
 from swift.cli.ringbuilder import EXIT_SUCCESS, EXIT_WARNING, EXIT_ERROR
 from swift.common import exceptions
-from swift.common.ring import RingBuilder
+from swift.common.ring import RingBuilder, RingData
 from swift.common.ring.io import RingReader
 from swift.common.ring.composite_builder import CompositeRingBuilder
+from swift.common.utils import md5
 
 from test.unit import Timeout, write_stub_builder
 
@@ -2576,6 +2577,36 @@ class TestCommands(unittest.TestCase, RunSwiftRingBuilderMixin):
                                 exp_results=exp_results)
         self.assertIn('invalid choice', err)
 
+    def test_write_ring_mmap(self):
+        self.create_sample_ring()
+        argv = ["", self.tmpfile, "rebalance"]
+        self.assertSystemExit(EXIT_SUCCESS, ringbuilder.main, argv)
+        ring_file = "%s.ring.gz" % self.tmpfile
+        mmap_file = "%s.ring.mmap" % self.tmpfile
+        self.assertFalse(os.path.exists(mmap_file))
+
+        argv = ["", self.tmpfile, "write_ring", "--mmap"]
+        self.assertSystemExit(EXIT_SUCCESS, ringbuilder.main, argv)
+        expected = RingData.load(ring_file)
+        mapped = RingData.load_mmap(mmap_file)
+        self.assertEqual(expected.devs, mapped.devs)
+        self.assertEqual(expected._replica2part2dev_id,
+                         mapped._replica2part2dev_id)
+
+        # an existing sidecar is kept up to date
+        ring = RingBuilder.load(self.tmpfile)
+        ring.set_dev_weight(3, 0)
+        ring.pretend_min_part_hours_passed()
+        ring.save(self.tmpfile)
+        argv = ["", self.tmpfile, "rebalance"]
+        self.assertSystemExit(EXIT_SUCCESS, ringbuilder.main, argv)
+        expected = RingData.load(ring_file)
+        with open(ring_file, 'rb') as fp:
+            checksum = md5(fp.read(), usedforsecurity=False).hexdigest()
+        mapped = RingData.load_mmap(mmap_file, source_checksum=checksum)
+        self.assertEqual(expected._replica2part2dev_id,
+                         mapped._replica2part2dev_id)
+
     def test_write_empty_ring(self):
         ring = RingBuilder(6, 3, 1)
         ring.save(self.tmpfile)
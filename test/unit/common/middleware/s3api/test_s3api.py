@@ -81,6 +81,28 @@ class TestListingMiddleware(S3ApiTestCase):
             {'subdir': 'path/'},
         ])
 
+    def test_s3_etag_in_streamed_json(self):
+        body_data = json.dumps([
+            {'name': 'obj1', 'hash': '0123456789abcdef0123456789abcdef'},
+            {'name': 'obj2', 'hash': 'swiftetag; s3_etag=mu-etag'},
+            {'name': 'obj3', 'hash': None},
+            {'subdir': 'path/'},
+        ]).encode('ascii')
+        self.swift.register(
+            'GET', '/v1/a/c', swob.HTTPOk,
+            {'Content-Type': 'application/json; charset=UTF-8'},
+            iter([body_data[:40], body_data[40:]]))
+
+        req = Request.blank('/v1/a/c')
+        status, headers, body = self.call_s3api(req)
+        self.assertNotIn('Content-Length', headers)
+        self.assertEqual(json.loads(body), [
+            {'name': 'obj1', 'hash': '0123456789abcdef0123456789abcdef'},
+            {'name': 'obj2', 'hash': 'swiftetag', 's3_etag': '"mu-etag"'},
+            {'name': 'obj3', 'hash': None},
+            {'subdir': 'path/'},
+        ])
+
     def test_s3_etag_non_json(self):
         self.swift.register(
             'GET', '/v1/a/c', swob.HTTPOk,
@@ -789,3 +789,232 @@ class TestListingFormats(unittest.TestCase):
         # assume it is and slap on the missing charset. If you set up staticweb
         # to serve back such responses, your clients are already hosed.
         do_test('/v1/staticweb/bad-json?format=json', expect_charset=True)
+
+    def _register_streamed(self, path, body, chunk_size=7):
+        # no content-length, as for a listing streamed by a container server
+        self.fake_swift.register(
+            'GET', path, HTTPOk, {'Content-Type': 'application/json'},
+            iter([body[i:i + chunk_size]
+                  for i in range(0, len(body), chunk_size)]))
+
+    def test_streamed_container(self):
+        def do_test(query_string):
+            self._register_streamed('/v1/a/c', self.fake_container_listing)
+            req = Request.blank('/v1/a/c' + query_string)
+            resp = req.get_response(self.app)
+            self.assertNotIn('Content-Length', resp.headers)
+            self.assertEqual(self.fake_swift.calls[-1], (
+                'GET', '/v1/a/c?format=json'))
+            return resp
+
+        resp = do_test('')
+        self.assertEqual(resp.body, b'bar\nfoo/\n')
+        self.assertEqual(resp.headers['Content-Type'],
+                         'text/plain; charset=utf-8')
+
+        resp = do_test('?format=json')
+        self.assertEqual(resp.body, self.fake_container_listing)
+        self.assertEqual(resp.headers['Content-Type'],
+                         'application/json; charset=utf-8')
+
+        resp = do_test('?format=xml')
+        self.assertEqual(
+            resp.body,
+            b'<?xml version="1.0" encoding="UTF-8"?>\n'
+            b'<container name="c">'
+            b'<object><name>bar</name><hash>etag</hash><bytes>0</bytes>'
+            b'<content_type>text/plain</content_type>'
+            b'<last_modified>1970-01-01T00:00:00.000000</last_modified>'
+            b'</object>'
+            b'<subdir name="foo/"><name>foo/</name></subdir>'
+            b'</container>'
+        )
+        self.assertEqual(resp.headers['Content-Type'],
+                         'application/xml; charset=utf-8')
+
+    def test_streamed_account(self):
+        self._register_streamed('/v1/a', self.fake_account_listing)
+        resp = Request.blank('/v1/a?format=xml').get_response(self.app)
+        self.assertNotIn('Content-Length', resp.headers)
+        self.assertEqual(
+            resp.body,
+            listing_formats.account_to_xml(
+                json.loads(self.fake_account_listing), 'a'))
+
+    def test_streamed_container_with_reserved(self):
+        self._register_streamed(
+            '/v1/a/c', self.fake_container_listing_with_reserved)
+        resp = Request.blank('/v1/a/c').get_response(self.app)
+        self.assertEqual(resp.body, b'bar\nfoo/\n')
+        self.assertEqual(self.logger.get_lines_for_level('warning'), [
+            "Container listing for a/c had reserved byte "
+            "in name: '\\x00bar\\x00extra data'",
+            "Container listing for a/c had reserved byte "
+            "in subdir: '\\x00foo/'",
+        ])
+
+        self._register_streamed(
+            '/v1/a/c', self.fake_container_listing_with_reserved)
+        req = Request.blank('/v1/a/c?format=json', headers={
+            'X-Backend-Allow-Reserved-Names': 'true'})
+        resp = req.get_response(self.app)
+        self.assertEqual(resp.body,
+                         self.fake_container_listing_with_reserved)
+
+    def test_streamed_container_all_reserved(self):
+        body = json.dumps([{'subdir': get_reserved_name('foo/')}]).encode(
+            'ascii')
+        self._register_streamed('/v1/a/c', body)
+        resp = Request.blank('/v1/a/c').get_response(self.app)
+        self.assertEqual(resp.status, '204 No Content')
+        self.assertEqual(resp.body, b'')
+        self.assertEqual(resp.headers['Content-Length'], '0')
+
+        self._register_streamed('/v1/a/c', body)
+        resp = Request.blank('/v1/a/c?format=json').get_response(self.app)
+        self.assertEqual(resp.status, '200 OK')
+        self.assertEqual(resp.body, b'[]')
+        self.assertEqual(resp.headers['Content-Length'], '2')
+
+    def test_streamed_not_a_listing(self):
+        for body in (b'Not actually JSON', b'{"some": "hash"}', b'[0, 1]',
+                     b'[{"some": "hash"'):
+            self._register_streamed('/v1/staticweb/not-json', body)
+            resp = Request.blank('/v1/staticweb/not-json?format=xml') \
+                .get_response(self.app)
+            self.assertEqual(resp.body, body)
+            self.assertEqual(resp.headers['Content-Type'],
+                             'application/json')
+
+
+class TestListingStreams(unittest.TestCase):
+    def test_iter_listing_records(self):
+        listing = [
+            {'name': 'bar', 'hash': 'etag', 'bytes': 0,
+             'content_type': 'text/plain',
+             'last_modified': '1970-01-01T00:00:00.000000'},
+            {'subdir': u'f\u00f6\u00f6/'},
+            {'name': u'\u2603', 'hash': 'etag', 'bytes': 10,
+             'content_type': 'text/plain; swift_bytes=3',
+             'last_modified': '1970-01-01T00:00:00.000000'},
+        ]
+        for body in (json.dumps(listing).encode('ascii'),
+                     json.dumps(listing, indent=2).encode('ascii'),
+                     json.dumps(listing, ensure_ascii=False).encode('utf-8'),
+                     b' \n' + json.dumps(listing).encode('ascii') + b'\n'):
+            for chunk_size in (1, 2, 3, 10, len(body)):
+                chunks = [body[i:i + chunk_size]
+                          for i in range(0, len(body), chunk_size)]
+                self.assertEqual(
+                    listing,
+                    list(listing_formats.iter_listing_records(chunks)))
+
+        for body in (b'[]', b' [ ] '):
+            self.assertEqual(
+                [], list(listing_formats.iter_listing_records([body])))
+
+    def test_iter_listing_records_invalid(self):
+        for body in (b'', b'{}', b'[', b'[{}', b'[{},', b'[{}]]', b'[0]',
+                     b'[{} {}]', b'[{}, 0]', b'[{"a": "\xff"}]', b'[{}] x',
+                     b'[,{}]', b'[{},]'):
+            with self.assertRaises(ValueError, msg=body):
+                list(listing_formats.iter_listing_records([body]))
+            with self.assertRaises(ValueError, msg=body):
+                list(listing_formats.iter_listing_records(
+                    [body[i:i + 1] for i in range(len(body))]))
+
+    def test_stream_listing(self):
+        closed = []
+
+        class Body(object):
+            def __init__(self, chunks):
+                self.chunks = iter(chunks)
+
+            def __iter__(self):
+                return self
+
+            def __next__(self):
+                return next(self.chunks)
+
+            def close(self):
+                closed.append(True)
+
+        records, body = listing_formats.stream_listing(
+            Body([b'[{"name": ', b'"a"}, {"na', b'me": "b"}]']))
+        self.assertIsNone(body)
+        self.assertEqual([{'name': 'a'}, {'name': 'b'}], list(records))
+        self.assertEqual([True], closed)
+
+        del closed[:]
+        records, body = listing_formats.stream_listing(
+            Body([b'[{"name": ', b'"a"}, {"na', b'me": "b"}]']))
+        self.assertEqual({'name': 'a'}, next(records))
+        records.close()
+        self.assertEqual([True], closed)
+
+        del closed[:]
+        records, body = listing_formats.stream_listing(Body([b'[]']))
+        self.assertEqual([], list(records))
+        self.assertEqual([True], closed)
+
+        del closed[:]
+        records, body = listing_formats.stream_listing(
+            Body([b'[{"name', b'": 0 0}, ', b'{}]']))
+        self.assertIsNone(records)
+        self.assertEqual(b'[{"name": 0 0}, {}]', b''.join(body))
+        self.assertEqual([True], closed)
+
+    def test_iter_listing_json(self):
+        listing = [{'name': u'\u2603', 'bytes': 1}, {'subdir': 'foo/'}]
+        for items in ([], listing[:1], listing):
+            self.assertEqual(
+                json.dumps(items).encode('ascii'),
+                b''.join(listing_formats.iter_listing_json(iter(items))))
+
+    def test_iter_xml(self):
+        account_listing = [
+            {'name': u'\u2603', 'bytes': 1, 'count': 2,
+             'last_modified': '1970-01-01T00:00:00.000000',
+             'storage_policy': 'gold'},
+            {'subdir': 'a<&>"b/'}]
+        container_listing = [
+            {'name': u'\u2603', 'hash': 'etag', 'bytes': 1,
+             'content_type': 'text/plain',
+             'last_modified': '1970-01-01T00:00:00.000000'},
+            {'subdir': 'a<&>"b/'}]
+        for items in ([], account_listing[:1], account_listing):
+            self.assertEqual(
+                listing_formats.account_to_xml(
+                    [dict(item) for item in items], u'a\u2603"'),
+                b''.join(listing_formats.iter_account_xml(
+                    (dict(item) for item in items), u'a\u2603"')))
+        for items in ([], container_listing[:1], container_listing):
+            self.assertEqual(
+                listing_formats.container_to_xml(
+                    [dict(item) for item in items], u'c\u2603"'),
+                b''.join(listing_formats.iter_container_xml(
+                    (dict(item) for item in items), u'c\u2603"')))
+
+    def test_chunk_listing(self):
+        pieces = [b'a' * 3, b'b' * 5, b'c', b'd' * 2]
+        self.assertEqual(
+            [b'aaabbbbb', b'cdd'],
+            list(listing_formats.chunk_listing(iter(pieces), 6)))
+        self.assertEqual(pieces,
+                         list(listing_formats.chunk_listing(pieces, 1)))
+        self.assertEqual([b''.join(pieces)],
+                         list(listing_formats.chunk_listing(pieces)))
+        self.assertEqual([], list(listing_formats.chunk_listing([])))
+
+    def test_update_listing_stream(self):
+        def update(item):
+            item['name'] = item['name'].upper()
+
+        self.assertEqual(
+            b'[{"name": "A"}, {"name": "B"}]',
+            b''.join(listing_formats.update_listing_stream(
+                update, [b'[{"name": "a"},', b' {"name": "b"}]'])))
+        self.assertEqual(
+            b'not json',
+            b''.join(listing_formats.update_listing_stream(
+                update, [b'not', b' json'])))
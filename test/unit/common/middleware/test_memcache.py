@@ -21,7 +21,7 @@ from swift.common.concurrency import ssl
 from unittest import mock
 
 from swift.common.middleware import memcache
-from swift.common.memcached import MemcacheRing
+from swift.common.memcached import MemcacheRing, LocalCache
 from swift.common.swob import Request
 from swift.common.wsgi import loadapp
 
@@ -47,6 +47,17 @@ class TestCacheMiddleware(unittest.TestCase):
         resp = self.app(req.environ, start_response)
         self.assertTrue('swift.cache' in resp)
         self.assertIsInstance(resp['swift.cache'], MemcacheRing)
+        self.assertNotIn('swift.local_cache', resp)
+
+    def test_cache_middleware_local_cache(self):
+        app = memcache.MemcacheMiddleware(FakeApp(), {
+            'local_cache_ttl': '3', 'local_cache_max_entries': '20'})
+        req = Request.blank('/something', environ={'REQUEST_METHOD': 'GET'})
+        resp = app(req.environ, start_response)
+        self.assertIsInstance(resp['swift.local_cache'], LocalCache)
+        self.assertIs(app.local_cache, resp['swift.local_cache'])
+        self.assertEqual(3, resp['swift.local_cache'].ttl)
+        self.assertEqual(20, resp['swift.local_cache'].max_entries)
 
     def test_filter_factory(self):
         factory = memcache.filter_factory({'max_connections': '3'},
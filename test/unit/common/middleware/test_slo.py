@@ -342,6 +342,36 @@ class TestSloMiddleware(SloTestCase):
             "content_type": "application/x-troff-me",
         }])
 
+    def test_streamed_container_listing(self):
+        listing_json = json.dumps([{
+            "bytes": 104857600,
+            "content_type": "application/x-troff-me",
+            "hash": "8de7b0b1551660da51d8d96a53b85531; this=that;"
+            "slo_etag=dc9947c2b53a3f55fe20c1394268e216",
+            "last_modified": "2018-07-12T03:14:39.532020",
+            "name": "test.me"
+        }, {
+            "subdir": "sub/"
+        }]).encode('ascii')
+        self.app.register(
+            'GET', '/v1/a/c',
+            swob.HTTPOk,
+            {'Content-Type': 'application/json'},
+            iter([listing_json[:50], listing_json[50:]]))
+        req = Request.blank('/v1/a/c', method='GET')
+        status, headers, body = self.call_slo(req)
+        self.assertNotIn('Content-Length', headers)
+        self.assertEqual(json.loads(body), [{
+            "slo_etag": '"dc9947c2b53a3f55fe20c1394268e216"',
+            "hash": "8de7b0b1551660da51d8d96a53b85531; this=that",
+            "name": "test.me",
+            "bytes": 104857600,
+            "last_modified": "2018-07-12T03:14:39.532020",
+            "content_type": "application/x-troff-me",
+        }, {
+            "subdir": "sub/",
+        }])
+
 
 class TestSloPutManifest(SloTestCase):
 
@@ -1385,6 +1385,54 @@ class TestSymlinkContainerContext(TestSymlinkMiddlewareBase):
         self.assertIn(obj_list[0]['symlink_path'], '/v1/a/c/o')
         self.assertNotIn('symlink_path', obj_list[1])
 
+    def test_get_container_streamed(self):
+        listing_json = json.dumps(
+            [{"hash": "etag; symlink_target=c/o;",
+              "last_modified": "2014-11-21T14:23:02.206740",
+              "bytes": 0,
+              "name": "sym_obj",
+              "content_type": "text/plain"},
+             {"hash": "etag2",
+              "last_modified": "2014-11-21T14:14:27.409100",
+              "bytes": 32,
+              "name": "normal_obj",
+              "content_type": "text/plain"},
+             {"subdir": "photos/"}]).encode('ascii')
+        chunks = []
+
+        def body_iter():
+            for i in range(0, len(listing_json), 20):
+                chunks.append(i)
+                yield listing_json[i:i + 20]
+
+        self.app.register(
+            'GET', '/v1/a/c?format=json', swob.HTTPOk,
+            {'Content-Type': 'application/json'}, body_iter())
+        req = Request.blank(path='/v1/a/c?format=json')
+        captured = []
+        resp_iter = self.sym(
+            req.environ, lambda *args: captured.extend(args[:2]))
+        self.assertEqual('200 OK', captured[0])
+        self.assertNotIn('Content-Length', dict(captured[1]))
+        # only the first record is read before the listing is sent on
+        self.assertLess(len(chunks), len(listing_json) // 20)
+        obj_list = json.loads(b''.join(resp_iter))
+        self.assertEqual('/v1/a/c/o', obj_list[0]['symlink_path'])
+        self.assertEqual('etag', obj_list[0]['hash'])
+        self.assertNotIn('symlink_path', obj_list[1])
+        self.assertEqual({'subdir': 'photos/'}, obj_list[2])
+
+        # and through listing_formats
+        self.app.register(
+            'GET', '/v1/a/c?format=json', swob.HTTPOk,
+            {'Content-Type': 'application/json'}, body_iter())
+        self.lf = listing_formats.filter_factory({})(self.sym)
+        req = Request.blank(path='/v1/a/c?format=txt')
+        status, headers, body = self.call_app(req, app=self.lf)
+        self.assertEqual(status, '200 OK')
+        self.assertNotIn('Content-Length', headers)
+        self.assertEqual(b'sym_obj\nnormal_obj\nphotos/\n', body)
+
     def test_get_container_with_subdir(self):
         self.app.register(
             'GET',
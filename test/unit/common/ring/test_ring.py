@@ -18,6 +18,7 @@ import collections
 from gzip import GzipFile
 import hashlib
 import json
+import mmap
 import os
 import unittest
 import stat
@@ -100,6 +101,80 @@ class TestRingData(unittest.TestCase):
         rd2 = ring.RingData.load(ring_fname)
         self.assert_ring_data_equal(rd, rd2)
 
+    def test_mmap_roundtrip(self):
+        ring_fname = os.path.join(self.testdir, 'foo.ring.gz')
+        mmap_fname = ring.ring.get_mmap_ring_path(ring_fname)
+        self.assertEqual(os.path.join(self.testdir, 'foo.ring.mmap'),
+                         mmap_fname)
+        for dev_id_bytes, type_code in ((2, 'H'), (4, 'I')):
+            rd = ring.RingData(
+                [array.array(type_code, [0, 1, 0, 1]),
+                 array.array(type_code, [1, 0, 1, 0]),
+                 array.array(type_code, [1, 0])],
+                [
+                    {'id': 0, 'region': 1, 'zone': 0},
+                    {'id': 1, 'region': 1, 'zone': 1},
+                ],
+                30, next_part_power=3, version=7)
+            rd.save(ring_fname, format_version=2)
+            rd.save_mmap(mmap_fname, ring_fname)
+
+            with open(mmap_fname, 'rb') as fp:
+                self.assertEqual(ring.ring.MMAP_RING_MAGIC, fp.read(8))
+                meta_len, = struct.unpack('!Q', fp.read(8))
+                meta = json.loads(fp.read(meta_len))
+            # assignments are page-aligned in the file
+            self.assertEqual(0, meta['table_offset'] % mmap.PAGESIZE)
+            self.assertEqual(meta['table_offset'] + 10 * dev_id_bytes,
+                             os.path.getsize(mmap_fname))
+            rd2 = ring.RingData.load_mmap(mmap_fname)
+            self.assert_ring_data_equal(rd, rd2)
+            self.assertEqual(dev_id_bytes, rd2.dev_id_bytes)
+            self.assertEqual(2, rd2.format_version)
+            loaded = ring.RingData.load(ring_fname)
+            self.assertEqual(loaded.size, rd2.size)
+            self.assertEqual(loaded.raw_size, rd2.raw_size)
+            for row in rd2._replica2part2dev_id:
+                self.assertIsInstance(row, memoryview)
+                self.assertTrue(row.readonly)
+
+            # checksum of the source ring is verified when asked
+            checksum = ring.ring._file_checksum(ring_fname)
+            ring.RingData.load_mmap(mmap_fname, source_checksum=checksum)
+            with self.assertRaises(ValueError) as caught:
+                ring.RingData.load_mmap(mmap_fname, source_checksum='bad')
+            self.assertIn('was not written from the current ring',
+                          str(caught.exception))
+
+    def test_mmap_bad_files(self):
+        ring_fname = os.path.join(self.testdir, 'foo.ring.gz')
+        mmap_fname = os.path.join(self.testdir, 'foo.ring.mmap')
+        rd = ring.RingData(
+            [array.array('H', [0, 1, 0, 1]), array.array('H', [0, 1, 0, 1])],
+            [{'id': 0, 'region': 1, 'zone': 0},
+             {'id': 1, 'region': 1, 'zone': 1}],
+            30)
+        rd.save(ring_fname)
+        with self.assertRaises(ValueError) as caught:
+            ring.RingData.load_mmap(ring_fname)
+        self.assertIn('unexpected magic', str(caught.exception))
+
+        with mock.patch.object(sys, 'byteorder',
+                               'big' if sys.byteorder == 'little'
+                               else 'little'):
+            rd.save_mmap(mmap_fname, ring_fname)
+        with self.assertRaises(ValueError) as caught:
+            ring.RingData.load_mmap(mmap_fname)
+        self.assertIn('unexpected byteorder', str(caught.exception))
+
+        # writes are atomic; failures leave nothing behind
+        os.unlink(mmap_fname)
+        with mock.patch('swift.common.ring.ring.os.fsync',
+                        side_effect=OSError('oops')):
+            with self.assertRaises(OSError):
+                rd.save_mmap(mmap_fname, ring_fname)
+        self.assertEqual(['foo.ring.gz'], os.listdir(self.testdir))
+
     def test_load_closes_file(self):
         ring_fname = os.path.join(self.testdir, 'foo.ring.gz')
         rd = ring.RingData(
@@ -598,6 +673,67 @@ class TestRing(TestRingBase):
         self.assertEqual(len(self.ring.devs), 9)
         self.assertNotEqual(self.ring._mtime, orig_mtime)
 
+    def test_mmap_sidecar(self):
+        rd = ring.RingData.load(self.testgz)
+        rd.save_mmap(self.ring.mmap_path, self.testgz)
+        self.assertEqual(os.path.join(self.testdir, 'whatever.ring.mmap'),
+                         self.ring.mmap_path)
+        # the sidecar showing up counts as a change
+        self.assertTrue(self.ring.has_changed())
+
+        r = ring.Ring(self.testdir, ring_name='whatever')
+        self.assertFalse(r.has_changed())
+        for row in r._replica2part2dev_id:
+            self.assertIsInstance(row, memoryview)
+        self.assertEqual(r._replica2part2dev_id,
+                         self.intended_replica2part2dev_id)
+        self.assertEqual(r.devs, self.intended_devs)
+        self.assertEqual(r.size, self.ring.size)
+        self.assertEqual(r.raw_size, self.ring.raw_size)
+        for part in range(r.partition_count):
+            self.assertEqual(r.get_part_nodes(part),
+                             self.ring.get_part_nodes(part))
+            self.assertEqual(list(r.get_more_nodes(part)),
+                             list(self.ring.get_more_nodes(part)))
+
+        # ring file updated without the sidecar; sidecar is ignored
+        self.intended_devs[0]['ip'] = '10.9.9.9'
+        ring.RingData(
+            self.intended_replica2part2dev_id,
+            self.intended_devs, self.intended_part_shift,
+        ).save(self.testgz, format_version=self.FORMAT_VERSION)
+        os.utime(self.testgz, (time() + 60, time() + 60))
+        r._reload(force=True)
+        for row in r._replica2part2dev_id:
+            self.assertIsInstance(row, array.array)
+        self.assertEqual('10.9.9.9', r.devs[0]['ip'])
+
+        # once the sidecar catches up, reload remaps it
+        old_rows = r._replica2part2dev_id
+        ring.RingData.load(self.testgz).save_mmap(r.mmap_path, self.testgz)
+        os.utime(r.mmap_path, (time() + 120, time() + 120))
+        self.assertTrue(r.has_changed())
+        r._rtime = 0
+        self.assertEqual('10.9.9.9', r.devs[0]['ip'])
+        self.assertIsNot(old_rows, r._replica2part2dev_id)
+        for row in r._replica2part2dev_id:
+            self.assertIsInstance(row, memoryview)
+
+        # garbage sidecar; fall back to the ring file
+        with open(r.mmap_path, 'wb') as fp:
+            fp.write(b'garbage')
+        r._reload(force=True)
+        for row in r._replica2part2dev_id:
+            self.assertIsInstance(row, array.array)
+        self.assertEqual(r._replica2part2dev_id,
+                         self.intended_replica2part2dev_id)
+
+        # sidecar removed
+        os.unlink(r.mmap_path)
+        self.assertTrue(r.has_changed())
+        r._reload(force=True)
+        self.assertFalse(r.has_changed())
+
     def test_reload_without_replication(self):
         replication_less_devs = [{'id': 0, 'region': 0, 'zone': 0,
                                   'weight': 1.0, 'ip': '10.1.1.1',
@@ -651,6 +787,38 @@ class TestRing(TestRingBase):
         part, nodes = self.ring.get_nodes('a')
         self.assertEqual(nodes, self.ring.get_part_nodes(part))
 
+    def test_get_parts_many(self):
+        names = [('a', None, None), ('a1', None, None), ('a', 'c1', None),
+                 ('a', 'c0', None), ('a', 'c', 'o1'), ('a', 'c', 'o5'),
+                 ('a', 'c', 'o0'), (b'a', b'c', b'o0'),
+                 ('a', 'c', u'\N{SNOWMAN}'), ('a', '', None)]
+        self.assertEqual([self.ring.get_part(*name) for name in names],
+                         self.ring.get_parts_many(names))
+        self.assertEqual([], self.ring.get_parts_many([]))
+        # generators are fine, too
+        self.assertEqual([self.ring.get_part(*name) for name in names],
+                         self.ring.get_parts_many(iter(names)))
+
+        with self.assertRaises(ValueError):
+            self.ring.get_parts_many([('a', None, 'o')])
+
+        with mock.patch.object(self.ring, '_reload') as mock_reload:
+            self.ring._rtime = 0
+            self.ring.get_parts_many(names)
+        self.assertEqual([mock.call()], mock_reload.mock_calls)
+
+    def test_get_nodes_many(self):
+        names = [('a', 'c', 'o%d' % i) for i in range(20)]
+        results = self.ring.get_nodes_many(names)
+        self.assertEqual([self.ring.get_nodes(*name) for name in names],
+                         results)
+        # node lists are shared between names in the same partition
+        by_part = {}
+        for part, nodes in results:
+            self.assertIs(by_part.setdefault(part, nodes), nodes)
+        self.assertEqual(len(by_part), len(set(
+            id(nodes) for _part, nodes in results)))
+
     def test_get_nodes(self):
         # Yes, these tests are deliberately very fragile. We want to make sure
         # that if someones changes the results the ring produces, they know it.
@@ -30,7 +30,7 @@ import time
 import random
 from unittest.mock import patch, MagicMock
 
-from swift.common.concurrency import Timeout
+from swift.common.concurrency import GreenPool, sleep, Timeout
 
 import swift.common.db
 from swift.common.constraints import \
@@ -38,12 +38,13 @@ from swift.common.constraints import \
 from swift.common.db import chexor, dict_factory, get_db_connection, \
     DatabaseBroker, DatabaseConnectionError, DatabaseAlreadyExists, \
     GreenDBConnection, PICKLE_PROTOCOL, zero_like, TombstoneReclaimer
-from swift.common.utils import mkdirs, md5
+from swift.common.utils import mkdirs, md5, lock_parent_directory
 from swift.common.utils.pickle import unpickle
 from swift.common.utils.timestamp import Timestamp, NormalTimestamp
 from swift.common.exceptions import LockTimeout
 from swift.common.swob import HTTPException
 
+from test.debug_logger import debug_logger
 from test.unit import make_timestamp_iter, generate_db_path, \
     BaseUnitTestCase, mock_normal_timestamp_now
 
@@ -102,6 +103,69 @@ class TestDictFactory(unittest.TestCase):
                          {'one': 'def', 'two': 456})
 
 
+class TestPendingRecords(unittest.TestCase):
+
+    def test_encode_decode(self):
+        record = ('o\u00e9', '1234567890.12345', 1 << 40, '', None, -1)
+        entry = swift.common.db.encode_pending_record('SSISSI', record)
+        self.assertEqual(b'\x01\x01\x06', entry[:3])
+        self.assertEqual(record, swift.common.db.decode_pending_record(
+            'SSISSI', entry))
+        # bytes are decoded as utf-8
+        entry = swift.common.db.encode_pending_record(
+            'SI', (b'o\xc3\xa9', 0))
+        self.assertEqual(('o\u00e9', 0),
+                         swift.common.db.decode_pending_record('SI', entry))
+        # a broker may add fields...
+        self.assertEqual(('o\u00e9', 0),
+                         swift.common.db.decode_pending_record('SIS', entry))
+        # ...but can't drop them
+        with self.assertRaises(ValueError) as cm:
+            swift.common.db.decode_pending_record('S', entry)
+        self.assertIn('with 2 fields', str(cm.exception))
+
+    def test_encode_invalid(self):
+        for fields, record in (
+                ('SI', ('o',)),
+                ('SI', ('o', None)),
+                ('SI', ('o', '0')),
+                ('SI', ('o', 1 << 64)),
+                ('SI', (1, 0))):
+            with self.assertRaises(ValueError):
+                swift.common.db.encode_pending_record(fields, record)
+
+    def test_decode_invalid(self):
+        entry = swift.common.db.encode_pending_record('SI', ('o', 0))
+        for bad in (entry[:-1], entry + b'x', entry[:5],
+                    entry[:1] + b'\x02' + entry[2:]):
+            with self.assertRaises(ValueError):
+                swift.common.db.decode_pending_record('SI', bad)
+
+    def test_split_pending_entries(self):
+        binary = [swift.common.db.encode_pending_record('SI', (name, 0))
+                  for name in ('a:b', '\x01', 'c')]
+        legacy = [base64.b64encode(pickle.dumps(('d', 0))),
+                  base64.b64encode(pickle.dumps(('e', 0)))]
+        data = b''.join((b':', legacy[0], binary[0], binary[1], b':',
+                         legacy[1], binary[2]))
+        self.assertEqual([legacy[0], binary[0], binary[1], legacy[1],
+                          binary[2]],
+                         list(swift.common.db.split_pending_entries(data)))
+        self.assertEqual([], list(swift.common.db.split_pending_entries(
+            b'::')))
+
+    def test_split_pending_entries_truncated(self):
+        entry = swift.common.db.encode_pending_record('SI', ('obj', 2))
+        legacy = base64.b64encode(pickle.dumps(('d', 0)))
+        # a torn write is yielded up to the start of the next entry
+        data = entry[:-2] + b':' + legacy + entry
+        self.assertEqual(
+            [entry[:-2], legacy, entry],
+            list(swift.common.db.split_pending_entries(data)))
+        self.assertEqual([entry[:-2]], list(
+            swift.common.db.split_pending_entries(entry[:-2])))
+
+
 class TestChexor(BaseUnitTestCase):
 
     def test_normal_case(self):
@@ -1664,6 +1728,175 @@ class TestDatabaseBroker(TestDbBase):
             pending = fd.read()
         self.assertFalse(pending)
 
+    def test_put_record_group_commit(self):
+        db_file = os.path.join(self.testdir, '1.db')
+        broker = DatabaseBroker(db_file)
+        broker._initialize = MagicMock()
+        broker.initialize(Timestamp.now())
+        logger = debug_logger()
+
+        def make_broker():
+            broker = DatabaseBroker(db_file, logger=logger)
+            broker.make_tuple_for_pickle = lambda x: x.upper()
+            return broker
+
+        pool = GreenPool()
+        with patch.object(swift.common.db, 'GROUP_COMMIT_WINDOW', 0.01), \
+                patch('swift.common.db.lock_parent_directory',
+                      side_effect=lock_parent_directory) as mock_lock:
+            for name in ('pinky', 'perky', 'winky'):
+                pool.spawn(make_broker().put_record, name)
+            pool.waitall()
+            # a later record starts a new group
+            make_broker().put_record('blinky')
+        self.assertEqual(2, mock_lock.call_count)
+        with open(broker.pending_file, 'rb') as fd:
+            pending = fd.read()
+        items = pending.split(b':')
+        self.assertEqual(['PINKY', 'PERKY', 'WINKY', 'BLINKY'],
+                         [unpickle(base64.b64decode(i), encoding='utf8')
+                             for i in items[1:]])
+        self.assertEqual({'pending.batches': 2, 'pending.records': 4,
+                          'pending.deduped': 0},
+                         logger.statsd_client.get_stats_counts())
+        self.assertEqual(
+            2, len(logger.statsd_client.calls['timing_since']))
+        self.assertFalse(swift.common.db._pending_groups)
+
+    def test_put_record_group_commit_above_cap(self):
+        db_file = os.path.join(self.testdir, '1.db')
+        broker = DatabaseBroker(db_file)
+        broker._initialize = MagicMock()
+        broker.initialize(Timestamp.now())
+        with open(broker.pending_file, 'wb') as fd:
+            fd.write(b'x' * (swift.common.db.PENDING_CAP + 1))
+
+        brokers = [DatabaseBroker(db_file, logger=debug_logger())
+                   for _ in range(3)]
+        pool = GreenPool()
+        with patch.object(swift.common.db, 'GROUP_COMMIT_WINDOW', 0.01), \
+                patch.object(DatabaseBroker, '_commit_puts') as mock_commit:
+            for broker, name in zip(brokers, ('pinky', 'perky', 'winky')):
+                pool.spawn(broker.put_record, name)
+            pool.waitall()
+        # one merge for the whole group
+        mock_commit.assert_called_once_with(['pinky', 'perky', 'winky'])
+
+    def test_put_record_group_commit_error(self):
+        db_file = os.path.join(self.testdir, '1.db')
+        broker = DatabaseBroker(db_file)
+        broker._initialize = MagicMock()
+        broker.initialize(Timestamp.now())
+
+        results = []
+
+        def put_record(name):
+            broker = DatabaseBroker(db_file, logger=debug_logger())
+            try:
+                broker.put_record(name)
+            except LockTimeout as err:
+                results.append((name, err))
+
+        pool = GreenPool()
+        with patch.object(swift.common.db, 'GROUP_COMMIT_WINDOW', 0.01), \
+                patch('swift.common.db.lock_parent_directory',
+                      side_effect=LockTimeout(None, broker.pending_file)):
+            for name in ('pinky', 'perky'):
+                pool.spawn(put_record, name)
+            pool.waitall()
+        # every broker in the group sees the error
+        self.assertEqual(['pinky', 'perky'], [name for name, _ in results])
+        self.assertFalse(os.path.exists(broker.pending_file))
+        self.assertFalse(swift.common.db._pending_groups)
+
+    def test_put_record_group_commit_uncontended(self):
+        db_file = os.path.join(self.testdir, '1.db')
+        broker = DatabaseBroker(db_file, logger=debug_logger())
+        broker._initialize = MagicMock()
+        broker.initialize(Timestamp.now())
+
+        broker.make_tuple_for_pickle = lambda x: x.upper()
+
+        # with no other writers waiting the window isn't slept
+        with patch.object(swift.common.db, 'GROUP_COMMIT_WINDOW', 10), \
+                patch('swift.common.db.sleep') as mock_sleep:
+            broker.put_record('pinky')
+        mock_sleep.assert_called_once_with(0)
+        with open(broker.pending_file, 'rb') as fd:
+            self.assertTrue(fd.read())
+        self.assertFalse(swift.common.db._pending_groups)
+
+    def test_put_record_group_commit_leader_killed(self):
+        db_file = os.path.join(self.testdir, '1.db')
+        broker = DatabaseBroker(db_file)
+        broker._initialize = MagicMock()
+        broker.initialize(Timestamp.now())
+
+        results = []
+
+        def put_record(name):
+            broker = DatabaseBroker(db_file, logger=debug_logger())
+            try:
+                broker.put_record(name)
+            except DatabaseConnectionError as err:
+                results.append((name, err))
+
+        pool = GreenPool()
+        with patch.object(swift.common.db, 'GROUP_COMMIT_WINDOW', 10):
+            leader = pool.spawn(put_record, 'pinky')
+            pool.spawn(put_record, 'perky')
+            # let the leader start the window with the follower in its group
+            sleep(0)
+            sleep(0)
+            leader.kill()
+            with Timeout(1):
+                pool.waitall()
+        # the follower isn't left waiting and doesn't think it worked
+        self.assertEqual(['perky'], [name for name, _ in results])
+        self.assertIn('group commit was interrupted', str(results[0][1]))
+        self.assertFalse(os.path.exists(broker.pending_file))
+        self.assertFalse(swift.common.db._pending_groups)
+
+    def test_put_record_binary_pending(self):
+        db_file = os.path.join(self.testdir, '1.db')
+        broker = DatabaseBroker(db_file)
+        broker._initialize = MagicMock()
+        broker.initialize(Timestamp.now())
+        broker.make_tuple_for_pickle = lambda x: (x, len(x))
+
+        broker.put_record('pinky')
+        with patch.object(swift.common.db, 'BINARY_PENDING', True):
+            # brokers that don't define pending_fields write pickles
+            broker.put_record('perky')
+            broker.pending_fields = 'SI'
+            broker.put_record('winky')
+            # as do brokers with records that don't match pending_fields
+            broker.make_tuple_for_pickle = lambda x: (x, None)
+            broker.put_record('blinky')
+        with open(broker.pending_file, 'rb') as fd:
+            pending = fd.read()
+        self.assertEqual(b''.join(
+            [b':' + base64.b64encode(pickle.dumps(
+                ('pinky', 5), protocol=PICKLE_PROTOCOL)),
+             b':' + base64.b64encode(pickle.dumps(
+                 ('perky', 5), protocol=PICKLE_PROTOCOL)),
+             swift.common.db.encode_pending_record('SI', ('winky', 5)),
+             b':' + base64.b64encode(pickle.dumps(
+                 ('blinky', None), protocol=PICKLE_PROTOCOL))]), pending)
+
+        loaded = []
+        broker._commit_puts_load = lambda item_list, entry: loaded.append(
+            entry)
+        broker.merge_items = MagicMock()
+        with open(broker.pending_file, 'ab') as fd:
+            fd.write(b'\x01junk')
+        broker.logger = debug_logger()
+        broker._commit_puts()
+        self.assertEqual([('pinky', 5), ('perky', 5), ('winky', 5),
+                          ('blinky', None)], loaded)
+        self.assertEqual(1, len(broker.logger.get_lines_for_level('error')))
+        self.assertEqual(0, os.path.getsize(broker.pending_file))
+
 
 class TestTombstoneReclaimer(TestDbBase):
     def _make_object(self, broker, obj_name, ts, deleted):
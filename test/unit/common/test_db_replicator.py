@@ -12,6 +12,7 @@
 # implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import base64
 import shutil
 import unittest
 from contextlib import contextmanager
@@ -33,7 +34,7 @@ from swift.common.db_replicator import BrokerAnnotatedLogger
 from swift.container.backend import DATADIR
 from swift.common import db_replicator
 from swift.common.utils import (hash_path, storage_directory, Timestamp, quote,
-                                mkdirs, listdir)
+                                mkdirs, listdir, md5, load_recon_cache)
 from swift.common.exceptions import DriveNotMounted
 from swift.common.swob import HTTPException
 
@@ -469,6 +470,13 @@ class TestDBReplicator(unittest.TestCase):
         replicator = ConcreteReplicator({'databases_per_second': '0.1'})
         self.assertEqual(replicator.node_timeout, 10)
         self.assertEqual(replicator.databases_per_second, 0.1)
+        self.assertEqual(replicator.replicator_workers, 0)
+        self.assertFalse(replicator.adaptive_concurrency)
+
+        replicator = ConcreteReplicator({'replicator_workers': '4',
+                                         'adaptive_concurrency': 'yes'})
+        self.assertEqual(replicator.replicator_workers, 4)
+        self.assertTrue(replicator.adaptive_concurrency)
 
     def test_repl_connection(self):
         node = {'replication_ip': '127.0.0.1', 'replication_port': 80,
@@ -814,7 +822,7 @@ class TestDBReplicator(unittest.TestCase):
             'Removed 0 dbs',
             '0 successes, 0 failures',
             'diff:0 diff_capped:0 empty:0 hashmatch:0 no_change:0 '
-            'remote_merge:0 rsync:0 ts_repl:0',
+            'page_sync:0 pages_sent:0 remote_merge:0 rsync:0 ts_repl:0',
         ])
         self.assertEqual(1, len(mock_recon_cache.mock_calls))
         self.assertEqual(mock_recon_cache.mock_calls[0][1][0], {
@@ -836,6 +844,8 @@ class TestDBReplicator(unittest.TestCase):
             'empty': 7,
             'hashmatch': 8,
             'no_change': 6,
+            'page_sync': 1,
+            'pages_sent': 11,
             'remote_merge': 2,
             'rsync': 3,
             'ts_repl': 10,
@@ -848,7 +858,7 @@ class TestDBReplicator(unittest.TestCase):
             'Removed 9 dbs',
             '25 successes, 1 failures',
             'diff:5 diff_capped:4 empty:7 hashmatch:8 no_change:6 '
-            'remote_merge:2 rsync:3 ts_repl:10',
+            'page_sync:1 pages_sent:11 remote_merge:2 rsync:3 ts_repl:10',
         ])
         self.assertEqual(1, len(mock_recon_cache.mock_calls))
         self.assertEqual(mock_recon_cache.mock_calls[0][1][0], {
@@ -1557,6 +1567,49 @@ class TestDBReplicator(unittest.TestCase):
             self.assertEqual('204 No Content', response.status)
             self.assertEqual(204, response.status_int)
 
+    def test_page_sync_rpcs(self):
+        rpc = db_replicator.ReplicatorRpc(self.temp_dir, 'data', FakeBroker,
+                                          mount_check=False)
+        db_file = os.path.join(self.temp_dir, 'db.db')
+        tmp_file = os.path.join(self.temp_dir, 'drive', 'tmp', 'local_id')
+        pages = [b'a' * 16, b'b' * 16, b'c' * 16]
+        with open(db_file, 'wb') as fp:
+            fp.write(b''.join(pages))
+
+        resp = rpc.page_hashes('drive', db_file, ['local_id', 16])
+        self.assertEqual(200, resp.status_int)
+        digests = base64.b64decode(json.loads(resp.body)['hashes'])
+        self.assertEqual(
+            b''.join(md5(page, usedforsecurity=False).digest()[:8]
+                     for page in pages), digests)
+        with open(tmp_file, 'rb') as fp:
+            self.assertEqual(b''.join(pages), fp.read())
+
+        # the remote changes a page, adds one and drops the last
+        new_db = pages[0] + b'x' * 16
+        resp = rpc.merge_pages('drive', db_file, [
+            'local_id', 16, [(1, base64.b64encode(b'x' * 16).decode())]])
+        self.assertEqual(202, resp.status_int)
+        resp = rpc.check_pages('drive', db_file, [
+            'local_id', 32, md5(new_db, usedforsecurity=False).hexdigest()])
+        self.assertEqual(204, resp.status_int)
+        with open(tmp_file, 'rb') as fp:
+            self.assertEqual(new_db, fp.read())
+
+        # a mismatch removes the tmp file
+        resp = rpc.check_pages('drive', db_file, [
+            'local_id', 32, md5(b'', usedforsecurity=False).hexdigest()])
+        self.assertEqual(409, resp.status_int)
+        self.assertFalse(os.path.exists(tmp_file))
+        resp = rpc.merge_pages('drive', db_file, ['local_id', 16, []])
+        self.assertEqual(404, resp.status_int)
+        resp = rpc.check_pages('drive', db_file, ['local_id', 0, ''])
+        self.assertEqual(404, resp.status_int)
+
+        os.unlink(db_file)
+        resp = rpc.page_hashes('drive', db_file, ['local_id', 16])
+        self.assertEqual(404, resp.status_int)
+
     def test_complete_rsync_db_exists(self):
         rpc = db_replicator.ReplicatorRpc('/', '/', FakeBroker,
                                           mount_check=False)
@@ -2177,7 +2230,7 @@ class TestHandoffsOnly(unittest.TestCase):
                 patch.object(replicator, 'ring', self.FakeRing3Nodes()):
             replicator.run_once()
 
-        self.assertEqual(sorted(mock_repl.mock_calls), [
+        self.assertEqual(sorted(mock_repl.call_args_list), [
             mock.call('1', os.path.join(
                 self.root, 'sdp', 'containers', '1', '98d',
                 'abababab2b5368158355e799323b498d',
@@ -2200,7 +2253,7 @@ class TestHandoffsOnly(unittest.TestCase):
                 patch.object(replicator, 'ring', self.FakeRing3Nodes()):
             replicator.run_once(partitions="0,2")
 
-        self.assertEqual(sorted(mock_repl.mock_calls), [
+        self.assertEqual(sorted(mock_repl.call_args_list), [
             mock.call('0', os.path.join(
                 self.root, 'sdp', 'containers', '0', '220',
                 '010101013cf2b7979af9eaa71cb67220',
@@ -2223,7 +2276,7 @@ class TestHandoffsOnly(unittest.TestCase):
                 patch.object(replicator, 'ring', self.FakeRing3Nodes()):
             replicator.run_once(devices="sdp")
 
-        self.assertEqual(sorted(mock_repl.mock_calls), [
+        self.assertEqual(sorted(mock_repl.call_args_list), [
             mock.call('0', os.path.join(
                 self.root, 'sdp', 'containers', '0', '220',
                 '010101013cf2b7979af9eaa71cb67220',
@@ -2246,13 +2299,259 @@ class TestHandoffsOnly(unittest.TestCase):
                 patch.object(replicator, 'ring', self.FakeRing3Nodes()):
             replicator.run_once(partitions="0,2", devices="sdp")
 
-        self.assertEqual(sorted(mock_repl.mock_calls), [
+        self.assertEqual(sorted(mock_repl.call_args_list), [
             mock.call('0', os.path.join(
                 self.root, 'sdp', 'containers', '0', '220',
                 '010101013cf2b7979af9eaa71cb67220',
                 '010101013cf2b7979af9eaa71cb67220.db'), 0)])
 
 
+class TestDeviceConcurrency(unittest.TestCase):
+    def test_limit(self):
+        device = db_replicator.DeviceConcurrency(2)
+        device.acquire()
+        device.acquire()
+        self.assertEqual(2, device.in_flight)
+        acquired = []
+
+        def acquire():
+            device.acquire()
+            acquired.append(True)
+
+        thread = eventlet.spawn(acquire)
+        eventlet.sleep(0)
+        self.assertEqual([], acquired)
+        device.release(True, 0.1)
+        thread.wait()
+        self.assertEqual([True], acquired)
+        self.assertEqual(2, device.in_flight)
+
+        idle = eventlet.spawn(device.wait_idle)
+        device.release(False, 0.1)
+        eventlet.sleep(0)
+        self.assertFalse(idle.dead)
+        device.release(True, 0.1)
+        idle.wait()
+        self.assertEqual(0, device.in_flight)
+        self.assertEqual(3, device.attempted)
+        self.assertEqual(2, device.success)
+        self.assertEqual(1, device.failure)
+        # the limit only changes when adaptive
+        self.assertEqual(2, device.limit)
+        self.assertIsNone(device.latency)
+
+    def test_adaptive_limit(self):
+        device = db_replicator.DeviceConcurrency(8, adaptive=True)
+        for _ in range(20):
+            device.acquire()
+            device.release(True, 0.1)
+        self.assertEqual(8, device.limit)
+        self.assertAlmostEqual(0.1, device.latency)
+
+        # latency rising tenfold leaves the device only one or two dbs at once
+        for _ in range(50):
+            device.acquire()
+            device.release(True, 1.0)
+        self.assertLess(device.limit, 2)
+        self.assertGreaterEqual(device.limit, 1)
+        self.assertAlmostEqual(0.1, device.min_latency)
+
+        # and the limit recovers along with the latency
+        for _ in range(50):
+            device.acquire()
+            device.release(True, 0.1)
+        self.assertEqual(8, device.limit)
+
+        progress = device.to_recon()
+        self.assertEqual({'attempted': 120, 'success': 120, 'failure': 0},
+                         progress['replication_stats'])
+        self.assertEqual(8, progress['concurrency'])
+        self.assertAlmostEqual(0.1, progress['latency'], places=3)
+        self.assertGreaterEqual(progress['replication_last'], device.start)
+
+
+class TestReplicatorWorkers(unittest.TestCase):
+    FakeRing3Nodes = TestHandoffsOnly.FakeRing3Nodes
+    _make_fake_db = TestHandoffsOnly._make_fake_db
+
+    def setUp(self):
+        patcher = patch.object(db_replicator, 'ring', FakeRing())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.root = mkdtemp()
+        self.logger = debug_logger()
+        # part 0 is on sdp and parts 1 and 2 are on sdq
+        self._make_fake_db('sdp', 0, '010101013cf2b7979af9eaa71cb67220')
+        self._make_fake_db('sdq', 1, '02020202e30f696a3cfa63d434a3c94e')
+        self._make_fake_db('sdq', 2, 'bcbcbcbc15d3835053d568c57e2c83b5')
+        self.ring = self.FakeRing3Nodes()
+        self.ring.serialized_path = os.path.join(self.root, 'ring.gz')
+        with open(self.ring.serialized_path, 'w'):
+            pass
+
+    def tearDown(self):
+        rmtree(self.root, ignore_errors=True)
+
+    def _make_replicator(self, **conf):
+        conf.update({'devices': self.root, 'bind_port': 6201,
+                     'mount_check': 'no', 'recon_cache_path': self.root})
+        replicator = ConcreteReplicator(conf, logger=self.logger)
+        replicator.ring = self.ring
+        return replicator
+
+    def test_get_worker_args(self):
+        replicator = self._make_replicator()
+        with patch.object(db_replicator, 'whataremyips',
+                          return_value=['10.0.0.1']):
+            self.assertEqual([], replicator.get_worker_args())
+
+        replicator = self._make_replicator(replicator_workers='4')
+        with patch.object(db_replicator, 'whataremyips',
+                          return_value=['10.0.0.1']):
+            self.assertEqual([
+                {'override_devices': ['sdp'], 'override_partitions': [],
+                 'have_overrides': False, 'multiprocess_worker_index': 0},
+                {'override_devices': ['sdq'], 'override_partitions': [],
+                 'have_overrides': False, 'multiprocess_worker_index': 1},
+            ], replicator.get_worker_args())
+        # no more workers than devices
+        self.assertEqual(2, replicator.replicator_workers)
+        self.assertEqual({'sdp', 'sdq'}, replicator.all_local_devices)
+
+        replicator = self._make_replicator(replicator_workers='4')
+        with patch.object(db_replicator, 'whataremyips',
+                          return_value=['10.0.0.1']):
+            self.assertEqual([
+                {'override_devices': ['sdq'], 'override_partitions': [1],
+                 'have_overrides': True, 'multiprocess_worker_index': 0},
+            ], replicator.get_worker_args(
+                once=True, devices='sdq,sdx', partitions='1'))
+
+        replicator = self._make_replicator(replicator_workers='1')
+        with patch.object(db_replicator, 'whataremyips',
+                          return_value=['10.0.0.1']):
+            self.assertEqual([
+                {'override_devices': ['sdp', 'sdq'], 'override_partitions': [],
+                 'have_overrides': False, 'multiprocess_worker_index': 0},
+            ], replicator.get_worker_args())
+
+    def test_run_once_workers(self):
+        def run_worker(index, devices, have_overrides=False):
+            replicator = self._make_replicator(replicator_workers='2')
+            with patch.object(db_replicator, 'whataremyips',
+                              return_value=['10.0.0.1']), \
+                    patch.object(replicator, '_replicate_object',
+                                 return_value=(True, [])) as mock_repl:
+                replicator.run_once(multiprocess_worker_index=index,
+                                    override_devices=devices,
+                                    have_overrides=have_overrides)
+            return mock_repl
+
+        rcache = os.path.join(self.root, 'container.recon')
+        mock_repl = run_worker(0, ['sdq'], have_overrides=True)
+        self.assertEqual(2, mock_repl.call_count)
+        self.assertFalse(os.path.exists(rcache))
+
+        mock_repl = run_worker(0, ['sdq'])
+        self.assertEqual(['1', '2'], sorted(
+            c[0][0] for c in mock_repl.call_args_list))
+        self.assertEqual(1, len([
+            line for line in self.logger.get_lines_for_level('info')
+            if line.startswith('[worker 1/2 pid=%d] Replicated 2 dbs on sdq '
+                               'in ' % os.getpid())]))
+        recon = load_recon_cache(rcache)
+        # workers only record the progress of their own devices
+        self.assertEqual(['replication_per_disk'], list(recon))
+        self.assertEqual(['sdq'], list(recon['replication_per_disk']))
+        progress = recon['replication_per_disk']['sdq']
+        self.assertEqual({'attempted': 2, 'success': 2, 'failure': 0},
+                         progress['replication_stats'])
+        self.assertEqual(8, progress['concurrency'])
+
+        # which the parent aggregates once every device has reported
+        replicator = self._make_replicator(replicator_workers='2')
+        with patch.object(db_replicator, 'whataremyips',
+                          return_value=['10.0.0.1']):
+            replicator.get_worker_args()
+        replicator.post_multiprocess_run()
+        self.assertEqual(['replication_per_disk'],
+                         list(load_recon_cache(rcache)))
+
+        run_worker(1, ['sdp'])
+        replicator.post_multiprocess_run()
+        recon = load_recon_cache(rcache)
+        per_disk = recon['replication_per_disk']
+        self.assertEqual({'attempted': 3, 'success': 3, 'failure': 0},
+                         recon['replication_stats'])
+        self.assertEqual(max(per_disk['sdp']['replication_time'],
+                             per_disk['sdq']['replication_time']),
+                         recon['replication_time'])
+        self.assertEqual(min(per_disk['sdp']['replication_last'],
+                             per_disk['sdq']['replication_last']),
+                         recon['replication_last'])
+
+        # devices that are no longer local are removed
+        replicator.all_local_devices = {'sdp'}
+        replicator.post_multiprocess_run()
+        recon = load_recon_cache(rcache)
+        self.assertEqual(['sdp'], list(recon['replication_per_disk']))
+        self.assertEqual({'attempted': 1, 'success': 1, 'failure': 0},
+                         recon['replication_stats'])
+
+    def test_run_once_adaptive_concurrency(self):
+        replicator = self._make_replicator(adaptive_concurrency='yes',
+                                           concurrency='4')
+        in_flight = {0: [], 1: []}
+        # dbs on sdq get slow to replicate
+        sdq_delays = iter([0.001] * 4 + [0.03] * 8)
+
+        def fake_replicate(part, object_file, node_id):
+            in_flight[node_id].append(
+                replicator._device_concurrency[node_id].in_flight)
+            eventlet.sleep(next(sdq_delays) if node_id else 0.001)
+            return True, []
+
+        for i in range(10):
+            self._make_fake_db('sdq', 1, '%032x' % i)
+        with patch.object(db_replicator, 'whataremyips',
+                          return_value=['10.0.0.1']), \
+                patch.object(replicator, '_replicate_object',
+                             side_effect=fake_replicate):
+            replicator.run_once()
+        self.assertEqual(1, len(in_flight[0]))
+        self.assertEqual(12, len(in_flight[1]))
+        self.assertLessEqual(max(in_flight[1]), 4)
+        sdp, sdq = (replicator._device_concurrency[node_id]
+                    for node_id in (0, 1))
+        self.assertEqual(4, sdp.limit)
+        self.assertLess(sdq.limit, 4)
+        self.assertEqual({'attempted': 12, 'success': 12, 'failure': 0},
+                         sdq.to_recon()['replication_stats'])
+
+    def test_is_healthy(self):
+        replicator = self._make_replicator(replicator_workers='2')
+        with patch.object(db_replicator, 'whataremyips',
+                          return_value=['10.0.0.1']):
+            replicator.get_worker_args()
+            self.assertTrue(replicator.is_healthy())
+            # the local devices are only checked when the ring changes
+            self.ring.devs = self.ring.devs[::2]
+            self.assertTrue(replicator.is_healthy())
+            os.utime(self.ring.serialized_path, (0, 0))
+            self.assertFalse(replicator.is_healthy())
+
+    def test_is_healthy_updates_recon(self):
+        replicator = self._make_replicator(replicator_workers='2')
+        with patch.object(replicator, 'aggregate_recon_update',
+                          return_value={'replication_last': 1}):
+            self.assertTrue(replicator.is_healthy())
+            self.assertEqual({}, load_recon_cache(replicator.rcache))
+            replicator._next_rcache_update = time.time() - 1
+            self.assertTrue(replicator.is_healthy())
+        self.assertEqual({'replication_last': 1},
+                         load_recon_cache(replicator.rcache))
+
+
 class TestReplToNode(BaseUnitTestCase):
     def setUp(self):
         super().setUp()
@@ -1024,6 +1024,88 @@ class TestMemcached(unittest.TestCase):
         self.assertEqual(memcache_client.get('some_key0'), [7, 8, 9])
         self.assertIn(key, mock2.cache)
 
+    def test_get_multi_without_server_key(self):
+        memcache_client = memcached.MemcacheRing(['1.2.3.4:11211',
+                                                  '1.2.3.5:11211'],
+                                                 logger=self.logger)
+        mock1 = MockMemcached()
+        mock2 = MockMemcached()
+        memcache_client._client_cache['1.2.3.4:11211'] = MockedMemcachePool(
+            [(mock1, mock1)] * 2)
+        memcache_client._client_cache['1.2.3.5:11211'] = MockedMemcachePool(
+            [(mock2, mock2)] * 2)
+
+        # MemcacheRing will put 'some_key0' on server 1.2.3.5:11211 and
+        # 'some_key1' and 'some_key2' on '1.2.3.4:11211'
+        memcache_client.set('some_key0', [1, 2, 3])
+        memcache_client.set('some_key1', [4, 5, 6])
+        memcache_client.set('some_key2', [7, 8, 9])
+        self.assertEqual(1, len(mock2.cache))
+        self.assertEqual(2, len(mock1.cache))
+
+        sent = defaultdict(list)
+        for name, mock_conn in (('mock1', mock1), ('mock2', mock2)):
+            orig_sendall = mock_conn.sendall
+
+            def capture(data, name=name, orig_sendall=orig_sendall):
+                sent[name].append(data)
+                return orig_sendall(data)
+            mock_conn.sendall = capture
+
+        self.assertEqual(
+            [[7, 8, 9], None, [1, 2, 3], [4, 5, 6]],
+            memcache_client.get_multi(
+                ('some_key2', 'not_exists', 'some_key0', 'some_key1')))
+        # one pipelined request per server
+        self.assertEqual(1, len(sent['mock1']))
+        self.assertEqual(1, len(sent['mock2']))
+        self.assertEqual(
+            sorted([b'get', memcached.md5hash('some_key1'),
+                    memcached.md5hash('some_key2'),
+                    memcached.md5hash('not_exists')]),
+            sorted(sent['mock1'][0].split()))
+        self.assertEqual(
+            b'get ' + memcached.md5hash('some_key0') + b'\r\n',
+            sent['mock2'][0])
+        self.assertEqual([], memcache_client.get_multi([]))
+        self.assertEqual(
+            ['memcached.get_multi.timing'] * 2,
+            [call[0][0] for call in
+             self.logger.logger.statsd_client.calls['timing_since']
+             if 'get_multi' in call[0][0]])
+
+        # keys whose servers can't be read from are misses
+        mock2.read_return_empty_str = True
+        self.assertEqual(
+            [[7, 8, 9], None, [4, 5, 6]],
+            memcache_client.get_multi(
+                ('some_key2', 'some_key0', 'some_key1')))
+        error_lines = self.logger.get_lines_for_level('error')
+        self.assertEqual(1, len(error_lines))
+        self.assertIn("Error talking to memcached: 1.2.3.5:11211: with "
+                      "key_prefix some_key0, method get_multi",
+                      error_lines[0])
+        self.assertIn("incomplete read", error_lines[0])
+
+    def test_get_multi_without_server_key_fails_over(self):
+        memcache_client = memcached.MemcacheRing(['1.2.3.4:11211',
+                                                  '1.2.3.5:11211'],
+                                                 logger=self.logger)
+        mock1 = ExplodingMockMemcached()
+        mock2 = MockMemcached()
+        memcache_client._client_cache['1.2.3.4:11211'] = MockedMemcachePool(
+            [(mock1, mock1)] * 2)
+        memcache_client._client_cache['1.2.3.5:11211'] = MockedMemcachePool(
+            [(mock2, mock2)] * 2)
+        # with 1.2.3.4 down, set() fails over to 1.2.3.5 and so should
+        # get_multi()
+        memcache_client.set('some_key1', [4, 5, 6])
+        memcache_client.set('some_key0', [1, 2, 3])
+        self.assertEqual(2, len(mock2.cache))
+        self.assertEqual(
+            [[1, 2, 3], [4, 5, 6]],
+            memcache_client.get_multi(('some_key0', 'some_key1')))
+
     def test_serialization(self):
         memcache_client = memcached.MemcacheRing(['1.2.3.4:11211'],
                                                  logger=self.logger)
@@ -1821,5 +1903,159 @@ class TestLoadMemcache(unittest.TestCase):
             memcache._client_cache['6.7.8.9:10'].max_size, 42)
 
 
+class TestLocalCache(unittest.TestCase):
+
+    def test_get_set_delete(self):
+        cache = memcached.LocalCache(10)
+        self.assertIsNone(cache.get('k'))
+        value = {'status': 200, 'meta': {'foo': 'bar'}}
+        self.assertNotIn('k', cache)
+        cache.set('k', value)
+        self.assertIn('k', cache)
+        self.assertEqual(value, cache.get('k'))
+        # each hit gets its own copy
+        got = cache.get('k')
+        got['meta']['foo'] = 'baz'
+        self.assertEqual(value, cache.get('k'))
+        self.assertEqual(1, len(cache))
+        cache.delete('k')
+        self.assertIsNone(cache.get('k'))
+        self.assertEqual(0, len(cache))
+        self.assertEqual(0, cache.current_bytes)
+        cache.delete('k')  # no-op
+
+    def test_bytes_values(self):
+        cache = memcached.LocalCache(10)
+        cache.set('k', b'\x00not json')
+        self.assertEqual(b'\x00not json', cache.get('k'))
+        self.assertEqual(9, cache.current_bytes)
+
+    def test_empty_values_not_cached(self):
+        cache = memcached.LocalCache(10)
+        cache.set('k', {'a': 1})
+        for value in (None, {}, []):
+            cache.set('k', value)
+            self.assertIsNone(cache.get('k'))
+            self.assertEqual(0, len(cache))
+
+    def test_expiry(self):
+        cache = memcached.LocalCache(10, jitter=0.5)
+        with mock.patch('swift.common.memcached.tm.time', return_value=100), \
+                mock.patch('swift.common.memcached.random.random',
+                           return_value=1.0):
+            cache.set('k', [1])
+            cache.set('short', [2], time=2)
+            # memcache time of zero means no particular expiry
+            cache.set('forever', [3], time=0)
+        # jitter brings expiry forward by up to half of each entry's ttl
+        with mock.patch('swift.common.memcached.tm.time', return_value=100.9):
+            self.assertEqual([1], cache.get('k'))
+            self.assertEqual([2], cache.get('short'))
+        with mock.patch('swift.common.memcached.tm.time', return_value=101):
+            self.assertNotIn('short', cache)
+            self.assertIsNone(cache.get('short'))
+            self.assertEqual([1], cache.get('k'))
+            self.assertEqual([3], cache.get('forever'))
+        with mock.patch('swift.common.memcached.tm.time', return_value=105):
+            self.assertIsNone(cache.get('k'))
+            self.assertIsNone(cache.get('forever'))
+        self.assertEqual(0, len(cache))
+        self.assertEqual(0, cache.current_bytes)
+
+        with mock.patch('swift.common.memcached.tm.time', return_value=100), \
+                mock.patch('swift.common.memcached.random.random',
+                           return_value=0.0):
+            cache.set('k', [1])
+        with mock.patch('swift.common.memcached.tm.time', return_value=109.9):
+            self.assertEqual([1], cache.get('k'))
+
+    def test_max_entries(self):
+        cache = memcached.LocalCache(10, max_entries=3)
+        for i in range(3):
+            cache.set('k%d' % i, [i])
+        # touch k0 so k1 is least recently used
+        self.assertEqual([0], cache.get('k0'))
+        cache.set('k3', [3])
+        self.assertEqual(3, len(cache))
+        self.assertIsNone(cache.get('k1'))
+        self.assertEqual([0], cache.get('k0'))
+        self.assertEqual([2], cache.get('k2'))
+        self.assertEqual([3], cache.get('k3'))
+
+    def test_max_bytes(self):
+        cache = memcached.LocalCache(10, max_bytes=20)
+        cache.set('k1', 'x' * 8)  # 10 bytes as JSON
+        cache.set('k2', 'y' * 8)
+        self.assertEqual(20, cache.current_bytes)
+        cache.set('k3', 'z')
+        self.assertIsNone(cache.get('k1'))
+        self.assertEqual('y' * 8, cache.get('k2'))
+        self.assertEqual('z', cache.get('k3'))
+        self.assertEqual(13, cache.current_bytes)
+        # replacing a value accounts for the old one
+        cache.set('k3', 'zz')
+        self.assertEqual(14, cache.current_bytes)
+        # too big to ever fit
+        cache.set('k4', 'w' * 20)
+        self.assertIsNone(cache.get('k4'))
+        self.assertEqual(2, len(cache))
+
+    def test_get_decoded(self):
+        cache = memcached.LocalCache(10, max_entries=2)
+        decoder = mock.MagicMock(side_effect=lambda value: tuple(value))
+        self.assertIsNone(cache.get_decoded('k', decoder))
+        cache.set('k', [1, 2])
+        decoded = cache.get_decoded('k', decoder)
+        self.assertEqual((1, 2), decoded)
+        # only decoded once
+        self.assertIs(decoded, cache.get_decoded('k', decoder))
+        self.assertEqual([mock.call([1, 2])], decoder.call_args_list)
+        # the serialized value is still available
+        self.assertEqual([1, 2], cache.get('k'))
+
+        # decoded again once the value is replaced
+        decoder.reset_mock()
+        cache.set('k', [3])
+        self.assertEqual((3,), cache.get_decoded('k', decoder))
+        self.assertEqual((3,), cache.get_decoded('k', decoder))
+        self.assertEqual([mock.call([3])], decoder.call_args_list)
+
+        # decoded values go when their entry is deleted, evicted or expires
+        cache.delete('k')
+        self.assertIsNone(cache.get_decoded('k', decoder))
+        self.assertEqual({}, cache._decoded)
+        cache.set('k', [4])
+        self.assertEqual((4,), cache.get_decoded('k', decoder))
+        cache.set('k1', [5])
+        cache.set('k2', [6])
+        self.assertIsNone(cache.get_decoded('k', decoder))
+        self.assertEqual({}, cache._decoded)
+        self.assertEqual((5,), cache.get_decoded('k1', decoder))
+        with mock.patch('swift.common.memcached.tm.time',
+                        return_value=time.time() + 11):
+            self.assertIsNone(cache.get_decoded('k1', decoder))
+        self.assertEqual({}, cache._decoded)
+
+    def test_load_local_cache(self):
+        self.assertIsNone(memcached.load_local_cache({}))
+        self.assertIsNone(memcached.load_local_cache(
+            {'local_cache_ttl': '0'}))
+        cache = memcached.load_local_cache({'local_cache_ttl': '2.5'})
+        self.assertIsInstance(cache, memcached.LocalCache)
+        self.assertEqual(2.5, cache.ttl)
+        self.assertEqual(memcached.DEFAULT_LOCAL_CACHE_MAX_ENTRIES,
+                         cache.max_entries)
+        self.assertEqual(memcached.DEFAULT_LOCAL_CACHE_MAX_BYTES,
+                         cache.max_bytes)
+        cache = memcached.load_local_cache({
+            'local_cache_ttl': '5',
+            'local_cache_max_entries': '10',
+            'local_cache_max_bytes': '1000'})
+        self.assertEqual(10, cache.max_entries)
+        self.assertEqual(1000, cache.max_bytes)
+        with self.assertRaises(ValueError):
+            memcached.load_local_cache({'local_cache_ttl': 'bad'})
+
+
 if __name__ == '__main__':
     unittest.main()
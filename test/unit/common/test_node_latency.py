@@ -0,0 +1,201 @@
+# Copyright (c) 2026 OpenStack Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+from swift.common.node_latency import NodeLatencyTracker, \
+    SharedLatencyTable, LocalLatencyTable, SLOT_STRUCT, RequestHedger
+
+
+class TestNodeLatencyTracker(unittest.TestCase):
+    def setUp(self):
+        self.node = {'ip': '10.0.0.1', 'port': 6200, 'device': 'sda'}
+        self.tempdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir, ignore_errors=True)
+
+    def test_init_config(self):
+        tracker = NodeLatencyTracker()
+        self.assertEqual(0.2, tracker.alpha)
+        self.assertEqual(300, tracker.expiry)
+        self.assertEqual(0.99, tracker.tail_quantile)
+        self.assertIsInstance(tracker.table, LocalLatencyTable)
+
+        tracker = NodeLatencyTracker(alpha='0.5', expiry='10')
+        self.assertEqual(0.5, tracker.alpha)
+        self.assertEqual(10, tracker.expiry)
+
+    def test_init_bad_config(self):
+        for alpha in (0, -0.1, 1.1):
+            with self.assertRaises(ValueError):
+                NodeLatencyTracker(alpha=alpha)
+        for quantile in (0.4, 1):
+            with self.assertRaises(ValueError):
+                NodeLatencyTracker(tail_quantile=quantile)
+        with self.assertRaises(ValueError):
+            NodeLatencyTracker(alpha='foo')
+
+    def test_record(self):
+        tracker = NodeLatencyTracker(alpha=0.5, expiry=10)
+        self.assertIsNone(tracker.get_stats(self.node, now=100))
+        self.assertEqual(-1.0, tracker.score(self.node, now=100))
+
+        tracker.record(self.node, 0.1, now=100)
+        self.assertEqual((0.1, 0.1), tracker.get_stats(self.node, now=100))
+        tracker.record(self.node, 0.3, now=101)
+        # the tail moves up as fast as the ewma...
+        self.assertEqual((0.2, 0.2), tracker.get_stats(self.node, now=101))
+        tracker.record(self.node, 0.0, now=102)
+        ewma, tail = tracker.get_stats(self.node, now=102)
+        self.assertAlmostEqual(0.1, ewma)
+        # ...but moves down much more slowly
+        self.assertAlmostEqual(0.2 - 0.2 * 0.5 * 0.01 / 0.99, tail)
+        self.assertEqual(0.149, tracker.score(self.node, now=102))
+
+        # stats expire
+        self.assertIsNone(tracker.get_stats(self.node, now=112))
+        self.assertEqual(-1.0, tracker.score(self.node, now=112))
+        # and are restarted by the next sample
+        tracker.record(self.node, 0.5, now=112)
+        self.assertEqual((0.5, 0.5), tracker.get_stats(self.node, now=112))
+
+    def test_tail_tracks_high_percentile(self):
+        rng = random.Random(42)
+        tracker = NodeLatencyTracker(alpha=0.05)
+        for i in range(20000):
+            # mostly fast, occasionally very slow
+            sample = 1.0 if rng.random() < 0.02 else rng.uniform(0.01, 0.02)
+            tracker.record(self.node, sample, now=1000)
+        ewma, tail = tracker.get_stats(self.node, now=1000)
+        self.assertLess(ewma, 0.2)
+        self.assertGreater(tail, 0.2)
+        self.assertGreater(tail, ewma)
+
+    def test_score_orders_nodes(self):
+        tracker = NodeLatencyTracker()
+        fast = {'ip': '10.0.0.1', 'port': 6200, 'device': 'sda'}
+        slow = {'ip': '10.0.0.1', 'port': 6200, 'device': 'sdb'}
+        unknown = {'ip': '10.0.0.2', 'port': 6200, 'device': 'sda'}
+        tracker.record(fast, 0.01, now=100)
+        tracker.record(slow, 0.05, now=100)
+        nodes = [slow, fast, unknown]
+        nodes.sort(key=lambda n: tracker.score(n, now=100))
+        self.assertEqual([unknown, fast, slow], nodes)
+
+    def test_shared(self):
+        path = os.path.join(self.tempdir, 'latency')
+        tracker1 = NodeLatencyTracker(shared_path=path, shared_slots=16)
+        tracker2 = NodeLatencyTracker(shared_path=path, shared_slots=16)
+        self.assertIsInstance(tracker1.table, SharedLatencyTable)
+        self.assertEqual(16 * SLOT_STRUCT.size, os.path.getsize(path))
+        tracker1.record(self.node, 0.1, now=100)
+        self.assertEqual((0.1, 0.1), tracker2.get_stats(self.node, now=100))
+        tracker2.record(self.node, 0.3, now=101)
+        ewma, tail = tracker1.get_stats(self.node, now=101)
+        self.assertAlmostEqual(0.14, ewma)
+        self.assertAlmostEqual(0.14, tail)
+
+
+class TestSharedLatencyTable(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tempdir, 'latency')
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir, ignore_errors=True)
+
+    def test_bad_slots(self):
+        with self.assertRaises(ValueError):
+            SharedLatencyTable(self.path, slots=0)
+
+    def test_resized(self):
+        with open(self.path, 'wb') as fd:
+            fd.write(b'x' * 10)
+        table = SharedLatencyTable(self.path, slots=4)
+        self.assertEqual(4 * SLOT_STRUCT.size, os.path.getsize(self.path))
+        table.close()
+
+    def test_full_table_reuses_oldest_slot(self):
+        table = SharedLatencyTable(self.path, slots=2)
+        table.set('a', 1.0, 1.0, 10)
+        table.set('b', 2.0, 2.0, 20)
+        self.assertEqual((1.0, 1.0, 10), table.get('a'))
+        self.assertEqual((2.0, 2.0, 20), table.get('b'))
+        table.set('c', 3.0, 3.0, 30)
+        self.assertIsNone(table.get('a'))
+        self.assertEqual((2.0, 2.0, 20), table.get('b'))
+        self.assertEqual((3.0, 3.0, 30), table.get('c'))
+        # updates stay in place
+        table.set('b', 4.0, 4.0, 40)
+        self.assertEqual((4.0, 4.0, 40), table.get('b'))
+        self.assertEqual((3.0, 3.0, 30), table.get('c'))
+        table.close()
+
+    def test_missing_key(self):
+        table = SharedLatencyTable(self.path, slots=8)
+        self.assertIsNone(table.get('a'))
+        table.close()
+
+
+class TestRequestHedger(unittest.TestCase):
+    def test_init_config(self):
+        hedger = RequestHedger()
+        self.assertEqual(0.05, hedger.budget)
+        self.assertEqual(0.95, hedger.quantile)
+        self.assertEqual(50, hedger.min_samples)
+        self.assertIsNone(hedger.delay)
+        self.assertEqual(0, hedger.tokens)
+
+        for quantile in (0, 1):
+            with self.assertRaises(ValueError):
+                RequestHedger(quantile=quantile)
+
+    def test_delay(self):
+        hedger = RequestHedger(min_samples=3, step=0.1, quantile=0.9)
+        hedger.observe(1.0)
+        self.assertIsNone(hedger.delay)
+        self.assertEqual(1.0, hedger.estimate)
+        hedger.observe(2.0)
+        self.assertIsNone(hedger.delay)
+        self.assertAlmostEqual(1.09, hedger.estimate)
+        hedger.observe(0.5)
+        self.assertAlmostEqual(1.09 * 0.99, hedger.delay)
+
+    def test_delay_tracks_quantile(self):
+        rng = random.Random(7)
+        hedger = RequestHedger()
+        for i in range(50000):
+            hedger.observe(rng.uniform(0.0, 1.0))
+        self.assertAlmostEqual(0.95, hedger.delay, delta=0.1)
+
+    def test_budget(self):
+        hedger = RequestHedger(budget=0.25, max_tokens=2)
+        self.assertFalse(hedger.acquire())
+        for i in range(3):
+            hedger.request_sent()
+        self.assertFalse(hedger.acquire())
+        hedger.request_sent()
+        self.assertTrue(hedger.acquire())
+        self.assertFalse(hedger.acquire())
+        for i in range(100):
+            hedger.request_sent()
+        self.assertEqual(2, hedger.tokens)
+        self.assertTrue(hedger.acquire())
+        self.assertTrue(hedger.acquire())
+        self.assertFalse(hedger.acquire())
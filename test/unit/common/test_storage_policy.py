@@ -325,6 +325,14 @@ class TestStoragePolicies(unittest.TestCase):
         self.assertRaisesWithMessage(PolicyError, 'Invalid type',
                                      BogusStoragePolicy, 1, 'one')
 
+    def test_ec_systematic(self):
+        policy = ECStoragePolicy(10, 'ten', ec_type=DEFAULT_TEST_EC_TYPE,
+                                 ec_ndata=10, ec_nparity=4)
+        self.assertTrue(policy.ec_systematic)
+        # libphazr transforms the data before encoding it
+        policy._ec_type = 'libphazr'
+        self.assertFalse(policy.ec_systematic)
+
     def test_policies_type_attribute(self):
         test_policies = [
             StoragePolicy(0, 'zero', is_default=True),
@@ -6416,6 +6416,52 @@ class TestNamespaceBoundList(unittest.TestCase):
         self.assertEqual(namespace_list.bounds, self.lowerbounds)
 
 
+class TestCompactNamespaceBoundList(TestNamespaceBoundList):
+    def test_from_bounds(self):
+        namespace_list = utils.CompactNamespaceBoundList.from_bounds(
+            self.lowerbounds)
+        self.assertEqual(['', 'a', 'f', 'l', 'r', 'z'], namespace_list.lowers)
+        self.assertEqual('a/-aa/a-fa/f-la/l-ra/r-za/z-', namespace_list.names)
+        self.assertEqual([0, 4, 9, 14, 19, 24, 28],
+                         list(namespace_list.name_offsets))
+        self.assertEqual(self.lowerbounds, namespace_list.bounds)
+        self.assertEqual(6, len(namespace_list))
+        self.assertEqual(utils.NamespaceBoundList(self.lowerbounds),
+                         namespace_list)
+        self.assertEqual(namespace_list,
+                         utils.NamespaceBoundList(self.lowerbounds))
+        self.assertNotEqual(utils.CompactNamespaceBoundList.from_bounds(
+            self.lowerbounds[:1]), namespace_list)
+
+    def test_get_namespace(self):
+        namespace_list = utils.CompactNamespaceBoundList.from_bounds(
+            self.lowerbounds)
+        self.assertEqual(namespace_list.get_namespace('1'), self.start_ns)
+        self.assertEqual(namespace_list.get_namespace('a'), self.start_ns)
+        self.assertEqual(namespace_list.get_namespace('b'), self.atof_ns)
+        self.assertEqual(namespace_list.get_namespace('f'), self.atof_ns)
+        self.assertEqual(namespace_list.get_namespace('f\x00'), self.ftol_ns)
+        self.assertEqual(namespace_list.get_namespace('l'), self.ftol_ns)
+        self.assertEqual(namespace_list.get_namespace('x'), self.rtoz_ns)
+        self.assertEqual(namespace_list.get_namespace('r'), self.ltor_ns)
+        self.assertEqual(namespace_list.get_namespace('}'), self.end_ns)
+        # same as NamespaceBoundList for any item
+        expected = utils.NamespaceBoundList(self.lowerbounds)
+        for item in ('', '\x00', 'a\x00', 'm', 'z', 'z\x00', u'\u00e9'):
+            self.assertEqual(expected.get_namespace(item),
+                             namespace_list.get_namespace(item), item)
+
+    def test_get_namespaces(self):
+        namespace_list = utils.CompactNamespaceBoundList.from_bounds(
+            self.lowerbounds)
+        self.assertEqual([self.start_ns, self.atof_ns, self.ftol_ns,
+                          self.ltor_ns, self.rtoz_ns, self.end_ns],
+                         namespace_list.get_namespaces())
+        self.assertEqual(
+            utils.NamespaceBoundList(self.lowerbounds).get_namespaces(),
+            namespace_list.get_namespaces())
+
+
 class TestShardRange(BaseUnitTestCase, BaseNamespaceShardRange):
     def test_constants(self):
         self.assertEqual({utils.ShardRange.SHARDING,
@@ -62,6 +62,41 @@ class TestAuditorMigrations(BaseUnitTestCase):
         for k, v in expected.items():
             self.assertEqual(info[k], v)
 
+    @with_tempdir
+    @mock.patch('swift.common.db_auditor.dump_recon_cache')
+    def test_listing_index_migration(self, tempdir, mock_recon):
+        db_path = os.path.join(tempdir, 'sda', 'containers', '0', '0', '0',
+                               'test.db')
+        broker = auditor.ContainerBroker(db_path, account='a', container='c')
+        broker.initialize(self.ts().internal, 0)
+        broker.put_object('o', self.ts().internal, 0, 'text/plain', 'etag')
+
+        conf = {'devices': tempdir, 'mount_check': False}
+        logger = debug_logger()
+        test_auditor = auditor.ContainerAuditor(conf, logger=logger)
+        self.assertFalse(test_auditor.listing_index)
+        test_auditor.run_once()
+        self.assertFalse(broker.has_listing_index())
+
+        conf['listing_index'] = 'true'
+        test_auditor = auditor.ContainerAuditor(conf, logger=logger)
+        self.assertTrue(test_auditor.listing_index)
+        test_auditor.run_once()
+        self.assertTrue(broker.has_listing_index())
+        self.assertEqual(
+            {'passes': 2, 'listing_index_created': 1},
+            {k: v for k, v in logger.statsd_client.get_stats_counts().items()
+             if k in ('passes', 'listing_index_created')})
+        self.assertEqual(['Added listing index to %s' % db_path],
+                         logger.get_lines_for_level('info')[-2:-1])
+
+        test_auditor.run_once()
+        self.assertEqual(
+            1, logger.statsd_client.get_stats_counts()[
+                'listing_index_created'])
+        self.assertEqual(['o'], [
+            row[0] for row in broker.list_objects_iter(10, '', '', '', '')])
+
 
 if __name__ == '__main__':
     unittest.main()
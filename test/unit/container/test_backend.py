@@ -31,11 +31,12 @@ import pickle
 import json
 import itertools
 
+from swift.common.concurrency import GreenPool
 from swift.common.exceptions import LockTimeout
 from swift.container.backend import ContainerBroker, \
     update_new_item_from_existing, UNSHARDED, SHARDING, SHARDED, \
     COLLAPSED, SHARD_LISTING_STATES, SHARD_UPDATE_STATES, sift_shard_ranges, \
-    merge_shards
+    merge_shards, LISTING_INDEX
 from swift.common.db import DatabaseAlreadyExists, GreenDBConnection, \
     TombstoneReclaimer, GreenDBCursor
 from swift.common.request_helpers import get_reserved_name
@@ -2136,6 +2137,101 @@ class TestContainerBroker(test_db.TestDbBase):
         broker = ContainerBroker(db_path, account='a', container='c')
         self._test_put_object_multiple_explicit_timestamps(broker)
 
+    def test_dedupe_records(self):
+        broker = ContainerBroker(self.get_db_path(), account='a',
+                                 container='c')
+        t = [self.ts() for _ in range(4)]
+
+        def record(name, created_at, ctype_timestamp=None,
+                   meta_timestamp=None, policy_index=0):
+            return {'name': name, 'created_at': created_at.internal,
+                    'size': 0, 'content_type': 'text/plain', 'etag': 'etag',
+                    'deleted': 0, 'storage_policy_index': policy_index,
+                    'ctype_timestamp': ctype_timestamp and
+                    ctype_timestamp.internal,
+                    'meta_timestamp': meta_timestamp and
+                    meta_timestamp.internal}
+
+        old = record('o', t[0])
+        new = record('o', t[1])
+        self.assertEqual([new], broker._dedupe_records([old, new]))
+        self.assertEqual([new], broker._dedupe_records([new, old]))
+        # of equal records the first is kept
+        dup = dict(new, size=1)
+        self.assertEqual([new], broker._dedupe_records([new, dup]))
+        # other names and policies are kept
+        other = record('p', t[0])
+        other_policy = record('o', t[0], policy_index=1)
+        self.assertEqual([other, other_policy, new], broker._dedupe_records(
+            [old, other, other_policy, new]))
+        # a POST is not superseded by an older PUT nor supersedes it
+        post = record('o', t[0], meta_timestamp=t[2])
+        put = record('o', t[1])
+        self.assertEqual([post, put], broker._dedupe_records([post, put]))
+        # ...but both are superseded by a newer PUT
+        newer_put = record('o', t[3])
+        self.assertEqual([newer_put], broker._dedupe_records(
+            [post, put, newer_put]))
+        # encoded timestamps are compared too
+        encoded = dict(record('o', t[1]),
+                       created_at=encode_timestamps(t[1], t[2], t[3]))
+        self.assertEqual([encoded], broker._dedupe_records([post, encoded]))
+
+    @with_tempdir
+    def test_put_object_group_commit(self, tempdir):
+        db_path = os.path.join(tempdir, 'container.db')
+        broker = ContainerBroker(db_path, account='a', container='c')
+        broker.initialize(self.ts().internal, 0)
+        logger = debug_logger()
+        t = [self.ts() for _ in range(3)]
+
+        def put_object(name, timestamp, size):
+            broker = ContainerBroker(db_path, account='a', container='c',
+                                     logger=logger)
+            broker.put_object(name, timestamp.internal, size, 'text/plain',
+                              'etag')
+
+        pool = GreenPool()
+        with mock.patch('swift.common.db.GROUP_COMMIT_WINDOW', 0.01):
+            pool.spawn(put_object, 'o1', t[0], 1)
+            pool.spawn(put_object, 'o2', t[0], 2)
+            pool.spawn(put_object, 'o1', t[2], 3)
+            pool.spawn(put_object, 'o1', t[1], 4)
+            pool.waitall()
+        self.assertEqual({'pending.batches': 1, 'pending.records': 4,
+                          'pending.deduped': 2},
+                         logger.statsd_client.get_stats_counts())
+        with open(broker.pending_file, 'rb') as fd:
+            self.assertEqual(2, fd.read().count(b':'))
+        self.assertEqual(
+            [('o1', t[2].internal, 3), ('o2', t[0].internal, 2)],
+            [(row[0], row[1], row[2])
+             for row in broker.list_objects_iter(10, '', '', '', '')])
+
+    def test_put_object_binary_pending(self):
+        broker = ContainerBroker(self.get_db_path(), account='a',
+                                 container='c')
+        broker.initialize(self.ts().internal, 0)
+        t = [self.ts() for _ in range(4)]
+        broker.put_object('o\u00e9', t[0].internal, 1, 'text/plain', 'etag')
+        with mock.patch('swift.common.db.BINARY_PENDING', True):
+            broker.put_object('p', t[1].internal, 2, 'text/plain', 'etag',
+                              storage_policy_index=1)
+            broker.put_object('o\u00e9', t[0].internal, 0, 'text/html',
+                              'etag', ctype_timestamp=t[2].internal,
+                              meta_timestamp=t[3].internal)
+        with open(broker.pending_file, 'rb') as fd:
+            pending = fd.read()
+        self.assertEqual(b':', pending[:1])
+        self.assertEqual(2, pending.count(b'\x01\x01\x09'))
+        self.assertEqual(
+            [('o\u00e9', t[3].internal, 1, 'text/html', 'etag')],
+            broker.list_objects_iter(10, '', '', '', ''))
+        self.assertEqual(
+            [('p', t[1].internal, 2, 'text/plain', 'etag')],
+            broker.list_objects_iter(10, '', '', '', '',
+                                     storage_policy_index=1))
+
     def test_last_modified_time(self):
         # Test container listing reports the most recent of data or metadata
         # timestamp as last-modified time
@@ -3283,6 +3379,134 @@ class TestContainerBroker(test_db.TestDbBase):
         self.assertEqual([row[0] for row in listing],
                          ['/'])
 
+    def test_list_objects_iter_delimiter_skip_scan(self):
+        broker = ContainerBroker(self.get_db_path(), account='a',
+                                 container='c')
+        broker.initialize(self.ts().internal, 0)
+        names = ['a', 'b/1/x', 'b/2', 'c']
+        names += ['b/1/%04d' % i for i in range(50)]
+        names += ['d/%04d' % i for i in range(50)]
+        names += ['e%d/%04d' % (i, j) for i in range(5) for j in range(10)]
+        for name in names:
+            broker.put_object(name, self.ts().internal, 0, 'text/plain',
+                              'etag')
+
+        with mock.patch.object(broker, '_list_delimited',
+                               wraps=broker._list_delimited) as mocked:
+            listing = broker.list_objects_iter(100, '', '', '', '/')
+        self.assertEqual(['a', 'b/', 'c', 'd/', 'e0/', 'e1/', 'e2/', 'e3/',
+                          'e4/'], [row[0] for row in listing])
+        # the first common prefix was found by the query for the listing
+        self.assertEqual(1, mocked.call_count)
+
+        listing = broker.list_objects_iter(3, 'b/', 'e3/', '', '/')
+        self.assertEqual(['c', 'd/', 'e0/'], [row[0] for row in listing])
+        listing = broker.list_objects_iter(
+            100, 'e3/', 'b/', '', '/', reverse=True)
+        self.assertEqual(['e2/', 'e1/', 'e0/', 'd/', 'c'],
+                         [row[0] for row in listing])
+        listing = broker.list_objects_iter(100, '', '', 'b/', '/')
+        self.assertEqual(['b/1/', 'b/2'], [row[0] for row in listing])
+        listing = broker.list_objects_iter(100, '', '', None, None, path='b')
+        self.assertEqual(['b/2'], [row[0] for row in listing])
+        listing = broker.list_objects_iter(100, '', '', '', '/', reverse=True)
+        self.assertEqual(['e4/', 'e3/', 'e2/', 'e1/', 'e0/', 'd/', 'c', 'b/',
+                          'a'], [row[0] for row in listing])
+        # deleted rows
+        for name in ('c', 'e1/0000', 'e1/0001'):
+            broker.delete_object(name, self.ts().internal)
+        listing = broker.list_objects_iter(100, '', '', '', '/')
+        self.assertEqual(['a', 'b/', 'd/', 'e0/', 'e1/', 'e2/', 'e3/', 'e4/'],
+                         [row[0] for row in listing])
+        listing = broker.list_objects_iter(
+            100, '', '', '', '/', include_deleted=True)
+        self.assertEqual(['c', 'e1/'], [row[0] for row in listing])
+
+    def test_list_objects_iter_delimiter_skip_scan_reserved_names(self):
+        broker = ContainerBroker(self.get_db_path(), account='a',
+                                 container='c')
+        broker.initialize(self.ts().internal, 0)
+        names = [get_reserved_name('x', '1'), get_reserved_name('x/1'),
+                 get_reserved_name('x/2'), get_reserved_name('y/1'),
+                 get_reserved_name('y/2'), 'z/1', 'z/2']
+        for name in names:
+            broker.put_object(name, self.ts().internal, 0, 'text/plain',
+                              'etag')
+        listing = broker.list_objects_iter(
+            100, '', '', '', '/', allow_reserved=True)
+        self.assertEqual([get_reserved_name('x', '1'),
+                          get_reserved_name('x/'), get_reserved_name('y/'),
+                          'z/'], [row[0] for row in listing])
+        listing = broker.list_objects_iter(
+            100, '', '', '', '/', allow_reserved=True, reverse=True)
+        self.assertEqual(['z/', get_reserved_name('y/'),
+                          get_reserved_name('x/'),
+                          get_reserved_name('x', '1')],
+                         [row[0] for row in listing])
+        listing = broker.list_objects_iter(100, '', '', '', '/')
+        self.assertEqual(['z/'], [row[0] for row in listing])
+
+    def test_iter_objects(self):
+        broker = ContainerBroker(self.get_db_path(), account='a',
+                                 container='c')
+        broker.initialize(self.ts().internal, 0)
+        names = ['a', 'b/1', 'b/2', 'b/3/x', 'c', 'd/1', 'd/2', 'e']
+        for name in names:
+            broker.put_object(name, self.ts().internal, 0, 'text/plain',
+                              'etag')
+
+        for args, kwargs in (
+                ((100, '', '', None, None), {}),
+                ((5, '', '', None, None), {}),
+                ((100, 'b/2', 'e', None, None), {}),
+                ((100, '', '', '', '/'), {}),
+                ((3, '', '', '', '/'), {}),
+                ((100, 'b/', '', '', '/'), {}),
+                ((100, '', '', 'b/', '/'), {}),
+                ((100, '', '', None, None), {'path': 'b'}),
+                ((100, '', '', None, None), {'reverse': True}),
+                ((100, 'e', 'a', '', '/'), {'reverse': True}),
+                ((4, 'd/', '', '', '/'), {'reverse': True})):
+            expected = broker.list_objects_iter(*args, **kwargs)
+            self.assertTrue(expected)
+            for batch_size in (1, 2, 3, 100):
+                with mock.patch.object(
+                        broker, 'list_objects_iter',
+                        wraps=broker.list_objects_iter) as mocked:
+                    actual = list(broker.iter_objects(
+                        *args, batch_size=batch_size, **kwargs))
+                self.assertEqual(expected, actual, (args, kwargs))
+                self.assertTrue(all(call[0][0] <= batch_size
+                                    for call in mocked.call_args_list))
+
+    def test_create_listing_index(self):
+        broker = ContainerBroker(self.get_db_path(), account='a',
+                                 container='c')
+        broker.initialize(self.ts().internal, 0)
+        for name in ('a', 'b/1', 'b/2', 'c'):
+            broker.put_object(name, self.ts().internal, 0, 'text/plain',
+                              'etag')
+        broker.delete_object('c', self.ts().internal)
+        query_args = [(10, '', '', None, None), (10, '', '', '', '/')]
+        expected = [broker.list_objects_iter(*args) for args in query_args]
+        self.assertFalse(broker.has_listing_index())
+
+        self.assertTrue(broker.create_listing_index())
+        self.assertTrue(broker.has_listing_index())
+        self.assertFalse(broker.create_listing_index())
+        self.assertEqual(
+            expected, [broker.list_objects_iter(*args) for args in query_args])
+        with broker.get() as conn:
+            plan = conn.execute('''
+                EXPLAIN QUERY PLAN
+                SELECT name, created_at, size, content_type, etag
+                FROM object
+                WHERE deleted = 0 AND storage_policy_index = ? AND name > ?
+                ORDER BY name LIMIT 10
+            ''', (0, 'a')).fetchall()
+        self.assertIn('USING COVERING INDEX %s' % LISTING_INDEX,
+                      ' '.join(str(row[-1]) for row in plan))
+
     def test_list_objects_iter_order_and_reverse(self):
         # Test ContainerBroker.list_objects_iter
         broker = ContainerBroker(self.get_db_path(), account='a',
@@ -3615,6 +3839,66 @@ class TestContainerBroker(test_db.TestDbBase):
             broker.get_info()
         mock_tpool.execute.assert_called_once()
 
+    def test_merge_objects_from(self):
+        src = ContainerBroker(self.get_db_path(), account='a', container='c')
+        src.initialize(self.ts().internal, 0)
+        dest = ContainerBroker(self.get_db_path(), account='.shards_a',
+                               container='c1')
+        dest.initialize(self.ts().internal, 0)
+        expected = ContainerBroker(self.get_db_path(), account='.shards_a',
+                                   container='c2')
+        expected.initialize(self.ts().internal, 0)
+        # dest already has some objects, some newer and some older
+        for name in ('b', 'c', 'x'):
+            item = {'name': name, 'created_at': self.ts().internal,
+                    'size': 1, 'content_type': 'text/plain', 'etag': 'old',
+                    'deleted': 0, 'storage_policy_index': 0}
+            dest.merge_items([dict(item)])
+            expected.merge_items([dict(item)])
+        for i, name in enumerate('abcdef'):
+            src.put_object(name, self.ts().internal, 10, 'text/plain',
+                           'etag', deleted=i % 3 == 2,
+                           storage_policy_index=i % 2)
+        # same name in another policy
+        src.put_object('d', self.ts().internal, 20, 'text/plain', 'etag',
+                       storage_policy_index=0)
+        # dest has a newer object than src
+        ts = self.ts().internal
+        dest.put_object('e', ts, 30, 'text/plain', 'new',
+                        storage_policy_index=0)
+        expected.put_object('e', ts, 30, 'text/plain', 'new',
+                            storage_policy_index=0)
+        self.assertTrue(os.path.getsize(src.pending_file))
+
+        # batches end at the last name within the limit, including that name
+        # in all policies
+        self.assertEqual((3, 'd'), dest.merge_objects_from(
+            src, 2, marker='a', include_deleted=False))
+        self.assertEqual((1, None), dest.merge_objects_from(
+            src, 2, marker='d', include_deleted=False))
+        self.assertEqual((1, None), dest.merge_objects_from(
+            src, 2, end_marker='b', include_deleted=False))
+        # a full batch may be followed by an empty batch
+        self.assertEqual((2, 'f'), dest.merge_objects_from(
+            src, 2, include_deleted=True))
+        self.assertEqual((0, None), dest.merge_objects_from(
+            src, 2, marker='f', include_deleted=True))
+        expected.merge_items(src.get_objects())
+        self.assertEqual(expected.get_objects(), dest.get_objects())
+        self.assertEqual('new', dest.get_objects(marker='d')[0]['etag'])
+        self.assertEqual(expected.get_info()['object_count'],
+                         dest.get_info()['object_count'])
+        self.assertEqual(expected.get_policy_stats(),
+                         dest.get_policy_stats())
+
+        # since_row
+        dest = ContainerBroker(self.get_db_path(), account='.shards_a',
+                               container='c3')
+        dest.initialize(self.ts().internal, 0)
+        self.assertEqual((2, None), dest.merge_objects_from(
+            src, 10, since_row=5))
+        self.assertEqual(src.get_objects(since_row=5), dest.get_objects())
+
     def test_merge_items_overwrite_unicode(self):
         # test DatabaseBroker.merge_items
         snowman = u'\N{SNOWMAN}'
@@ -5062,6 +5346,30 @@ class TestContainerBroker(test_db.TestDbBase):
         self._check_find_shard_ranges('lower', '')
         self._check_find_shard_ranges('lower', 'upper')
 
+    def test_find_shard_ranges_progress_callback(self):
+        broker = ContainerBroker(self.get_db_path(), account='a',
+                                 container='c')
+        broker.initialize(self.ts().internal, 0)
+        for i in range(25):
+            broker.put_object('obj%02d' % i, self.ts().internal, 0,
+                              'text/plain', 'etag')
+        expected, last_found = broker.find_shard_ranges(10)
+        self.assertTrue(last_found)
+        self.assertEqual(['obj09', 'obj19', ''],
+                         [sr['upper'] for sr in expected])
+
+        progress = []
+        callback = mock.MagicMock(
+            side_effect=lambda found: progress.append(list(found)))
+        self.assertEqual((expected, True), broker.find_shard_ranges(
+            10, progress_callback=callback))
+        self.assertEqual([expected[:1], expected[:2], expected], progress)
+
+        progress = []
+        self.assertEqual((expected[:2], False), broker.find_shard_ranges(
+            10, limit=2, progress_callback=callback))
+        self.assertEqual([expected[:1], expected[:2]], progress)
+
     @with_tempdir
     def test_find_shard_ranges_with_misplaced_objects(self, tempdir):
         # verify that misplaced objects outside of a shard's range do not
@@ -6178,6 +6486,17 @@ class TestContainerBrokerBeforeSPI(ContainerBrokerMigrationMixin,
             conn.execute('SELECT storage_policy_index FROM container_stat')
         test_db.TestDbBase.tearDown(self)
 
+    def test_create_listing_index_before_spi_migration(self):
+        broker = ContainerBroker(self.get_db_path(), account='a',
+                                 container='c')
+        broker.initialize(self.ts().internal, 0)
+        self.assertFalse(broker.create_listing_index())
+        self.assertFalse(broker.has_listing_index())
+        # the DB can still be used, and is migrated by merging the object
+        broker.put_object('o', self.ts().internal, 0, 'text/plain', 'etag')
+        self.assertEqual(1, broker.get_info()['object_count'])
+        self.assertTrue(broker.create_listing_index())
+
     @patch_policies
     @with_tempdir
     def test_object_table_migration(self, tempdir):
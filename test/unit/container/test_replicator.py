@@ -295,6 +295,84 @@ class TestReplicatorSync(test_db_replicator.TestReplicatorSync):
             success = daemon._repl_to_node(node, broker, part, info)
         self.assertFalse(success)
 
+    def test_sync_remote_missing_most_rows_page_sync(self):
+        put_timestamp = time.time()
+        broker = self._get_broker('a', 'c', node_index=0)
+        broker.initialize(put_timestamp, POLICIES.default.idx)
+        for i in range(100):
+            broker.put_object('o%03d' % i, self.ts().internal, 0,
+                              'content-type', 'etag',
+                              storage_policy_index=broker.storage_policy_index)
+        daemon = replicator.ContainerReplicator(
+            {'per_diff': 10, 'page_sync': 'yes'}, logger=self.logger)
+
+        def _rsync_file(broker_arg, remote_file, **kwargs):
+            remote_server, remote_path = remote_file.split('/', 1)
+            dest_path = os.path.join(self.root, remote_path)
+            shutil.copy(broker_arg.db_file, dest_path)
+            return True
+        daemon._rsync_file = _rsync_file
+        # the remote db is created by rsync...
+        remote_broker = self._get_broker('a', 'c', node_index=1)
+        part, node = self._get_broker_part_node(remote_broker)
+        self.assertTrue(daemon._repl_to_node(
+            node, broker, part, broker.get_replication_info()))
+        self.assertEqual(1, daemon.stats['rsync'])
+        self.assertEqual(0, daemon.stats['page_sync'])
+        remote_broker.put_object(
+            'remote', self.ts().internal, 0, 'content-type', 'etag',
+            storage_policy_index=broker.storage_policy_index)
+        # ...and falls behind
+        for i in range(100, 400):
+            broker.put_object('o%03d' % i, self.ts().internal, 0,
+                              'content-type', 'etag',
+                              storage_policy_index=broker.storage_policy_index)
+        info = broker.get_replication_info()
+        daemon._rsync_file = mock.MagicMock()
+        self.assertTrue(daemon._repl_to_node(node, broker, part, info))
+        daemon._rsync_file.assert_not_called()
+        self.assertEqual(1, daemon.stats['remote_merge'])
+        self.assertEqual(1, daemon.stats['page_sync'])
+        num_pages = os.path.getsize(broker.db_file) // 4096
+        self.assertGreater(daemon.stats['pages_sent'], 0)
+        self.assertLess(daemon.stats['pages_sent'], num_pages)
+        self.assertEqual(daemon.stats['pages_sent'],
+                         self.logger.statsd_client.get_stats_counts()[
+                             'pages_sent'])
+        remote_broker = self._get_broker('a', 'c', node_index=1)
+        self.assertEqual(
+            ['o%03d' % i for i in range(400)] + ['remote'],
+            [row[0] for row in remote_broker.list_objects_iter(
+                1000, '', '', '', '')])
+        self.assertNotEqual(info['id'], remote_broker.get_info()['id'])
+        self.assertFalse(os.listdir(
+            os.path.join(self.root, node['device'], 'tmp')))
+
+    def test_page_sync_falls_back_to_rsync(self):
+        put_timestamp = time.time()
+        broker = self._get_broker('a', 'c', node_index=0)
+        broker.initialize(put_timestamp, POLICIES.default.idx)
+        remote_broker = self._get_broker('a', 'c', node_index=1)
+        remote_broker.initialize(put_timestamp, POLICIES.default.idx)
+        broker.put_object('o', self.ts().internal, 0, 'content-type',
+                          'etag',
+                          storage_policy_index=broker.storage_policy_index)
+        daemon = replicator.ContainerReplicator(
+            {'per_diff': 0, 'page_sync': 'yes'})
+        daemon._rsync_db = mock.MagicMock(return_value=True)
+        part, node = self._get_broker_part_node(remote_broker)
+        info = broker.get_replication_info()
+        # a remote that doesn't support page sync
+        with mock.patch.object(self.rpc, 'page_hashes',
+                               return_value=HTTPServerError()):
+            self.assertTrue(daemon._repl_to_node(node, broker, part, info))
+        self.assertEqual(1, daemon.stats['remote_merge'])
+        self.assertEqual(0, daemon.stats['page_sync'])
+        daemon._rsync_db.assert_called_once_with(
+            broker, node, mock.ANY, info['id'],
+            replicate_method='rsync_then_merge', replicate_timeout=0.0005,
+            different_region=False)
+
     def test_sync_remote_missing_most_rows(self):
         put_timestamp = time.time()
         # create "local" broker
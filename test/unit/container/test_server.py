@@ -5162,6 +5162,103 @@ class TestContainerController(BaseUnitTestCase):
             'GET.timing',
             self.logger.statsd_client.calls['timing_since'][-1][0][0])
 
+    def test_GET_streamed_in_batches(self):
+        req = Request.blank(
+            '/sda1/p/a/c', environ={'REQUEST_METHOD': 'PUT',
+                                    'HTTP_X_TIMESTAMP': '0'})
+        resp = req.get_response(self.controller)
+        names = ['a', 'b/1', 'b/2', 'c', 'd/1', 'e', 'f']
+        for name in names:
+            req = Request.blank(
+                '/sda1/p/a/c/%s' % name,
+                environ={
+                    'REQUEST_METHOD': 'PUT',
+                    'HTTP_X_TIMESTAMP': '1',
+                    'HTTP_X_CONTENT_TYPE': 'text/plain',
+                    'HTTP_X_ETAG': 'x',
+                    'HTTP_X_SIZE': 0})
+            self._update_object_put_headers(req)
+            resp = req.get_response(self.controller)
+            self.assertEqual(resp.status_int, 201)
+
+        def do_test(query_string):
+            req = Request.blank('/sda1/p/a/c?' + query_string,
+                                environ={'REQUEST_METHOD': 'GET'},
+                                headers={'X-Backend-Listing-Stream': 'true'})
+            orig_list_objects_iter = \
+                swift.container.backend.ContainerBroker.list_objects_iter
+            calls = []
+
+            def mock_list_objects_iter(broker, limit, *args, **kwargs):
+                calls.append(limit)
+                return orig_list_objects_iter(broker, limit, *args, **kwargs)
+
+            with mock.patch('swift.container.backend.LISTING_BATCH_SIZE', 2), \
+                    mock.patch('swift.container.backend.ContainerBroker.'
+                               'list_objects_iter', mock_list_objects_iter):
+                resp = req.get_response(self.controller)
+                self.assertEqual(resp.status_int, 200)
+                self.assertNotIn('Content-Length', resp.headers)
+                # the first batch is read before responding
+                self.assertEqual(1, len(calls))
+                body = resp.body
+            return body, calls
+
+        body, calls = do_test('')
+        self.assertEqual(b'a\nb/1\nb/2\nc\nd/1\ne\nf\n', body)
+        self.assertEqual([2, 2, 2, 2], calls)
+        body, calls = do_test('delimiter=/&limit=4')
+        self.assertEqual(b'a\nb/\nc\nd/\n', body)
+        self.assertEqual([2, 2], calls)
+        body, calls = do_test('delimiter=/&reverse=on&marker=e&limit=3')
+        self.assertEqual(b'd/\nc\nb/\n', body)
+        self.assertEqual([2, 1], calls)
+        body, calls = do_test('format=json&prefix=b/&limit=3')
+        self.assertEqual(['b/1', 'b/2'],
+                         [item['name'] for item in json.loads(body)])
+        self.assertEqual([2, 1], calls)
+        body, calls = do_test('format=xml&path=d')
+        self.assertEqual(
+            b'<?xml version="1.0" encoding="UTF-8"?>\n'
+            b'<container name="c"><object><name>d/1</name><hash>x</hash>'
+            b'<bytes>0</bytes><content_type>text/plain</content_type>'
+            b'<last_modified>1970-01-01T00:00:01.000000</last_modified>'
+            b'</object></container>', body)
+
+    def test_GET_not_streamed_without_header(self):
+        # proxies that don't ask for a streamed listing may not be able to
+        # handle one, so they still get a Content-Length
+        req = Request.blank(
+            '/sda1/p/a/c', environ={'REQUEST_METHOD': 'PUT',
+                                    'HTTP_X_TIMESTAMP': '0'})
+        resp = req.get_response(self.controller)
+        for name in ('a', 'b'):
+            req = Request.blank(
+                '/sda1/p/a/c/%s' % name,
+                environ={
+                    'REQUEST_METHOD': 'PUT',
+                    'HTTP_X_TIMESTAMP': '1',
+                    'HTTP_X_CONTENT_TYPE': 'text/plain',
+                    'HTTP_X_ETAG': 'x',
+                    'HTTP_X_SIZE': 0})
+            self._update_object_put_headers(req)
+            resp = req.get_response(self.controller)
+            self.assertEqual(resp.status_int, 201)
+
+        for value in (None, 'false'):
+            headers = {}
+            if value is not None:
+                headers['X-Backend-Listing-Stream'] = value
+            req = Request.blank('/sda1/p/a/c?format=json',
+                                environ={'REQUEST_METHOD': 'GET'},
+                                headers=headers)
+            resp = req.get_response(self.controller)
+            self.assertEqual(resp.status_int, 200)
+            self.assertEqual(str(len(resp.body)),
+                             resp.headers['Content-Length'])
+            self.assertEqual(['a', 'b'],
+                             [item['name'] for item in json.loads(resp.body)])
+
     def test_GET_prefix(self):
         req = Request.blank(
             '/sda1/p/a/c', environ={'REQUEST_METHOD': 'PUT',
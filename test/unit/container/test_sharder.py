@@ -215,6 +215,7 @@ class TestSharder(BaseTestSharder):
             'max_shrinking': 1,
             'max_expanding': -1,
             'stats_interval': 3600,
+            'bulk_cleave': False,
         }
         sharder, mock_ic = self._do_test_init({}, expected, use_logger=False)
         self.assertEqual(
@@ -267,6 +268,7 @@ class TestSharder(BaseTestSharder):
             'max_expanding': 4,
             'rows_per_shard': 13000000,
             'stats_interval': 300,
+            'bulk_cleave': 'yes',
         }
         expected = {
             'mount_check': False, 'bind_ip': '10.11.12.13', 'port': 62010,
@@ -293,6 +295,7 @@ class TestSharder(BaseTestSharder):
             'max_shrinking': 5,
             'max_expanding': 4,
             'stats_interval': 300,
+            'bulk_cleave': True,
         }
         sharder, mock_ic = self._do_test_init(conf, expected)
         mock_ic.assert_called_once_with(
@@ -1318,6 +1321,66 @@ class TestSharder(BaseTestSharder):
                        sharder.yield_objects(broker, src_range)]
         self.assertEqual([], batches)
 
+    def test_merge_objects(self):
+        broker = self._make_broker()
+        objects = [
+            ('o%02d' % i, self.ts_encoded(), 10, 'text/plain', 'etag_a',
+             i % 2, 0) for i in range(30)]
+        for obj in objects:
+            broker.put_object(*obj)
+
+        def do_test(src_range, conf, expected_batches, since_row=None):
+            dest = self._make_broker(account='.shards_a', container='shard')
+            expected = self._make_broker(account='.shards_a',
+                                         container='expected')
+            with self._mock_sharder(conf=conf) as sharder:
+                num_merged = sharder.merge_objects(
+                    broker, src_range, dest, since_row=since_row)
+                for batch, _ in sharder.yield_objects(
+                        broker, src_range, since_row=since_row):
+                    expected.merge_items(batch)
+            self.assertEqual(sum(expected_batches), num_merged)
+            self.assertEqual(expected.get_objects(), dest.get_objects())
+            self.assertEqual(
+                ['merged %s rows (deleted=%s)' % batch
+                 for batch in expected_batches_with_deleted(
+                     expected_batches)],
+                [line.split(' in ')[0] for line in
+                 sharder.logger.get_lines_for_level('debug')
+                 if line.startswith('merged ')])
+            os.unlink(dest.db_file)
+            os.unlink(expected.db_file)
+
+        def expected_batches_with_deleted(expected_batches):
+            half = len(expected_batches) // 2
+            return ([(n, False) for n in expected_batches[:half]] +
+                    [(n, True) for n in expected_batches[half:]])
+
+        src_range = ShardRange('dont/care', NormalTimestamp.now())
+        do_test(src_range, {}, [15, 15])
+        # batches of cleave_row_batch_size; a full batch is followed by a
+        # batch that is empty or not full
+        do_test(src_range, {'cleave_row_batch_size': 5},
+                [5, 5, 5, 0, 5, 5, 5, 0])
+        do_test(src_range, {'cleave_row_batch_size': 10}, [10, 5, 10, 5])
+        do_test(src_range, {}, [5, 5], since_row=20)
+        # restricted source range
+        src_range = ShardRange('dont/care', NormalTimestamp.now(),
+                               lower='o10', upper='o20')
+        do_test(src_range, {}, [5, 5])
+
+        # null source range
+        dest = self._make_broker(account='.shards_a', container='shard')
+        for src_range in (
+                ShardRange('dont/care', NormalTimestamp.now(),
+                           lower=ShardRange.MAX),
+                ShardRange('dont/care', NormalTimestamp.now(),
+                           upper=ShardRange.MIN)):
+            with self._mock_sharder(conf={}) as sharder:
+                self.assertEqual(0, sharder.merge_objects(
+                    broker, src_range, dest))
+        self.assertEqual([], dest.get_objects())
+
     def test_yield_objects_to_shard_range_no_objects(self):
         # verify that dest_shard_ranges func is not called if the source
         # broker has no objects
@@ -2706,6 +2769,56 @@ class TestSharder(BaseTestSharder):
         actual_objects = shard_broker.get_objects()
         self.assertEqual(objects[4:], actual_objects)
 
+    def test_bulk_cleave(self):
+        # verify that objects are cleaved in the same way with bulk_cleave
+        broker = self._make_broker()
+        objects = [{'name': 'obj_%03d' % i,
+                    'created_at': Timestamp.now().normal,
+                    'content_type': 'text/plain',
+                    'etag': 'etag_%d' % i,
+                    'size': 1024 * i,
+                    'deleted': i % 3 == 0,
+                    'storage_policy_index': i % 2,
+                    } for i in range(1, 20)]
+        # merge_items mutates items
+        broker.merge_items([dict(obj) for obj in objects])
+        broker.enable_sharding(NormalTimestamp.now())
+        shard_ranges = self._make_shard_ranges(
+            (('', 'obj_010'), ('obj_010', '')), state=ShardRange.CREATED)
+        expected_shard_dbs = []
+        for shard_range in shard_ranges:
+            db_hash = hash_path(shard_range.account, shard_range.container)
+            expected_shard_dbs.append(
+                os.path.join(self.tempdir, 'sda', 'containers', '0',
+                             db_hash[-3:], db_hash, db_hash + '.db'))
+        broker.merge_shard_ranges(shard_ranges)
+        self.assertTrue(broker.set_sharding_state())
+        # the second shard db already has a newer version of an object
+        newer = dict(objects[14], created_at=Timestamp.now().normal,
+                     size=1)
+        node = {'ip': '1.2.3.4', 'port': 6040, 'device': 'sda5', 'id': '2',
+                'index': 0}
+
+        with self._mock_sharder(conf={'bulk_cleave': 'yes',
+                                      'cleave_row_batch_size': 3}) \
+                as sharder:
+            _, shard_broker, _, _ = sharder._get_shard_broker(
+                shard_ranges[1], broker.root_path, 0)
+            self.assertEqual(expected_shard_dbs[1], shard_broker.db_file)
+            shard_broker.merge_items([dict(newer)])
+            sharder._audit_container = mock.MagicMock()
+            with mock.patch.object(sharder, 'yield_objects') as mock_yield:
+                sharder._process_broker(broker, node, 99)
+        mock_yield.assert_not_called()
+
+        self.assertEqual([ShardRange.ACTIVE] * 2,
+                         [sr.state for sr in broker.get_shard_ranges()])
+        shard_broker = ContainerBroker(expected_shard_dbs[0])
+        self.assertEqual(objects[:10], shard_broker.get_objects())
+        shard_broker = ContainerBroker(expected_shard_dbs[1])
+        self.assertEqual(objects[10:14] + [newer] + objects[15:],
+                         shard_broker.get_objects())
+
     def test_cleave_insufficient_replication(self):
         # verify that if replication of a cleaved shard range fails then rows
         # are not merged again to the existing shard db
@@ -51,6 +51,7 @@ from swift.common import utils
 from swift.common.utils import hash_path, mkdirs, Timestamp, lock_path, \
     encode_timestamps, O_TMPFILE, md5 as _md5, MD5_OF_EMPTY_STRING
 from swift.common.utils.pickle import unpickle
+from swift.common.utils.logs import get_prefixed_swift_logger
 from swift.common import ring
 from swift.common.splice import splice
 from swift.common.exceptions import DiskFileNotExist, DiskFileQuarantined, \
@@ -1190,6 +1191,20 @@ class TestDiskFileRouter(BaseUnitTestCase):
             self.assertIs(manager_3, manager_0)
             self.assertIsInstance(manager_3, diskfile.DiskFileManager)
 
+    @patch_policies(test_policies)
+    def test_per_policy_config(self):
+        conf = {'metadata_cache_size': '10',
+                'policy_config': {'1': {'metadata_cache_size': '0'}}}
+        df_router = diskfile.DiskFileRouter(conf, debug_logger())
+        self.assertEqual(10, df_router[POLICIES[0]].metadata_cache.max_entries)
+        self.assertIsNone(df_router[POLICIES[1]].metadata_cache)
+
+        for index in ('2', 'zero'):
+            conf = {'policy_config': {index: {'metadata_cache_size': '0'}}}
+            with self.assertRaises(ValueError) as cm:
+                diskfile.DiskFileRouter(conf, debug_logger())
+            self.assertIn('index: %s' % index, str(cm.exception))
+
     def test_invalid_policy_config(self):
         # verify that invalid policy diskfile configs are detected when the
         # DiskfileRouter is created
@@ -1223,6 +1238,104 @@ class TestDiskFileRouter(BaseUnitTestCase):
                       str(cm.exception))
 
 
+class TestMetadataCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = mkdtemp()
+        self.logger = debug_logger()
+        self.long_ago = time() - 60
+
+    def tearDown(self):
+        rmtree(self.tmpdir, ignore_errors=True)
+
+    def _make_hash_dir(self, name, files=('1.data',), recent=False):
+        hsh_path = os.path.join(self.tmpdir, name)
+        os.mkdir(hsh_path)
+        for filename in files:
+            open(os.path.join(hsh_path, filename), 'w').close()
+        if not recent:
+            os.utime(hsh_path, (self.long_ago, self.long_ago))
+        return hsh_path
+
+    def test_list_files(self):
+        cache = diskfile.MetadataCache(10, self.logger)
+        hsh_path = self._make_hash_dir('abc', ['1.data', '2.meta'])
+        listdir = mock.Mock(side_effect=os.listdir)
+        for _ in range(3):
+            self.assertEqual(['1.data', '2.meta'],
+                             sorted(cache.list_files(hsh_path, listdir)))
+        self.assertEqual(1, listdir.call_count)
+        self.assertEqual(
+            {'metadata_cache.hits': 2, 'metadata_cache.misses': 1},
+            self.logger.statsd_client.get_stats_counts())
+
+        # a changed hash dir is listed again
+        os.unlink(os.path.join(hsh_path, '2.meta'))
+        self.assertEqual(['1.data'], cache.list_files(hsh_path, listdir))
+        self.assertEqual(2, listdir.call_count)
+        self.assertEqual(0, len(cache))
+
+        rmtree(hsh_path)
+        with self.assertRaises(OSError) as cm:
+            cache.list_files(hsh_path, listdir)
+        self.assertEqual(errno.ENOENT, cm.exception.errno)
+
+    def test_list_files_not_a_dir(self):
+        cache = diskfile.MetadataCache(10, self.logger)
+        path = os.path.join(self.tmpdir, 'abc')
+        open(path, 'w').close()
+        os.utime(path, (self.long_ago, self.long_ago))
+        with self.assertRaises(OSError) as cm:
+            cache.list_files(path, os.listdir)
+        self.assertEqual(errno.ENOTDIR, cm.exception.errno)
+        self.assertEqual(0, len(cache))
+
+    def test_recently_changed_hash_dir_not_cached(self):
+        cache = diskfile.MetadataCache(10, self.logger)
+        hsh_path = self._make_hash_dir('abc', recent=True)
+        self.assertEqual(['1.data'], cache.list_files(hsh_path, os.listdir))
+        self.assertEqual(0, len(cache))
+        cache.set_metadata(hsh_path, '1.data', {'name': '/a/c/o'})
+        self.assertIsNone(cache.get_metadata(hsh_path, '1.data'))
+
+    def test_eviction(self):
+        cache = diskfile.MetadataCache(2, self.logger)
+        paths = [self._make_hash_dir(name) for name in ('a', 'b', 'c')]
+        cache.list_files(paths[0], os.listdir)
+        cache.list_files(paths[1], os.listdir)
+        cache.list_files(paths[0], os.listdir)
+        cache.list_files(paths[2], os.listdir)
+        self.assertEqual(2, len(cache))
+        self.assertEqual(
+            {'metadata_cache.hits': 1, 'metadata_cache.misses': 3,
+             'metadata_cache.evictions': 1},
+            self.logger.statsd_client.get_stats_counts())
+        # the least recently used hash dir was evicted
+        listdir = mock.Mock(side_effect=os.listdir)
+        cache.list_files(paths[0], listdir)
+        cache.list_files(paths[2], listdir)
+        listdir.assert_not_called()
+
+    def test_metadata(self):
+        cache = diskfile.MetadataCache(10, self.logger)
+        hsh_path = self._make_hash_dir('abc')
+        self.assertIsNone(cache.get_metadata(hsh_path, '1.data'))
+        cache.list_files(hsh_path, os.listdir)
+        self.assertIsNone(cache.get_metadata(hsh_path, '1.data'))
+        metadata = {'name': '/a/c/o'}
+        cache.set_metadata(hsh_path, '1.data', metadata)
+        # only files that were listed are cached
+        cache.set_metadata(hsh_path, '2.data', metadata)
+        self.assertIsNone(cache.get_metadata(hsh_path, '2.data'))
+        # callers get copies
+        metadata['name'] = '/a/c/other'
+        found = cache.get_metadata(hsh_path, '1.data')
+        self.assertEqual({'name': '/a/c/o'}, found)
+        found.pop('name')
+        self.assertEqual({'name': '/a/c/o'},
+                         cache.get_metadata(hsh_path, '1.data'))
+
+
 class BaseDiskFileTestMixin(object):
     """
     Bag of helpers that are useful in the per-policy DiskFile test classes,
@@ -4041,6 +4154,68 @@ class DiskFileMixin(BaseDiskFileTestMixin):
         df.open()
         return df, data
 
+    def test_open_with_metadata_cache(self):
+        self.conf['metadata_cache_size'] = '10'
+        self.df_router = diskfile.DiskFileRouter(self.conf, self.logger)
+        df, data = self._create_test_file(
+            b'body', timestamp=self.ts(),
+            metadata={'X-Object-Meta-Color': 'blue'})
+        cache = df.manager.metadata_cache
+        self.assertIsInstance(cache, diskfile.MetadataCache)
+        # the hash dir has only just changed
+        self.assertEqual(0, len(cache))
+        long_ago = time() - 60
+        os.utime(df._datadir, (long_ago, long_ago))
+        with self._simple_get_diskfile().open():
+            pass
+        self.assertEqual(1, len(cache))
+
+        with mock.patch.object(df.manager, '_list_object_files',
+                               side_effect=AssertionError('listed')), \
+                mock.patch('swift.obj.diskfile._read_file_metadata',
+                           side_effect=AssertionError('read')):
+            df = self._simple_get_diskfile()
+            with df.open():
+                self.assertEqual('blue',
+                                 df.get_metadata()['X-Object-Meta-Color'])
+                self.assertEqual(data, b''.join(df.reader()))
+        self.assertEqual(
+            {'metadata_cache.hits': 1, 'metadata_cache.misses': 2},
+            self.logger.statsd_client.get_stats_counts())
+
+        # a POST changes the hash dir
+        df.write_metadata({'X-Timestamp': self.ts().internal,
+                           'X-Object-Meta-Color': 'red'})
+        df = self._simple_get_diskfile()
+        with df.open():
+            self.assertEqual('red', df.get_metadata()['X-Object-Meta-Color'])
+        self.assertEqual(0, len(cache))
+
+        # as does a DELETE
+        os.utime(df._datadir, (long_ago, long_ago))
+        with self._simple_get_diskfile().open():
+            pass
+        self.assertEqual(1, len(cache))
+        ts = self.ts()
+        df.delete(ts)
+        with self.assertRaises(DiskFileDeleted) as cm:
+            self._simple_get_diskfile().open()
+        self.assertEqual(ts, cm.exception.timestamp)
+
+    def test_open_modernize_bypasses_metadata_cache(self):
+        self.conf['metadata_cache_size'] = '10'
+        self.df_router = diskfile.DiskFileRouter(self.conf, self.logger)
+        df, data = self._create_test_file(b'body', timestamp=self.ts())
+        long_ago = time() - 60
+        os.utime(df._datadir, (long_ago, long_ago))
+        with self._simple_get_diskfile().open():
+            pass
+        with mock.patch.object(df.manager.metadata_cache, 'list_files',
+                               side_effect=AssertionError('cached')):
+            df = self._simple_get_diskfile()
+            with df.open(modernize=True):
+                self.assertEqual(data, b''.join(df.reader()))
+
     def test_get_dev_path(self):
         self.df_mgr.devices = '/srv'
         device = 'sda1'
@@ -7409,6 +7584,53 @@ class TestECDiskFile(DiskFileMixin, BaseUnitTestCase):
 
 
 @patch_policies(with_ec_default=True)
+class TestSuffixHashThreads(unittest.TestCase):
+
+    def test_map(self):
+        def func(item):
+            if item == 'bad':
+                raise OSError(errno.EIO, 'bad')
+            return item.upper()
+
+        threads = diskfile.SuffixHashThreads(3)
+        results = threads.map('/dev/sda', func, ['abc', 'bad', 'def'])
+        self.assertEqual(['abc', 'bad', 'def'], sorted(results))
+        self.assertEqual(('ABC', None), results['abc'])
+        self.assertEqual(('DEF', None), results['def'])
+        self.assertIsNone(results['bad'][0])
+        self.assertIsInstance(results['bad'][1], OSError)
+        self.assertEqual({}, threads.map('/dev/sda', func, []))
+
+    def test_map_limits_in_progress_per_device(self):
+        lock = diskfile._threading.Lock()
+        in_progress = {'sda': 0, 'sdb': 0}
+        most = {'sda': 0, 'sdb': 0}
+
+        def func(item):
+            device = item[:3]
+            with lock:
+                in_progress[device] += 1
+                most[device] = max(most[device], in_progress[device])
+            diskfile.time.sleep(0.001)
+            with lock:
+                in_progress[device] -= 1
+            return item
+
+        threads = diskfile.SuffixHashThreads(2)
+        callers = [
+            diskfile._threading.Thread(
+                target=threads.map,
+                args=(device, func,
+                      ['%s-%d' % (device, i) for i in range(10)]))
+            for device in ('sda', 'sda', 'sdb')]
+        for caller in callers:
+            caller.start()
+        for caller in callers:
+            caller.join()
+        self.assertEqual({'sda': 2, 'sdb': 2}, most)
+        self.assertEqual({'sda': 0, 'sdb': 0}, in_progress)
+
+
 class TestSuffixHashes(BaseUnitTestCase):
     """
     This tests all things related to hashing suffixes and therefore
@@ -9338,6 +9560,191 @@ class TestSuffixHashes(BaseUnitTestCase):
                                            policy)
             self.assertEqual(hashes, new_hashes)
 
+    def test_get_hashes_log_format(self):
+        self.conf['suffix_hashes_format'] = 'log'
+        self.df_router = diskfile.DiskFileRouter(self.conf, self.logger)
+        for policy in self.iter_policies():
+            df_mgr = self.df_router[policy]
+            part_path = os.path.join(
+                self.devices, 'sda1', diskfile.get_data_dir(policy), '0')
+            hashes_file = os.path.join(part_path, diskfile.HASH_LOG_FILE)
+            df = df_mgr.get_diskfile('sda1', '0', 'a', 'c', 'o',
+                                     policy=policy, frag_index=2)
+            df.delete(self.ts())
+            suffix = os.path.basename(os.path.dirname(df._datadir))
+            hashes = df_mgr.get_hashes('sda1', '0', [], policy)
+            self.assertIn(suffix, hashes)
+            self.assertTrue(os.path.exists(hashes_file))
+            self.assertFalse(os.path.exists(
+                os.path.join(part_path, diskfile.HASH_FILE)))
+            with open(hashes_file) as f:
+                compacted = f.read()
+
+            # an invalidation is appended rather than rewriting the file
+            df.delete(self.ts())
+            found = df_mgr.consolidate_hashes(part_path)
+            self.assertIsNone(found[suffix])
+            with open(hashes_file) as f:
+                self.assertEqual(compacted + suffix + '\n', f.read())
+
+            # ... as is the new hash of the suffix
+            new_hashes = df_mgr.get_hashes('sda1', '0', [], policy)
+            self.assertNotEqual(hashes[suffix], new_hashes[suffix])
+            self.assertEqual(new_hashes,
+                             df_mgr.get_hashes('sda1', '0', [], policy))
+            with open(hashes_file) as f:
+                self.assertTrue(f.read().startswith(compacted + suffix))
+            found = diskfile.read_hashes_log(part_path)
+            self.assertTrue(found.pop('valid'))
+            found.pop('updated')
+            self.assertEqual(new_hashes, found)
+
+    def test_get_hashes_log_format_migrates_pkl(self):
+        for policy in self.iter_policies():
+            df_mgr = self.df_router[policy]
+            part_path = os.path.join(
+                self.devices, 'sda1', diskfile.get_data_dir(policy), '0')
+            df = df_mgr.get_diskfile('sda1', '0', 'a', 'c', 'o',
+                                     policy=policy, frag_index=2)
+            df.delete(self.ts())
+            suffix = os.path.basename(os.path.dirname(df._datadir))
+            hashes = df_mgr.get_hashes('sda1', '0', [], policy)
+            self.assertTrue(os.path.exists(
+                os.path.join(part_path, diskfile.HASH_FILE)))
+
+            conf = dict(self.conf, suffix_hashes_format='log')
+            log_df_mgr = diskfile.DiskFileRouter(conf, self.logger)[policy]
+            with mock.patch.object(log_df_mgr, '_hash_suffix') as mocked:
+                self.assertEqual(
+                    hashes, log_df_mgr.get_hashes('sda1', '0', [], policy))
+            mocked.assert_not_called()
+            self.assertFalse(os.path.exists(
+                os.path.join(part_path, diskfile.HASH_FILE)))
+            found = diskfile.read_hashes_log(part_path)
+            self.assertTrue(found['valid'])
+            self.assertEqual(hashes[suffix], found[suffix])
+
+    def test_get_hashes_log_format_compacts(self):
+        self.conf['suffix_hashes_format'] = 'log'
+        self.df_router = diskfile.DiskFileRouter(self.conf, self.logger)
+        for policy in self.iter_policies():
+            df_mgr = self.df_router[policy]
+            part_path = os.path.join(
+                self.devices, 'sda1', diskfile.get_data_dir(policy), '0')
+            hashes_file = os.path.join(part_path, diskfile.HASH_LOG_FILE)
+            df = df_mgr.get_diskfile('sda1', '0', 'a', 'c', 'o',
+                                     policy=policy, frag_index=2)
+            df.delete(self.ts())
+            df_mgr.get_hashes('sda1', '0', [], policy)
+            compacted_size = os.stat(hashes_file).st_size
+            sizes = set()
+            for i in range(10):
+                df.delete(self.ts())
+                hashes = df_mgr.get_hashes('sda1', '0', [], policy)
+                sizes.add(os.stat(hashes_file).st_size)
+            # the log grew but was compacted rather than growing forever
+            self.assertIn(compacted_size, sizes)
+            self.assertLessEqual(
+                max(sizes),
+                diskfile.HASH_LOG_COMPACTION_RATIO * compacted_size)
+            found = diskfile.read_hashes_log(part_path)
+            self.assertTrue(found.pop('valid'))
+            found.pop('updated')
+            self.assertEqual(hashes, found)
+
+    def test_get_hashes_suffix_hash_threads(self):
+        conf = dict(self.conf, suffix_hash_threads_per_device='4')
+        threaded_router = diskfile.DiskFileRouter(conf, self.logger)
+        for policy in self.iter_policies():
+            df_mgr = self.df_router[policy]
+            threaded_df_mgr = threaded_router[policy]
+            self.assertEqual(
+                4, threaded_df_mgr.suffix_hash_threads.threads_per_device)
+            suffixes = set()
+            for i in range(10):
+                df = df_mgr.get_diskfile('sda1', '0', 'a', 'c', 'o%d' % i,
+                                         policy=policy, frag_index=2)
+                df.delete(self.ts())
+                suffixes.add(os.path.basename(os.path.dirname(df._datadir)))
+            self.assertGreater(len(suffixes), 1)  # sanity
+            suffixes.add('abc')  # does not exist
+            self.logger.clear()
+            with mock.patch.object(
+                    threaded_df_mgr.suffix_hash_threads, 'map',
+                    wraps=threaded_df_mgr.suffix_hash_threads.map) as mocked:
+                hashes = threaded_df_mgr.get_hashes(
+                    'sda1', '0', sorted(suffixes), policy)
+            self.assertEqual(1, mocked.call_count)
+            self.assertNotIn('abc', hashes)
+            # one timing for all the suffixes
+            self.assertEqual(
+                ['suffix.hash.timing'],
+                [call[0][0] for call in
+                 self.logger.statsd_client.calls['timing']])
+            self.assertEqual(
+                hashes,
+                df_mgr.get_hashes('sda1', '0', sorted(suffixes), policy))
+
+    def test_get_hashes_suffix_hash_threads_error(self):
+        conf = dict(self.conf, suffix_hash_threads_per_device='2')
+        for policy in self.iter_policies():
+            df_mgr = diskfile.DiskFileRouter(conf, self.logger)[policy]
+            for i in range(4):
+                df = df_mgr.get_diskfile('sda1', '0', 'a', 'c', 'o%d' % i,
+                                         policy=policy, frag_index=2)
+                df.delete(self.ts())
+            df_mgr.get_hashes('sda1', '0', [], policy)
+            part_path = os.path.dirname(os.path.dirname(df._datadir))
+            suffixes = [suffix for suffix in os.listdir(part_path)
+                        if len(suffix) == 3]
+            # an unexpected error still escapes get_hashes
+            with mock.patch.object(df_mgr, '_hash_suffix',
+                                   side_effect=ValueError('kaboom')):
+                with self.assertRaises(ValueError):
+                    df_mgr.get_hashes('sda1', '0', suffixes, policy)
+            # an OSError is logged and the suffix left to be rehashed
+            with mock.patch.object(df_mgr, '_hash_suffix',
+                                   side_effect=OSError(errno.EACCES, 'no')):
+                with mock.patch('swift.obj.diskfile.logging') as mock_logging:
+                    hashes = df_mgr.get_hashes('sda1', '0', suffixes, policy)
+            self.assertEqual(
+                [mock.call.exception('Error hashing suffix')] * len(suffixes),
+                mock_logging.method_calls)
+            self.assertEqual(dict.fromkeys(suffixes), hashes)
+
+    def test_get_hashes_logger_without_statsd(self):
+        # the relinker gives its diskfile managers a logger that has no
+        # statsd methods
+        logger = get_prefixed_swift_logger(self.logger, 'test ')
+        self.assertFalse(hasattr(logger, 'timing'))  # sanity
+        for threads in ('1', '2'):
+            conf = dict(self.conf, suffix_hash_threads_per_device=threads)
+            for policy in self.iter_policies():
+                df_mgr = diskfile.DiskFileRouter(conf, logger)[policy]
+                suffixes = set()
+                for i in range(4):
+                    df = df_mgr.get_diskfile(
+                        'sda1', '0', 'a', 'c', 'o%d' % i, policy=policy,
+                        frag_index=2)
+                    df.delete(self.ts())
+                    suffixes.add(
+                        os.path.basename(os.path.dirname(df._datadir)))
+                hashes = df_mgr.get_hashes(
+                    'sda1', '0', sorted(suffixes), policy)
+                self.assertEqual(suffixes, set(hashes))
+
+    def test_invalid_suffix_hash_threads_per_device(self):
+        for value in ('0', '-1', 'auto'):
+            conf = dict(self.conf, suffix_hash_threads_per_device=value)
+            with self.assertRaises(ValueError):
+                diskfile.DiskFileRouter(conf, self.logger)
+
+    def test_invalid_suffix_hashes_format(self):
+        self.conf['suffix_hashes_format'] = 'lmdb'
+        with self.assertRaises(ValueError) as cm:
+            diskfile.DiskFileRouter(self.conf, self.logger)
+        self.assertIn("'lmdb'", str(cm.exception))
+
     def _do_test_get_hashes_new_pkl_finds_new_suffix_dirs(self, device):
         for policy in self.iter_policies():
             df_mgr = self.df_router[policy]
@@ -9872,6 +10279,45 @@ class TestHashesHelpers(unittest.TestCase):
         result = diskfile.read_hashes(self.testdir)
         self.assertFalse(result['valid'])
 
+    def test_read_write_hashes_log(self):
+        hashes = {'000': 'fake', 'abc': None,
+                  'fff': {None: 'durable', 0: 'frag0', 12: 'frag12'},
+                  'valid': True}
+        diskfile.write_hashes_log(self.testdir, hashes)
+        self.assertIn('updated', hashes)
+        self.assertEqual(hashes, diskfile.read_hashes_log(self.testdir))
+
+    def test_update_hashes_log_appends(self):
+        orig = {'000': 'fake', 'abc': 'other', 'valid': True}
+        diskfile.write_hashes_log(self.testdir, orig)
+        hashes = {'000': 'new', 'def': None, 'valid': True}
+        diskfile.update_hashes_log(self.testdir, hashes, orig)
+        hashes_file = os.path.join(self.testdir, diskfile.HASH_LOG_FILE)
+        with open(hashes_file) as f:
+            lines = f.read().splitlines()
+        self.assertEqual(['000 fake', 'abc other'], lines[1:3])
+        self.assertEqual(['000 new', 'abc -', 'def'], sorted(lines[3:]))
+        self.assertEqual(hashes, diskfile.read_hashes_log(self.testdir))
+
+    def test_read_hashes_log_torn_or_corrupt(self):
+        self.assertEqual({'valid': False},
+                         diskfile.read_hashes_log(self.testdir))
+        hashes_file = os.path.join(self.testdir, diskfile.HASH_LOG_FILE)
+        for data in (diskfile.HASH_LOG_HEADER + '000 fake\nabc oth',
+                     diskfile.HASH_LOG_HEADER + '\x00\x00\x00 fake\n',
+                     diskfile.HASH_LOG_HEADER + '000 {x:fake}\n',
+                     'garbage\n000 fake\n'):
+            with open(hashes_file, 'w') as f:
+                f.write(data)
+            self.assertEqual({'valid': False},
+                             diskfile.read_hashes_log(self.testdir))
+
+    def test_write_hashes_log_invalid_removes_file(self):
+        diskfile.write_hashes_log(self.testdir, {'000': 'fake', 'valid': True})
+        diskfile.write_hashes_log(self.testdir, {'valid': False})
+        self.assertFalse(os.path.exists(
+            os.path.join(self.testdir, diskfile.HASH_LOG_FILE)))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -327,6 +327,23 @@ class TestObjectReplicator(BaseUnitTestCase):
         ])
         self.assertEqual(replicator.handoff_delete, 0)
 
+    def test_slab_policy_requires_ssync(self):
+        slab_policies = [
+            StoragePolicy(0, 'zero', False),
+            StoragePolicy(1, 'one', True, diskfile_module='replication.slab')]
+        with patch_policies(slab_policies):
+            for sync_method in ('rsync', None):
+                conf = dict(self.conf, sync_method=sync_method)
+                with self.assertRaises(ValueError) as cm:
+                    object_replicator.ObjectReplicator(conf,
+                                                       logger=self.logger)
+                self.assertIn('Policy one ', str(cm.exception))
+                self.assertIn('sync_method = ssync', str(cm.exception))
+            conf = dict(self.conf, sync_method='ssync')
+            replicator = object_replicator.ObjectReplicator(
+                conf, logger=self.logger)
+            self.assertEqual(replicator.ssync, replicator.sync_method)
+
     def _write_disk_data(self, disk_name, with_json=False):
         os.mkdir(os.path.join(self.devices, disk_name))
         objects = os.path.join(self.devices, disk_name,
@@ -9300,6 +9300,25 @@ class TestObjectController(BaseUnitTestCase):
             method = getattr(self.object_controller, method_name)
             self.assertEqual(method.replication, True)
 
+    def test_app_factory_per_policy_config(self):
+        conf_path = os.path.join(self.testdir, 'object-server.conf')
+        with open(conf_path, 'w') as fd:
+            fd.write(dedent('''
+                [app:object-server]
+                use = egg:swift#object
+                metadata_cache_size = 10
+
+                [object-server:policy:1]
+                metadata_cache_size = 0
+                '''))
+        conf = {'devices': self.testdir, 'mount_check': 'false',
+                '__file__': conf_path, '__name__': 'object-server',
+                'metadata_cache_size': '10'}
+        app = object_server.app_factory(conf)
+        self.assertEqual(
+            10, app._diskfile_router[POLICIES[0]].metadata_cache.max_entries)
+        self.assertIsNone(app._diskfile_router[POLICIES[1]].metadata_cache)
+
     def test_correct_allowed_method(self):
         # Test correct work for allowed method using
         # swift.obj.server.ObjectController.__call__
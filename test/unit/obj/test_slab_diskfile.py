@@ -0,0 +1,460 @@
+# Copyright (c) 2026 OpenStack Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import time
+import unittest
+from unittest import mock
+
+from swift.common.exceptions import DiskFileDeleted, DiskFileNotExist, \
+    DiskFileQuarantined
+from swift.common.storage_policy import POLICIES, StoragePolicy, \
+    ECStoragePolicy
+from swift.common.utils import Timestamp, md5
+from swift.obj import diskfile, slab_diskfile
+from test.debug_logger import debug_logger
+from test.unit import BaseUnitTestCase, patch_policies, \
+    DEFAULT_TEST_EC_TYPE
+from test.unit.obj.test_diskfile import BaseDiskFileTestMixin
+
+
+slab_policies = [
+    StoragePolicy(0, name='zero', is_default=True,
+                  diskfile_module='replication.slab'),
+    ECStoragePolicy(1, name='one', ec_type=DEFAULT_TEST_EC_TYPE,
+                    ec_ndata=10, ec_nparity=4,
+                    diskfile_module='erasure_coding.slab'),
+]
+
+
+class TestSlabIndex(unittest.TestCase):
+
+    def test_parse(self):
+        index = slab_diskfile.SlabIndex.parse(
+            b'slab.1.vol\n'
+            b'+ abc 1.data 0 10 5 1.5\n'
+            b'+ abc 2.meta 15 10 0 2.5\n'
+            b'+ def 3.ts 25 10 0 3.5\n'
+            b'- abc 1.data\n'
+            b'> def 3.ts 4.ts\n'
+            b'+ def 5.data 35 10 2')
+        self.assertEqual('slab.1.vol', index.volume)
+        self.assertEqual({
+            'abc': {'2.meta': slab_diskfile.SlabEntry(15, 10, 0, 2.5)},
+            'def': {'4.ts': slab_diskfile.SlabEntry(25, 10, 0, 3.5)},
+        }, index.entries)
+        # the last line has no newline yet
+        self.assertEqual(5, index.records)
+        self.assertEqual(20, index.live_bytes)
+        self.assertEqual(15, index.dead_bytes)
+        self.assertEqual(112, index.length)
+        self.assertEqual(['4.ts'], index.files('def'))
+        self.assertIsNone(index.get('abc', '1.data'))
+
+    def test_parse_skips_bad_lines(self):
+        index = slab_diskfile.SlabIndex.parse(
+            b'slab.1.vol\n'
+            b'+ abc 1.data 0 10\n'
+            b'* abc 1.data\n'
+            b'> abc\n'
+            b'+ abc 2.data 0 10 5 2.5\n')
+        self.assertEqual(['2.data'], index.files('abc'))
+        self.assertEqual(1, index.records)
+
+    def test_parse_no_volume(self):
+        self.assertIsNone(slab_diskfile.SlabIndex.parse(b''))
+        self.assertIsNone(slab_diskfile.SlabIndex.parse(b'slab.1.vol'))
+
+    def test_needs_compaction(self):
+        index = slab_diskfile.SlabIndex('slab.1.vol')
+        index.apply('+ abc 1.data 0 100 1048576 1')
+        index.apply('+ abc 1.data 1048676 100 1048576 1')
+        self.assertFalse(index.needs_compaction())
+        index.apply('+ abc 1.data 2097352 100 1048576 1')
+        self.assertTrue(index.needs_compaction())
+
+        index = slab_diskfile.SlabIndex('slab.1.vol')
+        index.apply('+ abc 0.ts 0 100 0 1')
+        for i in range(slab_diskfile.SLAB_COMPACTION_MIN_RECORDS // 2):
+            index.apply('+ abc %d.ts 0 100 0 1' % (i + 1))
+            index.apply('- abc %d.ts' % i)
+        self.assertFalse(index.needs_compaction())
+        index.apply('- abc %d.ts' % (i + 1))
+        self.assertTrue(index.needs_compaction())
+
+
+@patch_policies(slab_policies)
+class TestSlabDiskFileRouter(unittest.TestCase):
+
+    def test_router(self):
+        conf = {'slab_max_object_size': '4096'}
+        router = diskfile.DiskFileRouter(conf, debug_logger())
+        self.assertIsInstance(router[POLICIES[0]],
+                              slab_diskfile.SlabDiskFileManager)
+        self.assertIsInstance(router[POLICIES[1]],
+                              slab_diskfile.SlabECDiskFileManager)
+        self.assertEqual(4096, router[POLICIES[0]].slab_max_object_size)
+
+    def test_invalid_max_object_size(self):
+        for value in ('-1', 'big'):
+            conf = {'slab_max_object_size': value}
+            with self.assertRaises(ValueError):
+                diskfile.DiskFileRouter(conf, debug_logger())
+
+
+class SlabTestMixin(BaseDiskFileTestMixin):
+
+    def setUp(self):
+        super(SlabTestMixin, self).setUp()
+        self.conf['slab_max_object_size'] = '1024'
+        self.df_mgr = self.mgr_cls(self.conf, self.logger)
+
+    def _get_diskfile(self, obj='o', device='sda1', df_mgr=None):
+        df_mgr = df_mgr or self.df_mgr
+        return df_mgr.get_diskfile(device, '0', 'a', 'c', obj,
+                                   policy=POLICIES.default, frag_index=2)
+
+    def _put(self, df, body, timestamp, size=None, **metadata):
+        metadata.update({'X-Timestamp': timestamp.internal,
+                         'ETag': md5(body).hexdigest(),
+                         'Content-Length': str(len(body))})
+        with df.create(size=len(body) if size is None else size) as writer:
+            for offset in range(0, len(body), 100):
+                writer.write(body[offset:offset + 100])
+            writer.put(metadata)
+            writer.commit(timestamp)
+
+    def _index(self, df):
+        return self.df_mgr._read_slab_index(os.path.dirname(df._datadir))
+
+
+@patch_policies(slab_policies)
+class TestSlabDiskFile(SlabTestMixin, BaseUnitTestCase):
+
+    mgr_cls = slab_diskfile.SlabDiskFileManager
+
+    def test_small_object_is_packed(self):
+        df = self._get_diskfile()
+        ts = self.ts()
+        self._put(df, b'packed', ts, **{'X-Object-Meta-Color': 'blue'})
+        self.assertFalse(os.path.exists(df._datadir))
+        suffix_path = os.path.dirname(df._datadir)
+        index = self._index(df)
+        self.assertEqual(sorted(['slab.idx', index.volume]),
+                         sorted(os.listdir(suffix_path)))
+        self.assertEqual([ts.internal + '.data'],
+                         index.files(os.path.basename(df._datadir)))
+
+        df = self._get_diskfile()
+        with df.open():
+            self.assertEqual('blue', df.get_metadata()['X-Object-Meta-Color'])
+            self.assertEqual('/a/c/o', df.get_metadata()['name'])
+            reader = df.reader()
+            self.assertFalse(reader.can_zero_copy_send())
+            self.assertEqual(b'packed', b''.join(reader))
+        with df.open():
+            reader = df.reader()
+            self.assertEqual(b'ack', b''.join(reader.app_iter_range(1, 4)))
+
+    def test_large_object_is_a_file(self):
+        df = self._get_diskfile()
+        ts = self.ts()
+        body = b'x' * 1025
+        self._put(df, body, ts)
+        self.assertEqual([ts.internal + '.data'], os.listdir(df._datadir))
+        self.assertIsNone(self._index(df))
+        with self._get_diskfile().open() as df:
+            self.assertEqual(body, b''.join(df.reader()))
+
+    def test_unknown_size_spills_to_a_file(self):
+        for length, packed in ((1024, True), (1025, False)):
+            df = self._get_diskfile(obj='o%d' % length)
+            ts = self.ts()
+            body = b'y' * length
+            with df.create() as writer:
+                for offset in range(0, len(body), 100):
+                    writer.write(body[offset:offset + 100])
+                self.assertEqual((length, md5(body).hexdigest()),
+                                 writer.chunks_finished())
+                writer.put({'X-Timestamp': ts.internal,
+                            'ETag': md5(body).hexdigest(),
+                            'Content-Length': str(length)})
+            self.assertEqual(not packed, os.path.exists(df._datadir))
+            with self._get_diskfile(obj='o%d' % length).open() as df:
+                self.assertEqual(body, b''.join(df.reader()))
+
+    def test_next_part_power_writes_files(self):
+        df = self.df_mgr.get_diskfile('sda1', '0', 'a', 'c', 'o',
+                                      policy=POLICIES.default,
+                                      next_part_power=1)
+        ts = self.ts()
+        self._put(df, b'relinked', ts)
+        self.assertEqual([ts.internal + '.data'], os.listdir(df._datadir))
+
+    def test_overwrite_post_and_delete(self):
+        df = self._get_diskfile()
+        hsh = os.path.basename(df._datadir)
+        t1, t2, t3, t4 = [self.ts() for _ in range(4)]
+        self._put(df, b'one', t1)
+        self._put(df, b'two', t2)
+        self.assertEqual([t2.internal + '.data'], self._index(df).files(hsh))
+        df.write_metadata({'X-Timestamp': t3.internal,
+                           'X-Object-Meta-Color': 'red'})
+        self.assertEqual(
+            sorted([t2.internal + '.data', t3.internal + '.meta']),
+            sorted(self._index(df).files(hsh)))
+        with self._get_diskfile().open() as df:
+            self.assertEqual('red', df.get_metadata()['X-Object-Meta-Color'])
+            self.assertEqual(b'two', b''.join(df.reader()))
+
+        df.delete(t4)
+        self.assertEqual([t4.internal + '.ts'], self._index(df).files(hsh))
+        with self.assertRaises(DiskFileDeleted) as cm:
+            self._get_diskfile().open()
+        self.assertEqual(t4, cm.exception.timestamp)
+        self.assertFalse(os.path.exists(df._datadir))
+
+    def test_packed_and_file_versions_replace_each_other(self):
+        df = self._get_diskfile()
+        hsh = os.path.basename(df._datadir)
+        t1, t2, t3 = [self.ts() for _ in range(3)]
+        self._put(df, b'small', t1)
+        self._put(df, b'x' * 2048, t2)
+        self.assertEqual([t2.internal + '.data'], os.listdir(df._datadir))
+        self.assertEqual([], self._index(df).files(hsh)
+                         if self._index(df) else [])
+        self._put(df, b'small', t3)
+        self.assertFalse(os.path.exists(df._datadir))
+        self.assertEqual([t3.internal + '.data'], self._index(df).files(hsh))
+        with self._get_diskfile().open() as df:
+            self.assertEqual(b'small', b''.join(df.reader()))
+
+    def test_empty_volume_is_removed(self):
+        df = self._get_diskfile()
+        suffix_path = os.path.dirname(df._datadir)
+        old = Timestamp(time.time() - self.df_mgr.reclaim_age - 100)
+        self._put(df, b'gone', old)
+        # the reclaimable tombstone is removed straight away, and with it
+        # the volume
+        df.delete(Timestamp(old, offset=1))
+        self.assertEqual([], os.listdir(suffix_path))
+        hashes = self.df_mgr.get_hashes('sda1', '0', [], POLICIES.default)
+        self.assertEqual({}, hashes)
+        self.assertFalse(os.path.exists(suffix_path))
+
+    def test_suffix_hashes_match_fs_backend(self):
+        fs_mgr = diskfile.DiskFileManager(self.conf, self.logger)
+        t1, t2, t3, t4 = [self.ts() for _ in range(4)]
+        for df_mgr, device in ((self.df_mgr, 'sda1'), (fs_mgr, 'sda2')):
+            self._put(self._get_diskfile('o1', device, df_mgr), b'a', t1)
+            self._put(self._get_diskfile('o2', device, df_mgr), b'b', t2)
+            self._get_diskfile('o2', device, df_mgr).write_metadata(
+                {'X-Timestamp': t3.internal})
+            self._put(self._get_diskfile('o3', device, df_mgr), b'c', t3)
+            self._get_diskfile('o3', device, df_mgr).delete(t4)
+        self.assertFalse(os.path.exists(
+            self._get_diskfile('o2')._datadir))
+        slab_hashes = self.df_mgr.get_hashes('sda1', '0', [],
+                                             POLICIES.default)
+        fs_hashes = fs_mgr.get_hashes('sda2', '0', [], POLICIES.default)
+        self.assertEqual(3, len(fs_hashes))
+        self.assertEqual(fs_hashes, slab_hashes)
+
+    def test_yield_hashes_and_get_diskfile_from_hash(self):
+        t1, t2, t3 = [self.ts() for _ in range(3)]
+        df1 = self._get_diskfile('o1')
+        self._put(df1, b'one', t1)
+        df1.write_metadata({'X-Timestamp': t2.internal})
+        df2 = self._get_diskfile('o2')
+        self._put(df2, b'x' * 2048, t3)
+        hashes = dict(self.df_mgr.yield_hashes(
+            'sda1', '0', POLICIES.default))
+        self.assertEqual({
+            os.path.basename(df1._datadir): {'ts_data': t1, 'ts_meta': t2},
+            os.path.basename(df2._datadir): {'ts_data': t3},
+        }, hashes)
+
+        df = self.df_mgr.get_diskfile_from_hash(
+            'sda1', '0', os.path.basename(df1._datadir), POLICIES.default)
+        with df.open():
+            self.assertEqual('/a/c/o1', df.get_metadata()['name'])
+            self.assertEqual(b'one', b''.join(df.reader()))
+        with self.assertRaises(DiskFileNotExist):
+            self.df_mgr.get_diskfile_from_hash(
+                'sda1', '0', 'f' * 32, POLICIES.default)
+
+    def test_audit_location_generator(self):
+        df = self._get_diskfile()
+        self._put(df, b'audit me', self.ts())
+        locations = list(self.df_mgr.object_audit_location_generator(
+            POLICIES.default, device_dirs=['sda1']))
+        self.assertEqual([df._datadir], [loc.path for loc in locations])
+        df = self.df_mgr.get_diskfile_from_audit_location(locations[0])
+        with df.open():
+            self.assertEqual(b'audit me', b''.join(df.reader()))
+
+    def test_remove_hash_dir(self):
+        df = self._get_diskfile()
+        suffix_path = os.path.dirname(df._datadir)
+        self._put(df, b'handoff', self.ts())
+        with self.assertRaises(OSError):
+            self.df_mgr.remove_suffix_dir(suffix_path)
+        self.df_mgr.remove_hash_dir(df._datadir)
+        self.assertIsNone(self._index(df))
+        self.df_mgr.remove_suffix_dir(suffix_path)
+        self.assertFalse(os.path.exists(suffix_path))
+
+    def test_corrupt_object_is_unpacked_to_quarantine(self):
+        df = self._get_diskfile()
+        t1, t2 = self.ts(), self.ts()
+        self._put(df, b'good data', t1)
+        df.write_metadata({'X-Timestamp': t2.internal})
+        index = self._index(df)
+        entry = index.get(os.path.basename(df._datadir), t1.internal + '.data')
+        volume = os.path.join(os.path.dirname(df._datadir), index.volume)
+        with open(volume, 'r+b') as fp:
+            fp.seek(entry.offset + entry.meta_size)
+            fp.write(b'bad!')
+
+        df = self._get_diskfile()
+        with df.open():
+            reader = df.reader()
+            self.assertEqual(b'bad! data', b''.join(reader))
+        quarantined = os.path.join(
+            self.testdir, 'sda1', 'quarantined', 'objects',
+            os.path.basename(df._datadir))
+        self.assertEqual(
+            sorted([t1.internal + '.data', t2.internal + '.meta']),
+            sorted(os.listdir(quarantined)))
+        metadata = diskfile.read_metadata(
+            os.path.join(quarantined, t1.internal + '.data'))
+        self.assertEqual('/a/c/o', metadata['name'])
+        self.assertIsNone(self._index(df))
+        with self.assertRaises(DiskFileNotExist):
+            self._get_diskfile().open()
+
+    def test_bad_metadata_is_quarantined(self):
+        df = self._get_diskfile()
+        ts = self.ts()
+        self._put(df, b'data', ts)
+        index = self._index(df)
+        entry = index.get(os.path.basename(df._datadir), ts.internal + '.data')
+        volume = os.path.join(os.path.dirname(df._datadir), index.volume)
+        with open(volume, 'r+b') as fp:
+            fp.seek(entry.offset)
+            fp.write(b'\x00' * entry.meta_size)
+        with self.assertRaises(DiskFileQuarantined):
+            self._get_diskfile().open()
+        self.assertEqual(['quarantines'],
+                         self.logger.statsd_client.get_increments())
+
+    def test_compaction(self):
+        df = self._get_diskfile()
+        suffix_path = os.path.dirname(df._datadir)
+        with mock.patch.object(slab_diskfile, 'SLAB_COMPACTION_MIN_BYTES',
+                               100):
+            self._put(df, b'x' * 200, self.ts())
+            old_volume = self._index(df).volume
+            self._put(df, b'y' * 200, self.ts())
+            self.assertEqual(old_volume, self._index(df).volume)
+            self._put(df, b'y' * 300, self.ts())
+        index = self._index(df)
+        self.assertNotEqual(old_volume, index.volume)
+        self.assertEqual(0, index.dead_bytes)
+        self.assertEqual(1, index.records)
+        self.assertEqual(index.live_bytes, os.path.getsize(
+            os.path.join(suffix_path, index.volume)))
+        self.assertEqual(sorted(['slab.idx', index.volume]),
+                         sorted(os.listdir(suffix_path)))
+        with self._get_diskfile().open() as df:
+            self.assertEqual(b'y' * 300, b''.join(df.reader()))
+
+    def test_partial_index_line_is_dropped(self):
+        df = self._get_diskfile()
+        self._put(df, b'one', self.ts())
+        index_file = os.path.join(os.path.dirname(df._datadir), 'slab.idx')
+        with open(index_file, 'ab') as fp:
+            fp.write(b'+ %s 9.data 0' % os.path.basename(
+                df._datadir).encode('ascii'))
+        with self._get_diskfile().open() as df:
+            self.assertEqual(b'one', b''.join(df.reader()))
+        ts = self.ts()
+        self._put(df, b'two', ts)
+        with open(index_file, 'rb') as fp:
+            self.assertNotIn(b'9.data', fp.read())
+        with self._get_diskfile().open() as df:
+            self.assertEqual(ts, df.data_timestamp)
+            self.assertEqual(b'two', b''.join(df.reader()))
+
+
+@patch_policies([
+    ECStoragePolicy(0, name='ec', is_default=True,
+                    ec_type=DEFAULT_TEST_EC_TYPE, ec_ndata=10, ec_nparity=4,
+                    diskfile_module='erasure_coding.slab'),
+    StoragePolicy(1, name='unu', diskfile_module='replication.slab'),
+], fake_ring_args=[{'replicas': 14}, {}])
+class TestSlabECDiskFile(SlabTestMixin, BaseUnitTestCase):
+
+    mgr_cls = slab_diskfile.SlabECDiskFileManager
+
+    def test_commit_and_purge(self):
+        df = self._get_diskfile()
+        hsh = os.path.basename(df._datadir)
+        ts = self.ts()
+        with df.create(size=4) as writer:
+            writer.write(b'frag')
+            writer.put({'X-Timestamp': ts.internal,
+                        'ETag': md5(b'frag').hexdigest(),
+                        'Content-Length': '4'})
+            self.assertEqual([ts.internal + '#2.data'],
+                             self._index(df).files(hsh))
+            self.assertEqual(
+                [(hsh, {'ts_data': ts, 'durable': False})],
+                list(self.df_mgr.yield_hashes('sda1', '0', POLICIES.default,
+                                              frag_index=2, frag_prefs=[])))
+            writer.commit(ts)
+        self.assertEqual([ts.internal + '#2#d.data'],
+                         self._index(df).files(hsh))
+        self.assertEqual(
+            [(hsh, {'ts_data': ts, 'durable': True})],
+            list(self.df_mgr.yield_hashes('sda1', '0', POLICIES.default,
+                                          frag_index=2)))
+        self.assertFalse(os.path.exists(df._datadir))
+
+        df = self.df_mgr.get_diskfile_from_hash(
+            'sda1', '0', hsh, POLICIES.default)
+        df.purge(ts, 2)
+        self.assertIsNone(self._index(df))
+
+    def test_purge_nondurable_after_delay(self):
+        df = self._get_diskfile()
+        hsh = os.path.basename(df._datadir)
+        ts = self.ts()
+        with df.create(size=4) as writer:
+            writer.write(b'frag')
+            writer.put({'X-Timestamp': ts.internal,
+                        'ETag': md5(b'frag').hexdigest(),
+                        'Content-Length': '4'})
+        df.purge(ts, 2, nondurable_purge_delay=60)
+        self.assertEqual([ts.internal + '#2.data'],
+                         self._index(df).files(hsh))
+        with mock.patch('swift.obj.slab_diskfile.time.time',
+                        return_value=time.time() + 61):
+            df.purge(ts, 2, nondurable_purge_delay=60)
+        self.assertIsNone(self._index(df))
+
+
+if __name__ == '__main__':
+    unittest.main()
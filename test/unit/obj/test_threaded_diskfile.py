@@ -0,0 +1,143 @@
+# Copyright (c) 2026 OpenStack Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import unittest
+from unittest import mock
+
+from swift.common.concurrency import GreenPool, sleep
+from swift.common.storage_policy import POLICIES, StoragePolicy, \
+    ECStoragePolicy, EC_POLICY
+from swift.common.utils import Timestamp, md5
+from swift.obj import diskfile, threaded_diskfile
+from test.debug_logger import debug_logger
+from test.unit import BaseUnitTestCase, patch_policies, \
+    DEFAULT_TEST_EC_TYPE, encode_frag_archive_bodies
+from test.unit.obj.test_diskfile import DiskFileMixin
+
+
+threaded_policies = [
+    StoragePolicy(0, name='zero', is_default=True,
+                  diskfile_module='replication.threaded'),
+    ECStoragePolicy(1, name='one', ec_type=DEFAULT_TEST_EC_TYPE,
+                    ec_ndata=10, ec_nparity=4,
+                    diskfile_module='erasure_coding.threaded'),
+]
+
+
+class TestDeviceIOQueues(unittest.TestCase):
+
+    def test_execute(self):
+        queues = threaded_diskfile.DeviceIOQueues(2)
+        self.assertEqual(3, queues.execute('/dev/sda', lambda x: x + 1, 2))
+        with self.assertRaises(OSError):
+            queues.execute('/dev/sda', os.close, -1)
+
+    def test_execute_limits_in_progress_per_device(self):
+        in_progress = {'sda': 0, 'sdb': 0}
+        most = {'sda': 0, 'sdb': 0}
+
+        def fake_execute(func, device):
+            in_progress[device] += 1
+            most[device] = max(most[device], in_progress[device])
+            sleep(0.001)
+            in_progress[device] -= 1
+            return func(device)
+
+        queues = threaded_diskfile.DeviceIOQueues(2)
+        pool = GreenPool()
+        with mock.patch('swift.obj.threaded_diskfile.tpool.execute',
+                        fake_execute):
+            for device in ['sda'] * 10 + ['sdb'] * 10:
+                pool.spawn(queues.execute, device, str, device)
+            pool.waitall()
+        self.assertEqual({'sda': 2, 'sdb': 2}, most)
+        self.assertEqual({'sda': 0, 'sdb': 0}, in_progress)
+
+
+@patch_policies(threaded_policies)
+class TestThreadedDiskFileRouter(unittest.TestCase):
+
+    def test_router(self):
+        conf = {'disk_io_threads_per_device': '3'}
+        router = diskfile.DiskFileRouter(conf, debug_logger())
+        self.assertIsInstance(router[POLICIES[0]],
+                              threaded_diskfile.ThreadedDiskFileManager)
+        self.assertIsInstance(router[POLICIES[1]],
+                              threaded_diskfile.ThreadedECDiskFileManager)
+        self.assertEqual(3, router[POLICIES[0]].device_io.threads_per_device)
+
+    def test_invalid_threads_per_device(self):
+        for value in ('0', '-1', 'auto'):
+            conf = {'disk_io_threads_per_device': value}
+            with self.assertRaises(ValueError):
+                diskfile.DiskFileRouter(conf, debug_logger())
+
+
+class ThreadedDiskFileMixin(DiskFileMixin):
+
+    def test_data_io_uses_device_queue(self):
+        df = self._simple_get_diskfile()
+        device_path = df._device_path
+        chunk_size = self.df_mgr.disk_chunk_size
+        body = b'x' * (chunk_size * 30 + 1)
+        if df.policy.policy_type == EC_POLICY:
+            body = encode_frag_archive_bodies(
+                df.policy, body)[df._frag_index]
+        timestamp = Timestamp.now()
+        calls = []
+
+        def fake_execute(device, func, *args, **kwargs):
+            calls.append((device, getattr(func, '__name__', func)))
+            return func(*args, **kwargs)
+
+        with mock.patch.object(df.manager.device_io, 'execute',
+                               fake_execute):
+            with df.create() as writer:
+                writer.write(body)
+                writer.put({'X-Timestamp': timestamp.internal,
+                            'ETag': md5(body).hexdigest(),
+                            'Content-Length': str(len(body))})
+                writer.commit(timestamp)
+            self.assertEqual((device_path, 'write'), calls[0])
+            self.assertIn((device_path, '_finalize_put'), calls)
+            del calls[:]
+            with df.open():
+                self.assertEqual(body, b''.join(df.reader()))
+        # one more read finds the end of the file
+        expected_reads = -(-len(body) // chunk_size) + 1
+        self.assertEqual([(device_path, 'read')] * expected_reads, calls)
+
+
+@patch_policies(threaded_policies)
+class TestThreadedDiskFile(ThreadedDiskFileMixin, BaseUnitTestCase):
+
+    mgr_cls = threaded_diskfile.ThreadedDiskFileManager
+
+
+@patch_policies([
+    ECStoragePolicy(0, name='ec', is_default=True,
+                    ec_type=DEFAULT_TEST_EC_TYPE, ec_ndata=10, ec_nparity=4,
+                    ec_segment_size=4096,
+                    diskfile_module='erasure_coding.threaded'),
+    StoragePolicy(1, name='unu', diskfile_module='replication.threaded'),
+], fake_ring_args=[{'replicas': 14}, {}])
+class TestThreadedECDiskFile(ThreadedDiskFileMixin, BaseUnitTestCase):
+
+    mgr_cls = threaded_diskfile.ThreadedECDiskFileManager
+
+
+if __name__ == '__main__':
+    unittest.main()
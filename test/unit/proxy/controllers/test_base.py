@@ -19,6 +19,7 @@ from argparse import Namespace
 import itertools
 import json
 from collections import defaultdict
+import zlib
 from unittest import mock
 
 from swift.proxy import server as proxy_server
@@ -28,12 +29,16 @@ from swift.proxy.controllers.base import headers_to_container_info, \
     Controller, GetOrHeadHandler, bytes_to_skip, clear_info_cache, \
     set_info_cache, NodeIter, headers_from_container_info, \
     record_cache_op_metrics, GetterSource, get_namespaces_from_cache, \
-    set_namespaces_in_cache
+    set_namespaces_in_cache, encode_compact_namespace_bounds, \
+    decode_compact_namespace_bounds, namespace_bounds_to_list, \
+    namespace_list_to_bounds, prefetch_from_memcache
 from swift.common.swob import Request, HTTPException, RESPONSE_REASONS, \
     bytes_to_wsgi
 from swift.common import exceptions
+from swift.common.memcached import LocalCache
 from swift.common.utils import split_path, Timestamp, \
-    GreenthreadSafeIterator, GreenAsyncPile, NamespaceBoundList
+    GreenthreadSafeIterator, GreenAsyncPile, NamespaceBoundList, \
+    CompactNamespaceBoundList
 from swift.common.header_key_dict import HeaderKeyDict
 from swift.common.http import is_success
 from swift.common.storage_policy import StoragePolicy, StoragePolicyCollection
@@ -267,6 +272,94 @@ class TestFuncs(BaseTest):
         actual = get_namespaces_from_cache(req, cache_key, 0.0)
         self.assertEqual((None, 'error'), actual)
 
+    def test_get_namespaces_from_cache_local_cache(self):
+        cache_key = 'shard-listing-v2/a/c'
+        ns_bound_list = NamespaceBoundList([['', 'sr1'], ['k', 'sr2']])
+        local_cache = LocalCache(10)
+        self.cache.set(cache_key, ns_bound_list.bounds)
+
+        req = Request.blank('a/c')
+        req.environ['swift.cache'] = self.cache
+        req.environ['swift.local_cache'] = local_cache
+        actual = get_namespaces_from_cache(req, cache_key, 0)
+        self.assertEqual((ns_bound_list, 'hit'), actual)
+        self.assertEqual(ns_bound_list.bounds, local_cache.get(cache_key))
+
+        self.cache.delete(cache_key)
+        req = Request.blank('a/c')
+        req.environ['swift.cache'] = self.cache
+        req.environ['swift.local_cache'] = local_cache
+        actual = get_namespaces_from_cache(req, cache_key, 0)
+        self.assertEqual((ns_bound_list, 'local_hit'), actual)
+        self.assertEqual({cache_key: ns_bound_list},
+                         req.environ['swift.infocache'])
+
+        # skipping memcache skips the local cache, too
+        req = Request.blank('a/c')
+        req.environ['swift.cache'] = self.cache
+        req.environ['swift.local_cache'] = local_cache
+        with mock.patch('swift.proxy.controllers.base.random.random',
+                        return_value=0.05):
+            actual = get_namespaces_from_cache(req, cache_key, 0.1)
+        self.assertEqual((None, 'skip'), actual)
+
+    def test_get_namespaces_from_cache_local_cache_decoded(self):
+        cache_key = 'shard-updating-v2/a/c/'
+        few = [['', 'sr1'], ['k', 'sr2']]
+        many = [['' if i == 0 else 'obj-%06d' % i, '.shards_a/c-%d' % i]
+                for i in range(10000)]
+        local_cache = LocalCache(10)
+
+        def do_get():
+            req = Request.blank('a/c')
+            req.environ['swift.cache'] = self.cache
+            req.environ['swift.local_cache'] = local_cache
+            return get_namespaces_from_cache(req, cache_key, 0)
+
+        for bounds, expected_class in ((few, NamespaceBoundList),
+                                       (many, CompactNamespaceBoundList)):
+            local_cache.delete(cache_key)
+            self.cache.set(cache_key, bounds)
+            ns_bound_list, cache_state = do_get()
+            self.assertEqual('hit', cache_state)
+            self.assertIs(NamespaceBoundList, type(ns_bound_list))
+            self.assertEqual(bounds, ns_bound_list.bounds)
+            # later requests share the namespaces decoded from the local cache
+            with mock.patch('swift.proxy.controllers.base.'
+                            'namespace_bounds_to_list',
+                            wraps=namespace_bounds_to_list) as mock_decode:
+                local_ns_bound_list, cache_state = do_get()
+                self.assertEqual('local_hit', cache_state)
+                self.assertIs(expected_class, type(local_ns_bound_list))
+                self.assertEqual(ns_bound_list, local_ns_bound_list)
+                self.assertIs(local_ns_bound_list, do_get()[0])
+            self.assertEqual(1, mock_decode.call_count)
+            self.assertEqual(
+                ns_bound_list.get_namespace('obj-005000\x00'),
+                local_ns_bound_list.get_namespace('obj-005000\x00'))
+
+        # a new value from memcache is decoded again
+        local_cache.set(cache_key, few)
+        self.assertEqual(NamespaceBoundList(few), do_get()[0])
+
+    def test_set_namespaces_in_cache_local_cache(self):
+        cache_key = 'shard-listing-v2/a/c'
+        ns_bound_list = NamespaceBoundList([['', 'sr1'], ['k', 'sr2']])
+        local_cache = LocalCache(10)
+        req = Request.blank('a/c')
+        req.environ['swift.cache'] = self.cache
+        req.environ['swift.local_cache'] = local_cache
+        actual = set_namespaces_in_cache(req, cache_key, ns_bound_list, 123)
+        self.assertEqual('set', actual)
+        self.assertEqual(ns_bound_list.bounds, local_cache.get(cache_key))
+
+        # not cached locally if memcache set fails
+        local_cache.delete(cache_key)
+        self.cache.error_on_set = [True]
+        actual = set_namespaces_in_cache(req, cache_key, ns_bound_list, 123)
+        self.assertEqual('set_error', actual)
+        self.assertIsNone(local_cache.get(cache_key))
+
     def test_set_namespaces_in_cache_disabled(self):
         cache_key = 'shard-testing-v2/a/c/'
         ns_bound_list = NamespaceBoundList([['', 'sr1'], ['k', 'sr2']])
@@ -288,6 +381,28 @@ class TestFuncs(BaseTest):
         self.assertEqual(ns_bound_list.bounds, self.cache.store.get(cache_key))
         self.assertEqual(123, self.cache.times.get(cache_key))
 
+    def test_set_namespaces_in_cache_compact(self):
+        cache_key = 'shard-testing-v2/a/c/'
+        ns_bound_list = NamespaceBoundList([['', 'sr1'], ['k', 'sr2']])
+        req = Request.blank('a/c')
+        req.environ['swift.cache'] = self.cache
+        actual = set_namespaces_in_cache(req, cache_key, ns_bound_list, 123,
+                                         compact=True)
+        self.assertEqual('set', actual)
+        self.assertEqual({cache_key: ns_bound_list},
+                         req.environ['swift.infocache'])
+        cached = self.cache.store.get(cache_key)
+        self.assertIsInstance(cached, bytes)
+        self.assertEqual(ns_bound_list.bounds,
+                         decode_compact_namespace_bounds(cached))
+        self.assertEqual(123, self.cache.times.get(cache_key))
+
+        # and it can be read back
+        req = Request.blank('a/c')
+        req.environ['swift.cache'] = self.cache
+        actual = get_namespaces_from_cache(req, cache_key, 0)
+        self.assertEqual((ns_bound_list, 'hit'), actual)
+
     def test_set_namespaces_in_cache_infocache_exists(self):
         cache_key = 'shard-testing-v2/a/c/'
         ns_bound_list = NamespaceBoundList([['', 'sr1'], ['k', 'sr2']])
@@ -319,6 +434,60 @@ class TestFuncs(BaseTest):
                       'CooperativeNamespaceCachePopulator',
                       str(cm.exception))
 
+    def test_compact_namespace_bounds(self):
+        def do_test(bounds):
+            data = encode_compact_namespace_bounds(bounds)
+            self.assertTrue(data.startswith(b'\x00nsb1'))
+            self.assertEqual(bounds, decode_compact_namespace_bounds(data))
+            self.assertEqual(NamespaceBoundList(bounds),
+                             namespace_bounds_to_list(data))
+            self.assertEqual(
+                data, namespace_list_to_bounds(NamespaceBoundList(bounds),
+                                               compact=True))
+
+        do_test([['', '.shards_a/c-0']])
+        do_test([['', '.shards_a/c-0'], ['k', '.shards_a/c-1']])
+        do_test([['', '.shards_a/c-0'],
+                 ['\N{SNOWMAN}\x00\xff', '.shards_a/\N{SNOWMAN}-1'],
+                 ['\U0001F4A9', '.shards_a/c-2']])
+        many = [['' if i == 0 else 'obj-%06d' % i, '.shards_a/c-%d' % i]
+                for i in range(10000)]
+        do_test(many)
+        self.assertLess(len(encode_compact_namespace_bounds(many)),
+                        len(json.dumps(many)) / 4)
+
+    def test_namespace_bounds_to_list_compact(self):
+        few = [['', 'sr1'], ['k', 'sr2']]
+        self.assertIs(NamespaceBoundList, type(
+            namespace_bounds_to_list(few, compact=True)))
+        many = [['' if i == 0 else 'obj-%06d' % i, '.shards_a/c-%d' % i]
+                for i in range(10000)]
+        for bounds in (many, encode_compact_namespace_bounds(many)):
+            self.assertIs(NamespaceBoundList, type(
+                namespace_bounds_to_list(bounds)))
+            ns_bound_list = namespace_bounds_to_list(bounds, compact=True)
+            self.assertIs(CompactNamespaceBoundList, type(ns_bound_list))
+            self.assertEqual(many, ns_bound_list.bounds)
+        self.assertIsNone(namespace_bounds_to_list(None, compact=True))
+        self.assertIsNone(namespace_bounds_to_list([], compact=True))
+
+    def test_compact_namespace_bounds_unencodable(self):
+        bounds = [['', '.shards_a/c-0'], ['\udce2', '.shards_a/c-1']]
+        self.assertIsNone(encode_compact_namespace_bounds(bounds))
+        # fall back to the usual bounds
+        self.assertEqual(
+            bounds, namespace_list_to_bounds(NamespaceBoundList(bounds),
+                                             compact=True))
+
+    def test_compact_namespace_bounds_invalid(self):
+        data = encode_compact_namespace_bounds([['', 'sr1'], ['k', 'sr2']])
+        for bad_data in (b'', b'["not", "compact"]', data[:-1],
+                         data[:5] + zlib.compress(b'\x01\x00'),
+                         data[:5] + zlib.compress(b'\x01\x00\x00\x00')):
+            with self.assertRaises(ValueError):
+                decode_compact_namespace_bounds(bad_data)
+            self.assertIsNone(namespace_bounds_to_list(bad_data))
+
     def test_get_info_zero_recheck(self):
         mock_cache = mock.Mock()
         mock_cache.get.return_value = None
@@ -713,6 +882,122 @@ class TestFuncs(BaseTest):
              self.logger.logger.statsd_client.calls['increment']],
             ['container.info.cache.hit'])
 
+    def test_get_container_info_local_cache(self):
+        cache_key = get_cache_key("account", "cont")
+        local_cache = LocalCache(10)
+        memcache = FakeCache()
+        memcache.set(cache_key, {'status': 200, 'bytes': 3333,
+                                 'object_count': 10, 'meta': {}})
+
+        def do_get_info():
+            req = Request.blank("/v1/account/cont", environ={
+                'swift.cache': memcache, 'swift.local_cache': local_cache})
+            return get_container_info(
+                req.environ, self.app, swift_source=None, cache_only=True)
+
+        # first lookup goes to memcache and populates the local cache
+        resp = do_get_info()
+        self.assertEqual(resp['bytes'], 3333)
+        self.assertEqual({'status': 200, 'bytes': 3333, 'object_count': 10,
+                          'meta': {}}, local_cache.get(cache_key))
+        # then the local cache is used, even though memcache has moved on
+        memcache.set(cache_key, {'status': 200, 'bytes': 4444,
+                                 'object_count': 10, 'meta': {}})
+        resp = do_get_info()
+        self.assertEqual(resp['bytes'], 3333)
+        self.assertEqual(
+            [x[0][0] for x in
+             self.logger.logger.statsd_client.calls['increment']],
+            ['container.info.cache.hit', 'container.info.local_cache.hit'])
+
+        # clearing the info cache clears the local cache, too
+        req = Request.blank("/v1/account/cont", environ={
+            'swift.cache': memcache, 'swift.local_cache': local_cache})
+        clear_info_cache(req.environ, 'account', 'cont')
+        self.assertIsNone(local_cache.get(cache_key))
+        self.assertIsNone(memcache.get(cache_key))
+
+        # setting the info cache sets it locally, respecting memcache's ttl
+        resp = FakeResponse(status_int=404, headers=HeaderKeyDict({
+            'x-container-object-count': '12',
+            'x-backend-recheck-container-existence': '40'}))
+        with mock.patch('swift.common.memcached.tm.time', return_value=100), \
+                mock.patch('swift.common.memcached.random.random',
+                           return_value=0):
+            set_info_cache(req.environ, 'account', 'cont', resp)
+        with mock.patch('swift.common.memcached.tm.time', return_value=103.9):
+            self.assertEqual('12', local_cache.get(cache_key)['object_count'])
+        with mock.patch('swift.common.memcached.tm.time', return_value=104):
+            self.assertIsNone(local_cache.get(cache_key))
+
+    def test_get_container_info_local_cache_skip(self):
+        cache_key = get_cache_key("account", "cont")
+        local_cache = LocalCache(10)
+        local_cache.set(cache_key, {'status': 200, 'bytes': 3333})
+        self.app.container_existence_skip_cache = 0.1
+        app = FakeApp(statuses=[200, 200])
+        app._pipeline_final_app = self.app
+        req = Request.blank("/v1/account/cont", environ={
+            'swift.cache': FakeCache(), 'swift.local_cache': local_cache})
+        # skipping memcache skips the local cache, too
+        with mock.patch('swift.proxy.controllers.base.random.random',
+                        return_value=0.05):
+            resp = get_container_info(req.environ, app)
+        self.assertEqual(resp['bytes'], 6666)
+        self.assertEqual('6666', local_cache.get(cache_key)['bytes'])
+
+    def test_prefetch_from_memcache(self):
+        info_key = get_cache_key("account", "cont")
+        ns_key = get_cache_key("account", "cont", shard='updating')
+        ns_bound_list = NamespaceBoundList([['', 'sr1'], ['k', 'sr2']])
+        memcache = FakeMemcache()
+        memcache.set(info_key, {'status': 200, 'bytes': 3333,
+                                'object_count': 10, 'meta': {}})
+        memcache.set(ns_key, ns_bound_list.bounds)
+        memcache.clear_calls()
+
+        req = Request.blank("/v1/account/cont", environ={
+            'swift.cache': memcache})
+        prefetch_from_memcache(req.environ, [info_key, ns_key])
+        resp = get_container_info(
+            req.environ, self.app, swift_source=None, cache_only=True)
+        self.assertEqual(resp['bytes'], 3333)
+        self.assertEqual((ns_bound_list, 'hit'),
+                         get_namespaces_from_cache(req, ns_key, 0))
+        # one round trip to memcache for both lookups
+        self.assertEqual([mock.call.get_multi([info_key, ns_key])],
+                         memcache.calls)
+        self.assertEqual(
+            [x[0][0] for x in
+             self.logger.logger.statsd_client.calls['increment']],
+            ['container.info.cache.hit'])
+
+        # keys that are cached elsewhere are not prefetched, nor is a lone key
+        local_cache = LocalCache(10)
+        local_cache.set(info_key, {'status': 200, 'bytes': 3333})
+        memcache.clear_calls()
+        req = Request.blank("/v1/account/cont", environ={
+            'swift.cache': memcache, 'swift.local_cache': local_cache})
+        prefetch_from_memcache(req.environ, [info_key, ns_key])
+        self.assertEqual({}, req.environ['swift.memcache_prefetched'])
+        self.assertEqual([], memcache.calls)
+
+        # misses are looked up again on their own, so errors are told apart
+        memcache.delete(ns_key)
+        memcache.clear_calls()
+        req = Request.blank("/v1/account/cont", environ={
+            'swift.cache': memcache})
+        prefetch_from_memcache(req.environ, [info_key, ns_key])
+        self.assertEqual((None, 'miss'),
+                         get_namespaces_from_cache(req, ns_key, 0))
+        self.assertEqual([mock.call.get_multi([info_key, ns_key]),
+                          mock.call.get(ns_key, raise_on_error=True)],
+                         memcache.calls)
+
+        # cleared info is not served from what was prefetched
+        clear_info_cache(req.environ, 'account', 'cont')
+        self.assertEqual({}, req.environ['swift.memcache_prefetched'])
+
     def test_get_cache_key(self):
         self.assertEqual(get_cache_key("account", "cont"),
                          'container/account/cont')
@@ -802,6 +1087,12 @@ class TestFuncs(BaseTest):
             self.logger.statsd_client.get_stats_counts().get(
                 'container.shard_listing.cache.hit'),
             1)
+        record_cache_op_metrics(
+            self.logger, 'container', 'info', 'local_hit')
+        self.assertEqual(
+            self.logger.statsd_client.get_stats_counts().get(
+                'container.info.local_cache.hit'),
+            1)
         resp = FakeResponse(status_int=200)
         record_cache_op_metrics(
             self.logger, 'object', 'shard_updating', 'skip', resp)
@@ -1492,6 +1783,36 @@ class TestNodeIter(BaseTest):
         self.assertEqual({0, 1, 2}, primary_indexes)
         self.assertEqual([0, 1, 2], handoff_indexes)
 
+    def test_iter_with_handoffs_sorted_by_latency(self):
+        ring = FakeRing(replicas=3, max_more_nodes=20)
+        policy = StoragePolicy(0, 'zero', object_ring=ring)
+        app = proxy_server.Application({'sorting_method': 'latency'},
+                                       logger=self.logger,
+                                       account_ring=self.account_ring,
+                                       container_ring=self.container_ring)
+        handoffs = list(itertools.islice(ring.get_more_nodes(0), 4))
+        for node, timing in zip(handoffs, (0.4, 0.3, 0.2, 0.1)):
+            app.set_node_first_byte_timing(node, timing)
+        node_iter = NodeIter(
+            'object', app, policy.object_ring, 0, self.logger,
+            policy=policy, request=Request.blank(''))
+        nodes = list(node_iter)
+        self.assertEqual(6, len(nodes))
+        # the expected handoffs are sorted by latency; the 4th handoff is
+        # faster but is not expected to be needed
+        self.assertEqual([2, 1, 0],
+                         [n['handoff_index'] for n in nodes[3:]])
+
+        # a supplied node_iter is not reordered
+        node_iter = NodeIter(
+            'object', app, policy.object_ring, 0, self.logger,
+            policy=policy, request=Request.blank(''),
+            node_iter=itertools.chain(ring.get_part_nodes(0),
+                                      ring.get_more_nodes(0)))
+        nodes = list(node_iter)
+        self.assertEqual([0, 1, 2],
+                         [n['handoff_index'] for n in nodes[3:]])
+
     def test_multi_iteration(self):
         ring = FakeRing(replicas=8, max_more_nodes=20)
         policy = StoragePolicy(0, 'ec', object_ring=ring)
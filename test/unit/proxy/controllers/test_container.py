@@ -182,6 +182,31 @@ class TestContainerController(BaseTestContainerController):
         for key in owner_headers:
             self.assertIn(key, resp.headers)
 
+    def test_GET_streamed_listing_transfer_encoding(self):
+        controller = proxy_server.ContainerController(self.app, 'a', 'c')
+        req = Request.blank('/v1/a/c?format=json')
+        with mock.patch('swift.proxy.controllers.base.http_connect',
+                        fake_http_connect(
+                            200, 200, body=b'[]',
+                            headers={'transfer-encoding': 'chunked'})):
+            resp = controller.GET(req)
+        self.assertEqual(200, resp.status_int)
+        self.assertNotIn('Transfer-Encoding', resp.headers)
+        self.assertEqual(b'[]', resp.body)
+
+    def test_GET_asks_for_streamed_listing(self):
+        controller = proxy_server.ContainerController(self.app, 'a', 'c')
+        for method, expected in (('GET', 'true'), ('HEAD', None)):
+            req = Request.blank('/v1/a/c', method=method)
+            with mocked_http_conn(200, 200) as mock_conn:
+                resp = getattr(controller, method)(req)
+            self.assertEqual(200, resp.status_int)
+            self.assertEqual(['/a', '/a/c'],
+                             [r['path'][6:] for r in mock_conn.requests])
+            self.assertEqual(
+                expected, mock_conn.requests[1]['headers'].get(
+                    'X-Backend-Listing-Stream'))
+
     def test_reseller_admin(self):
         reseller_internal_headers = {
             get_sys_meta_prefix('container') + 'sharding': 'True'}
@@ -2950,6 +2975,7 @@ class TestGetShardedContainer(BaseTestContainerController):
         self.assertEqual(resp.status_int, 200)
         self.assertEqual(1, len(fake_conn.requests))
         exp_backend_hdrs = {
+            'X-Backend-Listing-Stream': 'true',
             'X-Backend-Record-Type': 'shard',
             'X-Backend-Record-Shard-Format': 'namespace',
             'Host': mock.ANY, 'X-Trans-Id': mock.ANY, 'X-Timestamp': mock.ANY,
@@ -2980,6 +3006,7 @@ class TestGetShardedContainer(BaseTestContainerController):
         self.assertEqual(resp.status_int, 200)
         self.assertEqual(1, len(fake_conn.requests))
         exp_backend_hdrs = {
+            'X-Backend-Listing-Stream': 'true',
             'X-Backend-Record-Type': 'shard',
             'X-Backend-Record-Shard-Format': 'namespace',
             'Host': mock.ANY, 'X-Trans-Id': mock.ANY, 'X-Timestamp': mock.ANY,
@@ -3011,6 +3038,7 @@ class TestGetShardedContainer(BaseTestContainerController):
         self.assertEqual(resp.status_int, 200)
         self.assertEqual(1, len(fake_conn.requests))
         exp_backend_hdrs = {
+            'X-Backend-Listing-Stream': 'true',
             'X-Backend-Record-Type': 'object',
             'Host': mock.ANY, 'X-Trans-Id': mock.ANY, 'X-Timestamp': mock.ANY,
             'Connection': 'close', 'User-Agent': mock.ANY,
@@ -3153,6 +3181,7 @@ class BaseTestContainerControllerGetPath(BaseTestContainerController):
         expected_headers = {
             'Connection': 'close',
             'Host': 'localhost:80',
+            'X-Backend-Listing-Stream': 'true',
             'X-Trans-Id': req.headers['X-Trans-Id']}
         if extra_hdrs:
             expected_headers.update(extra_hdrs)
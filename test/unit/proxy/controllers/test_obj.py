@@ -2100,6 +2100,59 @@ class TestReplicatedObjController(CommonObjectControllerMixin,
         timestamp = mock_conn.requests[0]['headers'].get('X-Timestamp')
         self.assert_valid_timestamp(timestamp)
 
+    def _prime_hedger(self, tokens=1.0):
+        policy_opts = self.app.get_policy_options(self.policy)
+        policy_opts.hedged_gets = True
+        hedger = self.app.get_request_hedger('Object', self.policy)
+        hedger.samples = hedger.min_samples
+        hedger.estimate = 0.01
+        hedger.tokens = tokens
+        return hedger
+
+    def test_GET_hedged(self):
+        hedger = self._prime_hedger()
+        req = swift.common.swob.Request.blank('/v1/a/c/o')
+        with mocked_http_conn(FakeStatus(200, response_sleep=0.2),
+                              200) as log:
+            resp = req.get_response(self.app)
+        self.assertEqual(resp.status_int, 200)
+        self.assertEqual(2, len(log.requests))
+        stats = self.app.logger.statsd_client.get_stats_counts()
+        self.assertEqual(1, stats.get('object.hedge.launched'))
+        self.assertEqual(1, stats.get('object.hedge.won'))
+        self.assertNotIn('object.hedge.over_budget', stats)
+        # one request earned budget, the hedge spent a token
+        self.assertAlmostEqual(hedger.budget, hedger.tokens)
+
+    def test_GET_hedged_over_budget(self):
+        self._prime_hedger(tokens=0)
+        req = swift.common.swob.Request.blank('/v1/a/c/o')
+        with mocked_http_conn(FakeStatus(200, response_sleep=0.05)) as log:
+            resp = req.get_response(self.app)
+        self.assertEqual(resp.status_int, 200)
+        self.assertEqual(1, len(log.requests))
+        stats = self.app.logger.statsd_client.get_stats_counts()
+        self.assertEqual(1, stats.get('object.hedge.over_budget'))
+        self.assertNotIn('object.hedge.launched', stats)
+
+    def test_GET_hedge_not_needed(self):
+        hedger = self._prime_hedger()
+        hedger.estimate = 1.0
+        req = swift.common.swob.Request.blank('/v1/a/c/o')
+        with mocked_http_conn(200) as log:
+            resp = req.get_response(self.app)
+        self.assertEqual(resp.status_int, 200)
+        self.assertEqual(1, len(log.requests))
+        self.assertEqual(hedger.min_samples + 1, hedger.samples)
+
+        # a failed request is retried on the next node, not hedged
+        with mocked_http_conn(503, 200) as log:
+            resp = req.get_response(self.app)
+        self.assertEqual(resp.status_int, 200)
+        self.assertEqual(2, len(log.requests))
+        stats = self.app.logger.statsd_client.get_stats_counts()
+        self.assertFalse([k for k in stats if '.hedge.' in k])
+
     def test_HEAD_simple(self):
         req = swift.common.swob.Request.blank('/v1/a/c/o')
         req.method = 'HEAD'
@@ -2563,6 +2616,22 @@ class TestReplicatedObjController(CommonObjectControllerMixin,
         self.assertEqual([1] * self.replicas(),
                          node_error_counts(self.app, self.obj_ring.devs))
 
+    def test_GET_timeout_sorts_node_last_by_latency(self):
+        self.conf['sorting_method'] = 'latency'
+        self._make_app()
+        req = swift.common.swob.Request.blank('/v1/a/c/o')
+        with mocked_http_conn(Timeout(), 200) as log:
+            resp = req.get_response(self.app)
+        self.assertEqual(resp.status_int, 200)
+        contacted = [(r['ip'], r['port'], r['path'].split('/')[1])
+                     for r in log.requests]
+        primaries = self.obj_ring.get_part_nodes(1)
+        sorted_nodes = [(n['ip'], n['port'], n['device'])
+                        for n in self.app.sort_nodes(list(primaries))]
+        # the node that was not contacted has no stats so it sorts first;
+        # the one that timed out sorts behind the one that responded
+        self.assertEqual(contacted[::-1], sorted_nodes[1:])
+
     def test_HEAD_error_limit_supression_count(self):
         def do_test(primary_codes, expected, keep_errors=False):
             if not keep_errors:
@@ -3790,6 +3859,27 @@ class TestECObjController(ECObjectControllerMixin, BaseUnitTestCase):
             self.assertIn('Timeout (0.01s)', retry_line)
             self.assertIn(req.headers['x-trans-id'], retry_line)
 
+    def test_GET_timeout_sorts_node_last_by_latency(self):
+        self.conf['sorting_method'] = 'latency'
+        self._make_app()
+        req = swift.common.swob.Request.blank('/v1/a/c/o')
+        self.app.recoverable_node_timeout = 0.05
+        codes = [FakeStatus(404, response_sleep=1.0)] + \
+            [FakeStatus(200, response_sleep=0.005)] * self.policy.ec_ndata
+        with mocked_http_conn(*codes) as log:
+            resp = req.get_response(self.app)
+        self.assertEqual(resp.status_int, 200)
+        contacted = [(r['ip'], r['port'], r['path'].split('/')[1])
+                     for r in log.requests]
+        primaries = self.obj_ring.get_part_nodes(1)
+        sorted_nodes = [(n['ip'], n['port'], n['device'])
+                        for n in self.app.sort_nodes(list(primaries))]
+        # nodes that were not contacted have no stats so they sort first;
+        # the one that timed out sorts behind those that responded
+        self.assertEqual(contacted[0], sorted_nodes[-1])
+        self.assertEqual(sorted(contacted[1:]),
+                         sorted(sorted_nodes[-len(contacted):-1]))
+
     def test_GET_with_slow_primaries(self):
         segment_size = self.policy.ec_segment_size
         test_data = (b'test' * segment_size)[:-743]
@@ -3915,6 +4005,134 @@ class TestECObjController(ECObjectControllerMixin, BaseUnitTestCase):
             ))
         self.assertEqual(len(log.requests), self.policy.ec_n_unique_fragments)
 
+    def test_GET_hedged_with_slow_leader(self):
+        segment_size = self.policy.ec_segment_size
+        test_data = (b'test' * segment_size)[:-289]
+        etag = md5(test_data, usedforsecurity=False).hexdigest()
+        ec_archive_bodies = self._make_ec_archive_bodies(test_data)
+        ts = self.ts()
+        headers = []
+        for i, body in enumerate(ec_archive_bodies):
+            headers.append({
+                'X-Object-Sysmeta-Ec-Etag': etag,
+                'X-Object-Sysmeta-Ec-Content-Length': len(body),
+                'X-Object-Sysmeta-Ec-Frag-Index':
+                    self.policy.get_backend_index(i),
+                'X-Backend-Timestamp': ts.internal,
+                'X-Timestamp': ts.normal,
+                'X-Backend-Durable-Timestamp': ts.internal,
+                'X-Backend-Data-Timestamp': ts.internal,
+            })
+
+        req = swift.common.swob.Request.blank('/v1/a/c/o')
+
+        policy_opts = self.app.get_policy_options(self.policy)
+        policy_opts.hedged_gets = True
+        hedger = self.app.get_request_hedger('Object', self.policy)
+        hedger.samples = hedger.min_samples
+        hedger.estimate = 0.01
+        hedger.tokens = 1.0
+
+        # the slow leader and the ec_ndata - 1 other primaries, then one
+        # hedged request
+        status_codes = [FakeStatus(200, response_sleep=0.2)] + (
+            [200] * self.policy.ec_ndata)
+        # poison the slow request
+        ec_archive_bodies[0] = ''
+        with mocked_http_conn(*status_codes, body_iter=ec_archive_bodies,
+                              headers=headers) as log:
+            resp = req.get_response(self.app)
+            self.assertEqual(resp.status_int, 200)
+            self.assertEqual(resp.body, test_data)
+        self.assertEqual(len(log.requests), self.policy.ec_ndata + 1)
+        stats = self.app.logger.statsd_client.get_stats_counts()
+        self.assertEqual(1, stats.get('object.hedge.launched'))
+        self.assertEqual(1, stats.get('object.hedge.won'))
+        self.assertNotIn('object.hedge.over_budget', stats)
+
+    def test_GET_with_coding_pool(self):
+        segment_size = self.policy.ec_segment_size
+        test_data = (b'test' * segment_size)[:-289]
+        etag = md5(test_data, usedforsecurity=False).hexdigest()
+        ec_archive_bodies = self._make_ec_archive_bodies(test_data)
+        headers = {
+            'X-Object-Sysmeta-Ec-Etag': etag,
+            'X-Object-Sysmeta-Ec-Content-Length': len(test_data),
+        }
+        self.app.ec_coding_pool = obj.ECCodingPool(2)
+        calls = []
+
+        def fake_execute(func, *args):
+            calls.append(func)
+            return func(*args)
+
+        req = swift.common.swob.Request.blank('/v1/a/c/o')
+        status_codes = [200] * self.policy.ec_ndata
+        with mock.patch('swift.proxy.controllers.obj.tpool.execute',
+                        fake_execute), \
+                mocked_http_conn(*status_codes, body_iter=ec_archive_bodies,
+                                 headers=headers):
+            resp = req.get_response(self.app)
+            self.assertEqual(resp.status_int, 200)
+            self.assertEqual(resp.body, test_data)
+        # decodes aren't handed off to the pool
+        self.assertEqual([], calls)
+
+    def _data_fragment_ips(self):
+        return set(
+            node['ip'] for node in self.policy.object_ring.get_part_nodes(0)
+            if self.policy.get_backend_index(node['index']) <
+            self.policy.ec_ndata)
+
+    def test_GET_prefer_data_fragments(self):
+        segment_size = self.policy.ec_segment_size
+        test_data = (b'test' * segment_size)[:-289]
+        etag = md5(test_data, usedforsecurity=False).hexdigest()
+        ec_archive_bodies = self._make_ec_archive_bodies(test_data)
+        headers = {
+            'X-Object-Sysmeta-Ec-Etag': etag,
+            'X-Object-Sysmeta-Ec-Content-Length': len(test_data),
+        }
+        self.app.get_policy_options(
+            self.policy).ec_prefer_data_fragments = True
+
+        req = swift.common.swob.Request.blank('/v1/a/c/o')
+        status_codes = [200] * self.policy.ec_ndata
+        with mocked_http_conn(*status_codes, body_iter=ec_archive_bodies,
+                              headers=headers) as log:
+            resp = req.get_response(self.app)
+            self.assertEqual(resp.status_int, 200)
+            self.assertEqual(resp.body, test_data)
+        self.assertEqual(self._data_fragment_ips(),
+                         set(r['ip'] for r in log.requests))
+
+    def test_GET_prefer_data_fragments_with_failure(self):
+        segment_size = self.policy.ec_segment_size
+        test_data = (b'test' * segment_size)[:-289]
+        etag = md5(test_data, usedforsecurity=False).hexdigest()
+        ec_archive_bodies = self._make_ec_archive_bodies(test_data)
+        headers = {
+            'X-Object-Sysmeta-Ec-Etag': etag,
+            'X-Object-Sysmeta-Ec-Content-Length': len(test_data),
+        }
+        self.app.get_policy_options(
+            self.policy).ec_prefer_data_fragments = True
+
+        req = swift.common.swob.Request.blank('/v1/a/c/o')
+        # one data fragment is missing so a parity fragment is needed
+        ndata = self.policy.ec_ndata
+        status_codes = [404] + [200] * ndata
+        bodies = [b''] + ec_archive_bodies[1:ndata + 1]
+        with mocked_http_conn(*status_codes, body_iter=bodies,
+                              headers=headers) as log:
+            resp = req.get_response(self.app)
+            self.assertEqual(resp.status_int, 200)
+            self.assertEqual(resp.body, test_data)
+        requested_ips = [r['ip'] for r in log.requests]
+        self.assertEqual(ndata + 1, len(requested_ips))
+        self.assertEqual(self._data_fragment_ips(), set(requested_ips[:-1]))
+        self.assertNotIn(requested_ips[-1], self._data_fragment_ips())
+
     def test_GET_with_slow_nodes_and_failures(self):
         segment_size = self.policy.ec_segment_size
         test_data = (b'test' * segment_size)[:-289]
@@ -6753,6 +6971,95 @@ class TestECFunctions(unittest.TestCase):
         do_test(1)
         do_test(2)
 
+    def test_chunk_transformer_with_coding_pool(self):
+        segment_size = 1024
+        policy = ECStoragePolicy(0, 'ec8-2', ec_type=DEFAULT_TEST_EC_TYPE,
+                                 ec_ndata=8, ec_nparity=2,
+                                 object_ring=FakeRing(replicas=10),
+                                 ec_segment_size=segment_size)
+        orig_chunks = [chr(i + 97).encode('latin-1') * segment_size
+                       for i in range(3)]
+        last_chunk = b'z' * 100
+        expected = [b''.join(frags) for frags in zip(*[
+            policy.pyeclib_driver.encode(chunk) for chunk in orig_chunks])]
+        coding_pool = obj.ECCodingPool(2)
+        calls = []
+
+        def fake_execute(func, *args):
+            calls.append(func)
+            return func(*args)
+
+        with mock.patch('swift.proxy.controllers.obj.tpool.execute',
+                        fake_execute):
+            transform = obj.chunk_transformer(policy, coding_pool)
+            transform.send(None)
+            # several segments in one send are encoded concurrently
+            backend_chunks = transform.send(b''.join(orig_chunks))
+            self.assertEqual(expected, backend_chunks)
+            self.assertIsNone(transform.send(last_chunk))
+            backend_chunks = transform.send(b'')
+        self.assertEqual(policy.pyeclib_driver.encode(last_chunk),
+                         backend_chunks)
+        self.assertEqual([policy.pyeclib_driver.encode] * 4, calls)
+
+    def test_coding_pool_encode_many_error(self):
+        policy = ECStoragePolicy(0, 'ec8-2', ec_type=DEFAULT_TEST_EC_TYPE,
+                                 ec_ndata=8, ec_nparity=2,
+                                 object_ring=FakeRing(replicas=10),
+                                 ec_segment_size=1024)
+        coding_pool = obj.ECCodingPool(2)
+        finished = []
+
+        def fake_execute(func, segment):
+            if segment == b'b':
+                raise ECDriverError('kaboom')
+            sleep(0.01)
+            finished.append(segment)
+            return func(segment)
+
+        with mock.patch('swift.proxy.controllers.obj.tpool.execute',
+                        fake_execute):
+            with self.assertRaises(ECDriverError):
+                coding_pool.encode_many(policy, [b'a', b'b', b'c'])
+            sleep(0.05)
+        # the encode still running when the error was seen was killed, not
+        # left behind
+        self.assertEqual([b'a'], finished)
+
+    def test_chunk_buffer(self):
+        buf = obj.ChunkBuffer()
+        self.assertEqual(0, len(buf))
+        self.assertEqual(b'', buf.read(10))
+        buf.append(b'')
+        self.assertFalse(buf)
+        chunk = b'abcdef'
+        buf.append(chunk)
+        # a read of one whole chunk is not copied
+        self.assertIs(chunk, buf.read(6))
+        buf.append(b'abc')
+        buf.append(bytearray(b'defgh'))
+        buf.append(b'ij')
+        self.assertEqual(10, len(buf))
+        self.assertEqual(b'ab', buf.read(2))
+        self.assertEqual(b'cdefg', buf.read(5))
+        buf.skip(1)
+        self.assertEqual(2, len(buf))
+        self.assertEqual(b'ij', buf.read(5))
+        self.assertEqual(0, len(buf))
+        buf.append(b'klm')
+        buf.clear()
+        self.assertEqual(0, len(buf))
+        self.assertEqual(b'', buf.read(3))
+
+    def test_chunk_buffer_reads_are_bytes(self):
+        buf = obj.ChunkBuffer()
+        buf.append(b'x' * 10)
+        buf.append(bytearray(b'y' * 3))
+        for size in (4, 6, 3):
+            data = buf.read(size)
+            self.assertIsInstance(data, bytes)
+            self.assertEqual(size, len(data))
+
     def test_client_range_to_segment_range(self):
         actual = obj.client_range_to_segment_range(100, 700, 512)
         self.assertEqual(actual, (0, 1023))
@@ -8651,6 +8958,11 @@ class TestCooperativeToken(BaseObjectControllerMixin, unittest.TestCase):
                     else:
                         return super(CustomizedFakeCache, self).get(key)
 
+                def get_multi(self, keys, server_key=None):
+                    # nor is it there when prefetched with the container info
+                    return [None if key == cache_key else self.store.get(key)
+                            for key in keys]
+
             self.app.logger.clear()  # clean capture state
             self.app.statsd.clear()
             req = Request.blank(
@@ -8789,6 +9101,11 @@ class TestCooperativeToken(BaseObjectControllerMixin, unittest.TestCase):
                     else:
                         return super(CustomizedFakeCache, self).get(key)
 
+                def get_multi(self, keys, server_key=None):
+                    # nor is it there when prefetched with the container info
+                    return [None if key == cache_key else self.store.get(key)
+                            for key in keys]
+
             self.app.logger.clear()  # clean capture state
             self.app.statsd.clear()
             req = Request.blank(
@@ -54,7 +54,7 @@ from test import listen_zero, BaseTestCase
 from test.debug_logger import debug_logger, FakeStatsdClient, \
     debug_labeled_statsd_client
 from test.unit import (
-    connect_tcp, readuntil2crlfs, fake_http_connect, FakeRing,
+    connect_tcp, readuntil2crlfs, readbody, fake_http_connect, FakeRing,
     FakeMemcache, patch_policies, write_fake_ring, mocked_http_conn,
     DEFAULT_TEST_EC_TYPE, make_timestamp_iter, skip_if_no_xattrs,
     FakeHTTPResponse, node_error_count, node_last_error, set_node_errors)
@@ -85,6 +85,7 @@ from swift.proxy.controllers.base import get_cache_key, cors_validation, \
 import swift.proxy.controllers
 import swift.proxy.controllers.obj
 from swift.common.header_key_dict import HeaderKeyDict
+from swift.common.memcached import LocalCache
 from swift.common.swob import Request, Response, HTTPUnauthorized, \
     HTTPException, HTTPBadRequest, wsgi_to_str
 from swift.common.storage_policy import StoragePolicy, POLICIES
@@ -628,6 +629,12 @@ class TestProxyServerConfiguration(unittest.TestCase):
         self.assertEqual(app.container_listing_shard_ranges_skip_cache, 0.0001)
         self.assertEqual(app.container_updating_shard_ranges_skip_cache, 0.001)
 
+    def test_namespace_cache_compact_encoding_option(self):
+        app = self._make_app({})
+        self.assertFalse(app.namespace_cache_compact_encoding)
+        app = self._make_app({'namespace_cache_compact_encoding': 'yes'})
+        self.assertTrue(app.namespace_cache_compact_encoding)
+
 
 @patch_policies([StoragePolicy(0, 'zero', True, object_ring=FakeRing())])
 class TestProxyServer(unittest.TestCase):
@@ -865,6 +872,63 @@ class TestProxyServer(unittest.TestCase):
                        {'ip': '127.0.0.1'}]
         self.assertEqual(res, exp_sorting)
 
+    def test_node_latency(self):
+        baseapp = proxy_server.Application({'sorting_method': 'latency'},
+                                           container_ring=FakeRing(),
+                                           account_ring=FakeRing())
+        self.assertTrue(baseapp.sorts_by_latency)
+        self.assertFalse(baseapp.sorts_by_timing)
+        nodes = [{'ip': '127.0.0.%d' % i, 'port': 6200, 'device': 'sda'}
+                 for i in range(1, 5)]
+        baseapp.set_node_first_byte_timing(nodes[0], 0.3)
+        baseapp.set_node_first_byte_timing(nodes[1], 0.1)
+        baseapp.set_node_first_byte_timing(nodes[2], 0.2)
+        # connect times aren't mixed in with first byte times
+        baseapp.set_node_timing(nodes[3], 0.01)
+        self.assertIsNone(baseapp.node_latency.get_stats(nodes[3]))
+        self.assertEqual({}, baseapp.node_timings)
+        with mock.patch('swift.proxy.server.shuffle', lambda l: l):
+            res = baseapp.sort_nodes(list(nodes))
+        # nodes without stats come first
+        self.assertEqual([nodes[3], nodes[1], nodes[2], nodes[0]], res)
+
+        # handoffs are only sorted by latency
+        with mock.patch('swift.proxy.server.shuffle', lambda l: l):
+            res = baseapp.sort_handoff_nodes(list(nodes))
+        self.assertEqual([nodes[3], nodes[1], nodes[2], nodes[0]], res)
+        baseapp = proxy_server.Application({'sorting_method': 'timing'},
+                                           container_ring=FakeRing(),
+                                           account_ring=FakeRing())
+        self.assertIsNone(baseapp.node_latency)
+        baseapp.set_node_first_byte_timing(nodes[0], 0.3)
+        self.assertEqual(nodes, baseapp.sort_handoff_nodes(list(nodes)))
+
+    def test_node_latency_shared_file(self):
+        swift_dir = mkdtemp()
+        try:
+            conf = {'sorting_method': 'latency',
+                    'latency_shared_file': os.path.join(swift_dir, 'lat')}
+            app1 = proxy_server.Application(conf, container_ring=FakeRing(),
+                                            account_ring=FakeRing())
+            app2 = proxy_server.Application(conf, container_ring=FakeRing(),
+                                            account_ring=FakeRing())
+            node = {'ip': '127.0.0.1', 'port': 6200, 'device': 'sda'}
+            app1.set_node_first_byte_timing(node, 0.25)
+            self.assertEqual((0.25, 0.25),
+                             app2.node_latency.get_stats(node))
+
+            conf['latency_shared_file'] = os.path.join(
+                swift_dir, 'missing', 'lat')
+            logger = debug_logger()
+            app3 = proxy_server.Application(conf, logger=logger,
+                                            container_ring=FakeRing(),
+                                            account_ring=FakeRing())
+            self.assertIsNone(app3.node_latency.get_stats(node))
+            self.assertIn('Unable to map latency_shared_file',
+                          logger.get_lines_for_level('error')[0])
+        finally:
+            rmtree(swift_dir, ignore_errors=True)
+
     def _do_sort_nodes(self, conf, policy_conf, nodes, policy,
                        node_timings=None):
         # Note with shuffling mocked out, sort_nodes will by default return
@@ -1767,7 +1831,9 @@ class TestProxyServerConfigLoading(unittest.TestCase):
             "'write_affinity_handoff_delete_count': None, "
             "'rebalance_missing_suppression_count': 1, "
             "'concurrent_gets': False, 'concurrency_timeout': 0.5, "
-            "'concurrent_ec_extra_requests': 0"
+            "'concurrent_ec_extra_requests': 0, "
+            "'hedged_gets': False, 'hedge_budget': 5.0, "
+            "'ec_prefer_data_fragments': False"
             "}, app)",
             repr(default_options))
         self.assertEqual(default_options, eval(repr(default_options), {
@@ -1781,7 +1847,9 @@ class TestProxyServerConfigLoading(unittest.TestCase):
             "'write_affinity_handoff_delete_count': 4, "
             "'rebalance_missing_suppression_count': 2, "
             "'concurrent_gets': False, 'concurrency_timeout': 0.5, "
-            "'concurrent_ec_extra_requests': 0"
+            "'concurrent_ec_extra_requests': 0, "
+            "'hedged_gets': False, 'hedge_budget': 5.0, "
+            "'ec_prefer_data_fragments': False"
             "}, app)",
             repr(policy_0_options))
         self.assertEqual(policy_0_options, eval(repr(policy_0_options), {
@@ -2104,7 +2172,7 @@ class TestProxyServerConfigLoading(unittest.TestCase):
                 self._write_conf_and_load_app(conf_sections)
             self.assertEqual(
                 'Invalid sorting_method value; must be one of shuffle, '
-                "timing, affinity, not 'broken' for %s" % scope,
+                "timing, affinity, latency, not 'broken' for %s" % scope,
                 cm.exception.args[0])
 
         conf_sections = """
@@ -2271,6 +2339,55 @@ class TestProxyServerConfigLoading(unittest.TestCase):
         app = self._write_conf_and_load_app(conf_sections)
         self._check_policy_options(app, exp_options, {})
 
+    def test_per_policy_conf_overrides_default_hedging_settings(self):
+        conf_sections = """
+        [app:proxy-server]
+        use = egg:swift#proxy
+        hedged_gets = True
+
+        [proxy-server:policy:0]
+        hedged_gets = off
+
+        [proxy-server:policy:1]
+        hedge_budget = 10
+        """
+        exp_options = {
+            None: {
+                "hedged_gets": True,
+                "hedge_budget": 5.0,
+            }, POLICIES[0]: {
+                "hedged_gets": False,
+                "hedge_budget": 5.0,
+            }, POLICIES[1]: {
+                "hedged_gets": True,
+                "hedge_budget": 10.0,
+            }}
+        app = self._write_conf_and_load_app(conf_sections)
+        self._check_policy_options(app, exp_options, {})
+
+        self.assertIsNone(app.get_request_hedger('Object', POLICIES[0]))
+        hedger = app.get_request_hedger('Object', POLICIES[1])
+        self.assertEqual(0.1, hedger.budget)
+        self.assertIs(hedger, app.get_request_hedger('Object', POLICIES[1]))
+        self.assertIsNot(hedger, app.get_request_hedger('Account'))
+        self.assertEqual(0.05, app.get_request_hedger('Account').budget)
+
+    def test_per_policy_conf_overrides_default_ec_prefer_data_fragments(self):
+        conf_sections = """
+        [app:proxy-server]
+        use = egg:swift#proxy
+
+        [proxy-server:policy:0]
+        ec_prefer_data_fragments = on
+        """
+        exp_options = {
+            None: {"ec_prefer_data_fragments": False},
+            POLICIES[0]: {"ec_prefer_data_fragments": True},
+            POLICIES[1]: {"ec_prefer_data_fragments": False},
+        }
+        app = self._write_conf_and_load_app(conf_sections)
+        self._check_policy_options(app, exp_options, {})
+
     def test_log_name(self):
         # defaults...
         conf_sections = """
@@ -4374,6 +4491,61 @@ class TestReplicatedObjectController(
         do_test('PUT', 'sharding')
         do_test('PUT', 'sharded')
 
+    @patch_policies([
+        StoragePolicy(0, 'zero', is_default=True, object_ring=FakeRing()),
+        StoragePolicy(1, 'one', object_ring=FakeRing()),
+    ])
+    def test_backend_headers_update_shard_container_compact_cache(self):
+        # verify that updating namespaces are cached in the compact encoding
+        # when it is enabled, and are used from the cache
+        self.app.obj_controller_router = proxy_server.ObjectControllerRouter()
+        self.app.sort_nodes = lambda nodes, *args, **kwargs: nodes
+        self.app.namespace_cache_tokens_per_session = 0
+        self.app.namespace_cache_compact_encoding = True
+        cache = FakeMemcache()
+        resp_headers = {'X-Backend-Storage-Policy-Index': 1,
+                        'x-backend-sharding-state': 'sharded',
+                        'X-Backend-Record-Type': 'shard'}
+        shard_ranges = [
+            utils.ShardRange(
+                '.shards_a/c_not_used', NormalTimestamp.now(), '', 'l'),
+            utils.ShardRange(
+                '.shards_a/c_shard', NormalTimestamp.now(), 'l', 'u'),
+            utils.ShardRange(
+                '.shards_a/c_nope', NormalTimestamp.now(), 'u', ''),
+        ]
+        body = json.dumps([
+            dict(shard_range)
+            for shard_range in shard_ranges]).encode('ascii')
+
+        # acc HEAD, cont HEAD, cont shard GET, obj PUTs
+        req = Request.blank(
+            '/v1/a/c/o', {'swift.cache': cache}, method='PUT', body='',
+            headers={'Content-Type': 'text/plain'})
+        with mocked_http_conn(200, 200, 200, 201, 201, 201,
+                              headers=resp_headers, body=body):
+            resp = req.get_response(self.app)
+        self.assertEqual(resp.status_int, 201)
+        cached = cache.store['shard-updating-v2/a/c']
+        self.assertIsInstance(cached, bytes)
+        self.assertEqual(NamespaceBoundList.parse(shard_ranges).bounds,
+                         proxy_base.decode_compact_namespace_bounds(cached))
+
+        # obj PUTs only; everything else comes from memcache
+        req = Request.blank(
+            '/v1/a/c/o', {'swift.cache': cache}, method='PUT', body='',
+            headers={'Content-Type': 'text/plain'})
+        with mocked_http_conn(201, 201, 201,
+                              headers=resp_headers) as fake_conn:
+            resp = req.get_response(self.app)
+        self.assertEqual(resp.status_int, 201)
+        for request in fake_conn.requests:
+            self.assertEqual(
+                '.shards_a/c_shard',
+                request['headers']['X-Backend-Quoted-Container-Path'])
+        stats = self.app.logger.statsd_client.get_stats_counts()
+        self.assertEqual(1, stats['object.shard_updating.cache.hit'])
+
     @patch_policies([
         StoragePolicy(0, 'zero', is_default=True, object_ring=FakeRing()),
         StoragePolicy(1, 'one', object_ring=FakeRing()),
@@ -4601,6 +4773,103 @@ class TestReplicatedObjectController(
         do_test('PUT', 'sharding')
         do_test('PUT', 'sharded')
 
+    @patch_policies([
+        StoragePolicy(0, 'zero', is_default=True, object_ring=FakeRing()),
+        StoragePolicy(1, 'one', object_ring=FakeRing()),
+    ])
+    def test_backend_headers_update_shard_container_prefetched(self):
+        # verify that the container info and the updating shard ranges are
+        # fetched from memcache in a single round trip
+        self.app.obj_controller_router = proxy_server.ObjectControllerRouter()
+        self.app.sort_nodes = lambda nodes, *args, **kwargs: nodes
+        self.app.recheck_updating_shard_ranges = 3600
+
+        def do_test(method, sharding_state):
+            self.app.logger.clear()  # clean capture state
+            shard_ranges = [
+                utils.ShardRange(
+                    '.shards_a/c_not_used', NormalTimestamp.now(), '', 'l'),
+                utils.ShardRange(
+                    '.shards_a/c_shard', NormalTimestamp.now(), 'l', 'u'),
+                utils.ShardRange(
+                    '.shards_a/c_nope', NormalTimestamp.now(), 'u', ''),
+            ]
+            cache = FakeMemcache()
+            cache.set('container/a/c', {
+                'status': 200, 'storage_policy': '1', 'read_acl': None,
+                'write_acl': None, 'sync_key': None, 'versions': None,
+                'sharding_state': sharding_state})
+            cache.set(
+                'shard-updating-v2/a/c',
+                tuple(
+                    [shard_range.lower_str, str(shard_range.name)]
+                    for shard_range in shard_ranges))
+            status_codes = (201 if method == 'PUT' else 202,) * 3
+
+            def do_request():
+                cache.clear_calls()
+                self.app.logger.clear()
+                req = Request.blank('/v1/a/c/o', {'swift.cache': cache},
+                                    method=method, body='',
+                                    headers={'Content-Type': 'text/plain'})
+                # no account or container HEADs, just obj requests
+                with mocked_http_conn(*status_codes) as fake_conn:
+                    resp = req.get_response(self.app)
+                self.assertEqual(resp.status_int, status_codes[0])
+                return fake_conn
+
+            # until this worker has seen that the container is sharded its
+            # info and namespaces are fetched one after the other
+            self.app.sharded_containers = LocalCache(3600)
+            do_request()
+            self.assertEqual(
+                [mock.call.get('container/a/c'),
+                 mock.call.get('shard-updating-v2/a/c', raise_on_error=True)],
+                cache.calls)
+
+            # after which they're fetched together
+            fake_conn = do_request()
+            self.assertEqual(
+                [mock.call.get_multi(
+                    ['container/a/c', 'shard-updating-v2/a/c'])],
+                cache.calls)
+            stats = self.app.logger.statsd_client.get_stats_counts()
+            self.assertEqual({'container.info.cache.hit': 1,
+                              'container.info.infocache.hit': 1,
+                              'object.shard_updating.cache.hit': 1}, stats)
+            self.assertEqual(
+                [shard_ranges[1].name] * 3,
+                [request['headers'].get('X-Backend-Quoted-Container-Path')
+                 for request in fake_conn.requests])
+
+        do_test('POST', 'sharding')
+        do_test('POST', 'sharded')
+        do_test('DELETE', 'sharding')
+        do_test('DELETE', 'sharded')
+        do_test('PUT', 'sharding')
+        do_test('PUT', 'sharded')
+
+        # once the container is seen to be unsharded it's no longer worth
+        # fetching its shard ranges
+        cache = FakeMemcache()
+        cache.set('container/a/c', {
+            'status': 200, 'storage_policy': '1', 'read_acl': None,
+            'write_acl': None, 'sync_key': None, 'versions': None,
+            'sharding_state': 'unsharded'})
+        expected_calls = [
+            [mock.call.get_multi(['container/a/c', 'shard-updating-v2/a/c'])],
+            [mock.call.get('container/a/c')],
+        ]
+        for expected in expected_calls:
+            cache.clear_calls()
+            req = Request.blank('/v1/a/c/o', {'swift.cache': cache},
+                                method='PUT', body='',
+                                headers={'Content-Type': 'text/plain'})
+            with mocked_http_conn(201, 201, 201):
+                resp = req.get_response(self.app)
+            self.assertEqual(201, resp.status_int)
+            self.assertEqual(expected, cache.calls)
+
     @patch_policies([
         StoragePolicy(0, 'zero', is_default=True, object_ring=FakeRing()),
         StoragePolicy(1, 'one', object_ring=FakeRing()),
@@ -4872,7 +5141,10 @@ class TestReplicatedObjectController(
             req = Request.blank(
                 '/v1/a/c/o', {'swift.cache': cache},
                 method=method, body='', headers={'Content-Type': 'text/plain'})
-            cache.error_on_get = [False, True]
+            # the requests above showed the container to be sharded, so its
+            # shard ranges are prefetched with the container info, then
+            # looked up again on their own when that fails
+            cache.error_on_get = [False, True, True]
             with mock.patch('random.random', return_value=1.0), \
                     mocked_http_conn(*status_codes, headers=resp_headers,
                                      body=body):
@@ -6627,7 +6899,7 @@ class TestReplicatedObjectController(
         headers = readuntil2crlfs(fd)
         exp = b'HTTP/1.1 200'
         self.assertEqual(headers[:len(exp)], exp)
-        listing = json.loads(fd.read())
+        listing = json.loads(readbody(fd, headers))
         self.assertIn(ustr.decode('utf8'), [l['name'] for l in listing])
         # List account with ustr container (test xml)
         sock = connect_tcp(('localhost', prolis.getsockname()[1]))
@@ -6639,7 +6911,7 @@ class TestReplicatedObjectController(
         headers = readuntil2crlfs(fd)
         exp = b'HTTP/1.1 200'
         self.assertEqual(headers[:len(exp)], exp)
-        self.assertIn(b'<name>%s</name>' % ustr, fd.read())
+        self.assertIn(b'<name>%s</name>' % ustr, readbody(fd, headers))
         # Create ustr object with ustr metadata in ustr container
         sock = connect_tcp(('localhost', prolis.getsockname()[1]))
         fd = sock.makefile('rwb')
@@ -6663,7 +6935,7 @@ class TestReplicatedObjectController(
         headers = readuntil2crlfs(fd)
         exp = b'HTTP/1.1 200'
         self.assertEqual(headers[:len(exp)], exp)
-        objects = fd.read().split(b'\n')
+        objects = readbody(fd, headers).split(b'\n')
         self.assertIn(ustr, objects)
         # List ustr container with ustr object (test json)
         sock = connect_tcp(('localhost', prolis.getsockname()[1]))
@@ -6676,7 +6948,7 @@ class TestReplicatedObjectController(
         headers = readuntil2crlfs(fd)
         exp = b'HTTP/1.1 200'
         self.assertEqual(headers[:len(exp)], exp)
-        listing = json.loads(fd.read())
+        listing = json.loads(readbody(fd, headers))
         self.assertEqual(listing[0]['name'], ustr.decode('utf8'))
         # List ustr container with ustr object (test xml)
         sock = connect_tcp(('localhost', prolis.getsockname()[1]))
@@ -6689,7 +6961,7 @@ class TestReplicatedObjectController(
         headers = readuntil2crlfs(fd)
         exp = b'HTTP/1.1 200'
         self.assertEqual(headers[:len(exp)], exp)
-        self.assertIn(b'<name>%s</name>' % ustr, fd.read())
+        self.assertIn(b'<name>%s</name>' % ustr, readbody(fd, headers))
         # Retrieve ustr object with ustr metadata
         sock = connect_tcp(('localhost', prolis.getsockname()[1]))
         fd = sock.makefile('rwb')
@@ -12425,7 +12697,7 @@ class TestSocketObjectVersions(unittest.TestCase):
                      b'X-Storage-Token: t\r\n\r\n\r\n' % oc)
             fd.flush()
             headers = readuntil2crlfs(fd)
-            body = fd.read()
+            body = readbody(fd, headers)
             return headers, body
 
         # check that the header was set
@@ -12470,7 +12742,7 @@ class TestSocketObjectVersions(unittest.TestCase):
                      b'\r\n' % (container, obj))
             fd.flush()
             headers = readuntil2crlfs(fd)
-            body = fd.read()
+            body = readbody(fd, headers)
             return headers, body
 
         # Create the versioned file
@@ -12501,7 +12773,7 @@ class TestSocketObjectVersions(unittest.TestCase):
                      b'X-Storage-Token: t\r\n\r\n' % vc)
             fd.flush()
             headers = readuntil2crlfs(fd)
-            body = fd.read()
+            body = readbody(fd, headers)
             return headers, body
 
         # Ensure we have the right number of versions saved
@@ -12547,7 +12819,7 @@ class TestSocketObjectVersions(unittest.TestCase):
                      b'X-Auth-Token: t\r\n\r\n' % oc)
             fd.flush()
             headers = readuntil2crlfs(fd)
-            body = fd.read()
+            body = readbody(fd, headers)
             return headers, body
 
         headers, body = get_copy()
@@ -12606,7 +12878,7 @@ class TestSocketObjectVersions(unittest.TestCase):
             headers = readuntil2crlfs(fd)
             exp = b'HTTP/1.1 2'  # 2xx series response
             self.assertEqual(headers[:len(exp)], exp)
-            body = fd.read()
+            body = readbody(fd, headers)
             versions = [x for x in body.split(b'\n') if x]
             self.assertEqual(len(versions), segment - 1)
 
@@ -12668,7 +12940,7 @@ class TestSocketObjectVersions(unittest.TestCase):
         headers = readuntil2crlfs(fd)
         exp = b'HTTP/1.1 200 OK'
         self.assertEqual(headers[:len(exp)], exp)
-        body = fd.read()
+        body = readbody(fd, headers)
         versions = [x for x in body.split(b'\n') if x]
         self.assertEqual(versions_to_create - 1, len(versions))
 
@@ -12730,7 +13002,7 @@ class TestSocketObjectVersions(unittest.TestCase):
         headers = readuntil2crlfs(fd)
         exp = b'HTTP/1.1 2'  # 2xx series response
         self.assertEqual(headers[:len(exp)], exp)
-        body = fd.read()
+        body = readbody(fd, headers)
         versions = [x for x in body.split(b'\n') if x]
         self.assertEqual(len(versions), 1)
 
@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# Copyright (c) 2026 OpenStack Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Compare container DB listing page latency and DB size with and without the
+listing index added by the container auditor's listing_index option.
+
+A container DB with --objects objects is created in a temporary directory
+(pass --tmpdir to put it on a real disk). Pages of --limit entries are timed,
+as is a page of rows read by replication, before and after the index is
+added::
+
+    python tools/benchmarks/container_db_index.py --objects 1000000
+"""
+import argparse
+import hashlib
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from swift.common.utils import Timestamp
+from swift.container.backend import ContainerBroker
+
+
+def make_broker(db_path, num_objects):
+    broker = ContainerBroker(db_path, account='a', container='c')
+    broker.initialize(Timestamp.now().internal, 0)
+    batch = []
+    for i in range(num_objects):
+        name = 'dir%04d/object-%010d.jpg' % (i % 1000, i)
+        batch.append({'name': name,
+                      'created_at': Timestamp.now().internal,
+                      'size': random.randint(0, 1 << 30),
+                      'content_type': 'image/jpeg',
+                      'etag': hashlib.md5(name.encode('ascii')).hexdigest(),
+                      'deleted': 0, 'storage_policy_index': 0})
+        if len(batch) >= 100000:
+            broker.merge_items(batch)
+            batch = []
+    if batch:
+        broker.merge_items(batch)
+    return broker
+
+
+def timed(func, iterations):
+    start = time.time()
+    for _ in range(iterations):
+        func()
+    return (time.time() - start) / iterations * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split(
+        '\n')[0])
+    parser.add_argument('--objects', type=int, default=1000000)
+    parser.add_argument('--limit', type=int, default=10000)
+    parser.add_argument('--iterations', type=int, default=5)
+    parser.add_argument('--tmpdir', default=None)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(dir=args.tmpdir)
+    try:
+        db_path = os.path.join(tmpdir, 'container.db')
+        broker = make_broker(db_path, args.objects)
+        middle = 'dir0500/'
+        pages = (
+            ('first page', lambda: broker.list_objects_iter(
+                args.limit, '', '', '', '')),
+            ('from marker', lambda: broker.list_objects_iter(
+                args.limit, middle, '', '', '')),
+            ('reverse', lambda: broker.list_objects_iter(
+                args.limit, '', '', '', '', reverse=True)),
+            ('prefix', lambda: broker.list_objects_iter(
+                args.limit, '', '', middle, '')),
+            ('delimiter', lambda: broker.list_objects_iter(
+                args.limit, '', '', '', '/')),
+            ('replication', lambda: broker.get_items_since(
+                args.objects // 2, args.limit)),
+        )
+        results = []
+        for label in ('no index', 'index'):
+            if label == 'index':
+                start = time.time()
+                broker.create_listing_index()
+                print('added index in %.2fs' % (time.time() - start))
+            results.append(
+                [os.path.getsize(db_path) / float(1 << 20)] +
+                [timed(func, args.iterations) for _, func in pages])
+
+        print('%-14s %12s %12s' % ('', 'no index', 'index'))
+        print('%-14s %12.1f %12.1f' % ('DB size MiB', results[0][0],
+                                       results[1][0]))
+        for i, (label, _) in enumerate(pages, 1):
+            print('%-14s %12.2f %12.2f' % (
+                label + ' ms', results[0][i], results[1][i]))
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    main()
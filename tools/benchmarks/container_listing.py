@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# Copyright (c) 2026 OpenStack Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Time delimited container listings against a container DB with many objects.
+
+Object names are spread over --prefixes pseudo-directories. Each listing is
+timed when common prefixes are skip-scanned and when they are found with a
+query per common prefix, as listings of all policies still are. The DB is
+created in a temporary directory (pass --tmpdir to put it on a real disk)::
+
+    python tools/benchmarks/container_listing.py --objects 10000000
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from swift.common.utils import Timestamp
+from swift.container.backend import ContainerBroker
+
+
+def make_broker(db_path, num_objects, num_prefixes):
+    broker = ContainerBroker(db_path, account='a', container='c')
+    broker.initialize(Timestamp.now().internal, 0)
+    created_at = Timestamp.now().internal
+    batch = []
+    for i in range(num_objects):
+        batch.append({'name': 'dir%06d/obj%010d' % (i % num_prefixes, i),
+                      'created_at': created_at, 'size': 0,
+                      'content_type': 'text/plain', 'etag': 'etag',
+                      'deleted': 0, 'storage_policy_index': 0})
+        if len(batch) >= 100000:
+            broker.merge_items(batch)
+            batch = []
+    if batch:
+        broker.merge_items(batch)
+    return broker
+
+
+def timed(func, iterations):
+    start = time.time()
+    for _ in range(iterations):
+        result = func()
+    return result, (time.time() - start) / iterations * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split(
+        '\n')[0])
+    parser.add_argument('--objects', type=int, default=1000000)
+    parser.add_argument('--prefixes', type=int, default=100000)
+    parser.add_argument('--limit', type=int, default=10000)
+    parser.add_argument('--iterations', type=int, default=5)
+    parser.add_argument('--tmpdir', default=None)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(dir=args.tmpdir)
+    try:
+        broker = make_broker(os.path.join(tmpdir, 'container.db'),
+                             args.objects, args.prefixes)
+        listings = (
+            ('top level', dict(prefix='', delimiter='/')),
+            ('reverse', dict(prefix='', delimiter='/', reverse=True)),
+            ('in prefix', dict(prefix='dir000000/', delimiter='/')),
+            ('flat', dict(prefix='', delimiter='')),
+        )
+        print('%-10s %8s %14s %14s' % ('listing', 'rows', 'per prefix ms',
+                                       'skip-scan ms'))
+        for label, kwargs in listings:
+            # the DB only has policy 0, so listing all policies gets the
+            # same rows by querying for each common prefix
+            old, old_ms = timed(lambda: broker.list_objects_iter(
+                args.limit, '', '', all_policies=True, **kwargs),
+                args.iterations)
+            new, new_ms = timed(lambda: broker.list_objects_iter(
+                args.limit, '', '', storage_policy_index=0, **kwargs),
+                args.iterations)
+            assert [row[0] for row in old] == [row[0] for row in new]
+            print('%-10s %8d %14.2f %14.2f' % (label, len(new), old_ms,
+                                               new_ms))
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+# Copyright (c) 2026 OpenStack Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Compare the bytes sent and time taken to replicate a container DB by rsync,
+by usync and by syncing the pages that differ.
+
+A container DB with --objects objects is copied to a remote device as it
+would be by rsync, then --new-objects objects are added to the local replica
+and a few to the remote one. The local replica is then replicated to a copy
+of the remote one with each method, talking to the remote's replication RPCs
+in process. rsync is taken to send the whole DB, as it does when replicating
+to a tmp file. The DBs are created in a temporary directory (pass --tmpdir to
+put them on a real disk)::
+
+    python tools/benchmarks/db_replication.py --objects 1000000
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from unittest import mock
+
+from swift.common.utils import Timestamp, hash_path, storage_directory, \
+    mkdirs
+from swift.container.backend import ContainerBroker, DATADIR
+from swift.container.replicator import ContainerReplicator, \
+    ContainerReplicatorRpc
+
+
+class FakeResponse(object):
+    def __init__(self, status, data):
+        self.status = status
+        self.data = data
+
+
+class LocalConnection(object):
+    """
+    Send REPLICATE requests to replication RPCs in this process, counting the
+    bytes that would have been sent over the network.
+    """
+
+    def __init__(self, rpc, node, partition, hash_):
+        self.rpc = rpc
+        self.node = node
+        self.host = '%(ip)s:%(port)s' % node
+        self.replicate_args = [node['device'], partition, hash_]
+        self.bytes_sent = 0
+
+    def replicate(self, *args):
+        body = json.dumps(args)
+        self.bytes_sent += len(body)
+        resp = self.rpc.dispatch(self.replicate_args, json.loads(body))
+        self.bytes_sent += len(resp.body)
+        return FakeResponse(resp.status_int, resp.body)
+
+
+def merge_objects(broker, num_objects):
+    batch = []
+    for _ in range(num_objects):
+        name = 'object-%s' % uuid.uuid4()
+        batch.append({'name': name, 'created_at': Timestamp.now().internal,
+                      'size': 1024, 'content_type': 'text/plain',
+                      'etag': 'd41d8cd98f00b204e9800998ecf8427e',
+                      'deleted': 0, 'storage_policy_index': 0})
+        if len(batch) >= 100000:
+            broker.merge_items(batch)
+            batch = []
+    if batch:
+        broker.merge_items(batch)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split(
+        '\n')[0])
+    parser.add_argument('--objects', type=int, default=1000000)
+    parser.add_argument('--new-objects', type=int, default=10000)
+    parser.add_argument('--remote-objects', type=int, default=10)
+    parser.add_argument('--tmpdir', default=None)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(dir=args.tmpdir)
+    try:
+        hash_ = hash_path('a', 'c')
+        db_dir = storage_directory(DATADIR, 0, hash_)
+        local_path = os.path.join(tmpdir, 'local.db')
+        remote_path = os.path.join(tmpdir, 'remote.db')
+        local = ContainerBroker(local_path, account='a', container='c')
+        local.initialize(Timestamp.now().internal, 0)
+        merge_objects(local, args.objects)
+        # the remote replica starts out as a copy of the local one
+        shutil.copy(local_path, remote_path)
+        remote = ContainerBroker(remote_path, account='a', container='c')
+        remote.newid(local.get_info()['id'])
+        point = local.get_max_row()
+        remote.merge_syncs([{'remote_id': local.get_info()['id'],
+                             'sync_point': point}])
+        merge_objects(local, args.new_objects)
+        merge_objects(remote, args.remote_objects)
+        expected = args.objects + args.new_objects + args.remote_objects
+        print('DB size %.1f MiB' % (
+            os.path.getsize(local_path) / float(1 << 20)))
+
+        conf = {'devices': tmpdir, 'mount_check': 'false',
+                'per_diff': '1000', 'max_diffs': str(1 << 30)}
+        with mock.patch('swift.common.db_replicator.ring.Ring') as ring:
+            ring.return_value.replica_count = 3
+            daemon = ContainerReplicator(conf)
+        rpc = ContainerReplicatorRpc(tmpdir, DATADIR, ContainerBroker,
+                                     mount_check=False)
+        node = {'device': 'sdb', 'ip': '127.0.0.1', 'port': 6201,
+                'replication_ip': '127.0.0.1', 'replication_port': 6201}
+
+        def rsync_file(broker, remote_file, **kwargs):
+            # rsync sends all of the DB to a tmp file that does not exist
+            http.bytes_sent += os.path.getsize(broker.db_file)
+            shutil.copy(broker.db_file, os.path.join(
+                tmpdir, 'sdb', 'tmp', broker.get_info()['id']))
+            return True
+
+        daemon._rsync_file = rsync_file
+        methods = (
+            ('rsync', lambda broker, info: daemon._rsync_db(
+                broker, node, http, info['id'],
+                replicate_method='rsync_then_merge')),
+            ('usync', lambda broker, info: daemon._usync_db(
+                point, broker, http, remote.get_info()['id'], info['id'])),
+            ('pages', lambda broker, info: daemon._page_sync_db(
+                broker, http, info['id'])),
+        )
+        print('%-8s %12s %10s' % ('method', 'MiB sent', 'seconds'))
+        for label, method in methods:
+            device_dir = os.path.join(tmpdir, 'sda')
+            shutil.rmtree(device_dir, ignore_errors=True)
+            shutil.rmtree(os.path.join(tmpdir, 'sdb'), ignore_errors=True)
+            mkdirs(os.path.join(tmpdir, 'sdb', db_dir))
+            mkdirs(os.path.join(tmpdir, 'sdb', 'tmp'))
+            mkdirs(device_dir)
+            shutil.copy(remote_path, os.path.join(
+                tmpdir, 'sdb', db_dir, hash_ + '.db'))
+            broker = ContainerBroker(os.path.join(device_dir, 'local.db'))
+            shutil.copy(local_path, broker.db_file)
+            info = broker.get_info()
+            http = LocalConnection(rpc, node, 0, hash_)
+            start = time.time()
+            if not method(broker, info):
+                raise Exception('%s failed' % label)
+            elapsed = time.time() - start
+            synced = ContainerBroker(os.path.join(
+                tmpdir, 'sdb', db_dir, hash_ + '.db'))
+            assert synced.get_info()['object_count'] == expected
+            print('%-8s %12.2f %10.2f' % (
+                label, http.bytes_sent / float(1 << 20), elapsed))
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+# Copyright (c) 2026 OpenStack Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Compare the DiskFileManager with the ThreadedDiskFileManager under a
+concurrent PUT and GET load spread over several devices.
+
+Devices are directories in a temporary directory (pass --tmpdir to put them on
+a real disk). --slow-ms makes every write of object data to the first device
+block for that long, simulating a failing disk. For each manager the script
+reports the requests per second completed on the slow device and on the other
+devices, and the longest time the eventlet hub was unable to run another
+greenthread::
+
+    python tools/benchmarks/diskfile_load.py --slow-ms 20
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from swift.common import utils
+from swift.common.concurrency import GreenPool, sleep, spawn
+from swift.common.storage_policy import POLICIES
+from swift.obj.diskfile import DiskFileManager
+from swift.obj.threaded_diskfile import ThreadedDiskFileManager
+
+
+def slow_writes(device_path, delay):
+    """
+    Make os.write() block for delay seconds for files on device_path.
+    """
+    real_write = os.write
+
+    def write(fd, data):
+        if os.readlink('/proc/self/fd/%d' % fd).startswith(device_path):
+            time.sleep(delay)
+        return real_write(fd, data)
+    return write
+
+
+def run(mgr_cls, devices_dir, args):
+    conf = {'devices': devices_dir, 'mount_check': 'false',
+            'disk_io_threads_per_device': args.threads_per_device}
+    mgr = mgr_cls(conf, utils.get_logger(conf, log_route='diskfile-load'))
+    devices = sorted(os.listdir(devices_dir))
+    body = b'x' * args.size
+    done = dict((device, 0) for device in devices)
+    state = {'running': True, 'max_lag': 0.0}
+
+    def ticker():
+        while state['running']:
+            start = time.time()
+            sleep(0.001)
+            state['max_lag'] = max(state['max_lag'],
+                                   time.time() - start - 0.001)
+
+    def put_get(i):
+        device = devices[i % len(devices)]
+        df = mgr.get_diskfile(device, '0', 'AUTH_test', 'c', 'o%d' % i,
+                              policy=POLICIES.legacy)
+        with df.create(size=len(body)) as writer:
+            for offset in range(0, len(body), 65536):
+                writer.write(body[offset:offset + 65536])
+            writer.put({'X-Timestamp': utils.Timestamp.now().internal,
+                        'ETag': utils.md5(body).hexdigest(),
+                        'Content-Length': str(len(body))})
+        with df.open():
+            for _chunk in df.reader():
+                pass
+        done[device] += 1
+
+    tick = spawn(ticker)
+    pool = GreenPool(args.concurrency)
+    start = time.time()
+    for i in range(args.requests):
+        pool.spawn(put_get, i)
+    pool.waitall()
+    elapsed = time.time() - start
+    state['running'] = False
+    tick.wait()
+
+    slow = done[devices[0]] / elapsed
+    others = sum(done[d] for d in devices[1:]) / elapsed
+    print('%-24s %10.1f %14.1f %12.1fms' % (
+        mgr_cls.__name__, slow, others, state['max_lag'] * 1000))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split(
+        '\n')[0])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--devices', type=int, default=4)
+    parser.add_argument('--size', type=int, default=256 * 1024)
+    parser.add_argument('--slow-ms', type=float, default=0)
+    parser.add_argument('--threads-per-device', type=int, default=4)
+    parser.add_argument('--tmpdir', default=None)
+    args = parser.parse_args()
+
+    utils.HASH_PATH_SUFFIX = b'benchmark'
+    print('%-24s %10s %14s %14s' % (
+        'manager', 'slow req/s', 'other req/s', 'max hub lag'))
+    for mgr_cls in (DiskFileManager, ThreadedDiskFileManager):
+        tmpdir = tempfile.mkdtemp(dir=args.tmpdir)
+        real_write = os.write
+        try:
+            for i in range(args.devices):
+                os.mkdir(os.path.join(tmpdir, 'sd%d' % i))
+            if args.slow_ms:
+                os.write = slow_writes(os.path.join(tmpdir, 'sd0'),
+                                       args.slow_ms / 1000.0)
+            run(mgr_cls, tmpdir, args)
+        finally:
+            os.write = real_write
+            shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    main()
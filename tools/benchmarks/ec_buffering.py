@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+# Copyright (c) 2026 OpenStack Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Profile the buffering of the proxy's EC data path: the cutting of client
+chunks into segments on PUT, and of fragment archive chunks into fragments on
+GET.
+
+For each of the two, the bytes are buffered both with the proxy's ChunkBuffer
+and with the plain bytes slicing the proxy used before it. Encoding and
+decoding are left out. For every GB that goes through the buffer, the number
+of bytes objects allocated and the bytes copied into them are reported, along
+with the time taken and the peak memory traced by tracemalloc in a second
+run::
+
+    python tools/benchmarks/ec_buffering.py --chunk-size 65536
+"""
+import argparse
+import collections
+import time
+import tracemalloc
+
+from swift.proxy.controllers.obj import ChunkBuffer
+
+GB = 1024 ** 3
+
+
+class Counter(object):
+    def __init__(self):
+        self.allocations = 0
+        self.copied = 0
+
+    def copy(self, data):
+        self.allocations += 1
+        self.copied += len(data)
+        return data
+
+
+class CountingChunkBuffer(ChunkBuffer):
+    # ChunkBuffer.read, counting the joins
+    def __init__(self, counter):
+        super(CountingChunkBuffer, self).__init__()
+        self.counter = counter
+
+    def read(self, size):
+        pieces = self._take(size)
+        if len(pieces) == 1 and isinstance(pieces[0], bytes):
+            return pieces[0]
+        return self.counter.copy(b''.join(pieces))
+
+
+def put_chunk_buffer(chunks, segment_size, counter):
+    buf = CountingChunkBuffer(counter)
+    for chunk in chunks:
+        buf.append(chunk)
+        while len(buf) >= segment_size:
+            buf.read(segment_size)
+    buf.read(len(buf))
+
+
+def put_bytes(chunks, segment_size, counter):
+    # chunk_transformer's buffering before ChunkBuffer
+    buf = collections.deque()
+    total_buf_len = 0
+    for chunk in chunks:
+        buf.append(chunk)
+        total_buf_len += len(chunk)
+        while total_buf_len >= segment_size:
+            to_take = segment_size
+            pieces = []
+            while to_take > 0:
+                piece = buf.popleft()
+                if len(piece) > to_take:
+                    buf.appendleft(counter.copy(piece[to_take:]))
+                    piece = counter.copy(piece[:to_take])
+                pieces.append(piece)
+                to_take -= len(piece)
+                total_buf_len -= len(piece)
+            counter.copy(b''.join(pieces))
+    counter.copy(b''.join(buf))
+
+
+def get_chunk_buffer(chunks, fragment_size, counter):
+    buf = CountingChunkBuffer(counter)
+    for chunk in chunks:
+        buf.append(chunk)
+        while len(buf) >= fragment_size:
+            buf.read(fragment_size)
+    buf.read(len(buf))
+
+
+def get_bytes(chunks, fragment_size, counter):
+    # ECFragGetter's buffering before ChunkBuffer
+    buf = b''
+    for chunk in chunks:
+        buf = counter.copy(buf + chunk)
+        while len(buf) >= fragment_size:
+            counter.copy(buf[:fragment_size])
+            buf = counter.copy(buf[fragment_size:])
+    counter.copy(buf)
+
+
+def profile(func, chunk, nchunks, size):
+    # tracing slows every allocation down, so time an untraced run
+    counter = Counter()
+    start = time.time()
+    func((chunk for _ in range(nchunks)), size, counter)
+    elapsed = time.time() - start
+    tracemalloc.start()
+    func((chunk for _ in range(nchunks)), size, Counter())
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return counter, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split(
+        '\n')[0])
+    parser.add_argument('--chunk-size', type=int, default=65536,
+                        help='size of the chunks read from the client or '
+                        'from an object server')
+    parser.add_argument('--segment-size', type=int, default=1048576)
+    parser.add_argument('--fragment-size', type=int, default=262224,
+                        help='fragment size, including the fragment header')
+    parser.add_argument('--size', type=int, default=GB,
+                        help='bytes put through each buffer')
+    args = parser.parse_args()
+
+    chunk = b'x' * args.chunk_size
+    nchunks = max(1, args.size // args.chunk_size)
+    gbs = float(nchunks * args.chunk_size) / GB
+    print('%-4s %-12s %14s %14s %10s %10s' % (
+        'path', 'buffer', 'allocs/GB', 'copied MB/GB', 'secs/GB',
+        'peak MB'))
+    for path, size, funcs in (
+            ('PUT', args.segment_size,
+             (('ChunkBuffer', put_chunk_buffer), ('bytes', put_bytes))),
+            ('GET', args.fragment_size,
+             (('ChunkBuffer', get_chunk_buffer), ('bytes', get_bytes)))):
+        for name, func in funcs:
+            counter, elapsed, peak = profile(func, chunk, nchunks, size)
+            print('%-4s %-12s %14d %14.1f %10.3f %10.2f' % (
+                path, name, counter.allocations / gbs,
+                counter.copied / gbs / 1048576, elapsed / gbs,
+                peak / 1048576.0))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# Copyright (c) 2026 OpenStack Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Measure the EC encode throughput of one proxy worker, with and without the
+proxy's ec_coding_threads option.
+
+Each of --streams greenthreads encodes --size bytes of data one segment at a
+time, as the proxy does for one EC PUT. The total throughput is reported for
+4+2 and 10+4 policies, first with encodes run in the eventlet hub and then in
+a pool of --threads native threads::
+
+    python tools/benchmarks/ec_coding.py --streams 8 --threads 4
+"""
+import argparse
+import time
+
+from swift.common.concurrency import GreenPool
+from swift.common.storage_policy import ECStoragePolicy
+from swift.proxy.controllers.obj import ECCodingPool
+
+GB = 1024 ** 3
+
+
+def make_policy(ec_type, ndata, nparity, segment_size):
+    return ECStoragePolicy(0, 'ec%d-%d' % (ndata, nparity), ec_type=ec_type,
+                           ec_ndata=ndata, ec_nparity=nparity,
+                           ec_segment_size=segment_size)
+
+
+def encode_stream(policy, coding_pool, segment, nsegments):
+    for _ in range(nsegments):
+        if coding_pool is None:
+            policy.pyeclib_driver.encode(segment)
+        else:
+            coding_pool.encode(policy, segment)
+
+
+def run(policy, coding_pool, segment, nsegments, streams):
+    pool = GreenPool(streams)
+    start = time.time()
+    for _ in range(streams):
+        pool.spawn(encode_stream, policy, coding_pool, segment, nsegments)
+    pool.waitall()
+    return time.time() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split(
+        '\n')[0])
+    parser.add_argument('--ec-type', default='liberasurecode_rs_vand')
+    parser.add_argument('--segment-size', type=int, default=1048576)
+    parser.add_argument('--size', type=int, default=256 * 1048576,
+                        help='bytes encoded by each stream')
+    parser.add_argument('--streams', type=int, default=8)
+    parser.add_argument('--threads', type=int, default=4)
+    args = parser.parse_args()
+
+    nsegments = max(1, args.size // args.segment_size)
+    total = nsegments * args.segment_size * args.streams
+    print('%-6s %12s %12s' % ('policy', 'inline', '%d threads' %
+                              args.threads))
+    for ndata, nparity in ((4, 2), (10, 4)):
+        policy = make_policy(args.ec_type, ndata, nparity, args.segment_size)
+        segment = b'x' * args.segment_size
+        results = []
+        for coding_pool in (None, ECCodingPool(args.threads)):
+            elapsed = run(policy, coding_pool, segment, nsegments,
+                          args.streams)
+            results.append('%8.2f GB/s' % (total / GB / elapsed))
+        print('%-6s %12s %12s' % (
+            '%d+%d' % (ndata, nparity), results[0], results[1]))
+
+
+if __name__ == '__main__':
+    main()
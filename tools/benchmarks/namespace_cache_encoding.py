@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# Copyright (c) 2026 OpenStack Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Compare the JSON and compact memcache encodings of cached namespaces.
+
+Reports the size of each encoding and the time taken to encode a
+``NamespaceBoundList`` for memcache and to turn what memcache returns back into
+a ``NamespaceBoundList``, as the proxy does on every cache miss and hit::
+
+    python tools/benchmarks/namespace_cache_encoding.py --shards 10000
+"""
+import argparse
+import json
+import time
+
+from swift.common.utils import NamespaceBoundList, ShardName, ShardRange, \
+    Timestamp
+from swift.proxy.controllers.base import namespace_bounds_to_list, \
+    namespace_list_to_bounds
+
+
+def make_ns_bound_list(num_shards):
+    timestamp = Timestamp.now()
+    shard_ranges = []
+    lower = ''
+    for i in range(num_shards):
+        upper = '' if i == num_shards - 1 else \
+            'obj-%010d/some/longer/object/name' % (i * 1009)
+        name = ShardName.create('.shards_AUTH_test', 'container', 'container',
+                                timestamp, i)
+        shard_ranges.append(ShardRange(str(name), timestamp, lower, upper))
+        lower = upper
+    return NamespaceBoundList.parse(shard_ranges)
+
+
+def timed(func, iterations):
+    start = time.time()
+    for _ in range(iterations):
+        func()
+    return (time.time() - start) / iterations * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split(
+        '\n')[0])
+    parser.add_argument('--shards', type=int, default=10000)
+    parser.add_argument('--iterations', type=int, default=50)
+    args = parser.parse_args()
+
+    ns_bound_list = make_ns_bound_list(args.shards)
+    print('%-10s %12s %12s %12s' % ('encoding', 'bytes', 'encode ms',
+                                    'decode ms'))
+    for label, compact in (('json', False), ('compact', True)):
+        if compact:
+            def encode():
+                return namespace_list_to_bounds(ns_bound_list, compact=True)
+
+            def decode():
+                return namespace_bounds_to_list(data)
+        else:
+            # MemcacheRing serializes JSON values on set and get
+            def encode():
+                return json.dumps(
+                    namespace_list_to_bounds(ns_bound_list)).encode('ascii')
+
+            def decode():
+                return namespace_bounds_to_list(json.loads(data))
+
+        data = encode()
+        assert decode() == ns_bound_list
+        print('%-10s %12d %12.2f %12.2f' % (
+            label, len(data), timed(encode, args.iterations),
+            timed(decode, args.iterations)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# Copyright (c) 2026 OpenStack Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Compare the memory taken and lookup latency of the namespaces cached for
+object updates to a container with many shards.
+
+The namespaces of --shards shard ranges are kept as a NamespaceBoundList and as
+a CompactNamespaceBoundList, and --lookups object names are looked up in each.
+The time taken by a proxy to get the namespaces for an update is also timed,
+when they are decoded from the local cache for every request and when they
+are kept decoded in the local cache::
+
+    python tools/benchmarks/namespace_lookup.py --shards 100000
+"""
+import argparse
+import json
+import random
+import time
+import tracemalloc
+
+from swift.common.memcached import LocalCache
+from swift.common.utils import NamespaceBoundList, CompactNamespaceBoundList
+from swift.proxy.controllers.base import encode_compact_namespace_bounds, \
+    namespace_bounds_to_list
+
+
+def make_bounds(num_shards):
+    return [['' if i == 0 else 'obj-%010d' % (i * 1000),
+             '.shards_AUTH_test/c-%s-%d' % ('f' * 32, i)]
+            for i in range(num_shards)]
+
+
+def measure(func):
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        start = time.time()
+        result = func()
+        elapsed = time.time() - start
+        size = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    return result, size, elapsed
+
+
+def timed(func, iterations):
+    start = time.time()
+    for _ in range(iterations):
+        func()
+    return (time.time() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split(
+        '\n')[0])
+    parser.add_argument('--shards', type=int, default=100000)
+    parser.add_argument('--lookups', type=int, default=100000)
+    parser.add_argument('--requests', type=int, default=20)
+    args = parser.parse_args()
+
+    bounds = make_bounds(args.shards)
+    serialized = json.dumps(bounds)
+    items = ['obj-%010d' % random.randrange(args.shards * 1000)
+             for _ in range(args.lookups)]
+    print('%-12s %12s %12s %12s' % ('', 'MiB', 'build ms', 'lookup us'))
+    results = []
+    for label, klass in (
+            ('bound list', NamespaceBoundList),
+            ('compact', CompactNamespaceBoundList.from_bounds)):
+        # as decoded from memcache
+        ns_bound_list, size, elapsed = measure(
+            lambda: klass(json.loads(serialized)))
+        start = time.time()
+        results.append([ns_bound_list.get_namespace(item) for item in items])
+        lookup = (time.time() - start) / len(items) * 1e6
+        print('%-12s %12.1f %12.1f %12.2f' % (
+            label, size / float(1 << 20), elapsed * 1000, lookup))
+    assert results[0] == results[1]
+
+    cache_key = 'shard-updating-v2/a/c/'
+    for label, value in (('json', bounds),
+                         ('compact', encode_compact_namespace_bounds(bounds))):
+        local_cache = LocalCache(60)
+        local_cache.set(cache_key, value)
+        # the first hit decodes the namespaces and keeps them
+        local_cache.get_decoded(
+            cache_key, lambda b: namespace_bounds_to_list(b, compact=True))
+        per_request = timed(lambda: namespace_bounds_to_list(
+            local_cache.get(cache_key)), args.requests) / 1000
+        decoded = timed(lambda: local_cache.get_decoded(
+            cache_key, lambda b: namespace_bounds_to_list(b, compact=True)),
+            args.requests) / 1000
+        print('%-12s decode per request %.2fms, kept decoded %.4fms' % (
+            label, per_request, decoded))
+
+
+if __name__ == '__main__':
+    main()
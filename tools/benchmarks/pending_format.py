@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# Copyright (c) 2026 OpenStack Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Compare the throughput of container .pending files written as base64 encoded
+pickles and in the binary format.
+
+For each format --records object updates are put to a container DB and then
+loaded from its .pending file; loading is timed without merging the records
+into the DB, so that only the cost of the format is measured. The DB is
+created in a temporary directory (pass --tmpdir to put it on a real disk)::
+
+    python tools/benchmarks/pending_format.py --records 100000
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from unittest import mock
+
+import swift.common.db
+from swift.common.utils import Timestamp
+from swift.container.backend import ContainerBroker
+
+
+def run(db_path, num_records, binary):
+    broker = ContainerBroker(db_path, account='a', container='c')
+    broker.initialize(Timestamp.now().internal, 0)
+    timestamp = Timestamp.now().internal
+    records = [{'name': 'dir%04d/object-%010d.jpg' % (i % 1000, i),
+                'created_at': timestamp, 'size': i,
+                'content_type': 'image/jpeg',
+                'etag': 'd41d8cd98f00b204e9800998ecf8427e', 'deleted': 0,
+                'storage_policy_index': 0, 'ctype_timestamp': None,
+                'meta_timestamp': None}
+               for i in range(num_records)]
+    with mock.patch.object(swift.common.db, 'BINARY_PENDING', binary), \
+            mock.patch.object(swift.common.db, 'PENDING_CAP', float('inf')):
+        start = time.time()
+        for record in records:
+            broker.put_record(record)
+        put_time = time.time() - start
+    size = os.path.getsize(broker.pending_file)
+
+    loaded = []
+    with mock.patch.object(broker, 'merge_items', loaded.extend):
+        start = time.time()
+        broker._commit_puts()
+        load_time = time.time() - start
+    assert len(loaded) == num_records
+    return put_time, load_time, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split(
+        '\n')[0])
+    parser.add_argument('--records', type=int, default=100000)
+    parser.add_argument('--tmpdir', default=None)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(dir=args.tmpdir)
+    try:
+        print('%-8s %14s %14s %12s' % ('format', 'puts/s', 'loads/s',
+                                       'bytes'))
+        for label, binary in (('pickle', False), ('binary', True)):
+            put_time, load_time, size = run(
+                os.path.join(tmpdir, '%s.db' % label), args.records, binary)
+            print('%-8s %14d %14d %12d' % (
+                label, args.records / put_time, args.records / load_time,
+                size))
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# Copyright (c) 2026 OpenStack Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Compare resolving names one at a time through ``Ring.get_nodes()`` with the
+bulk ``Ring.get_nodes_many()`` / ``Ring.get_parts_many()`` APIs.
+
+Builds a throw-away ring in a temporary directory, so it needs nothing but a
+Swift checkout::
+
+    python tools/benchmarks/ring_lookups.py --names 1000000
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from swift.common import utils
+from swift.common.ring import Ring, RingBuilder
+
+
+def build_ring(path, part_power, replicas, devices):
+    builder = RingBuilder(part_power, replicas, 1)
+    for i in range(devices):
+        builder.add_dev({'id': i, 'region': 1, 'zone': i % 4,
+                         'ip': '10.0.0.%d' % (i % 250 + 1), 'port': 6200,
+                         'device': 'sd%d' % i, 'weight': 100})
+    builder.rebalance()
+    builder.get_ring().save(path)
+
+
+def timed(label, func, count):
+    start = time.time()
+    func()
+    elapsed = time.time() - start
+    print('%-28s %8.3fs %12.0f names/s' % (label, elapsed, count / elapsed))
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split(
+        '\n')[0])
+    parser.add_argument('--names', type=int, default=1000000)
+    parser.add_argument('--part-power', type=int, default=18)
+    parser.add_argument('--replicas', type=int, default=3)
+    parser.add_argument('--devices', type=int, default=48)
+    args = parser.parse_args()
+
+    utils.HASH_PATH_SUFFIX = b'benchmark'
+    tmpdir = tempfile.mkdtemp()
+    try:
+        build_ring(os.path.join(tmpdir, 'object.ring.gz'), args.part_power,
+                   args.replicas, args.devices)
+        ring = Ring(tmpdir, ring_name='object')
+        names = [('AUTH_test', 'c%d' % (i % 100), 'o%d' % i)
+                 for i in range(args.names)]
+
+        single = timed('get_part() loop', lambda: [
+            ring.get_part(*name) for name in names], len(names))
+        bulk = timed('get_parts_many()',
+                     lambda: ring.get_parts_many(names), len(names))
+        print('%-28s %8.2fx' % ('speedup', single / bulk))
+
+        single = timed('get_nodes() loop', lambda: [
+            ring.get_nodes(*name) for name in names], len(names))
+        bulk = timed('get_nodes_many()',
+                     lambda: ring.get_nodes_many(names), len(names))
+        print('%-28s %8.2fx' % ('speedup', single / bulk))
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# Copyright (c) 2026 OpenStack Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Time finding shard ranges in a container DB as swift-manage-shard-ranges find
+does.
+
+A container DB with --objects objects, one in --deleted-every of which are
+deleted, is created in a temporary directory (pass --tmpdir to put it on a real
+disk). Shard ranges of each of the --rows-per-shard sizes are found a few at
+a time, with each search given the ranges already found, and all with one
+search. Both ways must find the same ranges::
+
+    python tools/benchmarks/shard_range_discovery.py --objects 10000000 \\
+        --rows-per-shard 500000 100000 10000
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from swift.common.utils import Timestamp
+from swift.container.backend import ContainerBroker
+from swift.container.sharder import make_shard_ranges
+
+
+def make_broker(db_path, num_objects, deleted_every):
+    broker = ContainerBroker(db_path, account='a', container='c')
+    broker.initialize(Timestamp.now().internal, 0)
+    created_at = Timestamp.now().internal
+    batch = []
+    for i in range(num_objects):
+        batch.append({'name': 'obj%010d' % i, 'created_at': created_at,
+                      'size': 0, 'content_type': 'text/plain',
+                      'etag': 'etag', 'deleted': int(i % deleted_every == 0),
+                      'storage_policy_index': 0})
+        if len(batch) >= 100000:
+            broker.merge_items(batch)
+            batch = []
+    if batch:
+        broker.merge_items(batch)
+    return broker
+
+
+def find_in_batches(broker, rows_per_shard, limit=5):
+    shard_data, last_found = broker.find_shard_ranges(
+        rows_per_shard, limit=limit)
+    while shard_data and not last_found:
+        found_ranges = make_shard_ranges(broker, shard_data, '.shards_')
+        more_shard_data, last_found = broker.find_shard_ranges(
+            rows_per_shard, existing_ranges=found_ranges, limit=limit)
+        shard_data.extend(more_shard_data)
+    return shard_data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split(
+        '\n')[0])
+    parser.add_argument('--objects', type=int, default=2000000)
+    parser.add_argument('--deleted-every', type=int, default=7)
+    parser.add_argument('--rows-per-shard', type=int, nargs='+',
+                        default=[100000, 10000, 1000])
+    parser.add_argument('--tmpdir', default=None)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(dir=args.tmpdir)
+    try:
+        broker = make_broker(os.path.join(tmpdir, 'container.db'),
+                             args.objects, args.deleted_every)
+        print('%14s %8s %12s %12s' % ('rows per shard', 'ranges',
+                                      'batches s', 'one call s'))
+        for rows_per_shard in args.rows_per_shard:
+            start = time.time()
+            in_batches = find_in_batches(broker, rows_per_shard)
+            batches_elapsed = time.time() - start
+            start = time.time()
+            in_one_call, _last_found = broker.find_shard_ranges(
+                rows_per_shard, progress_callback=lambda found: None)
+            one_call_elapsed = time.time() - start
+            assert in_batches == in_one_call
+            print('%14d %8d %12.2f %12.2f' % (
+                rows_per_shard, len(in_one_call), batches_elapsed,
+                one_call_elapsed))
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+# Copyright (c) 2026 OpenStack Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Compare the throughput of cleaving object rows into shard containers with and
+without the sharder's bulk_cleave option.
+
+A container DB with --objects objects is cleaved into --shards new shard DBs,
+first by merging batches of rows read by the sharder and then by copying them
+between the DBs in SQLite. The DBs are created in a temporary directory (pass
+--tmpdir to put them on a real disk)::
+
+    python tools/benchmarks/sharder_cleave.py --objects 10000000
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from unittest import mock
+
+from swift.common.utils import Timestamp, ShardRange
+from swift.container.backend import ContainerBroker
+from swift.container.sharder import ContainerSharder
+
+
+def make_broker(db_path, num_objects):
+    broker = ContainerBroker(db_path, account='a', container='c')
+    broker.initialize(Timestamp.now().internal, 0)
+    batch = []
+    for i in range(num_objects):
+        batch.append({'name': 'obj%010d' % i,
+                      'created_at': Timestamp.now().internal, 'size': i,
+                      'content_type': 'text/plain',
+                      'etag': 'd41d8cd98f00b204e9800998ecf8427e',
+                      'deleted': int(i % 10 == 0),
+                      'storage_policy_index': 0})
+        if len(batch) >= 100000:
+            broker.merge_items(batch)
+            batch = []
+    if batch:
+        broker.merge_items(batch)
+    return broker
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split(
+        '\n')[0])
+    parser.add_argument('--objects', type=int, default=1000000)
+    parser.add_argument('--shards', type=int, default=4)
+    parser.add_argument('--cleave-row-batch-size', type=int, default=10000)
+    parser.add_argument('--tmpdir', default=None)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(dir=args.tmpdir)
+    try:
+        broker = make_broker(os.path.join(tmpdir, 'container.db'),
+                             args.objects)
+        step = args.objects // args.shards
+        bounds = [''] + ['obj%010d' % (i * step)
+                         for i in range(1, args.shards)] + ['']
+        shard_ranges = [
+            ShardRange('.shards_a/c-%d' % i, Timestamp.now(), lower, upper)
+            for i, (lower, upper) in enumerate(zip(bounds, bounds[1:]))]
+        conf = {'devices': tmpdir, 'mount_check': 'false',
+                'cleave_row_batch_size': str(args.cleave_row_batch_size)}
+        with mock.patch('swift.container.sharder.internal_client.'
+                        'InternalClient'), \
+                mock.patch('swift.common.db_replicator.ring.Ring') as ring:
+            ring.return_value.replica_count = 3
+            sharder = ContainerSharder(conf)
+
+        def merge_batches(shard_range, shard_broker):
+            for objects, _info in sharder.yield_objects(broker, shard_range):
+                shard_broker.merge_items(objects)
+
+        def bulk_merge(shard_range, shard_broker):
+            sharder.merge_objects(broker, shard_range, shard_broker)
+
+        print('%-10s %10s %14s' % ('cleave', 'seconds', 'rows/second'))
+        for label, cleave in (('batches', merge_batches),
+                              ('bulk', bulk_merge)):
+            elapsed = 0
+            for shard_range in shard_ranges:
+                shard_broker = ContainerBroker(
+                    os.path.join(tmpdir, '%s-%s.db' % (
+                        label, shard_range.container)),
+                    account=shard_range.account,
+                    container=shard_range.container)
+                shard_broker.initialize(Timestamp.now().internal, 0)
+                start = time.time()
+                cleave(shard_range, shard_broker)
+                elapsed += time.time() - start
+                assert shard_broker.get_max_row() > 0
+            print('%-10s %10.2f %14.0f' % (label, elapsed,
+                                           args.objects / elapsed))
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    main()